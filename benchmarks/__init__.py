@@ -0,0 +1,4 @@
+"""
+Benchmark Suite
+วัดความเร็วของ Backtester, Indicators และ PerformanceMetrics ด้วยข้อมูลจำลอง (offline)
+"""
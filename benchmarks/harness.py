@@ -0,0 +1,123 @@
+"""
+Benchmark Harness
+จับเวลา, บันทึกผลเป็น JSON และเปรียบเทียบผลระหว่าง commits
+"""
+
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+
+def time_call(func, repeat=3, warmup=1):
+    """
+    จับเวลาการเรียกฟังก์ชันหลายรอบ
+    
+    Args:
+        func: ฟังก์ชันที่ไม่มี argument
+        repeat: จำนวนรอบที่จับเวลา
+        warmup: จำนวนรอบอุ่นเครื่อง (ไม่นับเวลา)
+    
+    Returns:
+        dict: min_s, median_s, mean_s, repeat
+    """
+    for _ in range(warmup):
+        func()
+    
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    
+    return {
+        'min_s': min(timings),
+        'median_s': statistics.median(timings),
+        'mean_s': statistics.fmean(timings),
+        'repeat': repeat,
+    }
+
+
+def git_commit():
+    """commit ปัจจุบันของ repository (None ถ้าไม่ใช่ git repo)"""
+    try:
+        output = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+        return output.stdout.strip()
+    except Exception:
+        return None
+
+
+def environment_info():
+    """ข้อมูลเครื่องและเวอร์ชัน library ที่ใช้รัน benchmark"""
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+    }
+
+
+def write_results(path, results, meta=None):
+    """
+    บันทึกผล benchmark เป็น JSON
+    
+    Args:
+        path: ไฟล์ปลายทาง
+        results: list ของ dict ผลลัพธ์แต่ละรายการ
+        meta: ข้อมูลประกอบ (default = environment_info())
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'meta': meta or environment_info(), 'results': results}, f, indent=2)
+
+
+def load_results(path):
+    """โหลดผล benchmark จากไฟล์ JSON"""
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare_results(baseline, current, threshold=1.2):
+    """
+    เปรียบเทียบผล benchmark สองชุด (ใช้ median_s)
+    
+    Args:
+        baseline: dict จาก load_results() ของ commit อ้างอิง
+        current: dict จาก load_results() ของ commit ปัจจุบัน
+        threshold: อัตราส่วนเวลาที่ถือว่าช้าลง (1.2 = ช้าลง 20%)
+    
+    Returns:
+        list: dict ของแต่ละรายการ (name, scale, baseline_s, current_s, ratio, regression)
+    """
+    reference = {(row['name'], row['scale']): row for row in baseline['results']}
+    
+    rows = []
+    for row in current['results']:
+        base = reference.get((row['name'], row['scale']))
+        if base is None or base['median_s'] <= 0:
+            continue
+        ratio = row['median_s'] / base['median_s']
+        rows.append({
+            'name': row['name'],
+            'scale': row['scale'],
+            'baseline_s': base['median_s'],
+            'current_s': row['median_s'],
+            'ratio': ratio,
+            'regression': ratio > threshold,
+        })
+    return rows
@@ -0,0 +1,276 @@
+"""
+Backtesting Benchmarks
+วัดความเร็ว Backtester, Indicators และ PerformanceMetrics ที่หลายขนาดข้อมูล
+
+ตัวอย่าง:
+    python -m benchmarks.run_benchmarks --scales small medium
+    python -m benchmarks.run_benchmarks --compare benchmarks/results/baseline.json
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.harness import time_call, environment_info, write_results, load_results, compare_results
+from src.data.synthetic import generate_ohlcv
+from src.analysis.technical import TechnicalAnalyzer
+from src.signals.generator import SignalGenerator, AISignalGenerator
+from src.backtesting.backtester import Backtester
+from src.backtesting.events import EventRecorder
+from src.backtesting.portfolio import PortfolioBacktester
+from src.backtesting.metrics import PerformanceMetrics
+from src.ai.dataset import DatasetBuilder
+from src.ai.models import SignalClassifier, SIGNAL_CLASSIFIER_BACKENDS, CorrelationAnalyzer
+from src.ai.correlation import CorrelationIndex
+
+# ขนาดข้อมูล: (จำนวนหุ้น, จำนวนวันทำการ)
+SCALES = {
+    'small': (5, 252),
+    'medium': (20, 756),
+    'large': (100, 2520),
+    'universe': (500, 2520),
+}
+
+ROLLING_WINDOWS = (5, 10, 21, 42, 63, 84, 126, 189, 252, 378, 504, 756)
+
+INDICATORS = {
+    'sma_20': lambda data: TechnicalAnalyzer.calculate_sma(data, 20),
+    'ema_12': lambda data: TechnicalAnalyzer.calculate_ema(data, 12),
+    'rsi': TechnicalAnalyzer.calculate_rsi,
+    'macd': TechnicalAnalyzer.calculate_macd,
+    'bollinger_bands': TechnicalAnalyzer.calculate_bollinger_bands,
+    'atr': TechnicalAnalyzer.calculate_atr,
+    'stochastic': TechnicalAnalyzer.calculate_stochastic,
+    'indicator_history': TechnicalAnalyzer.get_indicator_history,
+}
+
+
+def bench_indicators(history, repeat):
+    """จับเวลา indicators ทุกตัว (รวมทุกหุ้น)"""
+    frames = list(history.values())
+    results = {}
+    for name, func in INDICATORS.items():
+        results[f'indicators.{name}'] = time_call(lambda: [func(data) for data in frames], repeat)
+    
+    signal_gen = SignalGenerator()
+    indicator_frames = [TechnicalAnalyzer.get_indicator_history(data) for data in frames]
+    results['signals.generate_signals_vectorized'] = time_call(
+        lambda: [signal_gen.generate_signals_vectorized(frame) for frame in indicator_frames], repeat)
+    return results
+
+
+def bench_metrics(history, repeat):
+    """จับเวลา PerformanceMetrics บน equity curve ของแต่ละหุ้น"""
+    closes = [data['Close'] * (10000 / data['Close'].iloc[0]) for data in history.values()]
+    returns = [close.pct_change().dropna() for close in closes]
+    benchmark = returns[0]
+    equity_curves = [close.to_frame('Portfolio Value') for close in closes]
+    equity_panel = pd.concat(closes, axis=1, keys=range(len(closes)))
+    summary = {'total_return': 10.0, 'win_rate': 55.0, 'avg_win': 120.0, 'avg_loss': -80.0,
+               'profit_factor': 1.5, 'total_trades': 40}
+    
+    return {
+        'metrics.sharpe_ratio': time_call(
+            lambda: [PerformanceMetrics.calculate_sharpe_ratio(r) for r in returns], repeat),
+        'metrics.sortino_ratio': time_call(
+            lambda: [PerformanceMetrics.calculate_sortino_ratio(r) for r in returns], repeat),
+        'metrics.max_drawdown': time_call(
+            lambda: [PerformanceMetrics.calculate_max_drawdown(c) for c in closes], repeat),
+        'metrics.volatility': time_call(
+            lambda: [PerformanceMetrics.calculate_volatility(r) for r in returns], repeat),
+        'metrics.alpha_beta': time_call(
+            lambda: [PerformanceMetrics.calculate_alpha_beta(r, benchmark) for r in returns], repeat),
+        'metrics.generate_report': time_call(
+            lambda: [PerformanceMetrics.generate_report(summary, curve) for curve in equity_curves], repeat),
+        'metrics.rolling_metrics': time_call(
+            lambda: [PerformanceMetrics.rolling_metrics(c, ROLLING_WINDOWS, benchmark=closes[0]) for c in closes],
+            repeat),
+        'metrics.generate_batch_report': time_call(
+            lambda: PerformanceMetrics.generate_batch_report(equity_panel), repeat),
+    }
+
+
+def bench_backtests(history, repeat):
+    """จับเวลา Backtester.run_backtest และ PortfolioBacktester.run_backtest"""
+    symbols = list(history)
+    dates = next(iter(history.values())).index
+    start_date = dates[min(200, len(dates) // 4)]
+    end_date = dates[-1]
+    
+    def run_backtester():
+        backtester = Backtester(initial_capital=100000, events=EventRecorder(quiet=True))
+        backtester.run_backtest(None, symbols, start_date, end_date, historical_data=history)
+    
+    def run_portfolio():
+        PortfolioBacktester(initial_capital=100000).run_backtest(symbols, start_date, end_date,
+                                                                 historical_data=history)
+    
+    return {
+        'backtester.run_backtest': time_call(run_backtester, repeat),
+        'portfolio.run_backtest': time_call(run_portfolio, repeat),
+    }
+
+
+def bench_dataset(history, repeat):
+    """จับเวลาการสร้าง Feature matrix + Labels สำหรับฝึก AI models"""
+    builder = DatasetBuilder()
+    indicators = {symbol: TechnicalAnalyzer.get_indicator_history(data) for symbol, data in history.items()}
+    return {
+        'dataset.build': time_call(lambda: builder.build(history), repeat),
+        'dataset.build_from_indicators': time_call(lambda: builder.build_from_indicators(indicators), repeat),
+    }
+
+
+def time_per_call(func, calls, repeat):
+    """จับเวลาเฉลี่ยต่อการเรียกหนึ่งครั้ง (เรียกติดกัน calls ครั้งต่อรอบ สำหรับงานที่เร็วกว่าความละเอียดของนาฬิกา)"""
+    timing = time_call(lambda: [func() for _ in range(calls)], repeat)
+    return {**{key: timing[key] / calls for key in ('min_s', 'median_s', 'mean_s')},
+            'repeat': repeat, 'calls': calls}
+
+
+def bench_inference(history, repeat):
+    """จับเวลาการทำนายแถวเดียวของ AISignalGenerator (sklearn เทียบกับ CompactTreeEnsemble)"""
+    dataset = DatasetBuilder().build(history)
+    generator = AISignalGenerator()
+    generator.train_model(dataset.X, dataset.y)
+    row = dataset.X[-1:]
+    model, scaler = generator.model, generator.scaler
+    
+    timings = {
+        'ai.predict_row.sklearn': time_per_call(lambda: generator._predict_proba(row), 200, repeat),
+        'ai.predict_row.sklearn_direct': time_per_call(
+            lambda: model.predict_proba(scaler.transform(row)), 200, repeat),
+    }
+    generator.compile_model()
+    compact = generator.compact
+    timings['ai.predict_row.compact'] = time_per_call(lambda: generator._predict_proba(row), 200, repeat)
+    timings['ai.predict_row.compact_direct'] = time_per_call(lambda: compact.predict_proba(row), 200, repeat)
+    timings['ai.predict_batch.compact'] = time_call(lambda: generator._predict_proba(dataset.X), repeat)
+    return timings
+
+
+def bench_training(history, repeat):
+    """จับเวลาการฝึก SignalClassifier แต่ละ backend และวัด accuracy บนข้อมูลช่วงท้าย 20%"""
+    dataset = DatasetBuilder().build(history)
+    cutoff = np.sort(dataset.dates)[int(len(dataset) * 0.8)]
+    train, test = dataset.split(cutoff)
+    
+    results = {}
+    for backend in SIGNAL_CLASSIFIER_BACKENDS:
+        classifier = SignalClassifier(backend=backend)
+        timing = time_call(lambda: classifier.train(train.X, train.y, dates=train.dates), repeat, warmup=0)
+        prediction = classifier.predict(test.X)['prediction']
+        results[f'signal_classifier.train.{backend}'] = {
+            **timing,
+            'train_rows': len(train),
+            'accuracy': float(np.mean(prediction == test.y)),
+        }
+    return results
+
+
+def bench_correlation(history, repeat):
+    """จับเวลา correlation matrix ของ pandas เทียบกับ CorrelationIndex (build / update / lookup)"""
+    close = pd.DataFrame({symbol: data['Close'] for symbol, data in history.items()})
+    window = min(252, len(close) - 1)
+    symbol = close.columns[0]
+    index = CorrelationIndex.from_prices(close, k=10, window=window)
+    
+    def lookup():
+        return index.most_correlated(symbol)
+    
+    def pandas_lookup():
+        matrix = CorrelationAnalyzer.calculate_correlation_matrix(close.iloc[-window - 1:])
+        return CorrelationAnalyzer.find_correlated_stocks(matrix, symbol, threshold=0.0)
+    
+    return {
+        'correlation.pandas_matrix_lookup': time_call(pandas_lookup, repeat),
+        'correlation.index_build': time_call(lambda: CorrelationIndex.from_prices(close, k=10, window=window),
+                                             repeat),
+        'correlation.index_update': time_call(lambda: index.update(np.zeros(len(index.symbols))), repeat),
+        'correlation.index_lookup': time_call(lookup, repeat),
+    }
+
+
+SUITES = {
+    'indicators': bench_indicators,
+    'metrics': bench_metrics,
+    'backtest': bench_backtests,
+    'dataset': bench_dataset,
+    'inference': bench_inference,
+    'training': bench_training,
+    'correlation': bench_correlation,
+}
+
+
+def run_benchmarks(scales=('small', 'medium'), suites=tuple(SUITES), repeat=3, seed=42):
+    """
+    รัน benchmarks ตามขนาดข้อมูลและชุดที่เลือก
+    
+    Args:
+        scales: ชื่อขนาดใน SCALES
+        suites: ชื่อชุดใน SUITES
+        repeat: จำนวนรอบที่จับเวลาต่อรายการ
+        seed: random seed ของข้อมูลจำลอง
+    
+    Returns:
+        list: dict ผลลัพธ์ของแต่ละรายการ
+    """
+    results = []
+    for scale in scales:
+        n_symbols, periods = SCALES[scale]
+        history = generate_ohlcv(n_symbols=n_symbols, periods=periods, seed=seed)
+        
+        for suite in suites:
+            for name, timing in SUITES[suite](history, repeat).items():
+                row = {'name': name, 'scale': scale, 'symbols': n_symbols, 'periods': periods, **timing}
+                results.append(row)
+                extra = f"  accuracy {timing['accuracy']:.3f}" if 'accuracy' in timing else ''
+                print(f"{scale:>7} {name:<40} {timing['median_s'] * 1000:>10.2f} ms{extra}")
+    
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark Backtester / Indicators / PerformanceMetrics')
+    parser.add_argument('--scales', nargs='+', default=['small', 'medium'], choices=list(SCALES),
+                        help='ขนาดข้อมูลที่ทดสอบ')
+    parser.add_argument('--suites', nargs='+', default=list(SUITES), choices=list(SUITES),
+                        help='ชุด benchmark ที่รัน')
+    parser.add_argument('--repeat', type=int, default=3, help='จำนวนรอบที่จับเวลาต่อรายการ')
+    parser.add_argument('--seed', type=int, default=42, help='random seed ของข้อมูลจำลอง')
+    parser.add_argument('-o', '--output', help='ไฟล์ JSON ผลลัพธ์ (default: benchmarks/results/<commit>.json)')
+    parser.add_argument('--compare', help='ไฟล์ JSON ผลลัพธ์อ้างอิงสำหรับเปรียบเทียบ')
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help='อัตราส่วนเวลาที่ถือว่าช้าลง (default 1.2)')
+    args = parser.parse_args()
+    
+    # ปิด log ระดับ INFO ของแต่ละ trade ระหว่างจับเวลา
+    logging.disable(logging.INFO)
+    
+    meta = environment_info()
+    meta.update({'seed': args.seed, 'scales': {scale: SCALES[scale] for scale in args.scales}})
+    results = run_benchmarks(args.scales, args.suites, args.repeat, args.seed)
+    
+    output = args.output or os.path.join('benchmarks', 'results', f"{meta['commit'] or 'local'}.json")
+    write_results(output, results, meta)
+    print(f"\nResults written to {output}")
+    
+    if args.compare:
+        rows = compare_results(load_results(args.compare), {'results': results}, args.threshold)
+        regressions = [row for row in rows if row['regression']]
+        print(f"\nComparison with {args.compare}:")
+        for row in rows:
+            flag = '  REGRESSION' if row['regression'] else ''
+            print(f"{row['scale']:>7} {row['name']:<40} {row['ratio']:>6.2f}x{flag}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
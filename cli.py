@@ -58,8 +58,43 @@ def main():
     microcap_parser.add_argument('--max-price', type=float, default=None,
                                 help='ราคาสูงสุด ($)')
     
+    # Backtest job queue
+    backtest_parser = subparsers.add_parser('backtest', help='คิวงาน Backtest (ส่งงาน/ดูสถานะ/worker)')
+    backtest_sub = backtest_parser.add_subparsers(dest='action', required=True)
+    
+    submit_parser = backtest_sub.add_parser('submit', help='ส่งงาน Backtest เข้าคิว')
+    submit_parser.add_argument('symbols', nargs='+', help='สัญลักษณ์หุ้น')
+    submit_parser.add_argument('--start', required=True, help='วันเริ่มต้น (YYYY-MM-DD)')
+    submit_parser.add_argument('--end', default=datetime.now().strftime('%Y-%m-%d'),
+                               help='วันสิ้นสุด (YYYY-MM-DD)')
+    submit_parser.add_argument('-s', '--strategy', choices=['technical', 'ai', 'combined'],
+                               default='technical', help='กลยุทธ์')
+    submit_parser.add_argument('-c', '--confidence', type=float, default=0.6,
+                               help='ระดับความเชื่อมั่นขั้นต่ำ (0.0-1.0)')
+    submit_parser.add_argument('--capital', type=float, default=10000, help='เงินทุนเริ่มต้น ($)')
+    submit_parser.add_argument('--no-cache', action='store_true', help='จำลองใหม่แม้มีผลลัพธ์ในแคช')
+    submit_parser.add_argument('-w', '--wait', action='store_true', help='รอจนงานเสร็จ')
+    
+    status_parser = backtest_sub.add_parser('status', help='ดูสถานะงาน')
+    status_parser.add_argument('job_id', type=int, help='หมายเลขงาน')
+    
+    list_parser = backtest_sub.add_parser('list', help='รายการงานล่าสุด')
+    list_parser.add_argument('-l', '--limit', type=int, default=20, help='จำนวนงานที่แสดง')
+    
+    cancel_parser = backtest_sub.add_parser('cancel', help='ยกเลิกงาน')
+    cancel_parser.add_argument('job_id', type=int, help='หมายเลขงาน')
+    
+    worker_parser = backtest_sub.add_parser('worker', help='เริ่ม worker processes')
+    worker_parser.add_argument('-n', '--workers', type=int, default=2, help='จำนวน worker processes')
+    worker_parser.add_argument('--until-idle', action='store_true', help='หยุดเมื่อคิวว่าง')
+    
     args = parser.parse_args()
     
+    # คำสั่ง backtest ส่งงาน/อ่านสถานะจากคิวเท่านั้น (ไม่ต้องสร้าง StockAnalyzerApp)
+    if args.command == 'backtest':
+        backtest_command(args)
+        return
+    
     app = StockAnalyzerApp()
     
     if args.command == 'analyze':
@@ -221,5 +256,88 @@ def main():
         parser.print_help()
 
 
+def print_job(job):
+    """แสดงสถานะของงาน Backtest"""
+    spec = job['spec']
+    print(f"#{job['id']} [{job['status']}] {', '.join(spec['symbols'])} "
+          f"{spec['start_date']} → {spec['end_date']} ({spec['strategy']})")
+    if job['status'] == 'running':
+        eta = f", ETA {job['eta_seconds']:.0f}s" if job['eta_seconds'] is not None else ""
+        print(f"   ความคืบหน้า: {job['processed']}/{job['total']} วัน ({job['progress']:.0%}"
+              f"{eta}) ล่าสุด {job['session_date'] or '-'}")
+    elif job['status'] == 'failed' and job['error']:
+        print(f"   ข้อผิดพลาด: {job['error'].strip().splitlines()[-1]}")
+
+
+def backtest_command(args):
+    """คำสั่งของคิวงาน Backtest"""
+    import time
+    from src.backtesting.jobs import JobQueue, WorkerPool
+    from src.backtesting.cache import BacktestCache
+    
+    queue = JobQueue()
+    
+    if args.action == 'submit':
+        job_id = queue.submit({
+            'symbols': args.symbols,
+            'start_date': args.start,
+            'end_date': args.end,
+            'strategy': args.strategy,
+            'min_confidence': args.confidence,
+            'initial_capital': args.capital,
+            'use_cache': not args.no_cache,
+        })
+        print(f"✅ ส่งงาน #{job_id} เข้าคิวแล้ว")
+        if not queue.active_workers():
+            print("⚠️ ยังไม่มี worker ทำงานอยู่ - เริ่มด้วย: python cli.py backtest worker")
+        
+        if args.wait:
+            job = queue.get(job_id)
+            while job['status'] in ('queued', 'running'):
+                time.sleep(2)
+                job = queue.get(job_id)
+                print_job(job)
+            args.job_id = job_id
+            args.action = 'status'
+    
+    if args.action == 'status':
+        job = queue.get(args.job_id)
+        if job is None:
+            print(f"❌ ไม่พบงาน #{args.job_id}")
+            return
+        print_job(job)
+        results = queue.result(args.job_id, BacktestCache())
+        if results:
+            print(f"   ผลตอบแทน: {results['total_return']:+.2f}%")
+            print(f"   เงินทุนสุดท้าย: ${results['final_capital']:,.2f}")
+            print(f"   จำนวน Trade: {results['total_trades']} (อัตราชนะ {results['win_rate']:.1f}%)")
+            print(f"   Max Drawdown: {results['max_drawdown']:.2f}%")
+    
+    elif args.action == 'list':
+        jobs = queue.list_jobs(limit=args.limit)
+        if not jobs:
+            print("ไม่มีงานในคิว")
+        for job in jobs:
+            print_job(job)
+        print(f"\n🛠️ Worker ที่ทำงานอยู่: {len(queue.active_workers())}")
+    
+    elif args.action == 'cancel':
+        if queue.cancel(args.job_id):
+            print(f"🛑 ยกเลิกงาน #{args.job_id} แล้ว")
+        else:
+            print(f"❌ ยกเลิกงาน #{args.job_id} ไม่ได้ (ไม่พบหรือจบไปแล้ว)")
+    
+    elif args.action == 'worker':
+        queue.requeue_stale()
+        pool = WorkerPool(n_workers=args.workers, db_path=queue.db_path)
+        print(f"🛠️ เริ่ม {pool.n_workers} worker(s) - กด Ctrl+C เพื่อหยุด")
+        pool.start(stop_when_idle=args.until_idle)
+        try:
+            pool.join()
+        except KeyboardInterrupt:
+            pool.stop()
+            print("\n🛑 หยุด workers แล้ว")
+
+
 if __name__ == '__main__':
     main()
@@ -21,7 +21,8 @@ from src.details.provider import StockDetailsProvider
 from src.details.widget import StockInfoWidget
 from src.dividend.analyzer import DividendAnalyzer
 from src.portfolio.manager import PortfolioManager
-from src.backtesting.backtester import Backtester
+from src.backtesting.cache import BacktestCache
+from src.backtesting.jobs import JobQueue
 from src.backtesting.metrics import PerformanceMetrics
 
 
@@ -1655,48 +1656,75 @@ elif st.session_state.current_page == "Backtesting":
             step=0.05,
             help="ส่วนต่างของราคาจากราคาที่ต้องการ"
         ) / 100
+        
+        use_cache = st.checkbox(
+            "ใช้ผลลัพธ์ที่แคชไว้",
+            value=True,
+            help="ถ้าพารามิเตอร์และข้อมูลราคาเหมือนเดิม จะแสดงผลลัพธ์เดิมทันทีโดยไม่ต้องจำลองใหม่"
+        )
     
     st.divider()
     
-    # Run backtest button
+    # Run backtest button (ส่งงานเข้าคิว - worker processes เป็นผู้จำลอง)
+    job_queue = JobQueue()
     if st.button("🚀 เริ่มทดสอบ", type="primary", use_container_width=True):
         if not backtest_stocks:
             st.error("❌ กรุณาเลือกหุ้นอย่างน้อย 1 ตัว")
         elif start_date >= end_date:
             st.error("❌ วันเริ่มต้นต้องน้อยกว่าวันสิ้นสุด")
         else:
-            with st.spinner("🔄 กำลังทำการทดสอบ... (อาจใช้เวลา 1-2 นาที)"):
-                try:
-                    # Initialize backtester
-                    backtester = Backtester(
-                        initial_capital=initial_capital,
-                        commission=commission,
-                        slippage=slippage,
-                        position_size_pct=position_size_pct
-                    )
-                    
-                    # Initialize app
-                    app = StockAnalyzerApp()
-                    
-                    # Run backtest
-                    results = backtester.run_backtest(
-                        analyzer_app=app,
-                        symbols=backtest_stocks,
-                        start_date=start_date.strftime('%Y-%m-%d'),
-                        end_date=end_date.strftime('%Y-%m-%d'),
-                        strategy='technical',
-                        min_confidence=min_confidence / 100
-                    )
-                    
-                    # Store results in session state
-                    st.session_state.backtest_results = results
-                    st.session_state.backtester = backtester
-                    st.success("✅ การทดสอบเสร็จสิ้น!")
-                    
-                except Exception as e:
-                    st.error(f"❌ เกิดข้อผิดพลาด: {str(e)}")
-                    import traceback
-                    st.code(traceback.format_exc())
+            try:
+                st.session_state.backtest_job_id = job_queue.submit({
+                    'symbols': backtest_stocks,
+                    'start_date': start_date.strftime('%Y-%m-%d'),
+                    'end_date': end_date.strftime('%Y-%m-%d'),
+                    'strategy': 'technical',
+                    'min_confidence': min_confidence / 100,
+                    'initial_capital': initial_capital,
+                    'commission': commission,
+                    'slippage': slippage,
+                    'position_size_pct': position_size_pct,
+                    'use_cache': use_cache,
+                })
+                st.session_state.backtest_results = None
+            except Exception as e:
+                st.error(f"❌ เกิดข้อผิดพลาด: {str(e)}")
+    
+    # สถานะงานล่าสุดของ session นี้
+    job_id = st.session_state.get('backtest_job_id')
+    job = job_queue.get(job_id) if job_id is not None else None
+    if job is not None and not st.session_state.get('backtest_results'):
+        if job['status'] in ('queued', 'running'):
+            if job['status'] == 'queued':
+                st.info(f"⏳ งาน #{job_id} รออยู่ในคิว")
+            else:
+                eta = f" - เหลืออีกประมาณ {job['eta_seconds']:.0f} วินาที" if job['eta_seconds'] is not None else ""
+                st.progress(job['progress'],
+                            text=f"🔄 งาน #{job_id}: {job['processed']}/{job['total']} วันทำการ{eta}")
+            if not job_queue.active_workers():
+                st.warning("⚠️ ไม่มี worker ทำงานอยู่ - เริ่มด้วยคำสั่ง `python cli.py backtest worker`")
+            
+            col_refresh, col_cancel = st.columns(2)
+            with col_refresh:
+                st.button("🔄 อัปเดตสถานะ", use_container_width=True)
+            with col_cancel:
+                if st.button("🛑 ยกเลิกงาน", use_container_width=True):
+                    job_queue.cancel(job_id)
+                    st.rerun()
+        
+        elif job['status'] == 'done':
+            st.session_state.backtest_results = job_queue.result(job_id, BacktestCache())
+            if st.session_state.backtest_results:
+                st.success(f"✅ การทดสอบ #{job_id} เสร็จสิ้น!")
+            else:
+                st.error("❌ ไม่พบผลลัพธ์ของงานในแคช")
+        
+        elif job['status'] == 'failed':
+            st.error(f"❌ งาน #{job_id} ล้มเหลว")
+            st.code(job['error'] or '')
+        
+        elif job['status'] == 'cancelled':
+            st.info(f"🛑 งาน #{job_id} ถูกยกเลิก")
     
     # Display results if available
     if 'backtest_results' in st.session_state and st.session_state.backtest_results:
@@ -1804,14 +1832,57 @@ elif st.session_state.current_page == "Backtesting":
             )
             
             st.plotly_chart(fig_equity, use_container_width=True)
+            
+            # Rolling Metrics Chart
+            st.subheader("📉 Rolling Metrics")
+            rolling_window = st.selectbox(
+                "ขนาดหน้าต่าง (วันทำการ)",
+                [21, 63, 126, 252],
+                index=1,
+                key="rolling_window"
+            )
+            rolling = PerformanceMetrics.rolling_metrics(
+                equity_curve, windows=(rolling_window,),
+                metrics=('sharpe_ratio', 'sortino_ratio', 'max_drawdown')
+            )
+            
+            fig_rolling = go.Figure()
+            for column, color in [(f'sharpe_ratio_{rolling_window}', '#00D9FF'),
+                                  (f'sortino_ratio_{rolling_window}', '#7CFC00')]:
+                fig_rolling.add_trace(go.Scatter(
+                    x=rolling.index,
+                    y=rolling[column],
+                    mode='lines',
+                    name=column.rsplit('_', 1)[0].replace('_', ' ').title(),
+                    line=dict(color=color, width=1.5)
+                ))
+            fig_rolling.add_trace(go.Scatter(
+                x=rolling.index,
+                y=-rolling[f'max_drawdown_{rolling_window}'],
+                mode='lines',
+                name='Max Drawdown (%)',
+                line=dict(color='#FF6B6B', width=1.5),
+                yaxis='y2'
+            ))
+            
+            fig_rolling.update_layout(
+                title=f"Rolling Sharpe / Sortino / Max Drawdown ({rolling_window} วัน)",
+                xaxis_title="Date",
+                yaxis_title="Ratio",
+                yaxis2=dict(title="Drawdown (%)", overlaying='y', side='right'),
+                template="plotly_dark",
+                height=400,
+                hovermode='x unified'
+            )
+            
+            st.plotly_chart(fig_rolling, use_container_width=True)
         
         # Trade History
         st.divider()
         st.subheader("📋 ประวัติการซื้อขาย")
         
-        if 'backtester' in st.session_state:
-            backtester = st.session_state.backtester
-            trade_history = backtester.get_trade_history()
+        if results.get('trade_log') is not None:
+            trade_history = results['trade_log'].to_frame()
             
             if not trade_history.empty:
                 # Add color coding
@@ -29,6 +29,30 @@ class StockAnalyzerApp:
         self.ai_signal_generator = AISignalGenerator()
         self.notification_manager = NotificationManager()
         self.analysis_results = {}
+        self.load_ai_model()
+    
+    def load_ai_model(self, registry=None, version=None):
+        """
+        ใช้ AI model ที่บันทึกไว้ใน ModelRegistry (ไม่ต้องฝึกใหม่ทุกครั้งที่เริ่มโปรแกรม)
+        
+        ไฟล์ model จะถูกโหลดจริงเมื่อทำนายครั้งแรก
+        
+        Args:
+            registry: ModelRegistry (default data/models)
+            version: เวอร์ชัน (None = ล่าสุด)
+        
+        Returns:
+            dict: metadata ของ model หรือ None ถ้ายังไม่มี model ที่บันทึกไว้
+        """
+        try:
+            from src.ai.registry import ModelRegistry, AI_SIGNAL_MODEL
+            registry = registry or ModelRegistry()
+            if registry.latest_version(AI_SIGNAL_MODEL) is None:
+                return None
+            return registry.load(AI_SIGNAL_MODEL, self.ai_signal_generator, version)
+        except Exception as e:
+            logger.warning(f"Could not load AI model: {str(e)}")
+            return None
     
     def analyze_single_stock(self, symbol, period='1y'):
         """
@@ -98,8 +122,34 @@ class StockAnalyzerApp:
             if result:
                 results[symbol] = result
         
+        # สัญญาณ AI ของทุกหุ้นในครั้งเดียว (ถ้าฝึก model แล้ว)
+        if self.ai_signal_generator.trained:
+            self.predict_ai_signals(list(results))
+        
         return results
     
+    def predict_ai_signals(self, symbols=None):
+        """
+        ทำนายสัญญาณ AI ของหุ้นที่วิเคราะห์แล้วด้วยการเรียก model ครั้งเดียว
+        
+        Args:
+            symbols: รายชื่อสัญลักษณ์หุ้น (ค่าเริ่มต้น: ทุกหุ้นใน analysis_results)
+        
+        Returns:
+            dict: {symbol: prediction result} (บันทึกใน analysis_results[symbol]['ai_signal'] ด้วย)
+        """
+        if not self.ai_signal_generator.trained:
+            logger.warning("AI model not trained yet")
+            return {}
+        
+        symbols = [symbol for symbol in (symbols or self.analysis_results) if symbol in self.analysis_results]
+        predictions = self.ai_signal_generator.predict_signals_batch(
+            {symbol: self.analysis_results[symbol]['technical'] for symbol in symbols})
+        for symbol, prediction in predictions.items():
+            self.analysis_results[symbol]['ai_signal'] = prediction
+        
+        return predictions
+    
     def find_buy_opportunities(self, symbols, min_confidence=0.6):
         """
         หาโอกาสในการซื้อ
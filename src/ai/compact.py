@@ -0,0 +1,329 @@
+"""
+Compact Tree-Ensemble Inference
+แปลง Random Forest / Gradient Boosting ที่ฝึกแล้วเป็น node arrays แบบแบน
+แล้วทำนายด้วยการเดินต้นไม้ทุกต้นพร้อมกันแบบ vectorized (ไม่ผ่าน validation และ joblib ของ sklearn)
+"""
+
+import os
+import json
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# จำนวนแถวสูงสุดที่ประมวลผลต่อรอบ (จำกัดหน่วยความจำของ array แถว × ต้นไม้ × outputs)
+DEFAULT_CHUNK_ROWS = 8192
+
+POSTPROCESS = ('mean', 'softmax', 'sigmoid')
+
+
+class CompactTreeEnsemble:
+    """
+    Tree ensemble ในรูป node arrays แบบแบน (ทุกต้นต่อกันใน array เดียว)
+    
+    - feature / threshold / left / right: ข้อมูลของทุก node (ใบชี้กลับมาที่ตัวเอง)
+    - values: ค่าที่ใบ (n_nodes × n_outputs)
+    - raw = init + scale × ผลรวมค่าใบของทุกต้น แล้วแปลงเป็นความน่าจะเป็นตาม postprocess
+    - แถวเดียว: เดินทีละต้นแบบ scalar ผ่าน memoryview (จำนวนรอบ = ความลึกจริงของเส้นทาง ไม่ใช่ max_depth)
+    
+    ได้ความน่าจะเป็นเท่ากับ predict_proba ของ model ต้นฉบับ (รวม StandardScaler ถ้าให้มา)
+    """
+    
+    ARRAYS = ('feature', 'threshold', 'left', 'right', 'missing_left', 'values', 'roots',
+              'init', 'classes', 'mean', 'std')
+    
+    def __init__(self, feature, threshold, left, right, missing_left, values, roots,
+                 init, scale, postprocess, classes, max_depth, mean=None, std=None):
+        if postprocess not in POSTPROCESS:
+            raise ValueError(f"Unknown postprocess: {postprocess}. Use one of {POSTPROCESS}")
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.missing_left = missing_left
+        self.values = values
+        self.roots = roots
+        self.init = init
+        self.scale = float(scale)
+        self.postprocess = postprocess
+        self.classes = classes
+        self.max_depth = int(max_depth)
+        self.mean = mean
+        self.std = std
+    
+    def __reduce_ex__(self, protocol):
+        # ตัวที่เปิดแบบ memory-mapped ส่งเฉพาะโฟลเดอร์ให้ process อื่นเปิดไฟล์เดียวกัน (ไม่ copy arrays)
+        source = getattr(self, '_source', None)
+        if source is not None:
+            return type(self).load_arrays, source
+        return super().__reduce_ex__(protocol)
+    
+    def __repr__(self):
+        return (f"CompactTreeEnsemble({len(self.roots)} trees, {len(self.feature)} nodes, "
+                f"depth {self.max_depth}, {self.postprocess})")
+    
+    @property
+    def classes_(self):
+        return self.classes
+    
+    @property
+    def n_trees(self):
+        return len(self.roots)
+    
+    # ==================== EXPORT ====================
+    
+    @classmethod
+    def from_sklearn(cls, model, scaler=None):
+        """
+        แปลง model ของ sklearn ที่ฝึกแล้ว
+        
+        Args:
+            model: RandomForestClassifier / ExtraTreesClassifier / DecisionTreeClassifier
+                   หรือ GradientBoostingClassifier (init แบบ prior หรือ zero)
+            scaler: StandardScaler ที่ใช้ก่อน model (optional)
+        
+        Returns:
+            CompactTreeEnsemble
+        """
+        mean, std = cls._scaler_arrays(scaler)
+        
+        if hasattr(model, 'tree_'):
+            trees, outputs = [model.tree_], [None]
+            init, scale, postprocess = np.zeros(len(model.classes_)), 1.0, 'mean'
+        elif hasattr(model, 'estimators_') and hasattr(model, 'learning_rate'):
+            trees, outputs, init = cls._gradient_boosting_trees(model)
+            scale = model.learning_rate
+            postprocess = 'softmax' if len(init) > 1 else 'sigmoid'
+        elif hasattr(model, 'estimators_'):
+            trees = [estimator.tree_ for estimator in model.estimators_]
+            outputs = [None] * len(trees)
+            init, scale, postprocess = np.zeros(len(model.classes_)), 1.0 / len(trees), 'mean'
+        else:
+            raise ValueError(f"Unsupported model for compact inference: {type(model).__name__}")
+        
+        n_outputs = len(init)
+        offsets = np.cumsum([0] + [tree.node_count for tree in trees])
+        total = offsets[-1]
+        feature = np.zeros(total, dtype=np.int32)
+        threshold = np.full(total, np.inf)
+        left = np.arange(total, dtype=np.int32)
+        right = np.arange(total, dtype=np.int32)
+        missing_left = np.zeros(total, dtype=bool)
+        values = np.zeros((total, n_outputs))
+        
+        for tree, output, start in zip(trees, outputs, offsets[:-1]):
+            end = start + tree.node_count
+            internal = tree.children_left != -1
+            nodes = np.arange(start, end)[internal]
+            feature[nodes] = tree.feature[internal]
+            threshold[nodes] = tree.threshold[internal]
+            left[nodes] = tree.children_left[internal] + start
+            right[nodes] = tree.children_right[internal] + start
+            if hasattr(tree, 'missing_go_to_left'):
+                missing_left[nodes] = np.asarray(tree.missing_go_to_left, dtype=bool)[internal]
+            
+            leaf_values = tree.value[:, 0, :]
+            if output is None:
+                # classifier: สัดส่วนของแต่ละ class ที่ใบ (เหมือน DecisionTreeClassifier.predict_proba)
+                normalizer = leaf_values.sum(axis=1, keepdims=True)
+                normalizer[normalizer == 0.0] = 1.0
+                values[start:end] = leaf_values / normalizer
+            else:
+                values[start:end, output] = leaf_values[:, 0]
+        
+        return cls(
+            feature=feature,
+            threshold=threshold,
+            left=left,
+            right=right,
+            missing_left=missing_left if missing_left.any() else None,
+            values=values,
+            roots=offsets[:-1].astype(np.int32),
+            init=np.asarray(init, dtype=np.float64),
+            scale=scale,
+            postprocess=postprocess,
+            classes=np.asarray(model.classes_),
+            max_depth=max(tree.max_depth for tree in trees),
+            mean=mean,
+            std=std,
+        )
+    
+    @staticmethod
+    def _scaler_arrays(scaler):
+        """mean / scale ของ StandardScaler (None = ไม่ scale)"""
+        if scaler is None or not hasattr(scaler, 'n_features_in_'):
+            return None, None
+        n_features = scaler.n_features_in_
+        mean = scaler.mean_ if getattr(scaler, 'mean_', None) is not None else np.zeros(n_features)
+        std = scaler.scale_ if getattr(scaler, 'scale_', None) is not None else np.ones(n_features)
+        return np.asarray(mean, dtype=np.float64), np.asarray(std, dtype=np.float64)
+    
+    @staticmethod
+    def _gradient_boosting_trees(model):
+        """ต้นไม้ + คอลัมน์ output ของแต่ละต้น + raw prediction เริ่มต้นของ GradientBoostingClassifier"""
+        n_features = model.n_features_in_
+        if isinstance(model.init_, str):
+            if model.init_ != 'zero':
+                raise ValueError(f"Unsupported GradientBoosting init: {model.init_}")
+        elif type(model.init_).__name__ != 'DummyClassifier':
+            raise ValueError("GradientBoosting with a custom init estimator is not supported")
+        # init แบบ prior / zero เป็นค่าคงที่ จึงคำนวณจากแถวใดก็ได้
+        init = model._raw_predict_init(np.zeros((1, n_features), dtype=np.float32))[0]
+        
+        trees, outputs = [], []
+        for stage in model.estimators_:
+            for output, estimator in enumerate(stage):
+                trees.append(estimator.tree_)
+                outputs.append(output)
+        return trees, outputs, init
+    
+    # ==================== INFERENCE ====================
+    
+    def transform(self, X):
+        """ใช้ StandardScaler (ถ้ามี) แล้วแปลงเป็น float32 แบบเดียวกับ sklearn trees"""
+        X = np.asarray(X)
+        if X.dtype != np.float32:
+            X = X.astype(np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if self.mean is not None:
+            # ปัดเศษทีละขั้นตาม dtype ของ input เหมือน StandardScaler.transform
+            X = ((X - self.mean).astype(X.dtype) / self.std).astype(X.dtype)
+        return X.astype(np.float32)
+    
+    def apply(self, X):
+        """
+        ใบที่แต่ละแถวตกในทุกต้นไม้
+        
+        Args:
+            X: feature matrix ที่ transform แล้ว (float32)
+        
+        Returns:
+            np.ndarray: ดัชนี node (แถว × ต้นไม้)
+        """
+        if len(X) == 1:
+            return self._apply_row(X[0])[np.newaxis, :]
+        
+        n_rows = len(X)
+        nodes = np.repeat(self.roots[np.newaxis, :], n_rows, axis=0)
+        rows = np.arange(n_rows)[:, np.newaxis]
+        for _ in range(self.max_depth):
+            x = X[rows, self.feature[nodes]]
+            go_left = x <= self.threshold[nodes]
+            if self.missing_left is not None:
+                go_left |= np.isnan(x) & self.missing_left[nodes]
+            next_nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+            if np.array_equal(next_nodes, nodes):  # ทุกแถวถึงใบแล้ว (ใบชี้กลับมาที่ตัวเอง)
+                break
+            nodes = next_nodes
+        return nodes
+    
+    def _apply_row(self, row):
+        """ใบของแถวเดียวในทุกต้นไม้ (เดินทีละ node แบบ scalar หยุดเมื่อถึงใบ)"""
+        # memoryview ให้ค่าเป็น Python scalar โดยไม่ copy arrays (ใช้กับ np.memmap ได้)
+        feature, threshold = memoryview(self.feature), memoryview(self.threshold)
+        left, right = memoryview(self.left), memoryview(self.right)
+        missing_left = memoryview(self.missing_left) if self.missing_left is not None else None
+        values = row.tolist()
+        leaves = np.empty(len(self.roots), dtype=np.int64)
+        for tree, node in enumerate(self.roots.tolist()):
+            child = left[node]
+            while child != node:
+                x = values[feature[node]]
+                if x <= threshold[node] or (x != x and missing_left is not None and missing_left[node]):
+                    node = child
+                else:
+                    node = right[node]
+                child = left[node]
+            leaves[tree] = node
+        return leaves
+    
+    def raw_predict(self, X, chunk_rows=DEFAULT_CHUNK_ROWS):
+        """ผลรวมค่าใบของทุกต้นไม้ (ก่อนแปลงเป็นความน่าจะเป็น)"""
+        X = self.transform(X)
+        raw = np.empty((len(X), len(self.init)))
+        for start in range(0, len(X), chunk_rows):
+            leaves = self.apply(X[start:start + chunk_rows])
+            raw[start:start + chunk_rows] = self.values[leaves].sum(axis=1)
+        return self.init + self.scale * raw
+    
+    def predict_proba(self, X, chunk_rows=DEFAULT_CHUNK_ROWS):
+        """
+        ความน่าจะเป็นของแต่ละ class (เท่ากับ predict_proba ของ model ต้นฉบับ)
+        
+        Args:
+            X: feature matrix (ก่อน scale) หรือแถวเดียว
+            chunk_rows: จำนวนแถวต่อรอบ
+        
+        Returns:
+            np.ndarray: (แถว × classes)
+        """
+        raw = self.raw_predict(X, chunk_rows)
+        if self.postprocess == 'mean':
+            return raw
+        if self.postprocess == 'sigmoid':
+            positive = 1.0 / (1.0 + np.exp(-raw[:, 0]))
+            return np.column_stack([1.0 - positive, positive])
+        shifted = np.exp(raw - raw.max(axis=1, keepdims=True))
+        return shifted / shifted.sum(axis=1, keepdims=True)
+    
+    def predict(self, X, chunk_rows=DEFAULT_CHUNK_ROWS):
+        """class ที่มีความน่าจะเป็นสูงสุด"""
+        return self.classes[self.predict_proba(X, chunk_rows).argmax(axis=1)]
+    
+    # ==================== PERSISTENCE ====================
+    
+    def save(self, path):
+        """บันทึกเป็นไฟล์ .npz"""
+        arrays = {name: getattr(self, name) for name in self.ARRAYS if getattr(self, name) is not None}
+        meta = {'scale': self.scale, 'postprocess': self.postprocess, 'max_depth': self.max_depth}
+        np.savez(path, meta=np.array(json.dumps(meta)), **arrays)
+    
+    @classmethod
+    def load(cls, path):
+        """โหลดจากไฟล์ .npz ที่บันทึกด้วย save()"""
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            arrays = {name: data[name] if name in data.files else None for name in cls.ARRAYS}
+        return cls(**arrays, **meta)
+    
+    def save_arrays(self, directory):
+        """
+        บันทึกแต่ละ array เป็นไฟล์ .npy แยกกันในโฟลเดอร์ (โหลดแบบ memory-mapped ได้ ต่างจาก .npz)
+        
+        Args:
+            directory: โฟลเดอร์ปลายทาง (สร้างให้ถ้ายังไม่มี)
+        """
+        os.makedirs(directory, exist_ok=True)
+        for name in self.ARRAYS:
+            array = getattr(self, name)
+            if array is not None:
+                np.save(os.path.join(directory, f'{name}.npy'), np.ascontiguousarray(array))
+        meta = {'scale': self.scale, 'postprocess': self.postprocess, 'max_depth': self.max_depth}
+        with open(os.path.join(directory, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+    
+    @classmethod
+    def load_arrays(cls, directory, mmap_mode='r'):
+        """
+        โหลดจากโฟลเดอร์ที่บันทึกด้วย save_arrays()
+        
+        Args:
+            directory: โฟลเดอร์ของ arrays
+            mmap_mode: 'r' = อ่าน arrays จากไฟล์ (หลาย processes ใช้ page เดียวกันใน OS cache)
+                       None = โหลดเข้าหน่วยความจำ
+        
+        Returns:
+            CompactTreeEnsemble
+        """
+        with open(os.path.join(directory, 'meta.json')) as f:
+            meta = json.load(f)
+        arrays = {}
+        for name in cls.ARRAYS:
+            path = os.path.join(directory, f'{name}.npy')
+            arrays[name] = np.load(path, mmap_mode=mmap_mode) if os.path.exists(path) else None
+        compact = cls(**arrays, **meta)
+        if mmap_mode is not None:
+            compact._source = (directory, mmap_mode)
+        return compact
@@ -0,0 +1,238 @@
+"""
+Correlation Index
+คำนวณ correlation ของผลตอบแทนทั้ง universe แบบเป็นบล็อก (float32, คูณ matrix ทีละชุดหุ้น)
+แล้วเก็บเฉพาะ top-k หุ้นที่เคลื่อนไหวไปด้วยกันมากที่สุดของแต่ละหุ้น ให้การค้นหาเป็นการเปิดตาราง
+"""
+
+import logging
+import warnings
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+class CorrelationIndex:
+    """
+    Top-k correlated neighbors ของทุกหุ้น จากผลตอบแทนย้อนหลัง window แท่ง
+    
+    - ผลตอบแทนเก็บใน ring buffer (window × หุ้น) float32
+    - correlation = Zᵀ Z เมื่อ Z คือผลตอบแทนที่ลบค่าเฉลี่ยแล้วหารด้วย norm ของแต่ละหุ้น
+      คำนวณทีละบล็อก block_size หุ้น จึงใช้หน่วยความจำ block_size × หุ้น แทนหุ้น × หุ้น
+    - ผลตอบแทนที่ขาด (NaN) ถือเป็นค่าเฉลี่ยของหุ้นนั้น (ใกล้เคียง pairwise ของ pandas เมื่อขาดไม่มาก)
+    - update(): ปรับค่า correlation ของ neighbors เดิมทุกครั้ง และเลือก neighbors ใหม่ทั้ง universe
+      ทุก refresh_every ครั้ง
+    """
+    
+    def __init__(self, k=10, window=252, block_size=1024, refresh_every=20, absolute=False):
+        """
+        Initialize CorrelationIndex
+        
+        Args:
+            k: จำนวน neighbors ต่อหุ้น
+            window: จำนวนผลตอบแทนล่าสุดที่ใช้คำนวณ
+            block_size: จำนวนหุ้นต่อบล็อกของการคูณ matrix
+            refresh_every: จำนวน update ก่อนเลือก neighbors ใหม่ทั้งหมด (build)
+            absolute: จัดอันดับด้วย |correlation| (รวมหุ้นที่เคลื่อนไหวสวนทาง)
+        """
+        self.k = int(k)
+        self.window = int(window)
+        self.block_size = int(block_size)
+        self.refresh_every = int(refresh_every)
+        self.absolute = absolute
+        self.symbols = []
+        self.index = {}
+        self.returns = np.empty((self.window, 0), dtype=np.float32)
+        self.filled = 0
+        self.position = 0
+        self.updates = 0
+        self.last_prices = None
+        self.neighbors = np.empty((0, 0), dtype=np.int32)
+        self.scores = np.empty((0, 0), dtype=np.float32)
+        self._standardized = None
+    
+    def __repr__(self):
+        return f"CorrelationIndex({len(self.symbols)} symbols, k={self.k}, {self.filled}/{self.window} returns)"
+    
+    # ==================== BUILD ====================
+    
+    @classmethod
+    def from_prices(cls, price_data, **kwargs):
+        """
+        สร้าง index จากราคาปิด
+        
+        Args:
+            price_data: DataFrame ราคาปิด (index วันที่, คอลัมน์หุ้น)
+            **kwargs: พารามิเตอร์ของ CorrelationIndex
+        
+        Returns:
+            CorrelationIndex
+        """
+        index = cls(**kwargs)
+        index.fit(price_data.pct_change().iloc[1:])
+        index.last_prices = price_data.iloc[-1].to_numpy(dtype=np.float64)
+        return index
+    
+    def fit(self, returns):
+        """
+        ตั้งค่าผลตอบแทนย้อนหลังแล้วสร้าง index
+        
+        Args:
+            returns: DataFrame ผลตอบแทน (index วันที่, คอลัมน์หุ้น) ใช้ window แถวล่าสุด
+        
+        Returns:
+            CorrelationIndex
+        """
+        self.symbols = list(returns.columns)
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        recent = returns.iloc[-self.window:].to_numpy(dtype=np.float32)
+        self.returns = np.full((self.window, len(self.symbols)), np.nan, dtype=np.float32)
+        self.returns[:len(recent)] = recent
+        self.filled = len(recent)
+        self.position = len(recent) % self.window
+        self.updates = 0
+        self.build()
+        return self
+    
+    def _z(self):
+        """ผลตอบแทนที่ standardize แล้ว (window × หุ้น) ซึ่ง Zᵀ Z = correlation matrix"""
+        if self._standardized is None:
+            returns = self.returns[:self.filled]
+            with warnings.catch_warnings():
+                # หุ้นที่ยังไม่มีผลตอบแทนเลยได้ค่าเฉลี่ย NaN แล้วกลายเป็น 0 ด้านล่าง
+                warnings.simplefilter('ignore', RuntimeWarning)
+                mean = np.nanmean(returns, axis=0) if len(returns) else np.zeros(returns.shape[1], dtype=np.float32)
+            centered = np.nan_to_num(returns - mean, nan=0.0)
+            norm = np.sqrt(np.square(centered, dtype=np.float64).sum(axis=0))
+            norm[norm == 0] = np.inf  # หุ้นที่ราคาไม่เปลี่ยนเลยมี correlation 0 กับทุกตัว
+            self._standardized = (centered / norm).astype(np.float32)
+        return self._standardized
+    
+    def _rank(self, correlation):
+        return np.abs(correlation) if self.absolute else correlation
+    
+    def _sort_neighbors(self, neighbors, scores):
+        order = np.argsort(-self._rank(scores), axis=1, kind='stable')
+        return np.take_along_axis(neighbors, order, axis=1), np.take_along_axis(scores, order, axis=1)
+    
+    def build(self):
+        """เลือก top-k neighbors ของทุกหุ้นใหม่ทั้งหมด (คูณ matrix ทีละบล็อก)"""
+        z = self._z()
+        n = len(self.symbols)
+        k = min(self.k, max(n - 1, 0))
+        self.neighbors = np.zeros((n, k), dtype=np.int32)
+        self.scores = np.zeros((n, k), dtype=np.float32)
+        if k == 0:
+            return
+        
+        for start in range(0, n, self.block_size):
+            end = min(start + self.block_size, n)
+            correlation = z[:, start:end].T @ z
+            rows = np.arange(end - start)
+            rank = self._rank(correlation)
+            rank[rows, rows + start] = -np.inf  # ไม่นับตัวเอง
+            top = np.argpartition(-rank, k - 1, axis=1)[:, :k]
+            neighbors, scores = self._sort_neighbors(top, np.take_along_axis(correlation, top, axis=1))
+            self.neighbors[start:end] = neighbors
+            self.scores[start:end] = scores
+        logger.debug(f"Built correlation index for {n} symbols (k={k})")
+    
+    def _refresh_scores(self):
+        """คำนวณ correlation ของ neighbors เดิมใหม่ (หุ้น × k dot products) แล้วเรียงใหม่"""
+        if self.neighbors.size == 0:
+            return
+        z = self._z()
+        for start in range(0, len(self.symbols), self.block_size):
+            end = min(start + self.block_size, len(self.symbols))
+            neighbors = self.neighbors[start:end]
+            scores = np.einsum('tb,tbk->bk', z[:, start:end], z[:, neighbors])
+            self.neighbors[start:end], self.scores[start:end] = self._sort_neighbors(neighbors, scores)
+    
+    # ==================== UPDATE ====================
+    
+    def update(self, returns):
+        """
+        เพิ่มผลตอบแทนของแท่งใหม่ (แทนที่แท่งเก่าสุดเมื่อครบ window)
+        
+        Args:
+            returns: ผลตอบแทนตามลำดับ self.symbols (array) หรือ dict/Series {symbol: ผลตอบแทน}
+        """
+        if isinstance(returns, (dict, pd.Series)):
+            row = np.full(len(self.symbols), np.nan, dtype=np.float32)
+            for symbol, value in returns.items():
+                if symbol in self.index:
+                    row[self.index[symbol]] = value
+        else:
+            row = np.asarray(returns, dtype=np.float32)
+        self.returns[self.position] = row
+        self.position = (self.position + 1) % self.window
+        self.filled = min(self.filled + 1, self.window)
+        self.updates += 1
+        self._standardized = None
+        
+        if self.refresh_every and self.updates % self.refresh_every == 0:
+            self.build()
+        else:
+            self._refresh_scores()
+    
+    def update_prices(self, prices):
+        """
+        เพิ่มแท่งใหม่จากราคาปิด (คำนวณผลตอบแทนเทียบกับราคาล่าสุดที่เห็น)
+        
+        Args:
+            prices: ราคาปิดตามลำดับ self.symbols (array) หรือ dict/Series {symbol: ราคา}
+        """
+        if isinstance(prices, (dict, pd.Series)):
+            prices = np.array([prices.get(symbol, np.nan) for symbol in self.symbols], dtype=np.float64)
+        prices = np.asarray(prices, dtype=np.float64)
+        if self.last_prices is None:
+            self.last_prices = prices
+            return
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = prices / self.last_prices - 1
+        self.update(np.where(np.isfinite(returns), returns, np.nan))
+        self.last_prices = np.where(np.isnan(prices), self.last_prices, prices)
+    
+    # ==================== QUERY ====================
+    
+    def most_correlated(self, symbol, k=None):
+        """
+        หุ้นที่เคลื่อนไหวไปด้วยกันมากที่สุด (เปิดจาก index ไม่คำนวณใหม่)
+        
+        Args:
+            symbol: หุ้นอ้างอิง
+            k: จำนวนที่ต้องการ (ไม่เกิน k ของ index)
+        
+        Returns:
+            pd.Series: correlation เรียงจากมากไปน้อย (ว่างถ้าไม่มีหุ้นนี้)
+        """
+        if symbol not in self.index:
+            return pd.Series(dtype=np.float64)
+        row = self.index[symbol]
+        neighbors, scores = self.neighbors[row][:k], self.scores[row][:k]
+        return pd.Series(scores.astype(np.float64), index=[self.symbols[i] for i in neighbors], name=symbol)
+    
+    def correlations(self, symbol):
+        """
+        correlation ของหุ้นกับทุกหุ้น (หนึ่งแถวของ matrix คำนวณจาก Z โดยตรง)
+        
+        Returns:
+            pd.Series หรือ None ถ้าไม่มีหุ้นนี้
+        """
+        if symbol not in self.index:
+            return None
+        z = self._z()
+        return pd.Series((z.T @ z[:, self.index[symbol]]).astype(np.float64), index=self.symbols, name=symbol)
+    
+    def correlation_matrix(self, symbols=None):
+        """
+        correlation matrix ของหุ้นที่เลือก (สำหรับชุดเล็ก)
+        
+        Returns:
+            DataFrame
+        """
+        symbols = list(symbols) if symbols is not None else self.symbols
+        columns = [self.index[symbol] for symbol in symbols]
+        z = self._z()[:, columns]
+        return pd.DataFrame((z.T @ z).astype(np.float64), index=symbols, columns=symbols)
@@ -0,0 +1,273 @@
+"""
+Training Dataset Builder
+สร้าง Feature matrix และ Labels (ผลตอบแทนล่วงหน้า) ของทุกแท่งทุกหุ้นสำหรับฝึก AI models
+"""
+
+import os
+import json
+import logging
+
+import numpy as np
+import pandas as pd
+
+from src.analysis.technical import TechnicalAnalyzer
+from src.signals.generator import AISignalGenerator, FEATURE_DEFAULTS
+
+logger = logging.getLogger(__name__)
+
+# เปลี่ยนเมื่อรูปแบบไฟล์ dataset เปลี่ยน
+DATASET_VERSION = 1
+
+FEATURE_NAMES = list(FEATURE_DEFAULTS)
+
+# Labels ตามที่ AISignalGenerator และ SignalClassifier ใช้
+LABEL_SELL = 0
+LABEL_HOLD = 1
+LABEL_BUY = 2
+
+
+def forward_returns(close, codes, horizon=5):
+    """
+    ผลตอบแทนล่วงหน้า horizon แท่งของทุกแถว (ไม่ข้ามหุ้น)
+    
+    Args:
+        close: ราคาปิดของทุกหุ้นต่อกัน (เรียงตามหุ้นแล้วตามวันที่)
+        codes: รหัสหุ้นของแต่ละแถว
+        horizon: จำนวนแท่งล่วงหน้า
+    
+    Returns:
+        np.ndarray: close[t + horizon] / close[t] - 1 (NaN เมื่อเลยข้อมูลของหุ้นนั้น)
+    """
+    close = np.asarray(close, dtype=np.float64)
+    codes = np.asarray(codes)
+    result = np.full(len(close), np.nan)
+    if horizon <= 0 or len(close) <= horizon:
+        return result
+    
+    same_symbol = codes[horizon:] == codes[:-horizon]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = close[horizon:] / close[:-horizon] - 1
+    result[:-horizon] = np.where(same_symbol, returns, np.nan)
+    return result
+
+
+def make_labels(returns, buy_threshold=0.02, sell_threshold=-0.02):
+    """
+    แปลงผลตอบแทนล่วงหน้าเป็น Labels
+    
+    Args:
+        returns: ผลตอบแทนล่วงหน้า
+        buy_threshold: ผลตอบแทน >= ค่านี้ = buy
+        sell_threshold: ผลตอบแทน <= ค่านี้ = sell
+    
+    Returns:
+        np.ndarray: int8 (0 sell / 1 hold / 2 buy)
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    labels = np.full(len(returns), LABEL_HOLD, dtype=np.int8)
+    labels[returns >= buy_threshold] = LABEL_BUY
+    labels[returns <= sell_threshold] = LABEL_SELL
+    return labels
+
+
+class FeatureDataset:
+    """
+    ชุดข้อมูลฝึก model แบบ columnar
+    
+    - X: float32 (จำนวนแถว × 10) คอลัมน์ตาม FEATURE_NAMES
+    - y: int8 labels, forward_return: float32
+    - codes: รหัสหุ้น (ดัชนีใน symbols), dates: datetime64[ns]
+    """
+    
+    ARRAYS = ('X', 'y', 'forward_return', 'codes', 'dates')
+    
+    def __init__(self, X, y, forward_return, codes, dates, symbols, params=None):
+        self.X = X
+        self.y = y
+        self.forward_return = forward_return
+        self.codes = codes
+        self.dates = dates
+        self.symbols = list(symbols)
+        self.params = params or {}
+    
+    def __len__(self):
+        return len(self.y)
+    
+    def __repr__(self):
+        return f"FeatureDataset({len(self)} rows, {len(self.symbols)} symbols)"
+    
+    def label_counts(self):
+        """จำนวนแถวของแต่ละ label {'sell', 'hold', 'buy'}"""
+        counts = np.bincount(self.y, minlength=3)
+        return {'sell': int(counts[LABEL_SELL]), 'hold': int(counts[LABEL_HOLD]), 'buy': int(counts[LABEL_BUY])}
+    
+    def subset(self, mask):
+        """ชุดข้อมูลเฉพาะแถวที่ mask เป็น True"""
+        return FeatureDataset(self.X[mask], self.y[mask], self.forward_return[mask], self.codes[mask],
+                              self.dates[mask], self.symbols, self.params)
+    
+    def split(self, date):
+        """
+        แบ่งชุดข้อมูลตามเวลา
+        
+        Args:
+            date: วันแรกของชุดทดสอบ
+        
+        Returns:
+            tuple: (train ก่อน date, test ตั้งแต่ date)
+        """
+        before = self.dates < np.datetime64(pd.Timestamp(date))
+        return self.subset(before), self.subset(~before)
+    
+    def to_frame(self):
+        """แปลงเป็น DataFrame (symbol, date, features, forward_return, label)"""
+        frame = pd.DataFrame(np.asarray(self.X), columns=FEATURE_NAMES)
+        frame.insert(0, 'date', pd.DatetimeIndex(self.dates))
+        frame.insert(0, 'symbol', np.asarray(self.symbols, dtype=object)[self.codes])
+        frame['forward_return'] = self.forward_return
+        frame['label'] = self.y
+        return frame
+    
+    def save(self, directory):
+        """
+        บันทึกลงโฟลเดอร์ (หนึ่งไฟล์ .npy ต่อ array + meta.json)
+        
+        Args:
+            directory: โฟลเดอร์ปลายทาง
+        """
+        os.makedirs(directory, exist_ok=True)
+        for name in self.ARRAYS:
+            np.save(os.path.join(directory, f'{name}.npy'), np.ascontiguousarray(getattr(self, name)))
+        with open(os.path.join(directory, 'meta.json'), 'w') as f:
+            json.dump({
+                'version': DATASET_VERSION,
+                'rows': len(self),
+                'features': FEATURE_NAMES,
+                'symbols': self.symbols,
+                'params': self.params,
+            }, f, indent=2)
+        logger.info(f"Saved dataset ({len(self)} rows) to {directory}")
+    
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """
+        โหลดชุดข้อมูลที่บันทึกไว้
+        
+        Args:
+            directory: โฟลเดอร์ของ dataset
+            mmap: เปิดแบบ memory-mapped (ไม่โหลดทั้งหมดเข้าหน่วยความจำ)
+        
+        Returns:
+            FeatureDataset หรือ None ถ้าไม่มีไฟล์หรือเวอร์ชันไม่ตรง
+        """
+        meta_path = os.path.join(directory, 'meta.json')
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get('version') != DATASET_VERSION or meta.get('features') != FEATURE_NAMES:
+            logger.warning(f"Ignoring dataset with different version/features: {directory}")
+            return None
+        
+        mmap_mode = 'r' if mmap else None
+        arrays = {name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mmap_mode)
+                  for name in cls.ARRAYS}
+        return cls(symbols=meta['symbols'], params=meta.get('params', {}), **arrays)
+
+
+class DatasetBuilder:
+    """
+    สร้าง FeatureDataset จาก indicators ของทุกแท่ง
+    
+    Features ตรงกับ AISignalGenerator.prepare_feature_matrix (ใช้ตอนทำนาย)
+    Label ของแถวที่ t มาจากผลตอบแทน close[t + horizon] / close[t] - 1
+    """
+    
+    def __init__(self, horizon=5, buy_threshold=0.02, sell_threshold=-0.02, drop_warmup=True):
+        """
+        Initialize DatasetBuilder
+        
+        Args:
+            horizon: จำนวนแท่งล่วงหน้าของผลตอบแทนที่ใช้ทำ label
+            buy_threshold: ผลตอบแทน >= ค่านี้ = buy (2)
+            sell_threshold: ผลตอบแทน <= ค่านี้ = sell (0)
+            drop_warmup: ตัดแถวที่ indicators ยังคำนวณไม่ครบ (เช่น 200 แท่งแรกของ SMA 200)
+        """
+        if sell_threshold >= buy_threshold:
+            raise ValueError("sell_threshold must be below buy_threshold")
+        self.horizon = int(horizon)
+        self.buy_threshold = buy_threshold
+        self.sell_threshold = sell_threshold
+        self.drop_warmup = drop_warmup
+    
+    def params(self):
+        """พารามิเตอร์ของ labels (บันทึกไว้กับ dataset)"""
+        return {
+            'horizon': self.horizon,
+            'buy_threshold': self.buy_threshold,
+            'sell_threshold': self.sell_threshold,
+            'drop_warmup': self.drop_warmup,
+        }
+    
+    def build(self, historical_data, cache=None):
+        """
+        สร้าง dataset จากข้อมูลราคา (คำนวณ indicators ครั้งเดียวต่อหุ้น)
+        
+        Args:
+            historical_data: dict {symbol: DataFrame ราคา}
+            cache: BacktestCache (optional) ใช้ indicator panels ที่คำนวณไว้แล้วซ้ำ
+        
+        Returns:
+            FeatureDataset
+        """
+        indicators = {}
+        for symbol, data in historical_data.items():
+            if data is None or data.empty:
+                continue
+            frame = cache.get_indicators(data) if cache is not None else None
+            indicators[symbol] = frame if frame is not None else TechnicalAnalyzer.get_indicator_history(data)
+        return self.build_from_indicators(indicators)
+    
+    def build_from_indicators(self, indicators):
+        """
+        สร้าง dataset จาก indicators ที่คำนวณไว้แล้ว
+        
+        Args:
+            indicators: dict {symbol: DataFrame จาก TechnicalAnalyzer.get_indicator_history()}
+                        (ต้องมี latest_price สำหรับคำนวณ label)
+        
+        Returns:
+            FeatureDataset
+        """
+        symbols = [symbol for symbol, frame in indicators.items() if frame is not None and not frame.empty]
+        if not symbols:
+            return FeatureDataset(np.empty((0, len(FEATURE_NAMES)), dtype=np.float32),
+                                  np.empty(0, dtype=np.int8), np.empty(0, dtype=np.float32),
+                                  np.empty(0, dtype=np.int32), np.empty(0, dtype='datetime64[ns]'),
+                                  [], self.params())
+        
+        # ต่อทุกหุ้นเป็นตารางเดียว แล้วคำนวณทุกอย่างแบบ vectorized ครั้งเดียว
+        panel = pd.concat([indicators[symbol] for symbol in symbols], ignore_index=False, copy=False)
+        lengths = np.array([len(indicators[symbol]) for symbol in symbols])
+        codes = np.repeat(np.arange(len(symbols), dtype=np.int32), lengths)
+        dates = pd.DatetimeIndex(panel.index).to_numpy(dtype='datetime64[ns]')
+        
+        returns = forward_returns(panel['latest_price'].to_numpy(dtype=np.float64), codes, self.horizon)
+        keep = ~np.isnan(returns)
+        if self.drop_warmup:
+            present = [name for name in FEATURE_NAMES if name in panel.columns]
+            keep &= ~np.isnan(panel[present].to_numpy(dtype=np.float64)).any(axis=1)
+        
+        X = AISignalGenerator.prepare_feature_matrix(panel)[keep].astype(np.float32)
+        returns = returns[keep]
+        dataset = FeatureDataset(
+            X=X,
+            y=make_labels(returns, self.buy_threshold, self.sell_threshold),
+            forward_return=returns.astype(np.float32),
+            codes=codes[keep],
+            dates=dates[keep],
+            symbols=symbols,
+            params=self.params(),
+        )
+        logger.info(f"Built dataset: {len(dataset)} rows from {len(symbols)} symbols {dataset.label_counts()}")
+        return dataset
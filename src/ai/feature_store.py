@@ -0,0 +1,346 @@
+"""
+Feature Store
+เก็บ features ของ AISignalGenerator ต่อหุ้นต่อวันไว้บนดิสก์ (คำนวณครั้งเดียว แล้วต่อท้ายเมื่อมี bars ใหม่)
+ให้การฝึก, การทำนาย และ backtests อ่านเป็นช่วงวันที่แบบ memory-mapped โดยไม่ต้องคำนวณ indicators ใหม่
+"""
+
+import os
+import re
+import json
+import hashlib
+import logging
+
+import numpy as np
+import pandas as pd
+
+from src.analysis.technical import TechnicalAnalyzer
+from src.backtesting.cache import INDICATOR_VERSION
+from src.signals.generator import AISignalGenerator, FEATURE_DEFAULTS
+from src.ai.dataset import DatasetBuilder, FeatureDataset, FEATURE_NAMES, forward_returns, make_labels
+
+logger = logging.getLogger(__name__)
+
+# เปลี่ยนเมื่อรูปแบบไฟล์ใน feature store เปลี่ยน
+FEATURE_STORE_FORMAT = 1
+
+# ไฟล์ของแต่ละ partition: ชื่อ -> (dtype, จำนวนค่าต่อแถว)
+# features เก็บเป็น block float32 แบบ row-major เพื่อให้ช่วงแถวเป็น X ที่ใช้ฝึก/ทำนายได้ทันที
+COLUMNS = {
+    'dates': ('datetime64[ns]', 1),
+    'close': ('float64', 1),
+    'complete': ('bool', 1),
+    'features': ('float32', len(FEATURE_NAMES)),
+}
+
+
+def feature_definition_version():
+    """
+    เวอร์ชันของนิยาม features (ชื่อ, ค่า default, INDICATOR_VERSION และรูปแบบไฟล์)
+    
+    นิยามที่ต่างกันจะถูกเก็บแยกโฟลเดอร์ จึงไม่ปนกับ features ที่คำนวณด้วยสูตรเก่า
+    
+    Returns:
+        str: hash 16 ตัวอักษร
+    """
+    definition = {
+        'format': FEATURE_STORE_FORMAT,
+        'features': [[name, float(default)] for name, default in FEATURE_DEFAULTS.items()],
+        'indicator_version': INDICATOR_VERSION,
+        'columns': {name: list(spec) for name, spec in COLUMNS.items()},
+    }
+    return hashlib.sha256(json.dumps(definition, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def _local_index(frame):
+    """
+    frame ที่ index เป็นวันที่ตามเวลาท้องถิ่นของตลาดแบบไม่มี timezone
+    
+    yfinance คืน index แบบ tz-aware (เช่น America/New_York) ถ้าแปลงเป็น datetime64 ตรงๆ จะได้เวลา UTC
+    ซึ่งไม่ตรงกับวันที่แบบ '2020-05-27' ที่ใช้อ่านช่วงวันที่
+    """
+    index = pd.DatetimeIndex(frame.index)
+    if index.tz is None:
+        return frame
+    return frame.set_axis(index.tz_localize(None), axis=0)
+
+
+def _local_date(value):
+    """วันที่สำหรับเทียบกับ dates ใน store (tz-aware ใช้เวลาท้องถิ่นของตัวเอง)"""
+    timestamp = pd.Timestamp(value)
+    if timestamp.tz is not None:
+        timestamp = timestamp.tz_localize(None)
+    return timestamp.to_datetime64()
+
+
+class FeatureStore:
+    """
+    Feature store แบบ columnar แบ่ง partition ตามหุ้น
+    
+    โครงสร้าง: <root>/<definition version>/<symbol>/{dates,close,complete,features}.bin + meta.json
+    - แต่ละไฟล์เป็น array ดิบที่ต่อท้ายได้ (append) และเปิดด้วย np.memmap
+    - meta.json เขียนหลังสุดและเป็นตัวกำหนดจำนวนแถวที่ใช้ได้ (ส่วนที่เขียนค้างจะถูกตัดทิ้งในรอบถัดไป)
+    """
+    
+    def __init__(self, root='data/feature_store', version=None):
+        """
+        Initialize FeatureStore
+        
+        Args:
+            root: โฟลเดอร์หลักของ feature store
+            version: เวอร์ชันของนิยาม features (default feature_definition_version())
+        """
+        self.version = version or feature_definition_version()
+        self.root = os.path.join(root, self.version)
+        os.makedirs(self.root, exist_ok=True)
+        
+        definition_path = os.path.join(self.root, 'definition.json')
+        if not os.path.exists(definition_path):
+            with open(definition_path, 'w') as f:
+                json.dump({'format': FEATURE_STORE_FORMAT, 'features': FEATURE_NAMES,
+                           'indicator_version': INDICATOR_VERSION}, f, indent=2)
+    
+    def _partition(self, symbol):
+        return os.path.join(self.root, re.sub(r'[^A-Za-z0-9._-]', '_', symbol))
+    
+    def _column_path(self, symbol, name):
+        return os.path.join(self._partition(symbol), f'{name}.bin')
+    
+    def _meta(self, symbol):
+        path = os.path.join(self._partition(symbol), 'meta.json')
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+    
+    def _write_meta(self, symbol, meta):
+        path = os.path.join(self._partition(symbol), 'meta.json')
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(temp_path, path)
+    
+    def _memmap(self, symbol, name, rows):
+        dtype, width = COLUMNS[name]
+        shape = (rows, width) if width > 1 else (rows,)
+        return np.memmap(self._column_path(symbol, name), dtype=dtype, mode='r', shape=shape)
+    
+    # ==================== PARTITIONS ====================
+    
+    def symbols(self):
+        """หุ้นทั้งหมดที่มีข้อมูลใน store"""
+        symbols = []
+        for entry in sorted(os.listdir(self.root)):
+            path = os.path.join(self.root, entry, 'meta.json')
+            if os.path.exists(path):
+                with open(path) as f:
+                    symbols.append(json.load(f)['symbol'])
+        return symbols
+    
+    def rows(self, symbol):
+        """จำนวนแถวของหุ้น (0 ถ้ายังไม่มี)"""
+        meta = self._meta(symbol)
+        return meta['rows'] if meta else 0
+    
+    def last_date(self, symbol):
+        """วันที่ล่าสุดที่เก็บไว้ของหุ้น หรือ None"""
+        meta = self._meta(symbol)
+        return pd.Timestamp(meta['last_date']) if meta and meta['rows'] else None
+    
+    def remove(self, symbol):
+        """ลบ partition ของหุ้น"""
+        directory = self._partition(symbol)
+        if os.path.isdir(directory):
+            for entry in os.listdir(directory):
+                os.remove(os.path.join(directory, entry))
+            os.rmdir(directory)
+    
+    # ==================== WRITE ====================
+    
+    def update(self, symbol, data, indicators=None):
+        """
+        ต่อท้าย features ของ bars ที่ใหม่กว่าวันล่าสุดใน store
+        
+        indicators คำนวณจากประวัติทั้งหมด (EMA/RSI ขึ้นกับทุกแท่งก่อนหน้า) แต่เขียนเฉพาะแถวใหม่
+        ถ้าราคาของวันล่าสุดใน store ไม่ตรงกับ data (เช่นปรับราคาจาก split) จะเขียน partition ใหม่ทั้งหมด
+        
+        Args:
+            symbol: ชื่อหุ้น
+            data: DataFrame ราคา (ประวัติทั้งหมดรวม bars ใหม่)
+            indicators: DataFrame จาก TechnicalAnalyzer.get_indicator_history(data) (optional)
+        
+        Returns:
+            int: จำนวนแถวที่เพิ่ม
+        """
+        if data is None or data.empty:
+            return 0
+        data = _local_index(data)
+        if indicators is not None:
+            indicators = _local_index(indicators)
+        
+        meta = self._meta(symbol)
+        if meta and meta['rows']:
+            last = pd.Timestamp(meta['last_date'])
+            if last not in data.index or not np.isclose(float(data['Close'].loc[last]), meta['last_close']):
+                logger.info(f"Price history of {symbol} changed; rebuilding feature partition")
+                self.remove(symbol)
+                meta = None
+        start_row = meta['rows'] if meta else 0
+        
+        if indicators is None:
+            indicators = TechnicalAnalyzer.get_indicator_history(data)
+        new_rows = indicators.index > pd.Timestamp(meta['last_date']) if start_row else slice(None)
+        frame = indicators[new_rows]
+        if frame.empty:
+            return 0
+        
+        present = [name for name in FEATURE_NAMES if name in frame.columns]
+        columns = {
+            'dates': pd.DatetimeIndex(frame.index).to_numpy(dtype='datetime64[ns]'),
+            'close': frame['latest_price'].to_numpy(dtype=np.float64),
+            'complete': ~np.isnan(frame[present].to_numpy(dtype=np.float64)).any(axis=1),
+            'features': AISignalGenerator.prepare_feature_matrix(frame).astype(np.float32),
+        }
+        
+        os.makedirs(self._partition(symbol), exist_ok=True)
+        for name, values in columns.items():
+            dtype, width = COLUMNS[name]
+            values = np.ascontiguousarray(values, dtype=dtype)
+            path = self._column_path(symbol, name)
+            with open(path, 'ab') as f:
+                # ตัดส่วนที่เขียนค้างจากรอบที่ล้มเหลว (เกินจำนวนแถวใน meta.json) ก่อนต่อท้าย
+                f.truncate(start_row * width * values.itemsize)
+                f.write(values.tobytes())
+        
+        rows = start_row + len(frame)
+        self._write_meta(symbol, {
+            'symbol': symbol,
+            'rows': rows,
+            'first_date': meta['first_date'] if start_row else pd.Timestamp(frame.index[0]).isoformat(),
+            'last_date': pd.Timestamp(frame.index[-1]).isoformat(),
+            'last_close': float(data['Close'].loc[frame.index[-1]]),
+        })
+        logger.debug(f"Appended {len(frame)} feature rows for {symbol} ({rows} total)")
+        return len(frame)
+    
+    def update_many(self, historical_data, cache=None):
+        """
+        ต่อท้าย features ของหลายหุ้น
+        
+        Args:
+            historical_data: dict {symbol: DataFrame ราคา}
+            cache: BacktestCache (optional) ใช้ indicator panels ที่คำนวณไว้แล้วซ้ำ
+        
+        Returns:
+            dict: {symbol: จำนวนแถวที่เพิ่ม}
+        """
+        appended = {}
+        for symbol, data in historical_data.items():
+            indicators = cache.get_indicators(data) if cache is not None and data is not None else None
+            appended[symbol] = self.update(symbol, data, indicators)
+        return appended
+    
+    # ==================== READ ====================
+    
+    def read(self, symbol, start=None, end=None):
+        """
+        ข้อมูลของหุ้นในช่วงวันที่ (views ของ np.memmap ไม่ copy)
+        
+        Args:
+            symbol: ชื่อหุ้น
+            start: วันแรก (รวม) None = ตั้งแต่ต้น
+            end: วันสุดท้าย (รวม) None = ถึงล่าสุด
+        
+        Returns:
+            dict: {'dates', 'close', 'complete', 'features'} หรือ None ถ้าไม่มีข้อมูล
+        """
+        rows = self.rows(symbol)
+        if rows == 0:
+            return None
+        dates = self._memmap(symbol, 'dates', rows)
+        lo = int(np.searchsorted(dates, _local_date(start), 'left')) if start is not None else 0
+        hi = int(np.searchsorted(dates, _local_date(end), 'right')) if end is not None else rows
+        return {name: self._memmap(symbol, name, rows)[lo:hi] for name in COLUMNS}
+    
+    def read_frame(self, symbol, start=None, end=None):
+        """
+        Features ของหุ้นเป็น DataFrame (คอลัมน์ FEATURE_NAMES, index วันที่)
+        
+        ใช้กับ AISignalGenerator.predict_signals_vectorized / predict_signals_panel ได้โดยตรง
+        
+        Returns:
+            DataFrame หรือ None ถ้าไม่มีข้อมูล
+        """
+        part = self.read(symbol, start, end)
+        if part is None:
+            return None
+        return pd.DataFrame(part['features'], index=pd.DatetimeIndex(part['dates']),
+                            columns=FEATURE_NAMES, copy=False)
+    
+    def latest(self, symbols=None):
+        """
+        Features ของแท่งล่าสุดของแต่ละหุ้น (สำหรับทำนายสัญญาณประจำวัน)
+        
+        Args:
+            symbols: รายชื่อหุ้น (None = ทุกหุ้นใน store)
+        
+        Returns:
+            tuple: (รายชื่อหุ้นที่มีข้อมูล, วันที่ล่าสุด datetime64[ns], X float32 จำนวนหุ้น × features)
+        """
+        found, dates, rows = [], [], []
+        for symbol in symbols if symbols is not None else self.symbols():
+            n = self.rows(symbol)
+            if n == 0:
+                continue
+            found.append(symbol)
+            dates.append(self._memmap(symbol, 'dates', n)[-1])
+            rows.append(self._memmap(symbol, 'features', n)[-1])
+        X = np.vstack(rows) if rows else np.empty((0, len(FEATURE_NAMES)), dtype=np.float32)
+        return found, np.array(dates, dtype='datetime64[ns]'), X
+    
+    def dataset(self, symbols=None, start=None, end=None, builder=None):
+        """
+        สร้าง FeatureDataset สำหรับฝึกจาก store (ผลเท่ากับ DatasetBuilder.build บนข้อมูลราคาเดียวกัน)
+        
+        Label ใช้ราคาปิดหลัง end ได้ถ้ามีใน store (ผลตอบแทนล่วงหน้า horizon แท่ง)
+        
+        Args:
+            symbols: รายชื่อหุ้น (None = ทุกหุ้นใน store)
+            start: วันแรกของแถวฝึก (รวม)
+            end: วันสุดท้ายของแถวฝึก (รวม)
+            builder: DatasetBuilder ที่กำหนด horizon และ thresholds (default DatasetBuilder())
+        
+        Returns:
+            FeatureDataset
+        """
+        builder = builder or DatasetBuilder()
+        symbols = [symbol for symbol in (symbols if symbols is not None else self.symbols()) if self.rows(symbol)]
+        parts = {'X': [], 'y': [], 'forward_return': [], 'codes': [], 'dates': []}
+        
+        for code, symbol in enumerate(symbols):
+            part = self.read(symbol)
+            returns = forward_returns(part['close'], np.zeros(len(part['close']), dtype=np.int32), builder.horizon)
+            keep = ~np.isnan(returns)
+            if builder.drop_warmup:
+                keep &= part['complete']
+            if start is not None:
+                keep &= part['dates'] >= _local_date(start)
+            if end is not None:
+                keep &= part['dates'] <= _local_date(end)
+            
+            parts['X'].append(part['features'][keep])
+            parts['y'].append(make_labels(returns[keep], builder.buy_threshold, builder.sell_threshold))
+            parts['forward_return'].append(returns[keep].astype(np.float32))
+            parts['codes'].append(np.full(int(keep.sum()), code, dtype=np.int32))
+            parts['dates'].append(np.asarray(part['dates'][keep]))
+        
+        if not symbols:
+            return builder.build_from_indicators({})
+        return FeatureDataset(
+            X=np.concatenate(parts['X']),
+            y=np.concatenate(parts['y']),
+            forward_return=np.concatenate(parts['forward_return']),
+            codes=np.concatenate(parts['codes']),
+            dates=np.concatenate(parts['dates']),
+            symbols=symbols,
+            params=builder.params(),
+        )
@@ -4,13 +4,15 @@ Advanced AI Models for Stock Analysis
 
 import numpy as np
 import pandas as pd
-from sklearn.ensemble import GradientBoostingClassifier, RandomForestRegressor
+from sklearn.ensemble import GradientBoostingClassifier, HistGradientBoostingClassifier, RandomForestRegressor
 from sklearn.preprocessing import StandardScaler
 import logging
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Backends ของ SignalClassifier
+SIGNAL_CLASSIFIER_BACKENDS = ('gradient_boosting', 'hist_gradient_boosting')
+
 
 class PricePredictor:
     """ทำนายราคาหุ้น"""
@@ -46,37 +48,151 @@ class PricePredictor:
             return None
 
 
+def _log_loss(model, X, y):
+    """log loss ของ classifier บนแถวที่ label อยู่ใน classes ของ model"""
+    known = np.isin(y, model.classes_)
+    probabilities = model.predict_proba(X[known])
+    picked = probabilities[np.arange(known.sum()), np.searchsorted(model.classes_, y[known])]
+    return float(-np.mean(np.log(np.clip(picked, 1e-15, None))))
+
+
 class SignalClassifier:
     """ใช้ Machine Learning แบบ Gradient Boosting เพื่อ classify signals"""
     
-    def __init__(self):
+    MAX_ITER = 500  # จำนวน iterations สูงสุดของ hist_gradient_boosting
+    HOLDOUT_FRACTION = 0.1  # สัดส่วนวันที่ช่วงท้ายที่ใช้เลือกจำนวน iterations
+    HOLDOUT_PATIENCE = 10  # จำนวน iterations ต่อการวัด loss ของ hold-out หนึ่งครั้ง
+    
+    def __init__(self, backend='gradient_boosting', early_stopping=True, purge=5):
+        """
+        Initialize SignalClassifier
+        
+        Args:
+            backend: 'gradient_boosting' (GradientBoostingClassifier)
+                     หรือ 'hist_gradient_boosting' (HistGradientBoostingClassifier, หลาย threads
+                     แบ่งค่า features เป็น bins เหมาะกับข้อมูลหลายล้านแถว)
+            early_stopping: หยุดเพิ่มต้นไม้เมื่อ loss ของ hold-out ช่วงท้าย 10% ตามเวลาไม่ดีขึ้น
+                            (เฉพาะ hist_gradient_boosting ดู train)
+            purge: จำนวนวันที่ตัดระหว่างข้อมูลฝึกกับ hold-out (ควรเท่ากับ horizon ของ labels)
+        """
+        if backend not in SIGNAL_CLASSIFIER_BACKENDS:
+            raise ValueError(f"Unknown backend: {backend}. Use one of {SIGNAL_CLASSIFIER_BACKENDS}")
+        self.backend = backend
+        self.early_stopping = early_stopping
+        self.purge = max(0, int(purge))
         self.model = None
         self.scaler = StandardScaler()
+        self.compact = None  # CompactTreeEnsemble (ดู compile_model)
     
-    def train(self, X_train, y_train):
-        """ฝึก Signal Classifier Model"""
-        try:
-            self.model = GradientBoostingClassifier(
-                n_estimators=200,
+    def _build_model(self, max_iter=MAX_ITER):
+        """สร้าง estimator ตาม backend"""
+        if self.backend == 'hist_gradient_boosting':
+            # ไม่ใช้ early stopping ของ sklearn: validation_fraction สุ่มแถวแบบ stratified
+            # ทำให้ labels ล่วงหน้าหลายแท่งคาบเกี่ยวกับข้อมูลฝึก (ดู _best_iteration)
+            return HistGradientBoostingClassifier(
+                max_iter=max_iter,
                 learning_rate=0.1,
                 max_depth=5,
+                early_stopping=False,
                 random_state=42
             )
+        return GradientBoostingClassifier(
+            n_estimators=200,
+            learning_rate=0.1,
+            max_depth=5,
+            random_state=42
+        )
+    
+    def _best_iteration(self, X, y, dates):
+        """
+        จำนวน iterations ที่ดีที่สุดจาก hold-out ช่วงท้ายตามเวลา
+        
+        ฝึกด้วยข้อมูลก่อน 10% สุดท้ายของวันที่ (ตัด purge วันก่อน hold-out) เพิ่มทีละ
+        HOLDOUT_PATIENCE iterations ด้วย warm_start และหยุดเมื่อ log loss ของ hold-out
+        ไม่ดีขึ้นตลอดหนึ่งช่วง
+        
+        Args:
+            X: feature matrix ที่ scale แล้ว
+            y: labels
+            dates: วันที่ของแต่ละแถว (None = แถวเรียงตามเวลาอยู่แล้ว)
+        
+        Returns:
+            int: จำนวน iterations (ค่าสูงสุดเมื่อข้อมูลไม่พอแบ่ง hold-out)
+        """
+        from src.ai.validation import date_ranks
+        
+        max_iter = self.MAX_ITER
+        ranks, n_dates = date_ranks(dates) if dates is not None else (np.arange(len(y)), len(y))
+        holdout_start = int(n_dates * (1 - self.HOLDOUT_FRACTION))
+        head = ranks < holdout_start - self.purge
+        tail = ranks >= holdout_start
+        if not head.any() or not tail.any() or len(np.unique(y[head])) < 2:
+            logger.warning("Not enough dates for a hold-out, training without early stopping")
+            return max_iter
+        
+        model = self._build_model(max_iter=0)
+        model.set_params(warm_start=True)
+        best_loss, best_iter = np.inf, max_iter
+        while model.max_iter < max_iter:
+            model.set_params(max_iter=min(model.max_iter + self.HOLDOUT_PATIENCE, max_iter))
+            model.fit(X[head], y[head])
+            loss = _log_loss(model, X[tail], y[tail])
+            if loss >= best_loss - 1e-7:
+                break
+            best_loss, best_iter = loss, model.n_iter_
+        return best_iter
+    
+    def train(self, X_train, y_train, dates=None):
+        """
+        ฝึก Signal Classifier Model
+        
+        Args:
+            X_train: feature matrix
+            y_train: labels
+            dates: วันที่ของแต่ละแถว (เช่น FeatureDataset.dates) ใช้แบ่ง hold-out ช่วงท้ายเมื่อ
+                   hist_gradient_boosting + early_stopping (None = ถือว่าแถวเรียงตามเวลาแล้ว
+                   ซึ่งไม่จริงสำหรับ FeatureDataset ที่เรียงตามหุ้น)
+        """
+        try:
             X_scaled = self.scaler.fit_transform(X_train)
+            y_train = np.asarray(y_train)
+            max_iter = self.MAX_ITER
+            if self.backend == 'hist_gradient_boosting' and self.early_stopping:
+                max_iter = self._best_iteration(X_scaled, y_train, dates)
+            self.model = self._build_model(max_iter=max_iter)
             self.model.fit(X_scaled, y_train)
-            logger.info("Signal classifier trained")
+            self.compact = None
+            n_trees = getattr(self.model, 'n_iter_', None) or self.model.n_estimators_
+            logger.info(f"Signal classifier trained ({self.backend}, {n_trees} iterations)")
         except Exception as e:
             logger.error(f"Error training signal classifier: {str(e)}")
     
+    def compile_model(self):
+        """แปลง model + scaler เป็น CompactTreeEnsemble (ตัด overhead ของ sklearn เมื่อทำนายทีละแถว)"""
+        if self.model is None:
+            return False
+        try:
+            from src.ai.compact import CompactTreeEnsemble
+            self.compact = CompactTreeEnsemble.from_sklearn(self.model, self.scaler)
+            return True
+        except ValueError as e:
+            logger.warning(f"Cannot compile signal classifier: {str(e)}")
+            self.compact = None
+            return False
+    
     def predict(self, X):
         """Classify signal"""
         if self.model is None:
             return None
         
         try:
-            X_scaled = self.scaler.transform(X)
-            predictions = self.model.predict(X_scaled)
-            probabilities = self.model.predict_proba(X_scaled)
+            if self.compact is not None:
+                probabilities = self.compact.predict_proba(X)
+                predictions = self.compact.classes_[probabilities.argmax(axis=1)]
+            else:
+                X_scaled = self.scaler.transform(X)
+                predictions = self.model.predict(X_scaled)
+                probabilities = self.model.predict_proba(X_scaled)
             
             return {
                 'prediction': predictions,
@@ -124,6 +240,160 @@ class AnomalyDetector:
         return anomalies
 
 
+class StreamingAnomalyDetector:
+    """
+    ตรวจจับ Anomalies ของราคาและปริมาณการซื้อขายแบบ streaming ทั้ง universe
+    
+    เก็บ exponentially weighted mean/variance ของทุกหุ้นใน arrays (หุ้น × [price, volume])
+    แต่ละ bar ใหม่อัปเดตทุกหุ้นพร้อมกันครั้งเดียว และคืนเฉพาะหุ้นที่เพิ่งผิดปกติ
+    (ไม่แจ้งซ้ำจนกว่าค่าจะกลับสู่ปกติแล้วผิดปกติอีกครั้ง)
+    """
+    
+    FIELDS = ('price', 'volume')
+    
+    def __init__(self, symbols=(), span=20, threshold=2.0, min_periods=None):
+        """
+        Initialize StreamingAnomalyDetector
+        
+        Args:
+            symbols: รายชื่อหุ้น (เพิ่มภายหลังได้ด้วย add_symbols)
+            span: ช่วงของ EWMA (alpha = 2 / (span + 1)) เทียบกับ window ของ AnomalyDetector
+            threshold: |z-score| ที่ถือว่าผิดปกติ
+            min_periods: จำนวน bars ขั้นต่ำก่อนเริ่มตรวจ (default = span)
+        """
+        self.span = span
+        self.alpha = 2.0 / (span + 1.0)
+        self.threshold = threshold
+        self.min_periods = span if min_periods is None else min_periods
+        self.symbols = []
+        self.index = {}
+        n_fields = len(self.FIELDS)
+        self.mean = np.empty((0, n_fields))
+        self.var = np.empty((0, n_fields))
+        self.count = np.empty((0, n_fields), dtype=np.int64)
+        self.active = np.empty((0, n_fields), dtype=bool)
+        self.add_symbols(symbols)
+    
+    def add_symbols(self, symbols):
+        """เพิ่มหุ้นใหม่ (state เริ่มว่าง)"""
+        new = [symbol for symbol in dict.fromkeys(symbols) if symbol not in self.index]
+        if not new:
+            return
+        for symbol in new:
+            self.index[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+        shape = (len(new), len(self.FIELDS))
+        self.mean = np.vstack([self.mean, np.full(shape, np.nan)])
+        self.var = np.vstack([self.var, np.zeros(shape)])
+        self.count = np.vstack([self.count, np.zeros(shape, dtype=np.int64)])
+        self.active = np.vstack([self.active, np.zeros(shape, dtype=bool)])
+    
+    def _step(self, values):
+        """
+        อัปเดต state ด้วยค่าของ bar ใหม่ (หุ้น × fields, NaN = ไม่มีข้อมูล)
+        
+        Returns:
+            tuple: (z-scores เทียบกับ state ก่อนอัปเดต, mask ที่เพิ่งผิดปกติ, mean ก่อนอัปเดต, std ก่อนอัปเดต)
+        """
+        valid = ~np.isnan(values)
+        mean, std = self.mean, np.sqrt(self.var)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            z_scores = (values - mean) / std
+        ready = valid & (self.count >= self.min_periods) & (std > 0)
+        anomalous = ready & (np.abs(z_scores) > self.threshold)
+        newly = anomalous & ~self.active
+        self.active = np.where(valid, anomalous, self.active)
+        
+        # EW mean/variance แบบ recursive (ค่าแรกของหุ้นเป็นค่าเริ่มต้นของ mean)
+        first = valid & (self.count == 0)
+        delta = np.where(valid, values - mean, 0.0)
+        self.mean = np.where(first, values, mean + self.alpha * delta)
+        self.var = np.where(valid & ~first, (1.0 - self.alpha) * (self.var + self.alpha * delta ** 2), self.var)
+        self.count = self.count + valid
+        return z_scores, newly, mean, std
+    
+    def update(self, close, volume):
+        """
+        อัปเดตทุกหุ้นด้วย bar ใหม่ในขั้นเดียว
+        
+        Args:
+            close: ราคาปิดตามลำดับ self.symbols (NaN = ไม่มีข้อมูล)
+            volume: ปริมาณการซื้อขายตามลำดับ self.symbols
+        
+        Returns:
+            list: dict ของ anomaly ที่เพิ่งเกิด {'symbol', 'field', 'value', 'mean', 'std', 'z_score'}
+        """
+        values = np.column_stack([np.asarray(close, dtype=np.float64), np.asarray(volume, dtype=np.float64)])
+        z_scores, newly, mean, std = self._step(values)
+        rows, fields = np.nonzero(newly)
+        return [
+            {
+                'symbol': self.symbols[row],
+                'field': self.FIELDS[field],
+                'value': float(values[row, field]),
+                'mean': float(mean[row, field]),
+                'std': float(std[row, field]),
+                'z_score': float(z_scores[row, field]),
+            }
+            for row, field in zip(rows, fields)
+        ]
+    
+    def update_bar(self, bar):
+        """
+        อัปเดตด้วย bar ใหม่แบบ dict (หุ้นที่ไม่อยู่ใน bar ถือว่าไม่มีข้อมูล)
+        
+        Args:
+            bar: dict {symbol: {'Close': ..., 'Volume': ...}}
+        
+        Returns:
+            list: anomalies ที่เพิ่งเกิด (ดู update)
+        """
+        self.add_symbols(bar)
+        close = np.full(len(self.symbols), np.nan)
+        volume = np.full(len(self.symbols), np.nan)
+        for symbol, values in bar.items():
+            row = self.index[symbol]
+            close[row] = values.get('Close', np.nan)
+            volume[row] = values.get('Volume', np.nan)
+        return self.update(close, volume)
+    
+    def warm_up(self, historical_data):
+        """
+        สร้าง state จากข้อมูลย้อนหลัง (ไม่คืน anomalies ระหว่างทาง)
+        
+        Args:
+            historical_data: dict {symbol: DataFrame ราคา}
+        """
+        self.add_symbols(historical_data)
+        columns = {symbol: data for symbol, data in historical_data.items() if data is not None and not data.empty}
+        if not columns:
+            return
+        close = pd.concat({symbol: data['Close'] for symbol, data in columns.items()}, axis=1)
+        volume = pd.concat({symbol: data['Volume'] for symbol, data in columns.items()}, axis=1)
+        close = close.reindex(columns=self.symbols).to_numpy(dtype=np.float64)
+        volume = volume.reindex(columns=self.symbols).to_numpy(dtype=np.float64)
+        for values in np.stack([close, volume], axis=2):
+            self._step(values)
+    
+    def save(self, path):
+        """บันทึก state เป็นไฟล์ .npz"""
+        np.savez(path, symbols=np.array(self.symbols, dtype=str), mean=self.mean, var=self.var,
+                 count=self.count, active=self.active,
+                 params=np.array([self.span, self.threshold, self.min_periods], dtype=np.float64))
+    
+    @classmethod
+    def load(cls, path):
+        """โหลด state ที่บันทึกด้วย save()"""
+        with np.load(path) as data:
+            span, threshold, min_periods = data['params']
+            detector = cls(data['symbols'].tolist(), span=span, threshold=threshold, min_periods=int(min_periods))
+            detector.mean = data['mean']
+            detector.var = data['var']
+            detector.count = data['count']
+            detector.active = data['active']
+        return detector
+
+
 class CorrelationAnalyzer:
     """วิเคราะห์ความสัมพันธ์ระหว่างหุ้นต่างๆ"""
     
@@ -149,3 +419,19 @@ class CorrelationAnalyzer:
         ]
         
         return highly_correlated.sort_values(ascending=False)
+    
+    @staticmethod
+    def build_index(price_data, k=10, window=252):
+        """
+        สร้าง CorrelationIndex (top-k neighbors ของทุกหุ้น) สำหรับ universe ขนาดใหญ่
+        
+        Args:
+            price_data: DataFrame ราคาปิด (index วันที่, คอลัมน์หุ้น)
+            k: จำนวน neighbors ต่อหุ้น
+            window: จำนวนผลตอบแทนล่าสุดที่ใช้
+        
+        Returns:
+            CorrelationIndex: ใช้ most_correlated(symbol) แทน find_correlated_stocks
+        """
+        from src.ai.correlation import CorrelationIndex
+        return CorrelationIndex.from_prices(price_data, k=k, window=window)
@@ -0,0 +1,94 @@
+"""
+Incremental Model Updates
+ปรับ AISignalGenerator ด้วย bars ใหม่ที่มี label แล้ว (partial_fit) แทนการฝึกใหม่ทั้งหมดทุกวัน
+ทุกการปรับบันทึกเป็นเวอร์ชันใหม่ใน ModelRegistry โดยอ้างถึงเวอร์ชันก่อนหน้า (ดู ModelRegistry.lineage)
+"""
+
+import logging
+
+import numpy as np
+import pandas as pd
+
+from src.ai.dataset import DatasetBuilder
+from src.ai.registry import ModelRegistry, AI_SIGNAL_MODEL, fingerprint_training_data
+from src.signals.generator import AISignalGenerator
+
+logger = logging.getLogger(__name__)
+
+
+def update_ai_model(registry, X_new, y_new, name=AI_SIGNAL_MODEL, metadata=None):
+    """
+    ปรับ model ล่าสุดใน registry ด้วยแถวใหม่ แล้วบันทึกเป็นเวอร์ชันถัดไป
+    
+    ถ้ายังไม่มี model จะฝึก AISignalGenerator(incremental=True) ด้วยแถวที่ให้มา
+    
+    Args:
+        registry: ModelRegistry
+        X_new: Feature array ของแถวใหม่
+        y_new: Label array ของแถวใหม่
+        name: ชื่อ model ใน registry
+        metadata: dict ข้อมูลเพิ่มเติมของเวอร์ชันใหม่
+    
+    Returns:
+        str: เวอร์ชันที่บันทึก
+    """
+    generator = AISignalGenerator(incremental=True)
+    parent = registry.load(name, generator, mmap=False)
+    if parent is not None:
+        if not generator.update_model(X_new, y_new):
+            raise ValueError(f"Model {name} {parent['version']} ({parent['model_class']}) "
+                             f"cannot be updated incrementally")
+    else:
+        generator.train_model(X_new, y_new)
+        if not generator.trained:
+            raise ValueError(f"Could not train incremental model {name}")
+    
+    return registry.save(
+        name, generator,
+        training_fingerprint=fingerprint_training_data(X_new, y_new),
+        metadata={'update_rows': int(len(y_new)), **(metadata or {})},
+        parent_version=parent['version'] if parent else None,
+    )
+
+
+def daily_update(historical_data, registry=None, name=AI_SIGNAL_MODEL, builder=None, cache=None, store=None):
+    """
+    งานประจำวัน: ปรับ model ด้วย bars ที่ได้ label ตั้งแต่การปรับครั้งก่อน
+    
+    Label ของ bar วันที่ t รู้ผลเมื่อมีราคาถึง t + horizon จึงใช้เฉพาะแถวที่วันที่
+    ใหม่กว่า last_label_date ที่บันทึกไว้กับเวอร์ชันล่าสุด
+    
+    Args:
+        historical_data: dict {symbol: DataFrame ราคา} ที่รวม bars ล่าสุดแล้ว
+        registry: ModelRegistry (default data/models)
+        name: ชื่อ model ใน registry
+        builder: DatasetBuilder (default horizon 5 วัน)
+        cache: BacktestCache (optional) ใช้ indicator panels ที่คำนวณไว้แล้วซ้ำ
+        store: FeatureStore (optional) ต่อท้าย bars ใหม่ลง store แล้วอ่าน features จาก store
+    
+    Returns:
+        str: เวอร์ชันใหม่ หรือ None ถ้าไม่มีแถวใหม่
+    """
+    registry = registry or ModelRegistry()
+    builder = builder or DatasetBuilder()
+    latest = registry.metadata(name)
+    last_label_date = (latest or {}).get('metadata', {}).get('last_label_date')
+    
+    if store is not None:
+        store.update_many(historical_data, cache)
+        dataset = store.dataset(list(historical_data), builder=builder)
+    else:
+        dataset = builder.build(historical_data, cache)
+    if last_label_date:
+        dataset = dataset.subset(dataset.dates > pd.Timestamp(last_label_date).to_datetime64())
+    if len(dataset) == 0:
+        logger.info(f"No newly labeled bars for {name}")
+        return None
+    
+    metadata = {
+        **builder.params(),
+        'first_label_date': pd.Timestamp(np.min(dataset.dates)).isoformat(),
+        'last_label_date': pd.Timestamp(np.max(dataset.dates)).isoformat(),
+        'symbols': len(np.unique(dataset.codes)),
+    }
+    return update_ai_model(registry, dataset.X, dataset.y, name, metadata)
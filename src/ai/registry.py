@@ -0,0 +1,330 @@
+"""
+Model Registry
+บันทึก models และ scalers ที่ฝึกแล้วพร้อมเวอร์ชัน, feature schema และ fingerprint ของข้อมูลฝึก
+แล้วโหลดกลับแบบ lazy (memory-mapped) เมื่อถูกใช้งานครั้งแรก
+"""
+
+import os
+import re
+import json
+import pickle
+import hashlib
+import logging
+from datetime import datetime
+
+import joblib
+import numpy as np
+
+from src.ai.dataset import FEATURE_NAMES
+
+logger = logging.getLogger(__name__)
+
+# เปลี่ยนเมื่อรูปแบบไฟล์ใน registry เปลี่ยน
+REGISTRY_FORMAT = 1
+
+# ชื่อ model ของ AISignalGenerator ที่ StockAnalyzerApp โหลดอัตโนมัติ
+AI_SIGNAL_MODEL = 'ai_signal_generator'
+
+_VERSION_PATTERN = re.compile(r'^v(\d+)$')
+
+
+def fingerprint_training_data(X, y=None):
+    """
+    คำนวณ hash ของข้อมูลฝึก (shape, dtype และค่าของ X และ y)
+    
+    Args:
+        X: feature matrix
+        y: labels (optional)
+    
+    Returns:
+        str: sha256 hex digest
+    """
+    digest = hashlib.sha256()
+    for array in (X, y):
+        if array is None:
+            continue
+        array = np.ascontiguousarray(array)
+        digest.update(f'{array.shape}:{array.dtype.str}'.encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+
+def fingerprint_model(owner):
+    """
+    คำนวณ hash ของ model และ scaler ของ owner (ใช้แยก cache key ของผลที่ขึ้นกับ model)
+    
+    LazyArtifact ใช้ path, ขนาดและเวลาแก้ไขของไฟล์ใน registry (ไม่ต้องโหลด model)
+    object ในหน่วยความจำใช้ bytes ของ pickle
+    
+    Args:
+        owner: object ที่มี model และ scaler (เช่น AISignalGenerator)
+    
+    Returns:
+        str: sha256 hex digest
+    """
+    digest = hashlib.sha256()
+    for artifact in (owner.model, owner.scaler):
+        if isinstance(artifact, LazyArtifact):
+            stat = os.stat(artifact._path)
+            digest.update(f'file:{os.path.abspath(artifact._path)}:{stat.st_size}:{stat.st_mtime_ns}'.encode())
+        else:
+            digest.update(pickle.dumps(artifact, protocol=pickle.HIGHEST_PROTOCOL))
+    return digest.hexdigest()
+
+
+class LazyArtifact:
+    """
+    Object ที่โหลดจากไฟล์เมื่อถูกใช้งานครั้งแรก
+    
+    โหลดด้วย joblib แบบ mmap_mode='r' ทำให้ numpy arrays ที่ model เก็บไว้ตรงๆ (เช่น coef_ ของ
+    linear models, mean_ ของ scaler) อ่านจากไฟล์และหลาย processes ใช้ page เดียวกันใน OS cache
+    ต้นไม้ของ sklearn ไม่ได้ประโยชน์นี้ เพราะ Tree.__setstate__ copy nodes เข้าหน่วยความจำของ process
+    (ModelRegistry จึงเก็บ CompactTreeEnsemble ของ tree models แยกไว้ให้ทำนายจาก arrays ที่ mmap แทน)
+    เมื่อ pickle (เช่นส่งให้ worker process) จะส่งเฉพาะ path ไม่ใช่ตัว model
+    """
+    
+    def __init__(self, path, mmap=True):
+        self._path = path
+        self._mmap = mmap
+        self._target = None
+    
+    def load(self):
+        """โหลด object (ครั้งแรกเท่านั้น)"""
+        if self._target is None:
+            self._target = joblib.load(self._path, mmap_mode='r' if self._mmap else None)
+            logger.debug(f"Loaded model artifact {self._path}")
+        return self._target
+    
+    def materialize(self):
+        """
+        โหลด object เข้าหน่วยความจำของ process แบบแก้ไขได้ (ไม่ใช้ mmap ซึ่งได้ arrays แบบอ่านอย่างเดียว)
+        
+        Returns:
+            object: สำเนาใหม่จากไฟล์ (ไม่กระทบ object ที่ load() คืนไปแล้ว)
+        """
+        return joblib.load(self._path)
+    
+    @property
+    def loaded(self):
+        return self._target is not None
+    
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.load(), name)
+    
+    def __getstate__(self):
+        return {'_path': self._path, '_mmap': self._mmap}
+    
+    def __setstate__(self, state):
+        self._path = state['_path']
+        self._mmap = state['_mmap']
+        self._target = None
+    
+    def __repr__(self):
+        status = 'loaded' if self.loaded else 'not loaded'
+        return f"LazyArtifact({self._path}, {status})"
+
+
+class ModelRegistry:
+    """
+    ที่เก็บ models ที่ฝึกแล้ว
+    
+    โครงสร้าง: <root>/<name>/v<N>/{model.joblib, scaler.joblib, meta.json, compact/}
+    ใช้ได้กับ object ที่มี attribute model และ scaler
+    (AISignalGenerator, PricePredictor, SignalClassifier)
+    
+    compact/ คือ CompactTreeEnsemble ของ tree models (arrays .npy แยกไฟล์) ที่ load() เปิดแบบ
+    memory-mapped ให้ owner ที่มี attribute compact ทำนายได้โดยไม่ต้อง unpickle ต้นไม้ของ sklearn
+    """
+    
+    def __init__(self, root='data/models'):
+        """
+        Initialize ModelRegistry
+        
+        Args:
+            root: โฟลเดอร์หลักของ registry
+        """
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+    
+    def _model_dir(self, name):
+        return os.path.join(self.root, name)
+    
+    def _version_dir(self, name, version):
+        return os.path.join(self.root, name, version)
+    
+    # ==================== VERSIONS ====================
+    
+    def names(self):
+        """ชื่อ models ทั้งหมดใน registry"""
+        return sorted(name for name in os.listdir(self.root) if self.versions(name))
+    
+    def versions(self, name):
+        """
+        เวอร์ชันทั้งหมดของ model (เก่าไปใหม่)
+        
+        Args:
+            name: ชื่อ model
+        
+        Returns:
+            list: เช่น ['v1', 'v2']
+        """
+        directory = self._model_dir(name)
+        if not os.path.isdir(directory):
+            return []
+        numbers = []
+        for entry in os.listdir(directory):
+            match = _VERSION_PATTERN.match(entry)
+            if match and os.path.exists(os.path.join(directory, entry, 'meta.json')):
+                numbers.append(int(match.group(1)))
+        return [f'v{number}' for number in sorted(numbers)]
+    
+    def latest_version(self, name):
+        """เวอร์ชันล่าสุดของ model หรือ None ถ้ายังไม่มี"""
+        versions = self.versions(name)
+        return versions[-1] if versions else None
+    
+    def metadata(self, name, version=None):
+        """
+        ข้อมูลของ model (ไม่โหลดตัว model)
+        
+        Args:
+            name: ชื่อ model
+            version: เวอร์ชัน (None = ล่าสุด)
+        
+        Returns:
+            dict: meta.json หรือ None ถ้าไม่พบ
+        """
+        version = version or self.latest_version(name)
+        if version is None:
+            return None
+        path = os.path.join(self._version_dir(name, version), 'meta.json')
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+    
+    def lineage(self, name, version=None):
+        """
+        ลำดับเวอร์ชันที่ model ถูกปรับต่อกันมา (จากเวอร์ชันที่ระบุย้อนไปถึงตัวที่ฝึกครั้งแรก)
+        
+        Args:
+            name: ชื่อ model
+            version: เวอร์ชัน (None = ล่าสุด)
+        
+        Returns:
+            list: metadata ของแต่ละเวอร์ชัน (ใหม่ไปเก่า)
+        """
+        chain = []
+        meta = self.metadata(name, version)
+        while meta is not None and meta['version'] not in (entry['version'] for entry in chain):
+            chain.append(meta)
+            parent = meta.get('parent_version')
+            meta = self.metadata(name, parent) if parent else None
+        return chain
+    
+    # ==================== SAVE / LOAD ====================
+    
+    def save(self, name, owner, training_fingerprint=None, feature_names=None, metadata=None,
+             parent_version=None):
+        """
+        บันทึก model และ scaler เป็นเวอร์ชันใหม่
+        
+        Args:
+            name: ชื่อ model
+            owner: object ที่มี model และ scaler ที่ฝึกแล้ว
+            training_fingerprint: hash ของข้อมูลฝึก (ดู fingerprint_training_data)
+            feature_names: ชื่อ features ตามลำดับคอลัมน์ (default FEATURE_NAMES)
+            metadata: dict ข้อมูลเพิ่มเติม (เช่น พารามิเตอร์ของ labels)
+            parent_version: เวอร์ชันที่ model นี้ถูกปรับต่อมา (incremental update) ดู lineage()
+        
+        Returns:
+            str: เวอร์ชันที่บันทึก
+        """
+        model = owner.model.load() if isinstance(owner.model, LazyArtifact) else owner.model
+        scaler = owner.scaler.load() if isinstance(owner.scaler, LazyArtifact) else owner.scaler
+        if model is None:
+            raise ValueError(f"Cannot save '{name}': model is not trained")
+        
+        latest = self.latest_version(name)
+        version = f'v{int(latest[1:]) + 1}' if latest else 'v1'
+        directory = self._version_dir(name, version)
+        os.makedirs(directory)
+        
+        # ไม่บีบอัด เพื่อให้โหลดแบบ memory-mapped ได้
+        joblib.dump(model, os.path.join(directory, 'model.joblib'))
+        joblib.dump(scaler, os.path.join(directory, 'scaler.joblib'))
+        compact = hasattr(owner, 'compact') and self._save_compact(model, scaler, directory)
+        
+        import sklearn
+        meta = {
+            'format': REGISTRY_FORMAT,
+            'name': name,
+            'version': version,
+            'created_at': datetime.now().isoformat(),
+            'owner_class': type(owner).__name__,
+            'model_class': type(model).__name__,
+            'feature_names': list(feature_names or FEATURE_NAMES),
+            'training_fingerprint': training_fingerprint,
+            'parent_version': parent_version,
+            'compact': compact,
+            'sklearn_version': sklearn.__version__,
+            'metadata': metadata or {},
+        }
+        with open(os.path.join(directory, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=2)
+        
+        logger.info(f"Saved model {name} {version} ({meta['model_class']})")
+        return version
+    
+    @staticmethod
+    def _save_compact(model, scaler, directory):
+        """บันทึก CompactTreeEnsemble ของ tree models (คืน False ถ้า model ไม่ใช่ tree classifier ที่รองรับ)"""
+        from src.ai.compact import CompactTreeEnsemble
+        try:
+            compact = CompactTreeEnsemble.from_sklearn(model, scaler)
+        except (ValueError, AttributeError):
+            return False
+        compact.save_arrays(os.path.join(directory, 'compact'))
+        return True
+    
+    def load(self, name, owner, version=None, feature_names=None, mmap=True):
+        """
+        ผูก model และ scaler ที่บันทึกไว้เข้ากับ owner (โหลดไฟล์จริงเมื่อถูกใช้ครั้งแรก)
+        
+        Args:
+            name: ชื่อ model
+            owner: object ที่จะได้ model และ scaler (เช่น AISignalGenerator())
+            version: เวอร์ชัน (None = ล่าสุด)
+            feature_names: features ที่ owner ใช้ (default FEATURE_NAMES) ต้องตรงกับตอนฝึก
+            mmap: โหลด arrays แบบ memory-mapped (รวม CompactTreeEnsemble ของ tree models)
+        
+        Returns:
+            dict: metadata ของเวอร์ชันที่โหลด หรือ None ถ้าไม่พบ
+        """
+        meta = self.metadata(name, version)
+        if meta is None:
+            logger.warning(f"Model {name} {version or '(latest)'} not found in registry")
+            return None
+        if meta.get('format') != REGISTRY_FORMAT:
+            raise ValueError(f"Model {name} {meta['version']} has unsupported format {meta.get('format')}")
+        expected = list(feature_names or FEATURE_NAMES)
+        if meta['feature_names'] != expected:
+            raise ValueError(f"Model {name} {meta['version']} was trained on features "
+                             f"{meta['feature_names']}, expected {expected}")
+        
+        directory = self._version_dir(name, meta['version'])
+        owner.model = LazyArtifact(os.path.join(directory, 'model.joblib'), mmap)
+        owner.scaler = LazyArtifact(os.path.join(directory, 'scaler.joblib'), mmap)
+        if hasattr(owner, 'trained'):
+            owner.trained = True
+        if hasattr(owner, 'compact'):
+            owner.compact = None
+            if meta.get('compact'):
+                from src.ai.compact import CompactTreeEnsemble
+                owner.compact = CompactTreeEnsemble.load_arrays(os.path.join(directory, 'compact'),
+                                                                mmap_mode='r' if mmap else None)
+        
+        logger.info(f"Registered model {name} {meta['version']} (lazy)")
+        return meta
@@ -0,0 +1,304 @@
+"""
+Time-Series Cross-Validation
+Purged / embargoed walk-forward cross-validation สำหรับ SignalClassifier และ PricePredictor
+ฝึกแต่ละ fold คู่ขนานหลาย processes โดยแชร์ feature matrix ผ่าน shared memory (ไม่ copy ต่อ process)
+"""
+
+import os
+import time
+import inspect
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def date_ranks(dates):
+    """
+    ลำดับของวันที่ของแต่ละแถวในปฏิทินรวมของทุกหุ้น
+    
+    Args:
+        dates: datetime64 ของแต่ละแถว (เช่น FeatureDataset.dates)
+    
+    Returns:
+        tuple: (ranks int32 ต่อแถว, จำนวนวันที่ไม่ซ้ำ)
+    """
+    unique, ranks = np.unique(np.asarray(dates), return_inverse=True)
+    return ranks.astype(np.int32), len(unique)
+
+
+def _fold_mask(ranks, ranges):
+    """mask ของแถวที่ลำดับวันที่อยู่ในช่วง [start, end) ใดช่วงหนึ่ง"""
+    mask = np.zeros(len(ranks), dtype=bool)
+    for start, end in ranges:
+        mask |= (ranks >= start) & (ranks < end)
+    return mask
+
+
+class PurgedWalkForwardSplit:
+    """
+    แบ่ง folds ตามเวลา (แบ่งตามวันที่ ไม่ใช่ตามแถว ทุกหุ้นในวันเดียวกันอยู่ fold เดียวกัน)
+    
+    - purge: ตัดแถวฝึกที่ label (ผลตอบแทนล่วงหน้า purge วัน) คาบเกี่ยวกับช่วงทดสอบ
+    - embargo: ตัดแถวฝึกหลังช่วงทดสอบ (ใช้เมื่อ walk_forward=False ที่ฝึกด้วยข้อมูลทั้งก่อนและหลัง)
+    - walk_forward=True: ฝึกด้วยข้อมูลก่อนช่วงทดสอบเท่านั้น (expanding หรือ rolling ตาม max_train_dates)
+    """
+    
+    def __init__(self, n_splits=5, purge=5, embargo=0, walk_forward=True, max_train_dates=None):
+        """
+        Initialize PurgedWalkForwardSplit
+        
+        Args:
+            n_splits: จำนวน folds
+            purge: จำนวนวันที่ตัดก่อนช่วงทดสอบ (ควรเท่ากับ horizon ของ labels)
+            embargo: จำนวนวันที่ตัดหลังช่วงทดสอบ
+            walk_forward: ฝึกด้วยข้อมูลในอดีตเท่านั้น
+            max_train_dates: จำนวนวันฝึกสูงสุด (None = ใช้ทั้งหมดตั้งแต่ต้น)
+        """
+        if n_splits < 1:
+            raise ValueError("n_splits must be at least 1")
+        self.n_splits = int(n_splits)
+        self.purge = max(0, int(purge))
+        self.embargo = max(0, int(embargo))
+        self.walk_forward = walk_forward
+        self.max_train_dates = max_train_dates
+    
+    def folds(self, n_dates):
+        """
+        ช่วงลำดับวันที่ของแต่ละ fold
+        
+        Args:
+            n_dates: จำนวนวันที่ไม่ซ้ำ
+        
+        Returns:
+            list: [{'fold', 'train': [(start, end), ...], 'test': (start, end)}] (ช่วงแบบ [start, end))
+        """
+        # walk-forward ใช้บล็อกแรกเป็นข้อมูลฝึกอย่างเดียว
+        n_blocks = self.n_splits + 1 if self.walk_forward else self.n_splits
+        bounds = np.linspace(0, n_dates, n_blocks + 1).astype(int)
+        first = 1 if self.walk_forward else 0
+        
+        folds = []
+        for fold, block in enumerate(range(first, n_blocks)):
+            test_start, test_end = int(bounds[block]), int(bounds[block + 1])
+            train_end = test_start - self.purge
+            train_start = 0
+            if self.walk_forward and self.max_train_dates:
+                train_start = max(0, train_end - int(self.max_train_dates))
+            train = [(train_start, train_end)]
+            if not self.walk_forward:
+                train.append((test_end + self.embargo, n_dates))
+            train = [(start, end) for start, end in train if end > start]
+            if not train or test_end <= test_start:
+                raise ValueError(f"Not enough dates ({n_dates}) for {self.n_splits} folds "
+                                 f"with purge={self.purge}, embargo={self.embargo}")
+            folds.append({'fold': fold, 'train': train, 'test': (test_start, test_end)})
+        return folds
+    
+    def split(self, dates):
+        """
+        ดัชนีแถวฝึก/ทดสอบของแต่ละ fold (ใช้แทน sklearn splitters ได้)
+        
+        Args:
+            dates: datetime64 ของแต่ละแถว
+        
+        Yields:
+            tuple: (train_index, test_index)
+        """
+        ranks, n_dates = date_ranks(dates)
+        for fold in self.folds(n_dates):
+            yield (np.flatnonzero(_fold_mask(ranks, fold['train'])),
+                   np.flatnonzero(_fold_mask(ranks, [fold['test']])))
+
+
+class SharedArrays:
+    """
+    numpy arrays ใน shared memory (สร้างครั้งเดียวใน process หลัก แล้ว worker เปิดด้วยชื่อ)
+    
+    ใช้เป็น context manager เพื่อคืนหน่วยความจำเมื่อเสร็จ
+    """
+    
+    def __init__(self, arrays):
+        """
+        Args:
+            arrays: dict {ชื่อ: np.ndarray} ที่จะ copy เข้า shared memory
+        """
+        self.blocks = {}
+        self.specs = {}
+        try:
+            for name, array in arrays.items():
+                array = np.ascontiguousarray(array)
+                block = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+                self.blocks[name] = block
+                np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+                self.specs[name] = (block.name, array.shape, array.dtype.str)
+        except Exception:
+            self.close()
+            raise
+    
+    @staticmethod
+    def attach(specs):
+        """
+        เปิด arrays จาก specs ใน worker process
+        
+        Returns:
+            tuple: (blocks ที่ต้อง close เมื่อเลิกใช้, dict {ชื่อ: np.ndarray})
+        """
+        blocks, arrays = [], {}
+        for name, (block_name, shape, dtype) in specs.items():
+            block = shared_memory.SharedMemory(name=block_name)
+            blocks.append(block)
+            arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+        return blocks, arrays
+    
+    def close(self):
+        """ปิดและคืน shared memory ทั้งหมด"""
+        for block in self.blocks.values():
+            block.close()
+            block.unlink()
+        self.blocks = {}
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def _predictions(result):
+    """ผลทำนายจาก predict() ของ model (SignalClassifier คืน dict, PricePredictor คืน array)"""
+    if isinstance(result, dict):
+        return np.asarray(result['prediction'])
+    return np.asarray(result)
+
+
+def score_predictions(y_true, y_pred, task):
+    """
+    Metrics ของ fold
+    
+    Args:
+        y_true: ค่าจริง
+        y_pred: ค่าที่ทำนาย
+        task: 'classification' หรือ 'regression'
+    
+    Returns:
+        dict: metrics
+    """
+    from sklearn import metrics
+    
+    if task == 'classification':
+        return {
+            'accuracy': float(metrics.accuracy_score(y_true, y_pred)),
+            'balanced_accuracy': float(metrics.balanced_accuracy_score(y_true, y_pred)),
+            'f1_macro': float(metrics.f1_score(y_true, y_pred, average='macro', zero_division=0)),
+        }
+    return {
+        'mae': float(metrics.mean_absolute_error(y_true, y_pred)),
+        'rmse': float(np.sqrt(metrics.mean_squared_error(y_true, y_pred))),
+        'r2': float(metrics.r2_score(y_true, y_pred)),
+        'direction_accuracy': float(np.mean(np.sign(y_true) == np.sign(y_pred))),
+    }
+
+
+def _run_fold(model_factory, arrays, fold, task):
+    """ฝึกและวัดผล fold เดียว (arrays ใช้ร่วมกับ process อื่น ไม่ถูกแก้ไข)"""
+    started = time.perf_counter()
+    X, y, ranks = arrays['X'], arrays['y'], arrays['ranks']
+    train = _fold_mask(ranks, fold['train'])
+    test = _fold_mask(ranks, [fold['test']])
+    
+    model = model_factory()
+    fit = model.train if hasattr(model, 'train') else model.train_model
+    # ส่งลำดับวันที่ให้ model ที่แบ่ง hold-out ตามเวลาเอง (เช่น SignalClassifier.train)
+    extra = {'dates': ranks[train]} if 'dates' in inspect.signature(fit).parameters else {}
+    train_started = time.perf_counter()
+    fit(X[train], y[train], **extra)
+    train_seconds = time.perf_counter() - train_started
+    
+    predict_started = time.perf_counter()
+    predicted = _predictions(model.predict(X[test]))
+    predict_seconds = time.perf_counter() - predict_started
+    
+    return {
+        'fold': fold['fold'],
+        'train_rows': int(train.sum()),
+        'test_rows': int(test.sum()),
+        'test_start': fold['test'][0],
+        'test_end': fold['test'][1],
+        **score_predictions(y[test], predicted, task),
+        'train_seconds': train_seconds,
+        'predict_seconds': predict_seconds,
+        'fold_seconds': time.perf_counter() - started,
+        'pid': os.getpid(),
+    }
+
+
+def _run_shared_fold(model_factory, specs, fold, task):
+    """จุดเริ่มของ fold ใน worker process (เปิด arrays จาก shared memory)"""
+    blocks, arrays = SharedArrays.attach(specs)
+    try:
+        return _run_fold(model_factory, arrays, fold, task)
+    finally:
+        del arrays
+        for block in blocks:
+            block.close()
+
+
+def cross_validate(model_factory, X, y, dates, splitter=None, n_jobs=None, task=None):
+    """
+    Purged walk-forward cross-validation
+    
+    Args:
+        model_factory: callable ที่สร้าง model ใหม่ (เช่น SignalClassifier, PricePredictor)
+                       ต้องมี train(X, y) และ predict(X) และ pickle ได้เมื่อ n_jobs > 1
+        X: feature matrix (เช่น FeatureDataset.X)
+        y: labels (FeatureDataset.y) หรือผลตอบแทนล่วงหน้า (FeatureDataset.forward_return)
+        dates: วันที่ของแต่ละแถว (FeatureDataset.dates)
+        splitter: PurgedWalkForwardSplit (default 5 folds, purge 5 วัน)
+        n_jobs: จำนวน processes (None = เท่ากับจำนวน folds แต่ไม่เกินจำนวน CPU, 1 = ไม่แยก process)
+        task: 'classification' / 'regression' (None = classification ถ้า y เป็นจำนวนเต็ม)
+    
+    Returns:
+        dict: folds (DataFrame ต่อ fold: แถว, metrics, เวลา), mean, std, n_jobs, total_seconds
+    """
+    started = time.perf_counter()
+    splitter = splitter or PurgedWalkForwardSplit()
+    y = np.asarray(y)
+    if task is None:
+        task = 'classification' if np.issubdtype(y.dtype, np.integer) else 'regression'
+    if task not in ('classification', 'regression'):
+        raise ValueError(f"Unknown task: {task}")
+    
+    ranks, n_dates = date_ranks(dates)
+    folds = splitter.folds(n_dates)
+    if n_jobs is None:
+        n_jobs = min(len(folds), os.cpu_count() or 1)
+    n_jobs = max(1, min(int(n_jobs), len(folds)))
+    
+    if n_jobs == 1:
+        arrays = {'X': np.asarray(X), 'y': y, 'ranks': ranks}
+        results = [_run_fold(model_factory, arrays, fold, task) for fold in folds]
+    else:
+        with SharedArrays({'X': X, 'y': y, 'ranks': ranks}) as shared:
+            with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+                futures = [executor.submit(_run_shared_fold, model_factory, shared.specs, fold, task)
+                           for fold in folds]
+                results = [future.result() for future in futures]
+    
+    frame = pd.DataFrame(results).set_index('fold')
+    metric_names = [column for column in frame.columns
+                    if column not in ('train_rows', 'test_rows', 'test_start', 'test_end', 'pid')]
+    total_seconds = time.perf_counter() - started
+    logger.info(f"Cross-validated {len(folds)} folds on {n_jobs} process(es) in {total_seconds:.1f}s")
+    return {
+        'task': task,
+        'folds': frame,
+        'mean': frame[metric_names].mean().to_dict(),
+        'std': frame[metric_names].std(ddof=0).to_dict(),
+        'n_jobs': n_jobs,
+        'total_seconds': total_seconds,
+    }
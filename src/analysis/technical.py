@@ -8,7 +8,6 @@ import pandas as pd
 from datetime import datetime
 import logging
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
@@ -222,6 +221,45 @@ class TechnicalAnalyzer:
             logger.error(f"Error calculating Stochastic: {str(e)}")
             return None
     
+    @staticmethod
+    def get_indicator_history(data):
+        """
+        คำนวณ Indicators ทุกแท่งในครั้งเดียว (ค่าเดียวกับ get_technical_summary ณ แต่ละวัน)
+        
+        Indicators ทั้งหมดเป็นแบบ causal ค่าในแถวที่ i จึงเท่ากับ
+        get_technical_summary(data.iloc[:i + 1]) โดยไม่ต้องคำนวณซ้ำทุกวัน
+        
+        Args:
+            data: DataFrame ของราคาหุ้น (ต้องมี Close, High, Low)
+        
+        Returns:
+            DataFrame: คอลัมน์เดียวกับ key ของ get_technical_summary (index ตาม data)
+        """
+        if data is None or data.empty:
+            return pd.DataFrame()
+        
+        analyzer = TechnicalAnalyzer()
+        macd, signal, hist = analyzer.calculate_macd(data)
+        bb = analyzer.calculate_bollinger_bands(data)
+        stoch = analyzer.calculate_stochastic(data)
+        
+        return pd.DataFrame({
+            'latest_price': data['Close'],
+            'sma_20': analyzer.calculate_sma(data, 20),
+            'sma_50': analyzer.calculate_sma(data, 50),
+            'sma_200': analyzer.calculate_sma(data, 200),
+            'rsi': analyzer.calculate_rsi(data),
+            'macd': macd,
+            'macd_signal': signal,
+            'macd_histogram': hist,
+            'bb_upper': bb['upper'],
+            'bb_middle': bb['middle'],
+            'bb_lower': bb['lower'],
+            'atr': analyzer.calculate_atr(data),
+            'stoch_k': stoch['k_line'],
+            'stoch_d': stoch['d_line'],
+        }, index=data.index)
+    
     @staticmethod
     def get_technical_summary(data):
         """
@@ -5,5 +5,10 @@ Backtesting Module
 
 from .backtester import Backtester
 from .metrics import PerformanceMetrics
+from .portfolio import PortfolioBacktester
+from .multi_strategy import MultiStrategyRunner
+from .benchmark_store import BenchmarkStore
+from .jobs import JobQueue, BacktestWorker, WorkerPool
 
-__all__ = ['Backtester', 'PerformanceMetrics']
+__all__ = ['Backtester', 'PerformanceMetrics', 'PortfolioBacktester', 'MultiStrategyRunner', 'BenchmarkStore',
+           'JobQueue', 'BacktestWorker', 'WorkerPool']
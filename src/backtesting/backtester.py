@@ -9,13 +9,65 @@ import numpy as np
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Optional
 
-logging.basicConfig(level=logging.INFO)
+from .trade_log import TradeLog
+from .execution import IntrabarExecution, EXIT_NONE, EXIT_REASONS
+from .events import EventRecorder
+from .metrics import PerformanceMetrics
+from src.utils.trading_calendar import TradingCalendar
+
 logger = logging.getLogger(__name__)
 
 
+def load_historical_data(symbols, start_dt, end_dt, fetcher=None, lookback_days=200):
+    """
+    ดึงข้อมูลย้อนหลังของแต่ละหุ้นสำหรับ Backtest
+    
+    Args:
+        symbols: รายการหุ้น
+        start_dt: วันเริ่มต้น (Timestamp)
+        end_dt: วันสิ้นสุด (Timestamp)
+        fetcher: StockDataFetcher (ถ้าไม่ระบุจะสร้างใหม่)
+        lookback_days: จำนวนวันย้อนหลังก่อน start_dt สำหรับคำนวณ indicators
+        
+    Returns:
+        dict: {symbol: DataFrame} (index แบบ timezone-naive)
+    """
+    if fetcher is None:
+        from src.data.fetcher import StockDataFetcher
+        fetcher = StockDataFetcher()
+    
+    historical_data = {}
+    for symbol in symbols:
+        try:
+            # ดึงข้อมูลย้อนหลังพอสำหรับคำนวณ indicators
+            days_diff = (end_dt - start_dt).days
+            period = 'max' if days_diff > 365 else f'{days_diff + lookback_days}d'
+            
+            data = fetcher.fetch_historical_data(symbol, period=period)
+            if data is not None and not data.empty:
+                # แปลง timezone-aware index เป็น timezone-naive
+                try:
+                    data.index = pd.to_datetime(data.index).tz_localize(None)
+                except:
+                    pass  # ถ้าไม่มี timezone ก็ข้าม
+                
+                # กรองเฉพาะช่วงที่ต้องการ + ข้อมูลย้อนหลังเพื่อคำนวณ indicators
+                lookback_start = start_dt - pd.Timedelta(days=lookback_days)
+                data_filtered = data[data.index >= lookback_start]
+                historical_data[symbol] = data_filtered
+                logger.info(f"Loaded {len(data_filtered)} days of data for {symbol}")
+        except Exception as e:
+            logger.error(f"Error fetching {symbol}: {str(e)}")
+    
+    return historical_data
+
+
 class Trade:
     """คลาสสำหรับเก็บข้อมูลการซื้อขาย"""
     
+    __slots__ = ('symbol', 'action', 'price', 'quantity', 'date', 'reason',
+                 'profit_loss', 'profit_loss_pct')
+    
     def __init__(self, symbol, action, price, quantity, date, reason=""):
         self.symbol = symbol
         self.action = action  # 'BUY' หรือ 'SELL'
@@ -33,11 +85,16 @@ class Trade:
 class Position:
     """คลาสสำหรับเก็บข้อมูล Position ที่ถือครอง"""
     
-    def __init__(self, symbol, entry_price, quantity, entry_date):
+    __slots__ = ('symbol', 'entry_price', 'quantity', 'entry_date', 'stop_loss', 'take_profit',
+                 'exit_price', 'exit_date', 'profit_loss', 'profit_loss_pct', 'holding_days')
+    
+    def __init__(self, symbol, entry_price, quantity, entry_date, stop_loss=None, take_profit=None):
         self.symbol = symbol
         self.entry_price = entry_price
         self.quantity = quantity
         self.entry_date = entry_date
+        self.stop_loss = stop_loss      # กำหนดตอนเข้าซื้อ (คงที่ตลอดการถือครอง)
+        self.take_profit = take_profit
         self.exit_price = None
         self.exit_date = None
         self.profit_loss = 0
@@ -75,7 +132,12 @@ class Backtester:
                  initial_capital=10000,
                  commission=0.001,  # 0.1%
                  slippage=0.0005,   # 0.05%
-                 position_size_pct=0.2):  # ใช้ 20% ของเงินต่อ trade
+                 position_size_pct=0.2,  # ใช้ 20% ของเงินต่อ trade
+                 keep_trade_objects=True,
+                 calendar=None,
+                 execution=None,
+                 events=None,
+                 stream=None):
         """
         Initialize Backtester
         
@@ -84,16 +146,33 @@ class Backtester:
             commission: ค่า commission (0.001 = 0.1%)
             slippage: ค่า slippage (0.0005 = 0.05%)
             position_size_pct: เปอร์เซ็นต์เงินทุนต่อ trade (0.2 = 20%)
+            keep_trade_objects: เก็บ Trade/Position objects ใน trades/closed_positions
+                                (False = บันทึกเฉพาะใน trade_log เพื่อประหยัดหน่วยความจำ)
+                                default True เพราะ trades/closed_positions เป็น API ที่ผู้ใช้เดิมอ่านโดยตรง
+                                งานขนาดใหญ่หรือใช้ stream ควรส่ง False
+            calendar: TradingCalendar สำหรับกำหนดวันทำการ (default NYSE)
+            execution: IntrabarExecution สำหรับ Stop Loss / Take Profit (default 3% / 5%)
+            events: EventRecorder สำหรับเหตุการณ์รายเทรด
+                    (EventRecorder(quiet=True) = นับจำนวนแทนการ log ทุกเทรด)
+            stream: BacktestStream (optional) เขียน equity/trades ลงดิสก์ทีละก้อนระหว่างรัน
+                    และคำนวณ metrics แบบ out-of-core (ควรใช้คู่กับ keep_trade_objects=False)
         """
         self.initial_capital = initial_capital
         self.capital = initial_capital
         self.commission = commission
         self.slippage = slippage
         self.position_size_pct = position_size_pct
+        self.keep_trade_objects = keep_trade_objects
+        self.calendar = calendar or TradingCalendar()
+        self.execution = execution or IntrabarExecution()
+        self.events = events or EventRecorder(logger)
+        self.stream = stream
         
         # Trade tracking
+        self.trade_log = TradeLog()
         self.trades: List[Trade] = []
         self.positions: Dict[str, Position] = {}  # Open positions
+        self.pending_exits = {}  # {symbol: (bar, price, reason)} จุดแตะ SL/TP แรกที่คำนวณไว้
         self.closed_positions: List[Position] = []
         
         # Portfolio tracking
@@ -105,12 +184,15 @@ class Backtester:
     def reset(self):
         """รีเซ็ตสถานะทั้งหมด"""
         self.capital = self.initial_capital
+        self.trade_log = TradeLog()  # ผลของรอบก่อน (results['trade_log']) ยังอ้างถึง log เดิม
         self.trades = []
         self.positions = {}
+        self.pending_exits = {}
         self.closed_positions = []
         self.portfolio_values = []
         self.equity_curve = pd.DataFrame()
-        logger.info("Backtester reset")
+        self.events.reset()
+        logger.debug("Backtester reset")
     
     def calculate_position_size(self, price):
         """
@@ -159,17 +241,20 @@ class Backtester:
                 self.capital -= (total_cost + commission_fee)
                 
                 # สร้าง Position
-                position = Position(symbol, execution_price, quantity, date)
+                position = Position(symbol, execution_price, quantity, date, stop_loss, take_profit)
                 self.positions[symbol] = position
                 
                 # บันทึก Trade
-                trade = Trade(symbol, action, execution_price, quantity, date, reason)
-                self.trades.append(trade)
+                self.trade_log.append(date, symbol, action, execution_price, quantity, reason=reason)
+                if self.keep_trade_objects:
+                    self.trades.append(Trade(symbol, action, execution_price, quantity, date, reason))
                 
-                logger.info(f"BUY {quantity} {symbol} @ ${execution_price:.2f} (Commission: ${commission_fee:.2f})")
+                self.events.record('buy', "BUY %s %s @ $%.2f (Commission: $%.2f)",
+                                   quantity, symbol, execution_price, commission_fee)
                 return True
             else:
-                logger.warning(f"Insufficient capital for BUY {symbol}")
+                self.events.record('insufficient_capital', "Insufficient capital for BUY %s", symbol,
+                                   level=logging.WARNING)
                 return False
         
         elif action == 'SELL':
@@ -185,33 +270,46 @@ class Backtester:
                 
                 # ปิด Position
                 position.close(execution_price, date)
-                self.closed_positions.append(position)
                 del self.positions[symbol]
+                self.pending_exits.pop(symbol, None)
                 
                 # บันทึก Trade
-                trade = Trade(symbol, action, execution_price, quantity, date, reason)
-                trade.profit_loss = position.profit_loss
-                trade.profit_loss_pct = position.profit_loss_pct
-                self.trades.append(trade)
+                self.trade_log.append(date, symbol, action, execution_price, quantity,
+                                      position.profit_loss, position.profit_loss_pct, reason)
+                if self.keep_trade_objects:
+                    self.closed_positions.append(position)
+                    trade = Trade(symbol, action, execution_price, quantity, date, reason)
+                    trade.profit_loss = position.profit_loss
+                    trade.profit_loss_pct = position.profit_loss_pct
+                    self.trades.append(trade)
                 
-                logger.info(f"SELL {quantity} {symbol} @ ${execution_price:.2f} (P/L: {position.profit_loss_pct:+.2f}%)")
+                self.events.record('sell', "SELL %s %s @ $%.2f (P/L: %+.2f%%)",
+                                   quantity, symbol, execution_price, position.profit_loss_pct)
                 return True
             else:
-                logger.warning(f"No position to SELL for {symbol}")
+                self.events.record('no_position', "No position to SELL for %s", symbol,
+                                   level=logging.WARNING)
                 return False
         
         return False
     
-    def check_stop_loss_take_profit(self, symbol, current_price, date, stop_loss=None, take_profit=None):
+    def check_stop_loss_take_profit(self, symbol, current_price, date, stop_loss=None, take_profit=None,
+                                    high=None, low=None, open_price=None):
         """
         ตรวจสอบ Stop Loss และ Take Profit
         
+        ถ้าระบุ high/low/open_price จะตรวจกับช่วงราคาของแท่ง (ดู execution.resolve_bars)
+        ไม่เช่นนั้นตรวจกับราคาปัจจุบันเท่านั้น
+        
         Args:
             symbol: รหัสหุ้น
             current_price: ราคาปัจจุบัน
             date: วันที่
-            stop_loss: ราคา Stop Loss
-            take_profit: ราคา Take Profit
+            stop_loss: ราคา Stop Loss (default = ระดับที่กำหนดตอนเข้าซื้อ)
+            take_profit: ราคา Take Profit (default = ระดับที่กำหนดตอนเข้าซื้อ)
+            high: ราคาสูงสุดของแท่ง
+            low: ราคาต่ำสุดของแท่ง
+            open_price: ราคาเปิดของแท่ง
             
         Returns:
             bool: ถูก trigger หรือไม่
@@ -220,20 +318,23 @@ class Backtester:
             return False
         
         position = self.positions[symbol]
+        stop_loss = position.stop_loss if stop_loss is None else stop_loss
+        take_profit = position.take_profit if take_profit is None else take_profit
+        
+        reason, price = self.execution.check_bars(
+            current_price if open_price is None else open_price,
+            current_price if high is None else high,
+            current_price if low is None else low,
+            np.nan if not stop_loss else stop_loss,
+            np.nan if not take_profit else take_profit,
+        )
+        if reason == EXIT_NONE:
+            return False
         
-        # Check Stop Loss
-        if stop_loss and current_price <= stop_loss:
-            logger.info(f"Stop Loss triggered for {symbol}")
-            self.execute_trade(symbol, 'SELL', current_price, date, "Stop Loss")
-            return True
-        
-        # Check Take Profit
-        if take_profit and current_price >= take_profit:
-            logger.info(f"Take Profit triggered for {symbol}")
-            self.execute_trade(symbol, 'SELL', current_price, date, "Take Profit")
-            return True
-        
-        return False
+        exit_reason = EXIT_REASONS[int(reason)]
+        self.events.record(self._event_name(exit_reason), "%s triggered for %s", exit_reason, symbol)
+        self.execute_trade(symbol, 'SELL', float(price), date, exit_reason)
+        return True
     
     def update_portfolio_value(self, date, current_prices):
         """
@@ -250,20 +351,31 @@ class Backtester:
                 positions_value += current_prices[symbol] * position.quantity
         
         total_value = self.capital + positions_value
-        self.portfolio_values.append((date, total_value))
+        if self.stream is not None:
+            self.stream.append_equity(date, total_value)
+            if len(self.trade_log) >= self.stream.chunk_size:
+                self.stream.spill_trades(self.trade_log)
+        else:
+            self.portfolio_values.append((date, total_value))
     
     def run_backtest(self, analyzer_app, symbols, start_date, end_date, 
-                     strategy='technical', min_confidence=0.6):
+                     strategy='technical', min_confidence=0.6, historical_data=None,
+                     cache=None, checkpoint=None, progress=None):
         """
         รัน Backtest ด้วยข้อมูลย้อนหลังจริง
         
         Args:
-            analyzer_app: StockAnalyzerApp instance
+            analyzer_app: StockAnalyzerApp instance (ใช้ ai_signal_generator เมื่อ strategy เป็น 'ai'/'combined')
             symbols: รายการหุ้นที่จะทดสอบ
             start_date: วันเริ่มต้น (YYYY-MM-DD)
             end_date: วันสิ้นสุด (YYYY-MM-DD)
             strategy: กลยุทธ์ ('technical', 'ai', 'combined')
             min_confidence: ความมั่นใจขั้นต่ำสำหรับสัญญาณ
+            historical_data: dict {symbol: DataFrame} ที่โหลดไว้แล้ว (ถ้าไม่ระบุจะดึงใหม่)
+            cache: BacktestCache (optional) ใช้ผลลัพธ์/indicators ที่เคยคำนวณไว้
+            checkpoint: BacktestCheckpoint (optional) บันทึกสถานะเป็นระยะและรันต่อจากจุดล่าสุด
+            progress: callback (optional) progress(วันที่จำลองแล้ว, จำนวนวันทั้งหมด, วันที่ปัจจุบัน)
+                      ถูกเรียกหลังจำลองแต่ละวัน
             
         Returns:
             dict: ผลลัพธ์การทดสอบ
@@ -271,97 +383,122 @@ class Backtester:
         logger.info(f"Starting backtest from {start_date} to {end_date}")
         self.reset()
         
+        if strategy not in ('technical', 'ai', 'combined'):
+            raise ValueError(f"Unknown strategy: {strategy}. Use 'technical', 'ai' or 'combined'")
+        ai_generator = None
+        if strategy != 'technical':
+            ai_generator = getattr(analyzer_app, 'ai_signal_generator', None)
+            if ai_generator is None or not ai_generator.trained:
+                raise ValueError(f"Strategy '{strategy}' requires a trained analyzer_app.ai_signal_generator")
+        
         # แปลง string เป็น datetime
         start_dt = pd.to_datetime(start_date)
         end_dt = pd.to_datetime(end_date)
         
         # ดึงข้อมูลย้อนหลังของแต่ละหุ้น
-        from src.data.fetcher import StockDataFetcher
-        fetcher = StockDataFetcher()
-        
-        historical_data = {}
-        for symbol in symbols:
-            try:
-                # ดึงข้อมูลย้อนหลังพอสำหรับคำนวณ indicators
-                days_diff = (end_dt - start_dt).days
-                period = 'max' if days_diff > 365 else f'{days_diff + 200}d'
-                
-                data = fetcher.fetch_historical_data(symbol, period=period)
-                if data is not None and not data.empty:
-                    # แปลง timezone-aware index เป็น timezone-naive
-                    try:
-                        data.index = pd.to_datetime(data.index).tz_localize(None)
-                    except:
-                        pass  # ถ้าไม่มี timezone ก็ข้าม
-                    
-                    # กรองเฉพาะช่วงที่ต้องการ + ข้อมูลย้อนหลัง 200 วันเพื่อคำนวณ indicators
-                    lookback_start = start_dt - pd.Timedelta(days=200)
-                    data_filtered = data[data.index >= lookback_start]
-                    historical_data[symbol] = data_filtered
-                    logger.info(f"Loaded {len(data_filtered)} days of data for {symbol}")
-            except Exception as e:
-                logger.error(f"Error fetching {symbol}: {str(e)}")
+        if historical_data is None:
+            historical_data = load_historical_data(symbols, start_dt, end_dt)
         
         if not historical_data:
             logger.error("No historical data available")
             return self.get_results()
         
-        # สร้าง date range เฉพาะวันที่มีการซื้อขาย (business days)
-        date_range = pd.bdate_range(start=start_dt, end=end_dt)
+        # key ของการรันนี้ (พารามิเตอร์ + ข้อมูลราคา + model ของ AI) สำหรับแคชและ checkpoint
+        run_key = None
+        if cache is not None or checkpoint is not None:
+            model_fingerprint = self.model_fingerprint(ai_generator)
+            cache_params = self._cache_params(symbols, start_dt, end_dt, strategy, min_confidence,
+                                              model_fingerprint)
+            run_key = self.run_key(symbols, start_dt, end_dt, strategy, min_confidence, historical_data,
+                                   model_fingerprint)
+        
+        # ใช้ผลลัพธ์จากแคชถ้าพารามิเตอร์และข้อมูลตรงกัน (ไม่ใช้เมื่อเขียนผลลัพธ์ลง stream)
+        use_result_cache = cache is not None and self.stream is None
+        if use_result_cache:
+            cached = cache.get(run_key)
+            if cached:
+                self._restore_results(cached)
+                return cached
+        
+        # คำนวณ indicators และสัญญาณทุกแท่งครั้งเดียวต่อหุ้น
+        panels = self.prepare_signal_panels(historical_data, cache)
+        if ai_generator is not None:
+            self.apply_ai_signals(panels, ai_generator, combine=(strategy == 'combined'))
+        
+        # วันทำการของตลาด (ไม่รวมวันหยุด) และตำแหน่งแท่งของแต่ละหุ้น ณ แต่ละวัน
+        sessions = self.calendar.sessions(start_dt, end_dt)
+        for panel in panels.values():
+            panel['positions'] = self.calendar.session_positions(sessions, panel['index'])
+        
+        from src.signals.generator import SignalGenerator
+        signal_gen = SignalGenerator()
+        
+        # รันต่อจาก checkpoint ล่าสุด (ไม่จำลองวันที่ทำไปแล้วซ้ำ)
+        start_index = 0
+        current_prices = {}
+        if checkpoint is not None:
+            state = checkpoint.load(run_key)
+            if state is not None:
+                self.set_state(state)
+                start_index = state['next_index']
+                current_prices = state['current_prices']
+        if self.stream is not None and start_index == 0:
+            self.stream.reset()
         
         # วนลูปผ่านแต่ละวัน
-        for current_date in date_range:
+        for t in range(start_index, len(sessions)):
+            current_date = sessions[t]
             current_prices = {}
             
             # ตรวจสอบแต่ละหุ้น
             for symbol in symbols:
-                if symbol not in historical_data:
+                if symbol not in panels:
                     continue
                 
-                data = historical_data[symbol]
+                panel = panels[symbol]
                 
-                # หาข้อมูลณ current_date (ใช้ข้อมูลถึงวันนั้น)
-                data_up_to_date = data[data.index <= current_date]
+                # ตำแหน่งแท่งล่าสุด ณ current_date
+                i = panel['positions'][t]
                 
-                if len(data_up_to_date) < 50:  # ต้องมีข้อมูลพอสำหรับ indicators
+                if i + 1 < 50:  # ต้องมีข้อมูลพอสำหรับ indicators
                     continue
                 
                 # ใช้ข้อมูลล่าสุด (ณ current_date)
-                current_price = data_up_to_date['Close'].iloc[-1]
+                current_price = panel['close'][i]
                 current_prices[symbol] = current_price
                 
-                # คำนวณ indicators ณ current_date
-                from src.analysis.technical import TechnicalAnalyzer
-                analyzer = TechnicalAnalyzer()
-                technical_summary = analyzer.get_technical_summary(data_up_to_date)
-                
-                # คำนวณสัญญาณ
-                from src.signals.generator import SignalGenerator
-                signal_gen = SignalGenerator()
-                signals = signal_gen.generate_signals_from_indicators(technical_summary)
-                entry_exit = signal_gen.generate_entry_exit_points(data_up_to_date)
+                # ออกจาก position ที่แตะ Stop Loss / Take Profit ระหว่างวัน (ก่อนสัญญาณ ณ ราคาปิด)
+                pending = self.pending_exits.get(symbol)
+                if pending is not None and pending[0] <= i:
+                    _, exit_price, exit_reason = pending
+                    self.events.record(self._event_name(exit_reason), "%s triggered for %s",
+                                       exit_reason, symbol)
+                    self.execute_trade(symbol, 'SELL', exit_price, current_date, exit_reason)
                 
-                # ตรวจสอบ Stop Loss / Take Profit สำหรับ positions ที่เปิดอยู่
-                if symbol in self.positions:
-                    stop_loss = entry_exit.get('stop_loss')
-                    take_profit = entry_exit.get('target_price')
-                    self.check_stop_loss_take_profit(symbol, current_price, current_date, 
-                                                     stop_loss, take_profit)
+                confident = panel['confidence'][i] >= min_confidence
                 
                 # ตรวจสอบสัญญาณซื้อ
-                if signals.get('buy') == 1 and signals.get('confidence', 0) >= min_confidence:
+                if panel['buy'][i] and confident:
                     if symbol not in self.positions:  # ยังไม่มี position
-                        reason = ", ".join(signals.get('reasons', []))[:100]  # จำกัดความยาว
-                        self.execute_trade(symbol, 'BUY', current_price, current_date, reason)
+                        reason = self._signal_reason(signal_gen, panel, i, strategy)
+                        stop_loss, take_profit = self.execution.levels(current_price)
+                        if self.execute_trade(symbol, 'BUY', current_price, current_date, reason,
+                                              float(stop_loss), float(take_profit)):
+                            self._schedule_exit(symbol, panel, i)
                 
                 # ตรวจสอบสัญญาณขาย
-                elif signals.get('sell') == 1 and signals.get('confidence', 0) >= min_confidence:
+                elif panel['sell'][i] and confident:
                     if symbol in self.positions:  # มี position อยู่
-                        reason = ", ".join(signals.get('reasons', []))[:100]
+                        reason = self._signal_reason(signal_gen, panel, i, strategy)
                         self.execute_trade(symbol, 'SELL', current_price, current_date, reason)
             
             # อัปเดตมูลค่า portfolio
             self.update_portfolio_value(current_date, current_prices)
+            
+            if checkpoint is not None and checkpoint.should_save(t + 1):
+                checkpoint.save(run_key, self.get_state(t + 1, current_prices))
+            if progress is not None:
+                progress(t + 1, len(sessions), current_date)
         
         # ปิด positions ที่เหลือ (ณ วันสุดท้าย)
         for symbol in list(self.positions.keys()):
@@ -370,8 +507,223 @@ class Backtester:
                                  "End of backtest")
         
         logger.info(f"Backtest completed. Final capital: ${self.capital:,.2f}")
+        self.events.log_summary()
+        
+        results = self.get_results()
+        if use_result_cache and results:
+            cache.put(run_key, results, cache_params)
+        if checkpoint is not None:
+            checkpoint.clear(run_key)
+        
+        return results
+    
+    @staticmethod
+    def prepare_signal_panels(historical_data, cache=None):
+        """
+        คำนวณ indicators และสัญญาณของทุกแท่ง (ครั้งเดียวต่อหุ้น)
+        
+        Args:
+            historical_data: dict {symbol: DataFrame}
+            cache: BacktestCache (optional) สำหรับใช้ indicator panels ซ้ำ
+            
+        Returns:
+            dict: {symbol: {'frame', 'index', 'open', 'high', 'low', 'close', 'buy', 'sell', 'confidence'}}
+        """
+        from src.analysis.technical import TechnicalAnalyzer
+        from src.signals.generator import SignalGenerator
+        analyzer = TechnicalAnalyzer()
+        signal_gen = SignalGenerator()
+        
+        panels = {}
+        for symbol, data in historical_data.items():
+            if data is None or data.empty:
+                continue
+            
+            frame = cache.get_indicators(data) if cache is not None else None
+            if frame is None:
+                indicators = analyzer.get_indicator_history(data)
+                frame = indicators.join(signal_gen.generate_signals_vectorized(indicators))
+                if cache is not None:
+                    cache.put_indicators(data, frame)
+            
+            close = frame['latest_price'].to_numpy(dtype=float)
+            
+            def _bar_column(column):
+                if column not in data.columns:
+                    return close
+                return data[column].reindex(frame.index).to_numpy(dtype=float)
+            
+            panels[symbol] = {
+                'frame': frame,
+                'index': pd.DatetimeIndex(frame.index).to_numpy(dtype='datetime64[ns]'),
+                'open': _bar_column('Open'),
+                'high': _bar_column('High'),
+                'low': _bar_column('Low'),
+                'close': close,
+                'buy': frame['buy'].to_numpy() == 1,
+                'sell': frame['sell'].to_numpy() == 1,
+                'confidence': frame['confidence'].to_numpy(dtype=float),
+            }
+        
+        return panels
+    
+    @staticmethod
+    def apply_ai_signals(panels, ai_generator, combine=False):
+        """
+        แทนสัญญาณใน panels ด้วยสัญญาณจาก AI (ทำนายทุกแท่งทุกหุ้นด้วยการเรียก model ครั้งเดียว)
+        
+        Args:
+            panels: dict จาก prepare_signal_panels (แก้ไขในที่)
+            ai_generator: AISignalGenerator ที่ฝึกแล้ว
+            combine: True = ใช้เฉพาะสัญญาณที่ technical และ AI ตรงกัน
+        """
+        predictions = ai_generator.predict_signals_panel({symbol: panel['frame'] for symbol, panel in panels.items()})
+        for symbol, panel in panels.items():
+            signals = predictions[symbol]
+            if combine:
+                signals = ai_generator.combine_signals(panel['frame'], signals)
+            panel['buy'] = signals['buy'].to_numpy() == 1
+            panel['sell'] = signals['sell'].to_numpy() == 1
+            panel['confidence'] = signals['confidence'].to_numpy(dtype=float)
+    
+    def _schedule_exit(self, symbol, panel, i):
+        """หาแท่งแรกหลังวันเข้าซื้อที่แตะ Stop Loss / Take Profit (ครั้งเดียวต่อ position)"""
+        position = self.positions[symbol]
+        start = i + 1
+        bar, exit_price, code = self.execution.find_exit(
+            panel['open'][start:], panel['high'][start:], panel['low'][start:],
+            np.nan if position.stop_loss is None else position.stop_loss,
+            np.nan if position.take_profit is None else position.take_profit,
+        )
+        if bar >= 0:
+            self.pending_exits[symbol] = (start + bar, exit_price, EXIT_REASONS[code])
+    
+    @staticmethod
+    def _event_name(reason):
+        """ชื่อประเภทเหตุการณ์จากเหตุผลการออก (เช่น 'Stop Loss' → 'stop_loss')"""
+        return reason.lower().replace(' ', '_')
+    
+    @staticmethod
+    def _signal_reason(signal_gen, panel, i, strategy='technical'):
+        """สร้างข้อความเหตุผลของสัญญาณ ณ แท่งที่ i (เฉพาะวันที่มีการเทรด)"""
+        if strategy == 'ai':
+            return f"AI signal ({panel['confidence'][i]:.0%})"
+        signals = signal_gen.generate_signals_from_indicators(panel['frame'].iloc[i].to_dict())
+        if strategy == 'combined':
+            return f"AI + {', '.join(signals.get('reasons', []))}"[:100]
+        return ", ".join(signals.get('reasons', []))[:100]  # จำกัดความยาว
+    
+    @staticmethod
+    def model_fingerprint(ai_generator):
+        """
+        hash ของ model ที่ใช้สร้างสัญญาณ AI (None สำหรับกลยุทธ์ technical)
+        
+        Args:
+            ai_generator: AISignalGenerator หรือ None
+        
+        Returns:
+            str หรือ None
+        """
+        if ai_generator is None:
+            return None
+        from src.ai.registry import fingerprint_model
+        return fingerprint_model(ai_generator)
+    
+    def _cache_params(self, symbols, start_dt, end_dt, strategy, min_confidence, model_fingerprint=None):
+        """พารามิเตอร์ทั้งหมดที่มีผลต่อผลลัพธ์ (ใช้สร้าง cache key)"""
+        # keep_trade_objects กำหนดว่าผลลัพธ์มี trades/closed_positions หรือไม่ จึงต้องอยู่ใน key ด้วย
+        params = {
+            'symbols': list(symbols),
+            'start_date': start_dt,
+            'end_date': end_dt,
+            'strategy': strategy,
+            'min_confidence': min_confidence,
+            'initial_capital': self.initial_capital,
+            'commission': self.commission,
+            'slippage': self.slippage,
+            'position_size_pct': self.position_size_pct,
+            'keep_trade_objects': self.keep_trade_objects,
+            **self.execution.params(),
+        }
+        if model_fingerprint is not None:
+            params['model_fingerprint'] = model_fingerprint
+        return params
+    
+    def run_key(self, symbols, start_date, end_date, strategy, min_confidence, historical_data,
+                model_fingerprint=None):
+        """
+        key ของการรัน (พารามิเตอร์ + ข้อมูลราคา + model + เวอร์ชัน engine) ที่ใช้กับ BacktestCache และ checkpoint
         
-        return self.get_results()
+        Args:
+            symbols: รายการหุ้น
+            start_date: วันเริ่มต้น
+            end_date: วันสิ้นสุด
+            strategy: กลยุทธ์
+            min_confidence: ความมั่นใจขั้นต่ำ
+            historical_data: dict {symbol: DataFrame}
+            model_fingerprint: hash ของ model สำหรับกลยุทธ์ 'ai'/'combined' (ดู model_fingerprint)
+        
+        Returns:
+            str: sha256 hex digest
+        """
+        from .cache import BacktestCache, fingerprint_price_data
+        params = self._cache_params(symbols, pd.to_datetime(start_date), pd.to_datetime(end_date),
+                                    strategy, min_confidence, model_fingerprint)
+        return BacktestCache.make_key(params, fingerprint_price_data(historical_data))
+    
+    def get_state(self, next_index=0, current_prices=None):
+        """
+        สถานะทั้งหมดของการจำลอง ณ ปัจจุบัน (สำหรับ checkpoint)
+        
+        Args:
+            next_index: ตำแหน่งวันทำการถัดไปที่ยังไม่ได้จำลอง
+            current_prices: ราคาล่าสุดของแต่ละหุ้น
+        
+        Returns:
+            dict: state ที่ใช้กับ set_state() ได้
+        """
+        return {
+            'next_index': next_index,
+            'current_prices': dict(current_prices or {}),
+            'capital': self.capital,
+            'positions': dict(self.positions),
+            'pending_exits': dict(self.pending_exits),
+            'trade_log': self.trade_log,
+            'trades': list(self.trades),
+            'closed_positions': list(self.closed_positions),
+            'portfolio_values': list(self.portfolio_values),
+            'event_counts': dict(self.events.counts),
+            'stream': self.stream.checkpoint() if self.stream is not None else None,
+        }
+    
+    def set_state(self, state):
+        """
+        คืนสถานะการจำลองจาก get_state()
+        
+        Args:
+            state: dict จาก get_state()
+        """
+        self.capital = state['capital']
+        self.positions = dict(state['positions'])
+        self.pending_exits = dict(state['pending_exits'])
+        self.trade_log = state['trade_log']
+        self.trades = list(state['trades'])
+        self.closed_positions = list(state['closed_positions'])
+        self.portfolio_values = list(state['portfolio_values'])
+        self.events.counts = dict(state.get('event_counts', {}))
+        if self.stream is not None and state.get('stream') is not None:
+            self.stream.restore(state['stream'])
+    
+    def _restore_results(self, results):
+        """คืนสถานะ Backtester จากผลลัพธ์ที่แคชไว้"""
+        self.capital = results.get('final_capital', self.initial_capital)
+        self.trade_log = results.get('trade_log', self.trade_log)
+        self.trades = list(results.get('trades', []))
+        self.closed_positions = list(results.get('closed_positions', []))
+        self.equity_curve = results.get('equity_curve', pd.DataFrame())
+        if not self.equity_curve.empty:
+            self.portfolio_values = list(zip(self.equity_curve.index,
+                                             self.equity_curve['Portfolio Value']))
     
     def get_results(self):
         """
@@ -380,6 +732,9 @@ class Backtester:
         Returns:
             dict: ผลลัพธ์ทั้งหมด
         """
+        if self.stream is not None:
+            return self._get_stream_results()
+        
         if not self.portfolio_values:
             return {}
         
@@ -394,27 +749,24 @@ class Backtester:
         final_value = self.capital
         total_return = ((final_value - self.initial_capital) / self.initial_capital) * 100
         
-        # นับ trades
-        total_trades = len([t for t in self.trades if t.action == 'BUY'])
-        winning_trades = len([p for p in self.closed_positions if p.profit_loss > 0])
-        losing_trades = len([p for p in self.closed_positions if p.profit_loss < 0])
+        # นับ trades (จาก trade log แบบ columnar)
+        actions = self.trade_log.column('action')
+        closed_pl = self.trade_log.column('profit_loss')[actions < 0]
+        wins = closed_pl[closed_pl > 0]
+        losses = closed_pl[closed_pl < 0]
+        
+        total_trades = int(np.count_nonzero(actions > 0))
+        winning_trades = int(wins.size)
+        losing_trades = int(losses.size)
         win_rate = (winning_trades / total_trades * 100) if total_trades > 0 else 0
         
         # คำนวณ Average Win/Loss
-        wins = [p.profit_loss for p in self.closed_positions if p.profit_loss > 0]
-        losses = [p.profit_loss for p in self.closed_positions if p.profit_loss < 0]
-        avg_win = np.mean(wins) if wins else 0
-        avg_loss = np.mean(losses) if losses else 0
-        
-        # คำนวณ Max Drawdown
-        peak = self.initial_capital
-        max_drawdown = 0
-        for _, value in self.portfolio_values:
-            if value > peak:
-                peak = value
-            drawdown = ((peak - value) / peak) * 100
-            if drawdown > max_drawdown:
-                max_drawdown = drawdown
+        avg_win = wins.mean() if wins.size else 0
+        avg_loss = losses.mean() if losses.size else 0
+        
+        # คำนวณ Max Drawdown (peak เริ่มจากเงินทุนเริ่มต้น)
+        drawdowns = PerformanceMetrics.analyze_drawdowns(self.equity_curve['Portfolio Value'],
+                                                         initial_value=self.initial_capital)
         
         results = {
             'initial_capital': self.initial_capital,
@@ -428,14 +780,61 @@ class Backtester:
             'avg_win': avg_win,
             'avg_loss': avg_loss,
             'profit_factor': abs(avg_win / avg_loss) if avg_loss != 0 else 0,
-            'max_drawdown': max_drawdown,
+            'max_drawdown': drawdowns['max_drawdown'],
+            'max_drawdown_duration': drawdowns['max_duration'],
+            'time_under_water': drawdowns['time_under_water'],
+            'drawdowns': drawdowns['top_drawdowns'],
             'trades': self.trades,
             'closed_positions': self.closed_positions,
+            'trade_log': self.trade_log,
             'equity_curve': self.equity_curve
         }
         
         return results
     
+    def _get_stream_results(self):
+        """
+        สรุปผลลัพธ์จาก BacktestStream ด้วยการ reduce ทีละก้อน (ไม่โหลด equity/trades ทั้งหมด)
+        
+        equity_curve ในผลลัพธ์เป็น DataFrame ว่าง; โหลดได้ด้วย stream.equity_frame()
+        """
+        self.stream.spill_trades(self.trade_log)
+        equity = PerformanceMetrics.chunked_equity_stats(self.stream.iter_equity(),
+                                                         initial_value=self.initial_capital)
+        if equity['observations'] == 0:
+            return {}
+        
+        trades = self.stream.trade_stats()
+        total_trades = trades['total_trades']
+        avg_win = trades['gross_profit'] / trades['winning_trades'] if trades['winning_trades'] else 0
+        avg_loss = trades['gross_loss'] / trades['losing_trades'] if trades['losing_trades'] else 0
+        total_return = ((self.capital - self.initial_capital) / self.initial_capital) * 100
+        
+        return {
+            'initial_capital': self.initial_capital,
+            'final_capital': self.capital,
+            'total_return': total_return,
+            'total_return_pct': total_return,
+            'total_trades': total_trades,
+            'winning_trades': trades['winning_trades'],
+            'losing_trades': trades['losing_trades'],
+            'win_rate': (trades['winning_trades'] / total_trades * 100) if total_trades > 0 else 0,
+            'avg_win': avg_win,
+            'avg_loss': avg_loss,
+            'profit_factor': abs(avg_win / avg_loss) if avg_loss != 0 else 0,
+            'max_drawdown': equity['max_drawdown'],
+            'max_drawdown_duration': equity['max_drawdown_duration'],
+            'time_under_water': equity['time_under_water'],
+            'sharpe_ratio': equity['sharpe_ratio'],
+            'sortino_ratio': equity['sortino_ratio'],
+            'volatility': equity['volatility'],
+            'trades': self.trades,
+            'closed_positions': self.closed_positions,
+            'trade_log': self.trade_log,
+            'equity_curve': pd.DataFrame(),
+            'stream_dir': self.stream.directory,
+        }
+    
     def get_trade_history(self):
         """
         ดึงประวัติการซื้อขายทั้งหมด
@@ -443,24 +842,10 @@ class Backtester:
         Returns:
             pd.DataFrame: ตาราง trade history
         """
-        if not self.trades:
-            return pd.DataFrame()
-        
-        data = []
-        for trade in self.trades:
-            data.append({
-                'Date': trade.date,
-                'Symbol': trade.symbol,
-                'Action': trade.action,
-                'Price': trade.price,
-                'Quantity': trade.quantity,
-                'Total': trade.price * trade.quantity,
-                'P/L': trade.profit_loss,
-                'P/L %': trade.profit_loss_pct,
-                'Reason': trade.reason
-            })
-        
-        return pd.DataFrame(data)
+        if self.stream is not None:
+            self.stream.spill_trades(self.trade_log)
+            return self.stream.trade_frame()
+        return self.trade_log.to_frame()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,181 @@
+"""
+Benchmark Store
+เก็บราคา benchmark (เช่น SPY, QQQ) ไว้ในเครื่อง และคำนวณ Alpha/Beta ของทุกหุ้น/ทุก backtest พร้อมกัน
+"""
+
+import os
+import logging
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from .cache import load_pickle, save_pickle
+from .metrics import PerformanceMetrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BENCHMARKS = ('SPY', 'QQQ')
+
+
+class BenchmarkStore:
+    """
+    ที่เก็บราคา benchmark ในเครื่อง
+    
+    ดึงข้อมูลทั้งหมด (period='max') ครั้งเดียวแล้วเก็บเป็นไฟล์ต่อ symbol
+    ดึงใหม่เมื่อข้อมูลเก่ากว่า max_age_hours (ถ้าดึงไม่ได้จะใช้ข้อมูลเดิม)
+    """
+    
+    def __init__(self, store_dir='data/benchmarks', symbols=DEFAULT_BENCHMARKS, fetcher=None,
+                 max_age_hours=24):
+        """
+        Initialize BenchmarkStore
+        
+        Args:
+            store_dir: โฟลเดอร์เก็บข้อมูล benchmark
+            symbols: benchmark ที่ใช้เป็นค่าเริ่มต้น
+            fetcher: StockDataFetcher (ถ้าไม่ระบุจะสร้างเมื่อต้องดึงข้อมูลครั้งแรก)
+            max_age_hours: อายุสูงสุดของข้อมูลก่อนดึงใหม่ (None = ไม่ดึงใหม่)
+        """
+        self.store_dir = store_dir
+        self.symbols = tuple(symbols)
+        self.fetcher = fetcher
+        self.max_age_hours = max_age_hours
+        self._memory = {}
+        os.makedirs(store_dir, exist_ok=True)
+    
+    def _path(self, symbol):
+        return os.path.join(self.store_dir, f'{symbol.upper()}.pkl')
+    
+    def _is_stale(self, entry):
+        if self.max_age_hours is None:
+            return False
+        return datetime.now() - entry['fetched_at'] > timedelta(hours=self.max_age_hours)
+    
+    def put(self, symbol, data):
+        """
+        บันทึกราคา benchmark ลง store (ใช้ได้ทั้งจากการดึงข้อมูลและการเติมข้อมูลแบบ offline)
+        
+        Args:
+            symbol: ชื่อ benchmark
+            data: DataFrame ที่มีคอลัมน์ Close หรือ Series ราคาปิด
+        """
+        close = data['Close'] if isinstance(data, pd.DataFrame) else data
+        close = close.astype(float).rename(symbol.upper())
+        index = pd.to_datetime(close.index)
+        close.index = index.tz_localize(None) if index.tz is not None else index
+        close = close[~close.index.duplicated(keep='last')].sort_index()
+        
+        entry = {'close': close, 'fetched_at': datetime.now()}
+        self._memory[symbol.upper()] = entry
+        save_pickle(self._path(symbol), entry)
+    
+    def _fetch(self, symbol):
+        if self.fetcher is None:
+            from src.data.fetcher import StockDataFetcher
+            self.fetcher = StockDataFetcher()
+        
+        data = self.fetcher.fetch_historical_data(symbol, period='max')
+        if data is None or data.empty:
+            return False
+        self.put(symbol, data)
+        logger.info(f"Stored {len(data)} days of benchmark data for {symbol}")
+        return True
+    
+    def get_prices(self, symbol, start=None, end=None, refresh=False):
+        """
+        ดึงราคาปิดของ benchmark จาก store (ดึงจากแหล่งข้อมูลเมื่อยังไม่มีหรือข้อมูลเก่า)
+        
+        Args:
+            symbol: ชื่อ benchmark
+            start: วันเริ่มต้น (optional)
+            end: วันสิ้นสุด (optional)
+            refresh: บังคับดึงข้อมูลใหม่
+        
+        Returns:
+            pd.Series: ราคาปิด (index = วันที่) หรือ None ถ้าไม่มีข้อมูล
+        """
+        symbol = symbol.upper()
+        entry = self._memory.get(symbol) or load_pickle(self._path(symbol))
+        
+        if entry is None or refresh or self._is_stale(entry):
+            if self._fetch(symbol):
+                entry = self._memory[symbol]
+            elif entry is not None:
+                logger.warning(f"Using stored {symbol} data from {entry['fetched_at']:%Y-%m-%d %H:%M}")
+        
+        if entry is None:
+            logger.error(f"No benchmark data available for {symbol}")
+            return None
+        
+        self._memory[symbol] = entry
+        return entry['close'].loc[start:end]
+    
+    def get_returns(self, symbol, start=None, end=None, index=None):
+        """
+        ดึง returns รายวันของ benchmark
+        
+        Args:
+            symbol: ชื่อ benchmark
+            start: วันเริ่มต้น (optional)
+            end: วันสิ้นสุด (optional)
+            index: จัดแนว returns ตาม index นี้ (optional)
+        
+        Returns:
+            pd.Series: returns หรือ None ถ้าไม่มีข้อมูล
+        """
+        prices = self.get_prices(symbol, start, end)
+        if prices is None:
+            return None
+        if index is not None:
+            prices = prices.reindex(pd.DatetimeIndex(index))
+        return prices.pct_change(fill_method=None)
+    
+    def relative_metrics(self, curves, benchmarks=None):
+        """
+        คำนวณ Alpha, Beta, Tracking Error และ Information Ratio ของทุกหุ้น/ทุก backtest
+        เทียบกับ benchmark แต่ละตัว (หนึ่งการคำนวณแบบ vectorized ต่อ benchmark)
+        
+        Args:
+            curves: DataFrame ราคา/มูลค่า portfolio (คอลัมน์ = หุ้นหรือ backtests)
+                    หรือ dict {name: Series, DataFrame ที่มี 'Close'/'Portfolio Value',
+                    หรือ dict ผลลัพธ์จาก get_results()}
+            benchmarks: รายชื่อ benchmark (default = self.symbols)
+        
+        Returns:
+            pd.DataFrame: หนึ่งแถวต่อ (benchmark, name) พร้อม RELATIVE_COLUMNS
+        """
+        if isinstance(curves, dict):
+            curves = pd.concat({name: self._level_series(curve) for name, curve in curves.items()}, axis=1)
+        else:
+            curves = curves.set_axis(self._naive_index(curves.index), axis=0)
+        curves = curves.sort_index()
+        returns = pd.DataFrame(PerformanceMetrics.batch_returns(curves), index=curves.index,
+                               columns=curves.columns)
+        
+        tables = {}
+        for symbol in benchmarks or self.symbols:
+            benchmark_returns = self.get_returns(symbol, curves.index[0], curves.index[-1], index=curves.index)
+            if benchmark_returns is None:
+                continue
+            tables[symbol.upper()] = PerformanceMetrics.batch_relative_metrics(returns, benchmark_returns)
+        
+        if not tables:
+            return pd.DataFrame()
+        return pd.concat(tables, names=['benchmark', 'name'])
+    
+    @staticmethod
+    def _naive_index(index):
+        """DatetimeIndex ที่ไม่มี timezone (ตรงกับ index ของราคา benchmark ที่เก็บไว้)"""
+        index = pd.to_datetime(index)
+        return index.tz_localize(None) if index.tz is not None else index
+    
+    @staticmethod
+    def _level_series(curve):
+        """ดึง Series ราคา/มูลค่าจาก DataFrame ราคาหุ้น, equity curve หรือผลลัพธ์ของ Backtester"""
+        if isinstance(curve, dict):
+            curve = curve['equity_curve']
+        if isinstance(curve, pd.DataFrame):
+            column = 'Portfolio Value' if 'Portfolio Value' in curve.columns else 'Close'
+            curve = curve[column]
+        return pd.Series(np.asarray(curve, dtype=float), index=BenchmarkStore._naive_index(curve.index))
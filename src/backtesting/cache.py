@@ -0,0 +1,303 @@
+"""
+Backtest Result Cache
+แคชผลลัพธ์ Backtest แบบ content-addressed (พารามิเตอร์ + ข้อมูลราคา + เวอร์ชัน engine)
+"""
+
+import os
+import hmac
+import json
+import pickle
+import hashlib
+import logging
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# เปลี่ยนเมื่อ logic การจำลองเปลี่ยน เพื่อไม่ให้ใช้ผลลัพธ์เก่า
+ENGINE_VERSION = '1.3'
+
+# เปลี่ยนเมื่อสูตร indicators หรือกฎสัญญาณเปลี่ยน
+INDICATOR_VERSION = '1.0'
+
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# secret สำหรับลงลายมือชื่อผลลัพธ์ที่เก็บใน MongoDB (ไม่ตั้ง = ไม่แชร์ผลลัพธ์ผ่าน MongoDB)
+CACHE_SECRET_ENV = 'BACKTEST_CACHE_SECRET'
+
+
+def fingerprint_dataframe(data):
+    """
+    คำนวณ hash ของ DataFrame ราคา (index + OHLCV)
+    
+    Args:
+        data: DataFrame ของราคาหุ้น
+    
+    Returns:
+        str: sha256 hex digest
+    """
+    digest = hashlib.sha256()
+    if data is None or data.empty:
+        return digest.hexdigest()
+    
+    digest.update(pd.DatetimeIndex(data.index).to_numpy(dtype='datetime64[ns]').tobytes())
+    columns = [column for column in PRICE_COLUMNS if column in data.columns]
+    digest.update(','.join(columns).encode())
+    digest.update(np.ascontiguousarray(data[columns].to_numpy(dtype=np.float64)).tobytes())
+    return digest.hexdigest()
+
+
+def fingerprint_price_data(historical_data):
+    """
+    คำนวณ hash ของข้อมูลราคาทุกหุ้น
+    
+    Args:
+        historical_data: dict {symbol: DataFrame}
+    
+    Returns:
+        str: sha256 hex digest
+    """
+    digest = hashlib.sha256()
+    for symbol in sorted(historical_data):
+        digest.update(symbol.encode())
+        digest.update(fingerprint_dataframe(historical_data[symbol]).encode())
+    return digest.hexdigest()
+
+
+def load_pickle(path):
+    """
+    โหลด pickle จากไฟล์
+    
+    Args:
+        path: ไฟล์ pickle
+    
+    Returns:
+        object: ค่าที่บันทึกไว้ หรือ None ถ้าไม่มีไฟล์/อ่านไม่ได้
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    except Exception as e:
+        logger.warning(f"Error reading cache file {path}: {str(e)}")
+        return None
+
+
+def save_pickle(path, value):
+    """
+    บันทึก pickle แบบ atomic (เขียนไฟล์ชั่วคราวก่อนแล้วค่อย rename เพื่อไม่ให้ได้ไฟล์ที่เขียนไม่เสร็จ)
+    
+    Args:
+        path: ไฟล์ปลายทาง
+        value: ค่าที่จะบันทึก
+    
+    Returns:
+        bool: สำเร็จหรือไม่
+    """
+    temp_path = f'{path}.{os.getpid()}.{datetime.now().strftime("%H%M%S%f")}.tmp'
+    try:
+        with open(temp_path, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+        return True
+    except Exception as e:
+        logger.warning(f"Error writing cache file {path}: {str(e)}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return False
+
+
+def normalize_params(params):
+    """
+    ทำให้พารามิเตอร์อยู่ในรูปแบบมาตรฐาน (ตัวพิมพ์ของหุ้น, รูปแบบวันที่, ทศนิยม)
+    
+    ลำดับหุ้นคงตามที่ผู้เรียกส่งมา เพราะ Backtester ส่งคำสั่งซื้อตามลำดับนี้
+    (หุ้นที่มาก่อนได้เงินก่อน) ลำดับต่างกันจึงให้ผลต่างกันได้
+    
+    Args:
+        params: dict ของพารามิเตอร์ backtest
+    
+    Returns:
+        dict: พารามิเตอร์ที่ normalize แล้ว
+    """
+    normalized = {}
+    for name, value in params.items():
+        if name == 'symbols':
+            value = [str(symbol).upper() for symbol in value]
+        elif name in ('start_date', 'end_date'):
+            value = pd.to_datetime(value).strftime('%Y-%m-%d')
+        elif isinstance(value, (float, np.floating)):
+            value = round(float(value), 10)
+        elif isinstance(value, np.integer):
+            value = int(value)
+        normalized[name] = value
+    return normalized
+
+
+class BacktestCache:
+    """
+    แคชผลลัพธ์ Backtest และ Indicator panels
+    
+    - ผลลัพธ์: key = hash(พารามิเตอร์ที่ normalize + hash ข้อมูลราคา + ENGINE_VERSION)
+    - Indicator panels: key = hash(ข้อมูลราคาของหุ้น + INDICATOR_VERSION)
+      ใช้ซ้ำได้แม้พารามิเตอร์อื่น (เช่น min_confidence, commission) เปลี่ยน
+    - ผลลัพธ์ใน MongoDB เป็น pickle ที่ลงลายมือชื่อด้วย HMAC-SHA256 (secret) และตรวจก่อน unpickle
+      ข้อมูลที่ไม่มีลายมือชื่อหรือลายมือชื่อไม่ตรงจะไม่ถูกโหลด
+    """
+    
+    def __init__(self, cache_dir='data/backtest_cache', mongodb_manager=None, secret=None):
+        """
+        Initialize BacktestCache
+        
+        Args:
+            cache_dir: โฟลเดอร์เก็บแคชในเครื่อง
+            mongodb_manager: MongoDBManager (optional) สำหรับเก็บผลลัพธ์ใน collection backtests
+            secret: secret สำหรับลงลายมือชื่อผลลัพธ์ใน MongoDB (default ตัวแปร BACKTEST_CACHE_SECRET)
+                    ไม่มี secret = บันทึกเฉพาะ summary และไม่อ่านผลลัพธ์จาก MongoDB
+        """
+        self.cache_dir = cache_dir
+        self.results_dir = os.path.join(cache_dir, 'results')
+        self.indicators_dir = os.path.join(cache_dir, 'indicators')
+        self.mongodb_manager = mongodb_manager
+        secret = secret if secret is not None else os.getenv(CACHE_SECRET_ENV)
+        self.secret = secret.encode() if isinstance(secret, str) else secret
+        if mongodb_manager is not None and not self.secret:
+            logger.warning(f"{CACHE_SECRET_ENV} is not set: backtest results will not be shared via MongoDB")
+        os.makedirs(self.results_dir, exist_ok=True)
+        os.makedirs(self.indicators_dir, exist_ok=True)
+    
+    @staticmethod
+    def make_key(params, data_fingerprint):
+        """
+        สร้าง cache key จากพารามิเตอร์และ fingerprint ของข้อมูล
+        
+        Args:
+            params: dict ของพารามิเตอร์ backtest
+            data_fingerprint: ผลลัพธ์จาก fingerprint_price_data()
+        
+        Returns:
+            str: cache key (sha256 hex)
+        """
+        payload = json.dumps({
+            'params': normalize_params(params),
+            'data': data_fingerprint,
+            'engine_version': ENGINE_VERSION,
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+    
+    def sign(self, key, payload):
+        """
+        ลายมือชื่อ HMAC-SHA256 ของ payload (ผูกกับ cache key เพื่อไม่ให้นำ payload ไปใช้กับ key อื่น)
+        
+        Args:
+            key: cache key
+            payload: bytes ของผลลัพธ์
+        
+        Returns:
+            str: hex digest
+        """
+        return hmac.new(self.secret, key.encode() + b':' + payload, hashlib.sha256).hexdigest()
+    
+    # ==================== RESULTS ====================
+    
+    def get(self, key):
+        """
+        ดึงผลลัพธ์จากแคช (ในเครื่องก่อน แล้วจึง MongoDB)
+        
+        Args:
+            key: cache key
+        
+        Returns:
+            dict: ผลลัพธ์ backtest หรือ None ถ้าไม่พบ
+        """
+        results = load_pickle(os.path.join(self.results_dir, f'{key}.pkl'))
+        if results is not None:
+            logger.info(f"Backtest cache hit: {key[:12]}")
+            return results
+        
+        if self.mongodb_manager is not None and self.secret:
+            try:
+                document = self.mongodb_manager.get_backtest_by_cache_key(key)
+                if document and document.get('payload'):
+                    payload = bytes(document['payload'])
+                    if not hmac.compare_digest(str(document.get('signature', '')), self.sign(key, payload)):
+                        logger.warning(f"Ignoring backtest cache {key[:12]} from MongoDB: invalid signature")
+                        return None
+                    results = pickle.loads(payload)
+                    save_pickle(os.path.join(self.results_dir, f'{key}.pkl'), results)
+                    logger.info(f"Backtest cache hit (MongoDB): {key[:12]}")
+                    return results
+            except Exception as e:
+                logger.warning(f"Error reading backtest cache from MongoDB: {str(e)}")
+        
+        return None
+    
+    def put(self, key, results, params=None):
+        """
+        บันทึกผลลัพธ์ลงแคช
+        
+        Args:
+            key: cache key
+            results: dict ผลลัพธ์จาก Backtester.get_results()
+            params: dict ของพารามิเตอร์ (บันทึกไว้เพื่ออ้างอิงใน MongoDB)
+        """
+        save_pickle(os.path.join(self.results_dir, f'{key}.pkl'), results)
+        
+        if self.mongodb_manager is not None:
+            try:
+                summary = {name: value for name, value in results.items()
+                           if isinstance(value, (int, float, np.integer, np.floating))}
+                document = {
+                    'cache_key': key,
+                    'engine_version': ENGINE_VERSION,
+                    'params': normalize_params(params or {}),
+                    'summary': {name: float(value) for name, value in summary.items()},
+                }
+                if self.secret:
+                    payload = pickle.dumps(results, protocol=pickle.HIGHEST_PROTOCOL)
+                    document['payload'] = payload
+                    document['signature'] = self.sign(key, payload)
+                self.mongodb_manager.save_backtest_result(document)
+            except Exception as e:
+                logger.warning(f"Error saving backtest cache to MongoDB: {str(e)}")
+    
+    # ==================== INDICATOR PANELS ====================
+    
+    def _indicator_path(self, data):
+        key = hashlib.sha256(f'{fingerprint_dataframe(data)}:{INDICATOR_VERSION}'.encode()).hexdigest()
+        return os.path.join(self.indicators_dir, f'{key}.pkl')
+    
+    def get_indicators(self, data):
+        """
+        ดึง indicator panel ของข้อมูลราคาชุดนี้
+        
+        Args:
+            data: DataFrame ของราคาหุ้น
+        
+        Returns:
+            DataFrame: indicators + signals หรือ None ถ้าไม่พบ
+        """
+        return load_pickle(self._indicator_path(data))
+    
+    def put_indicators(self, data, panel):
+        """
+        บันทึก indicator panel ของข้อมูลราคาชุดนี้
+        
+        Args:
+            data: DataFrame ของราคาหุ้น
+            panel: DataFrame ของ indicators + signals
+        """
+        save_pickle(self._indicator_path(data), panel)
+    
+    # ==================== UTILITY ====================
+    
+    def clear(self):
+        """ลบแคชในเครื่องทั้งหมด"""
+        for directory in (self.results_dir, self.indicators_dir):
+            for filename in os.listdir(directory):
+                if filename.endswith('.pkl'):
+                    os.remove(os.path.join(directory, filename))
+        logger.info(f"Cleared backtest cache at {self.cache_dir}")
@@ -0,0 +1,75 @@
+"""
+Backtest Checkpoints
+บันทึกสถานะ Backtester ระหว่างการรันเป็นระยะ และรันต่อจาก checkpoint ล่าสุด
+"""
+
+import os
+import logging
+
+from .cache import load_pickle, save_pickle
+
+logger = logging.getLogger(__name__)
+
+# เปลี่ยนเมื่อรูปแบบของ state เปลี่ยน (checkpoint เก่าจะไม่ถูกใช้)
+CHECKPOINT_VERSION = 1
+
+
+class BacktestCheckpoint:
+    """
+    ที่เก็บ checkpoint ของ Backtest
+    
+    ใช้ key เดียวกับ BacktestCache (พารามิเตอร์ + ข้อมูลราคา + เวอร์ชัน engine)
+    จึงรันต่อได้เฉพาะ backtest ที่ตั้งค่าและข้อมูลเหมือนเดิมเท่านั้น
+    """
+    
+    def __init__(self, checkpoint_dir='data/backtest_checkpoints', every=250):
+        """
+        Initialize BacktestCheckpoint
+        
+        Args:
+            checkpoint_dir: โฟลเดอร์เก็บ checkpoint
+            every: บันทึกทุก ๆ N วันทำการที่จำลองแล้ว
+        """
+        self.checkpoint_dir = checkpoint_dir
+        self.every = max(1, int(every))
+        os.makedirs(checkpoint_dir, exist_ok=True)
+    
+    def _path(self, key):
+        return os.path.join(self.checkpoint_dir, f'{key}.ckpt')
+    
+    def should_save(self, next_index):
+        """ถึงรอบบันทึก checkpoint หรือยัง (next_index = จำนวนวันที่จำลองแล้ว)"""
+        return next_index % self.every == 0
+    
+    def save(self, key, state):
+        """
+        บันทึกสถานะ
+        
+        Args:
+            key: key ของ backtest
+            state: dict จาก Backtester.get_state()
+        """
+        if save_pickle(self._path(key), {'version': CHECKPOINT_VERSION, 'state': state}):
+            logger.debug(f"Checkpoint saved at session {state.get('next_index')}: {key[:12]}")
+    
+    def load(self, key):
+        """
+        โหลดสถานะล่าสุด
+        
+        Args:
+            key: key ของ backtest
+        
+        Returns:
+            dict: state หรือ None ถ้าไม่มี checkpoint ที่ใช้ได้
+        """
+        payload = load_pickle(self._path(key))
+        if not payload or payload.get('version') != CHECKPOINT_VERSION:
+            return None
+        logger.info(f"Resuming backtest from session {payload['state'].get('next_index')}: {key[:12]}")
+        return payload['state']
+    
+    def clear(self, key):
+        """ลบ checkpoint (เมื่อ backtest เสร็จสมบูรณ์)"""
+        path = self._path(key)
+        if os.path.exists(path):
+            os.remove(path)
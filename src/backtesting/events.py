@@ -0,0 +1,80 @@
+"""
+Backtest Event Recorder
+บันทึกเหตุการณ์ใน hot path ของ Backtest (นับจำนวน + เก็บตัวอย่าง) แทนการ log ทุกครั้ง
+"""
+
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class EventRecorder:
+    """
+    ตัวบันทึกเหตุการณ์ของ Backtester
+    
+    โหมดปกติ: ส่งข้อความไปยัง logger (format แบบ lazy เฉพาะเมื่อ level เปิดอยู่)
+    โหมด quiet: นับจำนวนเหตุการณ์แต่ละประเภท และเก็บตัวอย่างทุก ๆ sample_every ครั้ง
+    ใน ring buffer โดยไม่ format ข้อความ แล้วสรุปครั้งเดียวตอนจบการรัน
+    """
+    
+    __slots__ = ('logger', 'quiet', 'sample_every', 'counts', 'samples')
+    
+    def __init__(self, logger=None, quiet=False, sample_every=0, buffer_size=1000):
+        """
+        Initialize EventRecorder
+        
+        Args:
+            logger: logger ปลายทาง (default = logger ของ module นี้)
+            quiet: True = ไม่ log เหตุการณ์รายครั้ง
+            sample_every: เก็บตัวอย่างทุก ๆ N ครั้งต่อประเภท (0 = ไม่เก็บ, ใช้ในโหมด quiet)
+            buffer_size: จำนวนตัวอย่างสูงสุดใน ring buffer
+        """
+        self.logger = logger or logging.getLogger(__name__)
+        self.quiet = quiet
+        self.sample_every = sample_every
+        self.counts = {}
+        self.samples = deque(maxlen=buffer_size)
+    
+    def reset(self):
+        """ล้างตัวนับและตัวอย่าง"""
+        self.counts = {}
+        self.samples.clear()
+    
+    def record(self, event, message, *args, level=logging.INFO):
+        """
+        บันทึกเหตุการณ์
+        
+        Args:
+            event: ประเภทเหตุการณ์ (เช่น 'buy', 'sell', 'stop_loss')
+            message: ข้อความแบบ %-format
+            *args: ค่าที่ใช้ format ข้อความ
+            level: logging level ในโหมดปกติ
+        """
+        count = self.counts.get(event, 0) + 1
+        self.counts[event] = count
+        
+        if not self.quiet:
+            self.logger.log(level, message, *args)
+        elif self.sample_every and count % self.sample_every == 0:
+            self.samples.append((event, message, args))
+    
+    def sample_messages(self):
+        """ข้อความของตัวอย่างใน ring buffer (format ตอนเรียกเท่านั้น)"""
+        return [f"{event}: {message % args}" for event, message, args in self.samples]
+    
+    def summary(self):
+        """
+        สรุปเหตุการณ์ทั้งหมด
+        
+        Returns:
+            dict: {'counts': {event: จำนวน}, 'samples': [ข้อความตัวอย่าง]}
+        """
+        return {'counts': dict(self.counts), 'samples': self.sample_messages()}
+    
+    def log_summary(self):
+        """log สรุปจำนวนเหตุการณ์หนึ่งบรรทัด (เฉพาะโหมด quiet)"""
+        if not self.quiet:
+            return
+        counts = ', '.join(f"{event}={count:,}" for event, count in sorted(self.counts.items()))
+        self.logger.info(f"Backtest events: {counts or 'none'} ({len(self.samples)} samples)")
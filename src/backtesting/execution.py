@@ -0,0 +1,165 @@
+"""
+Intrabar Execution Model
+ตรวจสอบ Stop Loss / Take Profit กับราคา High/Low ของแต่ละแท่งแบบ Vectorized
+"""
+
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+# รหัสเหตุผลการออก (ใช้ใน arrays)
+EXIT_NONE = 0
+EXIT_STOP = 1
+EXIT_TARGET = 2
+
+EXIT_REASONS = {EXIT_STOP: "Stop Loss", EXIT_TARGET: "Take Profit"}
+
+# กฎเมื่อแท่งเดียวกันแตะทั้ง Stop Loss และ Take Profit (และราคาเปิดไม่ gap ข้ามระดับใด)
+# - stop_first: ถือว่าแตะ Stop Loss ก่อน (conservative)
+# - target_first: ถือว่าแตะ Take Profit ก่อน (optimistic)
+# - open_proximity: ระดับที่ใกล้ราคาเปิดมากกว่าถูกแตะก่อน (เท่ากัน = Stop Loss)
+BOTH_TOUCHED_RULES = ('stop_first', 'target_first', 'open_proximity')
+
+
+def resolve_bars(open_, high, low, stop, target, both_touched='stop_first'):
+    """
+    ตรวจสอบการแตะ Stop Loss / Take Profit ของแต่ละแท่ง (element-wise, broadcast ได้)
+    
+    กฎการ fill:
+    - ราคาเปิด gap ต่ำกว่า Stop Loss → ออกที่ราคาเปิด (Stop Loss)
+    - ราคาเปิด gap สูงกว่า Take Profit → ออกที่ราคาเปิด (Take Profit)
+    - Low <= Stop Loss → ออกที่ราคา Stop Loss
+    - High >= Take Profit → ออกที่ราคา Take Profit
+    - แตะทั้งสองระดับ → ใช้กฎ both_touched
+    
+    Args:
+        open_: ราคาเปิด
+        high: ราคาสูงสุด
+        low: ราคาต่ำสุด
+        stop: ระดับ Stop Loss (NaN = ไม่ใช้)
+        target: ระดับ Take Profit (NaN = ไม่ใช้)
+        both_touched: กฎใน BOTH_TOUCHED_RULES
+    
+    Returns:
+        tuple: (รหัสเหตุผล int8 array, ราคาที่ออก float array; NaN ถ้าไม่แตะ)
+    """
+    if both_touched not in BOTH_TOUCHED_RULES:
+        raise ValueError(f"Unknown both_touched rule: {both_touched}. Use one of {BOTH_TOUCHED_RULES}")
+    
+    open_, high, low, stop, target = np.broadcast_arrays(
+        *(np.asarray(value, dtype=float) for value in (open_, high, low, stop, target)))
+    
+    # การเปรียบเทียบกับ NaN ได้ False จึงไม่แตะระดับที่ไม่ได้กำหนด
+    with np.errstate(invalid='ignore'):
+        gap_stop = open_ <= stop
+        gap_target = open_ >= target
+        stop_hit = low <= stop
+        target_hit = high >= target
+        
+        both = stop_hit & target_hit & ~gap_stop & ~gap_target
+        if both_touched == 'stop_first':
+            stop_wins = np.ones(open_.shape, dtype=bool)
+        elif both_touched == 'target_first':
+            stop_wins = np.zeros(open_.shape, dtype=bool)
+        else:
+            stop_wins = (open_ - stop) <= (target - open_)
+    
+    is_stop = gap_stop | (stop_hit & ~gap_target & (~both | stop_wins))
+    is_target = ~is_stop & (gap_target | target_hit)
+    
+    reason = np.where(is_stop, EXIT_STOP, np.where(is_target, EXIT_TARGET, EXIT_NONE)).astype(np.int8)
+    price = np.where(gap_stop | gap_target, open_,
+                     np.where(is_stop, stop, np.where(is_target, target, np.nan)))
+    return reason, price
+
+
+def first_touch(open_, high, low, stop, target, both_touched='stop_first'):
+    """
+    หาแท่งแรกที่ราคาแตะ Stop Loss หรือ Take Profit ในช่วงถือครอง
+    
+    Args:
+        open_, high, low: arrays ของราคาแท่งหลังวันเข้าซื้อ (1D)
+        stop: ระดับ Stop Loss (scalar)
+        target: ระดับ Take Profit (scalar)
+        both_touched: กฎใน BOTH_TOUCHED_RULES
+    
+    Returns:
+        tuple: (ตำแหน่งแท่ง หรือ -1, ราคาที่ออก, รหัสเหตุผล)
+    """
+    reason, price = resolve_bars(open_, high, low, stop, target, both_touched)
+    touched = np.flatnonzero(reason)
+    if touched.size == 0:
+        return -1, np.nan, EXIT_NONE
+    
+    bar = int(touched[0])
+    return bar, float(price[bar]), int(reason[bar])
+
+
+class IntrabarExecution:
+    """
+    โมเดลการออกจาก Position ด้วย Stop Loss / Take Profit ที่กำหนดตอนเข้าซื้อ
+    
+    ระดับราคาคงที่ตลอดการถือครอง (ไม่คำนวณใหม่ทุกวัน) และตรวจกับ High/Low ของแต่ละแท่ง
+    """
+    
+    def __init__(self, stop_loss_pct=0.03, take_profit_pct=0.05, both_touched='stop_first'):
+        """
+        Initialize IntrabarExecution
+        
+        Args:
+            stop_loss_pct: ระยะ Stop Loss จากราคาเข้า (0.03 = 3%, None = ไม่ใช้)
+            take_profit_pct: ระยะ Take Profit จากราคาเข้า (0.05 = 5%, None = ไม่ใช้)
+            both_touched: กฎเมื่อแท่งเดียวแตะทั้งสองระดับ (ดู BOTH_TOUCHED_RULES)
+        """
+        if both_touched not in BOTH_TOUCHED_RULES:
+            raise ValueError(f"Unknown both_touched rule: {both_touched}. Use one of {BOTH_TOUCHED_RULES}")
+        self.stop_loss_pct = stop_loss_pct
+        self.take_profit_pct = take_profit_pct
+        self.both_touched = both_touched
+    
+    def levels(self, entry_price):
+        """
+        คำนวณระดับ Stop Loss / Take Profit จากราคาเข้า
+        
+        Args:
+            entry_price: ราคาเข้า (scalar หรือ array)
+        
+        Returns:
+            tuple: (stop_loss, take_profit); NaN ถ้าไม่ใช้
+        """
+        entry_price = np.asarray(entry_price, dtype=float)
+        stop = np.full_like(entry_price, np.nan)
+        target = np.full_like(entry_price, np.nan)
+        if self.stop_loss_pct is not None:
+            stop = entry_price * (1 - self.stop_loss_pct)
+        if self.take_profit_pct is not None:
+            target = entry_price * (1 + self.take_profit_pct)
+        return stop, target
+    
+    def check_bars(self, open_, high, low, stop, target):
+        """
+        ตรวจสอบแท่งเดียวของหลาย positions พร้อมกัน
+        
+        Returns:
+            tuple: (รหัสเหตุผล, ราคาที่ออก) ดู resolve_bars()
+        """
+        return resolve_bars(open_, high, low, stop, target, self.both_touched)
+    
+    def find_exit(self, open_, high, low, stop, target):
+        """
+        หาแท่งแรกที่ออกจาก Position ในช่วงถือครอง
+        
+        Returns:
+            tuple: (ตำแหน่งแท่ง หรือ -1, ราคาที่ออก, รหัสเหตุผล) ดู first_touch()
+        """
+        return first_touch(open_, high, low, stop, target, self.both_touched)
+    
+    def params(self):
+        """พารามิเตอร์ที่มีผลต่อผลลัพธ์ (ใช้สร้าง cache key)"""
+        return {
+            'stop_loss_pct': self.stop_loss_pct,
+            'take_profit_pct': self.take_profit_pct,
+            'both_touched': self.both_touched,
+        }
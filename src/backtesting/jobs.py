@@ -0,0 +1,632 @@
+"""
+Backtest Job Queue
+คิวงาน Backtest แบบถาวร (SQLite) และ worker processes ที่ดึงงานไปรัน รายงานความคืบหน้า และเก็บผลลัพธ์
+"""
+
+import os
+import json
+import time
+import socket
+import sqlite3
+import logging
+import threading
+import traceback
+import multiprocessing
+from types import SimpleNamespace
+
+import pandas as pd
+
+from .backtester import Backtester, load_historical_data
+from .cache import BacktestCache
+from .checkpoint import BacktestCheckpoint
+from .execution import IntrabarExecution
+
+logger = logging.getLogger(__name__)
+
+JOB_STATUSES = ('queued', 'running', 'done', 'failed', 'cancelled')
+
+# ค่าเริ่มต้นของ spec งาน (พารามิเตอร์ของ Backtester.run_backtest + Backtester + IntrabarExecution)
+DEFAULT_SPEC = {
+    'strategy': 'technical',
+    'min_confidence': 0.6,
+    'initial_capital': 10000,
+    'commission': 0.001,
+    'slippage': 0.0005,
+    'position_size_pct': 0.2,
+    'stop_loss_pct': 0.03,
+    'take_profit_pct': 0.05,
+    'both_touched': 'stop_first',
+    'use_cache': True,
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    spec TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    worker TEXT,
+    processed INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0,
+    session_date TEXT,
+    result_key TEXT,
+    error TEXT,
+    submitted_at REAL NOT NULL,
+    started_at REAL,
+    updated_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+CREATE TABLE IF NOT EXISTS workers (
+    id TEXT PRIMARY KEY,
+    job_id INTEGER,
+    heartbeat REAL NOT NULL
+);
+"""
+
+
+class JobCancelled(Exception):
+    """งานถูกยกเลิกหรือถูกส่งให้ worker อื่นระหว่างรัน"""
+
+
+def normalize_spec(spec):
+    """
+    ตรวจสอบและเติมค่าเริ่มต้นของ spec งาน Backtest
+    
+    Args:
+        spec: dict ที่ต้องมี symbols, start_date, end_date (ที่เหลือใช้ค่าใน DEFAULT_SPEC)
+    
+    Returns:
+        dict: spec ที่ normalize แล้ว (แปลงเป็น JSON ได้)
+    """
+    missing = [name for name in ('symbols', 'start_date', 'end_date') if not spec.get(name)]
+    if missing:
+        raise ValueError(f"Backtest job spec is missing: {', '.join(missing)}")
+    unknown = set(spec) - set(DEFAULT_SPEC) - {'symbols', 'start_date', 'end_date'}
+    if unknown:
+        raise ValueError(f"Unknown backtest job parameters: {', '.join(sorted(unknown))}")
+    
+    normalized = {**DEFAULT_SPEC, **spec}
+    normalized['symbols'] = sorted({str(symbol).strip().upper() for symbol in spec['symbols']})
+    start_dt = pd.to_datetime(spec['start_date'])
+    end_dt = pd.to_datetime(spec['end_date'])
+    if start_dt >= end_dt:
+        raise ValueError("start_date must be before end_date")
+    normalized['start_date'] = start_dt.strftime('%Y-%m-%d')
+    normalized['end_date'] = end_dt.strftime('%Y-%m-%d')
+    return normalized
+
+
+class JobQueue:
+    """
+    คิวงาน Backtest และที่เก็บสถานะที่ใช้ร่วมกันระหว่าง processes
+    
+    เก็บใน SQLite ไฟล์เดียว (งานยังอยู่แม้ dashboard หรือ worker ปิดไป)
+    ทุก process เปิด connection ของตัวเองต่อการเรียกแต่ละครั้ง จึงใช้ข้าม fork/spawn ได้
+    """
+    
+    def __init__(self, db_path='data/backtest_jobs/jobs.db'):
+        """
+        Initialize JobQueue
+        
+        Args:
+            db_path: ไฟล์ฐานข้อมูล SQLite ของคิว
+        """
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+    
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return _Connection(conn)
+    
+    # ==================== SUBMIT / POLL ====================
+    
+    def submit(self, spec):
+        """
+        ส่งงาน Backtest เข้าคิว
+        
+        Args:
+            spec: dict ของพารามิเตอร์ (ดู normalize_spec)
+        
+        Returns:
+            int: job id
+        """
+        spec = normalize_spec(spec)
+        with self._connect() as conn:
+            cursor = conn.execute('INSERT INTO jobs (spec, submitted_at) VALUES (?, ?)',
+                                  (json.dumps(spec, sort_keys=True), time.time()))
+            job_id = cursor.lastrowid
+        logger.info(f"Submitted backtest job {job_id}: {', '.join(spec['symbols'])}")
+        return job_id
+    
+    def get(self, job_id):
+        """
+        สถานะของงาน
+        
+        Args:
+            job_id: job id
+        
+        Returns:
+            dict: ข้อมูลงาน + progress (0-1) และ eta_seconds หรือ None ถ้าไม่พบ
+        """
+        with self._connect() as conn:
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return self._job_dict(row) if row is not None else None
+    
+    def list_jobs(self, status=None, limit=50):
+        """
+        รายการงานล่าสุด
+        
+        Args:
+            status: กรองตามสถานะ (None = ทุกสถานะ)
+            limit: จำนวนงานสูงสุด
+        
+        Returns:
+            list: dict ของแต่ละงาน (ใหม่สุดก่อน)
+        """
+        with self._connect() as conn:
+            if status is None:
+                rows = conn.execute('SELECT * FROM jobs ORDER BY id DESC LIMIT ?', (limit,)).fetchall()
+            else:
+                rows = conn.execute('SELECT * FROM jobs WHERE status = ? ORDER BY id DESC LIMIT ?',
+                                    (status, limit)).fetchall()
+        return [self._job_dict(row) for row in rows]
+    
+    def cancel(self, job_id):
+        """
+        ยกเลิกงาน (งานที่กำลังรันจะหยุดเมื่อ worker รายงานความคืบหน้าครั้งถัดไป)
+        
+        Returns:
+            bool: ยกเลิกได้หรือไม่ (งานที่จบแล้วยกเลิกไม่ได้)
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? "
+                "WHERE id = ? AND status IN ('queued', 'running')", (time.time(), job_id))
+        return cursor.rowcount > 0
+    
+    def result(self, job_id, cache):
+        """
+        ผลลัพธ์ของงานที่เสร็จแล้ว
+        
+        Args:
+            job_id: job id
+            cache: BacktestCache ที่ worker ใช้เก็บผลลัพธ์
+        
+        Returns:
+            dict: ผลลัพธ์ backtest หรือ None ถ้างานยังไม่เสร็จ
+        """
+        job = self.get(job_id)
+        if job is None or job['status'] != 'done' or not job['result_key']:
+            return None
+        return cache.get(job['result_key'])
+    
+    @staticmethod
+    def _job_dict(row):
+        job = dict(row)
+        job['spec'] = json.loads(job['spec'])
+        job['progress'] = job['processed'] / job['total'] if job['total'] else 0.0
+        if job['status'] == 'done':
+            job['progress'] = 1.0
+        
+        # ETA จากอัตราเฉลี่ยตั้งแต่เริ่มรัน
+        job['eta_seconds'] = None
+        if job['status'] == 'running' and job['processed'] and job['started_at']:
+            elapsed = job['updated_at'] - job['started_at']
+            job['eta_seconds'] = elapsed / job['processed'] * (job['total'] - job['processed'])
+        return job
+    
+    # ==================== WORKER SIDE ====================
+    
+    def claim(self, worker_id):
+        """
+        ดึงงานที่รออยู่นานที่สุดหนึ่งงาน (atomic ข้าม processes)
+        
+        Args:
+            worker_id: ชื่อ worker
+        
+        Returns:
+            dict: ข้อมูลงาน หรือ None ถ้าคิวว่าง
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute("SELECT id FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1").fetchone()
+            if row is None:
+                conn.execute('COMMIT')
+                return None
+            conn.execute("UPDATE jobs SET status = 'running', worker = ?, started_at = ?, updated_at = ?, "
+                         "processed = 0, total = 0, error = NULL WHERE id = ?",
+                         (worker_id, now, now, row['id']))
+            conn.execute('COMMIT')
+        return self.get(row['id'])
+    
+    @staticmethod
+    def _owner_filter(job_id, worker_id):
+        """เงื่อนไข WHERE ของงานที่กำลังรัน (และเป็นของ worker_id ถ้าระบุ)"""
+        if worker_id is None:
+            return "id = ? AND status = 'running'", (job_id,)
+        return "id = ? AND status = 'running' AND worker = ?", (job_id, worker_id)
+    
+    def report_progress(self, job_id, processed, total, current_date=None, worker_id=None):
+        """
+        บันทึกความคืบหน้าของงาน
+        
+        Args:
+            worker_id: worker ที่รันงาน (ระบุเพื่อไม่ให้ worker ที่งานถูกส่งต่อไปแล้วเขียนทับ)
+        
+        Returns:
+            bool: False ถ้างานถูกยกเลิกหรือเป็นของ worker อื่นแล้ว (worker ควรหยุด)
+        """
+        current_date = pd.Timestamp(current_date).strftime('%Y-%m-%d') if current_date is not None else None
+        where, args = self._owner_filter(job_id, worker_id)
+        with self._connect() as conn:
+            cursor = conn.execute(
+                f"UPDATE jobs SET processed = ?, total = ?, session_date = ?, updated_at = ? WHERE {where}",
+                (int(processed), int(total), current_date, time.time(), *args))
+        return cursor.rowcount > 0
+    
+    def complete(self, job_id, result_key, worker_id=None):
+        """
+        บันทึกว่างานเสร็จ พร้อม key ของผลลัพธ์ใน BacktestCache
+        
+        Returns:
+            bool: False ถ้างานไม่ได้เป็นของ worker_id แล้ว (ไม่บันทึก)
+        """
+        now = time.time()
+        where, args = self._owner_filter(job_id, worker_id)
+        with self._connect() as conn:
+            cursor = conn.execute(
+                f"UPDATE jobs SET status = 'done', result_key = ?, processed = total, "
+                f"updated_at = ?, finished_at = ? WHERE {where}", (result_key, now, now, *args))
+        return cursor.rowcount > 0
+    
+    def fail(self, job_id, error, worker_id=None):
+        """
+        บันทึกว่างานล้มเหลว
+        
+        Returns:
+            bool: False ถ้างานไม่ได้เป็นของ worker_id แล้ว (ไม่บันทึก)
+        """
+        now = time.time()
+        where, args = self._owner_filter(job_id, worker_id)
+        with self._connect() as conn:
+            cursor = conn.execute(
+                f"UPDATE jobs SET status = 'failed', error = ?, updated_at = ?, finished_at = ? WHERE {where}",
+                (error, now, now, *args))
+        return cursor.rowcount > 0
+    
+    def heartbeat(self, worker_id, job_id=None):
+        """บันทึกว่า worker ยังทำงานอยู่"""
+        with self._connect() as conn:
+            conn.execute('INSERT OR REPLACE INTO workers (id, job_id, heartbeat) VALUES (?, ?, ?)',
+                         (worker_id, job_id, time.time()))
+    
+    def unregister(self, worker_id):
+        """ลบ worker ออกจากรายการ (เมื่อหยุดทำงาน)"""
+        with self._connect() as conn:
+            conn.execute('DELETE FROM workers WHERE id = ?', (worker_id,))
+    
+    def active_workers(self, max_age=30):
+        """
+        รายการ worker ที่ส่ง heartbeat ภายใน max_age วินาที
+        
+        Returns:
+            list: dict {'id', 'job_id', 'heartbeat'}
+        """
+        with self._connect() as conn:
+            rows = conn.execute('SELECT * FROM workers WHERE heartbeat >= ? ORDER BY id',
+                                (time.time() - max_age,)).fetchall()
+        return [dict(row) for row in rows]
+    
+    def requeue_stale(self, timeout=300):
+        """
+        ส่งงานที่ worker หายไป (worker เจ้าของงานไม่ส่ง heartbeat เกิน timeout วินาที) กลับเข้าคิว
+        งานจะรันต่อจาก checkpoint ล่าสุดถ้า worker ใช้ BacktestCheckpoint
+        
+        ดูจาก heartbeat ของ worker ไม่ใช่ความคืบหน้าของงาน เพราะช่วงโหลดข้อมูลและคำนวณ indicators
+        ไม่มีการรายงานความคืบหน้า แต่ worker ยังส่ง heartbeat อยู่ (ดู BacktestWorker.heartbeat_interval)
+        
+        Returns:
+            int: จำนวนงานที่ส่งกลับเข้าคิว
+        """
+        cutoff = time.time() - timeout
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'queued', worker = NULL "
+                "WHERE status = 'running' AND updated_at < ? AND NOT EXISTS ("
+                "SELECT 1 FROM workers WHERE workers.id = jobs.worker AND workers.job_id = jobs.id "
+                "AND workers.heartbeat >= ?)", (cutoff, cutoff))
+        if cursor.rowcount:
+            logger.warning(f"Requeued {cursor.rowcount} stale backtest job(s)")
+        return cursor.rowcount
+
+
+class _Connection:
+    """context manager ที่ปิด sqlite connection เมื่อออกจาก block"""
+    
+    def __init__(self, conn):
+        self.conn = conn
+    
+    def __enter__(self):
+        return self.conn
+    
+    def __exit__(self, exc_type, exc, tb):
+        if self.conn.in_transaction:
+            self.conn.execute('ROLLBACK')
+        self.conn.close()
+
+
+class BacktestWorker:
+    """
+    Worker ที่ดึงงานจาก JobQueue มารันด้วย Backtester
+    
+    - รายงานความคืบหน้า (จำนวนวันที่จำลองแล้ว + วันที่ปัจจุบัน) ไม่เกินทุก progress_interval วินาที
+    - ส่ง heartbeat จาก thread แยกทุก heartbeat_interval วินาทีระหว่างรันงาน (รวมช่วงโหลดข้อมูล)
+      ให้ JobQueue.requeue_stale รู้ว่างานยังไม่ถูกทิ้ง
+    - การบันทึกสถานะทุกครั้งระบุ worker_id จึงไม่เขียนทับงานที่ถูกส่งให้ worker อื่นไปแล้ว
+    - เก็บผลลัพธ์ใน BacktestCache ด้วย key เดียวกับแคชผลลัพธ์ของ Backtester (รวม model ของงาน AI)
+    - ใช้ BacktestCheckpoint ให้งานที่ถูกส่งกลับเข้าคิวรันต่อจากจุดเดิม
+    """
+    
+    def __init__(self, queue, cache=None, checkpoint=None, data_loader=None,
+                 worker_id=None, progress_interval=1.0, ai_generator=None, heartbeat_interval=10.0):
+        """
+        Initialize BacktestWorker
+        
+        Args:
+            queue: JobQueue
+            cache: BacktestCache สำหรับเก็บผลลัพธ์ (default โฟลเดอร์มาตรฐาน)
+            checkpoint: BacktestCheckpoint (optional)
+            data_loader: ฟังก์ชัน (symbols, start_dt, end_dt) -> {symbol: DataFrame}
+                         (default load_historical_data)
+            worker_id: ชื่อ worker (default hostname:pid)
+            progress_interval: ระยะห่างขั้นต่ำระหว่างการบันทึกความคืบหน้า (วินาที)
+            ai_generator: AISignalGenerator สำหรับงาน 'ai'/'combined'
+                          (default โหลด model ล่าสุดจาก ModelRegistry เมื่อต้องใช้ครั้งแรก)
+            heartbeat_interval: ระยะห่างของ heartbeat ระหว่างรันงาน (วินาที ต้องน้อยกว่า timeout ของ requeue_stale)
+        """
+        self.queue = queue
+        self.cache = cache or BacktestCache()
+        self.checkpoint = checkpoint
+        self.data_loader = data_loader or load_historical_data
+        self.worker_id = worker_id or f'{socket.gethostname()}:{os.getpid()}'
+        self.progress_interval = progress_interval
+        self.ai_generator = ai_generator
+        self.heartbeat_interval = heartbeat_interval
+    
+    def _start_heartbeat(self, job_id):
+        """เริ่ม thread ที่ส่ง heartbeat ของงานทุก heartbeat_interval วินาที (หยุดด้วย Event ที่คืนให้)"""
+        stop = threading.Event()
+        
+        def beat():
+            while not stop.wait(self.heartbeat_interval):
+                try:
+                    self.queue.heartbeat(self.worker_id, job_id)
+                except Exception as e:
+                    logger.warning(f"Worker {self.worker_id} heartbeat failed: {str(e)}")
+        
+        thread = threading.Thread(target=beat, name=f'heartbeat-{job_id}', daemon=True)
+        thread.start()
+        return stop, thread
+    
+    def _analyzer_app(self, strategy):
+        """analyzer_app สำหรับ Backtester.run_backtest (มีเฉพาะ ai_signal_generator)"""
+        if strategy == 'technical':
+            return None
+        if self.ai_generator is None:
+            from src.signals.generator import AISignalGenerator
+            from src.ai.registry import ModelRegistry, AI_SIGNAL_MODEL
+            self.ai_generator = AISignalGenerator()
+            ModelRegistry().load(AI_SIGNAL_MODEL, self.ai_generator)
+        return SimpleNamespace(ai_signal_generator=self.ai_generator)
+    
+    def run_job(self, job):
+        """
+        รันงานหนึ่งงานและบันทึกผลในคิว
+        
+        Args:
+            job: dict จาก JobQueue.claim()
+        
+        Returns:
+            str: สถานะสุดท้าย ('done', 'failed', 'cancelled')
+        """
+        job_id = job['id']
+        spec = job['spec']
+        logger.info(f"Worker {self.worker_id} running job {job_id}")
+        self.queue.heartbeat(self.worker_id, job_id)
+        stop_heartbeat, heartbeat_thread = self._start_heartbeat(job_id)
+        
+        try:
+            start_dt = pd.to_datetime(spec['start_date'])
+            end_dt = pd.to_datetime(spec['end_date'])
+            historical_data = self.data_loader(spec['symbols'], start_dt, end_dt)
+            if not historical_data:
+                raise ValueError("No historical data available")
+            
+            backtester = Backtester(
+                initial_capital=spec['initial_capital'],
+                commission=spec['commission'],
+                slippage=spec['slippage'],
+                position_size_pct=spec['position_size_pct'],
+                execution=IntrabarExecution(spec['stop_loss_pct'], spec['take_profit_pct'],
+                                            spec['both_touched']),
+            )
+            analyzer_app = self._analyzer_app(spec['strategy'])
+            model_fingerprint = Backtester.model_fingerprint(getattr(analyzer_app, 'ai_signal_generator', None))
+            result_key = backtester.run_key(spec['symbols'], start_dt, end_dt, spec['strategy'],
+                                            spec['min_confidence'], historical_data, model_fingerprint)
+            
+            results = backtester.run_backtest(
+                analyzer_app, spec['symbols'], start_dt, end_dt,
+                strategy=spec['strategy'],
+                min_confidence=spec['min_confidence'],
+                historical_data=historical_data,
+                cache=self.cache if spec['use_cache'] else None,
+                checkpoint=self.checkpoint,
+                progress=self._progress_callback(job_id),
+            )
+            # เก็บผลเสมอ (run_backtest ไม่เขียนแคชเมื่อ use_cache=False) เพื่อให้ JobQueue.result() อ่านได้
+            self.cache.put(result_key, results,
+                           backtester._cache_params(spec['symbols'], start_dt, end_dt, spec['strategy'],
+                                                    spec['min_confidence'], model_fingerprint))
+            if not self.queue.complete(job_id, result_key, self.worker_id):
+                raise JobCancelled(job_id)
+            logger.info(f"Job {job_id} completed: {results.get('total_return', 0):+.2f}%")
+            return 'done'
+        
+        except JobCancelled:
+            logger.info(f"Job {job_id} cancelled or reassigned")
+            return 'cancelled'
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {str(e)}")
+            self.queue.fail(job_id, traceback.format_exc(), self.worker_id)
+            return 'failed'
+        finally:
+            stop_heartbeat.set()
+            heartbeat_thread.join()
+            self.queue.heartbeat(self.worker_id)
+    
+    def _progress_callback(self, job_id):
+        """callback สำหรับ Backtester.run_backtest ที่บันทึกความคืบหน้าเป็นระยะ"""
+        last_report = [0.0]
+        
+        def progress(processed, total, current_date):
+            now = time.monotonic()
+            if processed < total and now - last_report[0] < self.progress_interval:
+                return
+            last_report[0] = now
+            if not self.queue.report_progress(job_id, processed, total, current_date, self.worker_id):
+                raise JobCancelled(job_id)
+            self.queue.heartbeat(self.worker_id, job_id)
+        
+        return progress
+    
+    def run_once(self):
+        """
+        ดึงและรันงานหนึ่งงาน
+        
+        Returns:
+            bool: True ถ้ามีงานให้รัน
+        """
+        job = self.queue.claim(self.worker_id)
+        if job is None:
+            self.queue.heartbeat(self.worker_id)
+            return False
+        self.run_job(job)
+        return True
+    
+    def run_forever(self, poll_interval=1.0, max_jobs=None, stop_when_idle=False):
+        """
+        วนดึงงานจากคิวจนกว่าจะถูกหยุด
+        
+        Args:
+            poll_interval: เวลารอเมื่อคิวว่าง (วินาที)
+            max_jobs: จำนวนงานสูงสุดก่อนหยุด (None = ไม่จำกัด)
+            stop_when_idle: หยุดเมื่อคิวว่าง
+        
+        Returns:
+            int: จำนวนงานที่รัน
+        """
+        completed = 0
+        try:
+            while max_jobs is None or completed < max_jobs:
+                if self.run_once():
+                    completed += 1
+                elif stop_when_idle:
+                    break
+                else:
+                    time.sleep(poll_interval)
+        except KeyboardInterrupt:
+            logger.info(f"Worker {self.worker_id} interrupted")
+        finally:
+            self.queue.unregister(self.worker_id)
+        return completed
+
+
+def run_worker(db_path, cache_dir='data/backtest_cache', checkpoint_dir='data/backtest_checkpoints',
+               data_loader=None, poll_interval=1.0, stop_when_idle=False):
+    """
+    จุดเริ่มของ worker process (ใช้กับ multiprocessing)
+    
+    Args:
+        db_path: ไฟล์คิวของ JobQueue
+        cache_dir: โฟลเดอร์ BacktestCache สำหรับผลลัพธ์
+        checkpoint_dir: โฟลเดอร์ BacktestCheckpoint (None = ไม่ใช้ checkpoint)
+        data_loader: ฟังก์ชันโหลดข้อมูลราคา (ดู BacktestWorker)
+        poll_interval: เวลารอเมื่อคิวว่าง (วินาที)
+        stop_when_idle: หยุดเมื่อคิวว่าง
+    
+    Returns:
+        int: จำนวนงานที่รัน
+    """
+    worker = BacktestWorker(
+        JobQueue(db_path),
+        cache=BacktestCache(cache_dir),
+        checkpoint=BacktestCheckpoint(checkpoint_dir) if checkpoint_dir else None,
+        data_loader=data_loader,
+    )
+    return worker.run_forever(poll_interval=poll_interval, stop_when_idle=stop_when_idle)
+
+
+class WorkerPool:
+    """กลุ่ม worker processes บนเครื่องเดียว"""
+    
+    def __init__(self, n_workers=2, db_path='data/backtest_jobs/jobs.db', cache_dir='data/backtest_cache',
+                 checkpoint_dir='data/backtest_checkpoints', data_loader=None, poll_interval=1.0):
+        """
+        Initialize WorkerPool
+        
+        Args:
+            n_workers: จำนวน worker processes
+            db_path: ไฟล์คิวของ JobQueue
+            cache_dir: โฟลเดอร์ BacktestCache สำหรับผลลัพธ์
+            checkpoint_dir: โฟลเดอร์ BacktestCheckpoint (None = ไม่ใช้ checkpoint)
+            data_loader: ฟังก์ชันโหลดข้อมูลราคา (ต้อง pickle ได้ถ้าใช้ spawn)
+            poll_interval: เวลารอเมื่อคิวว่าง (วินาที)
+        """
+        self.n_workers = max(1, int(n_workers))
+        self.worker_kwargs = {
+            'db_path': db_path,
+            'cache_dir': cache_dir,
+            'checkpoint_dir': checkpoint_dir,
+            'data_loader': data_loader,
+            'poll_interval': poll_interval,
+        }
+        self.processes = []
+        JobQueue(db_path)  # สร้าง schema ก่อน workers เริ่ม
+    
+    def start(self, stop_when_idle=False):
+        """เริ่ม worker processes"""
+        for _ in range(self.n_workers):
+            process = multiprocessing.Process(
+                target=run_worker, kwargs={**self.worker_kwargs, 'stop_when_idle': stop_when_idle},
+                daemon=True)
+            process.start()
+            self.processes.append(process)
+        logger.info(f"Started {self.n_workers} backtest worker(s)")
+    
+    def join(self, timeout=None):
+        """รอให้ worker processes หยุด"""
+        for process in self.processes:
+            process.join(timeout)
+    
+    def stop(self, timeout=5):
+        """หยุด worker processes (งานที่ค้างจะถูกส่งกลับเข้าคิวด้วย requeue_stale)"""
+        for process in self.processes:
+            if process.is_alive():
+                process.terminate()
+        self.join(timeout)
+        self.processes = []
+    
+    def __enter__(self):
+        self.start()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
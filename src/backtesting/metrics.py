@@ -7,6 +7,132 @@ import numpy as np
 import pandas as pd
 from typing import List
 
+TRADING_DAYS = 252
+
+RELATIVE_COLUMNS = [
+    'observations', 'alpha', 'beta', 'correlation', 'tracking_error', 'information_ratio',
+]
+
+ROLLING_METRICS = ('volatility', 'sharpe_ratio', 'sortino_ratio', 'max_drawdown', 'beta')
+
+BATCH_COLUMNS = [
+    'observations', 'total_return', 'volatility', 'sharpe_ratio', 'sortino_ratio',
+    'max_drawdown', 'max_drawdown_duration', 'time_under_water',
+]
+
+
+def _as_2d(data):
+    """
+    แปลงข้อมูลหลายชุดเป็น array 2 มิติ (เวลา × runs) โดย NaN = ไม่มีข้อมูล
+    
+    รับ DataFrame (คอลัมน์ = runs), array 2 มิติ, หรือ dict/list ของ Series
+    ที่ยาวไม่เท่ากัน (จัดแนวตาม index แล้วเติม NaN)
+    
+    Returns:
+        tuple: (values 2D float, ชื่อ runs)
+    """
+    if isinstance(data, dict):
+        data = pd.concat(data, axis=1)
+    elif isinstance(data, (list, tuple)) and data and isinstance(data[0], pd.Series):
+        data = pd.concat(list(data), axis=1, keys=range(len(data)))
+    
+    if isinstance(data, pd.DataFrame):
+        return data.to_numpy(dtype=float), list(data.columns)
+    
+    values = np.asarray(data, dtype=float)
+    if values.ndim == 1:
+        values = values[:, None]
+    return values, list(range(values.shape[1]))
+
+
+def _masked_mean_std(values, mask):
+    """
+    ค่าเฉลี่ยและส่วนเบี่ยงเบนมาตรฐาน (ddof=1 เหมือน pandas) ของแต่ละคอลัมน์เฉพาะค่าที่ mask = True
+    
+    Returns:
+        tuple: (mean, std, count) แต่ละตัวเป็น array ยาวเท่าจำนวนคอลัมน์ (NaN ถ้าข้อมูลไม่พอ)
+    """
+    count = mask.sum(axis=0)
+    filled = np.where(mask, values, 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = filled.sum(axis=0) / count
+        squared = np.where(mask, (values - mean) ** 2, 0.0).sum(axis=0)
+        std = np.sqrt(squared / (count - 1))
+    return mean, np.where(count > 1, std, np.nan), count
+
+
+def _prefix_sums(values, mask):
+    """
+    ผลรวมสะสม (cumsum) ของจำนวน, ผลรวม และผลรวมกำลังสอง สำหรับคำนวณสถิติแบบ rolling
+    
+    ค่าถูกเลื่อนด้วยค่าเฉลี่ยก่อนยกกำลังสองเพื่อลดความคลาดเคลื่อนจากการลบเลขใกล้กัน
+    (variance ไม่เปลี่ยนเมื่อเลื่อนค่า)
+    
+    Returns:
+        tuple: (count, sum, sum_sq, shift) โดย prefix มีความยาว n + 1
+    """
+    shift = values[mask].mean() if mask.any() else 0.0
+    centered = np.where(mask, values - shift, 0.0)
+    count = np.concatenate(([0], np.cumsum(mask)))
+    total = np.concatenate(([0.0], np.cumsum(centered)))
+    total_sq = np.concatenate(([0.0], np.cumsum(centered * centered)))
+    return count, total, total_sq, shift
+
+
+def _window_diff(prefix, window):
+    """ผลรวมในหน้าต่างที่จบ ณ แต่ละจุด (NaN สำหรับ window - 1 จุดแรก)"""
+    result = np.full(len(prefix) - 1, np.nan)
+    if window <= len(result):
+        result[window - 1:] = prefix[window:] - prefix[:-window]
+    return result
+
+
+def _window_mean_std(prefix, window, min_periods=2):
+    """
+    ค่าเฉลี่ยและ std (ddof=1) แบบ rolling จาก prefix sums
+    (NaN ถ้าจำนวนข้อมูลในหน้าต่างน้อยกว่า min_periods)
+    """
+    count, total, total_sq, shift = prefix
+    n = _window_diff(count.astype(float), window)
+    s = _window_diff(total, window)
+    ss = _window_diff(total_sq, window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = s / n
+        variance = np.maximum(ss - s * mean, 0.0) / (n - 1)
+    enough = n >= max(min_periods, 1)
+    return np.where(enough, mean + shift, np.nan), np.where(enough & (n > 1), np.sqrt(variance), np.nan)
+
+
+def _drawdown_tables(values, levels):
+    """
+    ตาราง doubling สำหรับ rolling max drawdown
+    
+    ระดับ k เก็บ (peak, trough, max drawdown) ของช่วงยาว 2^k ที่เริ่มต้น ณ แต่ละจุด
+    ช่วงที่ต่อกันรวมได้ด้วย: drawdown = max(ซ้าย, ขวา, 1 - trough ขวา / peak ซ้าย)
+    
+    Returns:
+        list: [(peak, trough, drawdown), ...] ยาว levels ระดับ
+    """
+    values = np.asarray(values, dtype=float)
+    tables = [(values, values, np.where(np.isnan(values), np.nan, 0.0))]
+    for level in range(1, levels):
+        half = 1 << (level - 1)
+        peak, trough, drawdown = tables[-1]
+        if len(peak) <= half:
+            break
+        with np.errstate(divide='ignore', invalid='ignore'):
+            merged = np.fmax(np.fmax(drawdown[:-half], drawdown[half:]), 1 - trough[half:] / peak[:-half])
+        tables.append((np.fmax(peak[:-half], peak[half:]), np.fmin(trough[:-half], trough[half:]), merged))
+    return tables
+
+
+def _as_series(data):
+    """แปลง Series/array เป็น (values float, index)"""
+    if isinstance(data, pd.Series):
+        return data.to_numpy(dtype=float), data.index
+    values = np.asarray(data, dtype=float)
+    return values, pd.RangeIndex(len(values))
+
 
 class PerformanceMetrics:
     """คำนวณ performance metrics สำหรับ backtesting"""
@@ -69,33 +195,95 @@ class PerformanceMetrics:
         Returns:
             tuple: (max_drawdown_pct, max_drawdown_duration_days)
         """
-        if len(equity_curve) == 0:
-            return 0, 0
-        
-        # คำนวณ running maximum
-        running_max = equity_curve.cummax()
-        
-        # คำนวณ drawdown
-        drawdown = (equity_curve - running_max) / running_max * 100
-        max_drawdown = drawdown.min()
-        
-        # คำนวณ duration
-        in_drawdown = False
-        drawdown_start = 0
-        max_duration = 0
-        current_duration = 0
-        
-        for i, dd in enumerate(drawdown):
-            if dd < 0 and not in_drawdown:
-                in_drawdown = True
-                drawdown_start = i
-            elif dd == 0 and in_drawdown:
-                in_drawdown = False
-                current_duration = i - drawdown_start
-                if current_duration > max_duration:
-                    max_duration = current_duration
+        analysis = PerformanceMetrics.analyze_drawdowns(equity_curve, top_n=0)
+        return analysis['max_drawdown'], analysis['max_duration']
+    
+    @staticmethod
+    def analyze_drawdowns(equity_curve, top_n=5, initial_value=None):
+        """
+        วิเคราะห์ Drawdown แบบ vectorized (run-length encoding ของช่วงที่ต่ำกว่าจุดสูงสุด)
         
-        return abs(max_drawdown), max_duration
+        Args:
+            equity_curve: Series/array ของมูลค่า portfolio
+            top_n: จำนวนช่วง drawdown ที่ลึกที่สุดที่ต้องการ
+            initial_value: จุดสูงสุดเริ่มต้น (เช่น เงินทุนเริ่มต้น); None = ใช้ค่าแรกของ equity
+            
+        Returns:
+            dict:
+                drawdown: Series ของ drawdown (%) ทุกจุด (ค่าลบหรือ 0)
+                max_drawdown: drawdown สูงสุด (%) เป็นค่าบวก
+                max_duration: ระยะเวลาใต้น้ำที่ยาวที่สุด (จำนวนแท่ง, รวมช่วงที่ยังไม่ฟื้นตัว)
+                underwater_bars: จำนวนแท่งที่อยู่ต่ำกว่าจุดสูงสุด
+                time_under_water: สัดส่วนเวลาที่อยู่ใต้น้ำ (%)
+                periods: DataFrame ของทุกช่วง drawdown (start, trough, recovery, depth,
+                         duration, recovery_bars, recovered)
+                top_drawdowns: periods ที่ลึกที่สุด top_n ช่วง
+        """
+        if isinstance(equity_curve, pd.DataFrame):
+            equity_curve = equity_curve['Portfolio Value']
+        index = equity_curve.index if isinstance(equity_curve, pd.Series) else None
+        values = np.asarray(equity_curve, dtype=float)
+        n = len(values)
+        if index is None:
+            index = pd.RangeIndex(n)
+        
+        empty_periods = pd.DataFrame(columns=['start', 'trough', 'recovery', 'depth', 'duration',
+                                              'recovery_bars', 'recovered'])
+        if n == 0:
+            return {
+                'drawdown': pd.Series(dtype=float),
+                'max_drawdown': 0,
+                'max_duration': 0,
+                'underwater_bars': 0,
+                'time_under_water': 0,
+                'periods': empty_periods,
+                'top_drawdowns': empty_periods,
+            }
+        
+        # จุดสูงสุดสะสม และ drawdown (%)
+        peak = np.maximum.accumulate(values if initial_value is None else np.maximum(values, initial_value))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            drawdown = np.where(peak > 0, values / peak - 1, 0.0) * 100
+        
+        # Run-length encoding ของช่วงใต้น้ำ: [start, end) โดย end = แท่งที่ฟื้นตัว (หรือ n)
+        underwater = drawdown < 0
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], underwater.view(np.int8), [0]))))
+        starts, ends = edges[0::2], edges[1::2]
+        lengths = ends - starts
+        
+        periods = empty_periods
+        if starts.size:
+            # จุดต่ำสุดของแต่ละช่วง: ค่าต่ำสุดด้วย reduceat แล้วหาตำแหน่งแรกที่เท่ากับค่านั้น
+            positions = np.flatnonzero(underwater)
+            offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+            depth = np.minimum.reduceat(drawdown[positions], offsets)
+            segment = np.repeat(np.arange(starts.size), lengths)
+            is_trough = drawdown[positions] == depth[segment]
+            _, first = np.unique(segment[is_trough], return_index=True)
+            troughs = positions[is_trough][first]
+            
+            recovered = ends < n
+            peak_positions = np.maximum(starts - 1, 0)
+            periods = pd.DataFrame({
+                'start': index[peak_positions],
+                'trough': index[troughs],
+                'recovery': pd.Series(index[np.minimum(ends, n - 1)]).where(recovered).to_numpy(),
+                'depth': -depth,
+                'duration': lengths,
+                'recovery_bars': np.where(recovered, ends - troughs, -1),
+                'recovered': recovered,
+            })
+        
+        underwater_bars = int(underwater.sum())
+        return {
+            'drawdown': pd.Series(drawdown, index=index),
+            'max_drawdown': float(-drawdown.min()),
+            'max_duration': int(lengths.max()) if lengths.size else 0,
+            'underwater_bars': underwater_bars,
+            'time_under_water': underwater_bars / n * 100,
+            'periods': periods,
+            'top_drawdowns': periods.sort_values('depth', ascending=False, kind='stable').head(top_n),
+        }
     
     @staticmethod
     def calculate_calmar_ratio(total_return, max_drawdown, years=1.0):
@@ -181,7 +369,7 @@ class PerformanceMetrics:
         
         # คำนวณ Beta (slope ของ regression)
         covariance = np.cov(portfolio_returns, benchmark_returns)[0][1]
-        benchmark_variance = np.var(benchmark_returns)
+        benchmark_variance = np.var(benchmark_returns, ddof=1)
         
         if benchmark_variance == 0:
             beta = 0
@@ -238,6 +426,471 @@ class PerformanceMetrics:
         
         return np.sqrt(252) * (excess_returns.mean() / tracking_error)
     
+    @staticmethod
+    def batch_returns(equity_curves):
+        """
+        คำนวณ returns รายวันของหลาย equity curves พร้อมกัน
+        
+        Args:
+            equity_curves: array 2 มิติ (เวลา × runs) หรือ DataFrame (NaN = ไม่มีข้อมูล)
+            
+        Returns:
+            np.ndarray: returns (เวลา × runs), NaN เมื่อวันนั้นหรือวันก่อนหน้าไม่มีข้อมูล
+        """
+        values, _ = _as_2d(equity_curves)
+        returns = np.full(values.shape, np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns[1:] = values[1:] / values[:-1] - 1
+        return returns
+    
+    @staticmethod
+    def batch_sharpe_ratio(returns, risk_free_rate=0.02):
+        """
+        คำนวณ Sharpe Ratio ของทุกคอลัมน์ (เวลา × runs) ในครั้งเดียว
+        
+        Args:
+            returns: array 2 มิติของ returns (NaN = ไม่มีข้อมูล)
+            risk_free_rate: อัตราดอกเบี้ยปลอดความเสี่ยง (default 2%)
+            
+        Returns:
+            np.ndarray: Sharpe Ratio ต่อ run (0 ถ้าข้อมูลไม่พอหรือ std = 0)
+        """
+        returns, _ = _as_2d(returns)
+        excess = returns - (risk_free_rate / TRADING_DAYS)
+        mean, std, _ = _masked_mean_std(excess, ~np.isnan(returns))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sharpe = np.sqrt(TRADING_DAYS) * mean / std
+        return np.where(np.isfinite(sharpe), sharpe, 0.0)
+    
+    @staticmethod
+    def batch_sortino_ratio(returns, risk_free_rate=0.02):
+        """
+        คำนวณ Sortino Ratio ของทุกคอลัมน์ (เวลา × runs) ในครั้งเดียว
+        
+        Args:
+            returns: array 2 มิติของ returns (NaN = ไม่มีข้อมูล)
+            risk_free_rate: อัตราดอกเบี้ยปลอดความเสี่ยง
+            
+        Returns:
+            np.ndarray: Sortino Ratio ต่อ run (0 ถ้าไม่มี downside returns)
+        """
+        returns, _ = _as_2d(returns)
+        valid = ~np.isnan(returns)
+        excess_mean, _, _ = _masked_mean_std(returns - (risk_free_rate / TRADING_DAYS), valid)
+        _, downside_std, _ = _masked_mean_std(returns, valid & (returns < 0))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sortino = np.sqrt(TRADING_DAYS) * excess_mean / downside_std
+        return np.where(np.isfinite(sortino), sortino, 0.0)
+    
+    @staticmethod
+    def batch_volatility(returns, annualize=True):
+        """
+        คำนวณ Volatility ของทุกคอลัมน์ (เวลา × runs) ในครั้งเดียว
+        
+        Args:
+            returns: array 2 มิติของ returns (NaN = ไม่มีข้อมูล)
+            annualize: แปลงเป็นรายปีหรือไม่
+            
+        Returns:
+            np.ndarray: Volatility ต่อ run
+        """
+        returns, _ = _as_2d(returns)
+        _, std, _ = _masked_mean_std(returns, ~np.isnan(returns))
+        if annualize:
+            std = std * np.sqrt(TRADING_DAYS)
+        return np.where(np.isfinite(std), std, 0.0)
+    
+    @staticmethod
+    def batch_max_drawdown(equity_curves):
+        """
+        คำนวณ Max Drawdown ของทุกคอลัมน์ (เวลา × runs) ในครั้งเดียว
+        
+        Args:
+            equity_curves: array 2 มิติของมูลค่า portfolio (NaN = ไม่มีข้อมูล)
+            
+        Returns:
+            dict: max_drawdown (%), max_duration (แท่ง), time_under_water (%) เป็น array ต่อ run
+        """
+        values, _ = _as_2d(equity_curves)
+        valid = ~np.isnan(values)
+        
+        # fmax ข้าม NaN ทำให้ peak ต่อเนื่องผ่านช่วงที่ไม่มีข้อมูล
+        peak = np.fmax.accumulate(values, axis=0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            drawdown = np.where(valid & (peak > 0), values / peak - 1, 0.0) * 100
+        underwater = drawdown < 0
+        
+        # ความยาวช่วงใต้น้ำต่อเนื่อง: cumsum ลบด้วย cumsum ณ จุดที่ออกจากใต้น้ำล่าสุด
+        running = np.cumsum(underwater, axis=0)
+        run_length = running - np.maximum.accumulate(np.where(underwater, 0, running), axis=0)
+        
+        count = valid.sum(axis=0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            time_under_water = np.where(count > 0, underwater.sum(axis=0) / count * 100, 0.0)
+        
+        return {
+            'max_drawdown': -drawdown.min(axis=0) if len(values) else np.zeros(values.shape[1]),
+            'max_duration': run_length.max(axis=0) if len(values) else np.zeros(values.shape[1], dtype=int),
+            'time_under_water': time_under_water,
+        }
+    
+    @staticmethod
+    def generate_batch_report(equity_curves, risk_free_rate=0.02):
+        """
+        สร้างตารางสรุป metrics ของหลาย equity curves พร้อมกัน (เช่น ผลลัพธ์จาก optimizer)
+        
+        Args:
+            equity_curves: DataFrame (คอลัมน์ = runs), array 2 มิติ (เวลา × runs),
+                           หรือ dict/list ของ Series ที่ยาวไม่เท่ากัน
+            risk_free_rate: อัตราดอกเบี้ยปลอดความเสี่ยง
+            
+        Returns:
+            pd.DataFrame: หนึ่งแถวต่อ run (index = ชื่อ run, คอลัมน์ตาม BATCH_COLUMNS)
+        """
+        values, names = _as_2d(equity_curves)
+        valid = ~np.isnan(values)
+        returns = PerformanceMetrics.batch_returns(values)
+        drawdowns = PerformanceMetrics.batch_max_drawdown(values)
+        
+        # ค่าแรกและค่าสุดท้ายที่มีข้อมูลของแต่ละ run
+        columns = np.arange(values.shape[1])
+        observations = valid.sum(axis=0)
+        first = values[valid.argmax(axis=0), columns] if len(values) else np.full(values.shape[1], np.nan)
+        last = values[len(values) - 1 - valid[::-1].argmax(axis=0), columns] if len(values) else first
+        with np.errstate(divide='ignore', invalid='ignore'):
+            total_return = np.where(observations > 0, (last / first - 1) * 100, 0.0)
+        
+        report = pd.DataFrame({
+            'observations': observations,
+            'total_return': total_return,
+            'volatility': PerformanceMetrics.batch_volatility(returns) * 100,  # เป็น %
+            'sharpe_ratio': PerformanceMetrics.batch_sharpe_ratio(returns, risk_free_rate),
+            'sortino_ratio': PerformanceMetrics.batch_sortino_ratio(returns, risk_free_rate),
+            'max_drawdown': drawdowns['max_drawdown'],
+            'max_drawdown_duration': drawdowns['max_duration'],
+            'time_under_water': drawdowns['time_under_water'],
+        }, index=pd.Index(names, name='run'), columns=BATCH_COLUMNS)
+        return report
+    
+    @staticmethod
+    def chunked_equity_stats(chunks, initial_value=None, risk_free_rate=0.02):
+        """
+        สรุป metrics ของ equity curve ที่อ่านทีละก้อน (out-of-core) โดยใช้หน่วยความจำคงที่
+        
+        ส่งต่อสถานะระหว่างก้อน: ค่าสุดท้าย (สำหรับ return ข้ามก้อน), peak, ความยาวช่วงใต้น้ำ
+        และสถิติ returns ที่รวมกันแบบ parallel variance (Chan et al.)
+        
+        Args:
+            chunks: iterable ของ array มูลค่า portfolio ตามลำดับเวลา
+            initial_value: จุดสูงสุดเริ่มต้น (เช่น เงินทุนเริ่มต้น)
+            risk_free_rate: อัตราดอกเบี้ยปลอดความเสี่ยง
+            
+        Returns:
+            dict: observations, final_value, max_drawdown, max_drawdown_duration, time_under_water,
+                  volatility (%), sharpe_ratio, sortino_ratio
+        """
+        def merge(stats, values):
+            # รวม (count, mean, M2) ของก้อนใหม่เข้ากับสถิติสะสม
+            count, mean, m2 = stats
+            n = values.size
+            if n == 0:
+                return stats
+            chunk_mean = values.mean()
+            chunk_m2 = ((values - chunk_mean) ** 2).sum()
+            total = count + n
+            delta = chunk_mean - mean
+            return total, mean + delta * n / total, m2 + chunk_m2 + delta * delta * count * n / total
+        
+        observations = 0
+        last = np.nan
+        peak = -np.inf if initial_value is None else float(initial_value)
+        max_drawdown = 0.0
+        run = longest = underwater_bars = 0
+        returns_stats = downside_stats = (0, 0.0, 0.0)
+        
+        for chunk in chunks:
+            values = np.asarray(chunk, dtype=float)
+            if values.size == 0:
+                continue
+            observations += values.size
+            
+            # returns รวมจุดต่อระหว่างก้อนก่อนหน้า
+            with np.errstate(divide='ignore', invalid='ignore'):
+                returns = np.diff(np.concatenate(([last], values))) / np.concatenate(([last], values[:-1]))
+            returns = returns[np.isfinite(returns)]
+            returns_stats = merge(returns_stats, returns)
+            downside_stats = merge(downside_stats, returns[returns < 0])
+            last = values[-1]
+            
+            # drawdown โดยเริ่มจาก peak ของก้อนก่อนหน้า
+            peaks = np.maximum.accumulate(np.maximum(values, peak))
+            peak = peaks[-1]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                drawdown = np.where(peaks > 0, 1 - values / peaks, 0.0)
+            max_drawdown = max(max_drawdown, float(drawdown.max()) * 100)
+            
+            # ความยาวช่วงใต้น้ำต่อเนื่อง (ต่อจากช่วงที่ค้างจากก้อนก่อนหน้า)
+            underwater = drawdown > 0
+            underwater_bars += int(underwater.sum())
+            running = np.cumsum(underwater) + run
+            lengths = running - np.maximum.accumulate(np.where(underwater, 0, running))
+            longest = max(longest, int(lengths.max()))
+            run = int(lengths[-1])
+        
+        count, mean, m2 = returns_stats
+        std = np.sqrt(m2 / (count - 1)) if count > 1 else 0.0
+        downside_std = np.sqrt(downside_stats[2] / (downside_stats[0] - 1)) if downside_stats[0] > 1 else 0.0
+        excess = mean - risk_free_rate / TRADING_DAYS
+        
+        return {
+            'observations': observations,
+            'final_value': float(last) if observations else 0.0,
+            'max_drawdown': max_drawdown,
+            'max_drawdown_duration': longest,
+            'time_under_water': underwater_bars / observations * 100 if observations else 0.0,
+            'volatility': std * np.sqrt(TRADING_DAYS) * 100,
+            'sharpe_ratio': np.sqrt(TRADING_DAYS) * excess / std if std > 0 else 0.0,
+            'sortino_ratio': np.sqrt(TRADING_DAYS) * excess / downside_std if downside_std > 0 else 0.0,
+        }
+    
+    @staticmethod
+    def batch_relative_metrics(returns, benchmark_returns):
+        """
+        คำนวณ Alpha, Beta, Tracking Error และ Information Ratio ของทุกคอลัมน์เทียบกับ benchmark
+        ในการคำนวณ covariance ครั้งเดียว (นิยามเดียวกับ calculate_alpha_beta /
+        calculate_information_ratio)
+        
+        Args:
+            returns: DataFrame/array 2 มิติของ returns (เวลา × หุ้นหรือ backtests, NaN = ไม่มีข้อมูล)
+            benchmark_returns: returns ของ benchmark ที่จัดแนวกับแถวของ returns แล้ว
+            
+        Returns:
+            pd.DataFrame: หนึ่งแถวต่อคอลัมน์ (คอลัมน์ตาม RELATIVE_COLUMNS, tracking_error เป็น % ต่อปี)
+        """
+        values, names = _as_2d(returns)
+        benchmark = np.asarray(benchmark_returns, dtype=float).reshape(-1, 1)
+        valid = ~np.isnan(values) & ~np.isnan(benchmark)
+        
+        # ใช้เฉพาะวันที่มีข้อมูลทั้งสองฝั่ง (mask แยกต่อคอลัมน์)
+        mean, std, count = _masked_mean_std(values, valid)
+        benchmark_2d = np.broadcast_to(benchmark, values.shape)
+        benchmark_mean, benchmark_std, _ = _masked_mean_std(benchmark_2d, valid)
+        excess_mean, excess_std, _ = _masked_mean_std(values - benchmark, valid)
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            products = np.where(valid, (values - mean) * (benchmark_2d - benchmark_mean), 0.0)
+            covariance = products.sum(axis=0) / (count - 1)
+            beta = covariance / benchmark_std ** 2
+            correlation = covariance / (std * benchmark_std)
+            information_ratio = np.sqrt(TRADING_DAYS) * excess_mean / excess_std
+        beta = np.where(np.isfinite(beta), beta, 0.0)
+        
+        return pd.DataFrame({
+            'observations': count,
+            'alpha': np.where(count > 0, mean - beta * benchmark_mean, 0.0),
+            'beta': beta,
+            'correlation': np.where(np.isfinite(correlation), correlation, 0.0),
+            'tracking_error': np.where(np.isfinite(excess_std), excess_std * np.sqrt(TRADING_DAYS) * 100, 0.0),
+            'information_ratio': np.where(np.isfinite(information_ratio), information_ratio, 0.0),
+        }, index=pd.Index(names, name='run'), columns=RELATIVE_COLUMNS)
+    
+    @staticmethod
+    def rolling_volatility(returns, window=63, annualize=True):
+        """
+        คำนวณ Volatility แบบ rolling (ใช้ cumulative sums, O(n) ต่อหน้าต่าง)
+        
+        Args:
+            returns: Series ของ returns (NaN = ไม่มีข้อมูล)
+            window: จำนวนแท่งต่อหน้าต่าง
+            annualize: แปลงเป็นรายปีหรือไม่
+            
+        Returns:
+            pd.Series: Volatility (%) ณ แต่ละจุด เหมือนคอลัมน์ใน rolling_metrics (NaN จนกว่าจะครบหน้าต่าง)
+        """
+        values, index = _as_series(returns)
+        _, std = _window_mean_std(_prefix_sums(values, ~np.isnan(values)), window, window)
+        if annualize:
+            std = std * np.sqrt(TRADING_DAYS)
+        return pd.Series(std * 100, index=index, name=f'volatility_{window}')
+    
+    @staticmethod
+    def rolling_sharpe_ratio(returns, window=63, risk_free_rate=0.02):
+        """
+        คำนวณ Sharpe Ratio แบบ rolling (นิยามเดียวกับ calculate_sharpe_ratio)
+        
+        Args:
+            returns: Series ของ returns (NaN = ไม่มีข้อมูล)
+            window: จำนวนแท่งต่อหน้าต่าง
+            risk_free_rate: อัตราดอกเบี้ยปลอดความเสี่ยง (default 2%)
+            
+        Returns:
+            pd.Series: Sharpe Ratio ณ แต่ละจุด (NaN ถ้าข้อมูลไม่พอหรือ std = 0)
+        """
+        values, index = _as_series(returns)
+        mean, std = _window_mean_std(_prefix_sums(values, ~np.isnan(values)), window, window)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sharpe = np.sqrt(TRADING_DAYS) * (mean - risk_free_rate / TRADING_DAYS) / std
+        return pd.Series(np.where(np.isfinite(sharpe), sharpe, np.nan), index=index,
+                         name=f'sharpe_ratio_{window}')
+    
+    @staticmethod
+    def rolling_sortino_ratio(returns, window=63, risk_free_rate=0.02):
+        """
+        คำนวณ Sortino Ratio แบบ rolling (นิยามเดียวกับ calculate_sortino_ratio)
+        
+        Args:
+            returns: Series ของ returns (NaN = ไม่มีข้อมูล)
+            window: จำนวนแท่งต่อหน้าต่าง
+            risk_free_rate: อัตราดอกเบี้ยปลอดความเสี่ยง
+            
+        Returns:
+            pd.Series: Sortino Ratio ณ แต่ละจุด (NaN ถ้า downside returns ในหน้าต่างไม่พอ)
+        """
+        values, index = _as_series(returns)
+        valid = ~np.isnan(values)
+        mean, _ = _window_mean_std(_prefix_sums(values, valid), window, window)
+        _, downside_std = _window_mean_std(_prefix_sums(values, valid & (values < 0)), window)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sortino = np.sqrt(TRADING_DAYS) * (mean - risk_free_rate / TRADING_DAYS) / downside_std
+        return pd.Series(np.where(np.isfinite(sortino), sortino, np.nan), index=index,
+                         name=f'sortino_ratio_{window}')
+    
+    @staticmethod
+    def rolling_beta(returns, benchmark_returns, window=63):
+        """
+        คำนวณ Beta แบบ rolling (slope ของ regression: cov(r, b) / var(b))
+        
+        Args:
+            returns: Series ของ returns ของ portfolio/หุ้น
+            benchmark_returns: Series ของ benchmark returns (จัดแนวตาม index)
+            window: จำนวนแท่งต่อหน้าต่าง
+            
+        Returns:
+            pd.Series: Beta ณ แต่ละจุด (NaN ถ้าข้อมูลไม่พอหรือ var = 0)
+        """
+        if isinstance(returns, pd.Series) and isinstance(benchmark_returns, pd.Series):
+            benchmark_returns = benchmark_returns.reindex(returns.index)
+        x, index = _as_series(returns)
+        y, _ = _as_series(benchmark_returns)
+        valid = ~np.isnan(x) & ~np.isnan(y)
+        
+        x_prefix = _prefix_sums(x, valid)
+        y_prefix = _prefix_sums(y, valid)
+        xc = np.where(valid, x - x_prefix[3], 0.0)
+        yc = np.where(valid, y - y_prefix[3], 0.0)
+        
+        n = _window_diff(x_prefix[0].astype(float), window)
+        sx = _window_diff(x_prefix[1], window)
+        sy = _window_diff(y_prefix[1], window)
+        syy = _window_diff(y_prefix[2], window)
+        sxy = _window_diff(np.concatenate(([0.0], np.cumsum(xc * yc))), window)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            beta = (sxy - sx * sy / n) / (syy - sy * sy / n)
+        return pd.Series(np.where(np.isfinite(beta) & (n >= window) & (n > 1), beta, np.nan), index=index,
+                         name=f'beta_{window}')
+    
+    @staticmethod
+    def rolling_max_drawdown(equity_curve, window=63, tables=None):
+        """
+        คำนวณ Max Drawdown แบบ rolling (peak เริ่มใหม่ในแต่ละหน้าต่าง)
+        
+        ใช้ตาราง doubling (สถิติของช่วงยาว 2^k ทุกจุดเริ่มต้น) แล้วต่อช่วงตาม bit ของ window
+        จึงใช้เวลา O(n log window) แทน O(n × window)
+        
+        Args:
+            equity_curve: Series ของมูลค่า portfolio หรือราคา
+            window: จำนวนแท่งต่อหน้าต่าง
+            tables: ตารางจาก _drawdown_tables() (ใช้ร่วมกันหลายหน้าต่าง)
+            
+        Returns:
+            pd.Series: Max Drawdown (%) ค่าบวก ณ แต่ละจุด (NaN จนกว่าจะครบหน้าต่าง)
+        """
+        values, index = _as_series(equity_curve)
+        result = np.full(len(values), np.nan)
+        if 0 < window <= len(values):
+            if tables is None or len(tables) < window.bit_length():
+                tables = _drawdown_tables(values, window.bit_length())
+            count = len(values) - window + 1
+            peak = trough = drawdown = None
+            offset = 0
+            for level in range(window.bit_length() - 1, -1, -1):
+                if not window & (1 << level):
+                    continue
+                block_peak, block_trough, block_drawdown = (
+                    table[offset:offset + count] for table in tables[level])
+                if peak is None:
+                    peak, trough, drawdown = block_peak, block_trough, block_drawdown
+                else:
+                    with np.errstate(divide='ignore', invalid='ignore'):
+                        drawdown = np.fmax(np.fmax(drawdown, block_drawdown), 1 - block_trough / peak)
+                    peak, trough = np.fmax(peak, block_peak), np.fmin(trough, block_trough)
+                offset += 1 << level
+            result[window - 1:] = drawdown * 100
+        return pd.Series(result, index=index, name=f'max_drawdown_{window}')
+    
+    @staticmethod
+    def rolling_metrics(equity_curve, windows=(21, 63, 126, 252), benchmark=None, risk_free_rate=0.02,
+                        metrics=ROLLING_METRICS):
+        """
+        คำนวณ rolling metrics หลายหน้าต่างพร้อมกัน สำหรับกราฟใน dashboard และการวิเคราะห์ regime
+        
+        Args:
+            equity_curve: Series ของมูลค่า portfolio หรือราคาหุ้น (หรือ DataFrame ที่มี 'Portfolio Value')
+            windows: ขนาดหน้าต่าง (จำนวนแท่ง)
+            benchmark: Series ราคาของ benchmark เช่น SPY (จำเป็นสำหรับ beta)
+            risk_free_rate: อัตราดอกเบี้ยปลอดความเสี่ยง
+            metrics: metrics ที่ต้องการ (ย่อยของ ROLLING_METRICS)
+            
+        Returns:
+            pd.DataFrame: คอลัมน์ '{metric}_{window}' (index เดียวกับ equity curve)
+        """
+        unknown = set(metrics) - set(ROLLING_METRICS)
+        if unknown:
+            raise ValueError(f"Unknown rolling metrics: {sorted(unknown)}. Use {ROLLING_METRICS}")
+        
+        if isinstance(equity_curve, pd.DataFrame):
+            equity_curve = equity_curve['Portfolio Value']
+        values, index = _as_series(equity_curve)
+        returns = np.full(len(values), np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns[1:] = values[1:] / values[:-1] - 1
+        
+        # prefix sums และตาราง drawdown คำนวณครั้งเดียว ใช้ร่วมกันทุกหน้าต่าง
+        valid = ~np.isnan(returns)
+        tables = _drawdown_tables(values, max(windows).bit_length()) if 'max_drawdown' in metrics else None
+        prefix = _prefix_sums(returns, valid)
+        downside_prefix = _prefix_sums(returns, valid & (returns < 0))
+        
+        benchmark_returns = None
+        if 'beta' in metrics and benchmark is not None:
+            if isinstance(benchmark, pd.Series):
+                benchmark_prices = benchmark.reindex(index)
+            else:
+                benchmark_prices = pd.Series(np.asarray(benchmark, dtype=float), index=index)
+            benchmark_returns = benchmark_prices.pct_change(fill_method=None)
+        
+        columns = {}
+        for window in windows:
+            mean, std = _window_mean_std(prefix, window, window)
+            excess = mean - risk_free_rate / TRADING_DAYS
+            with np.errstate(divide='ignore', invalid='ignore'):
+                if 'volatility' in metrics:
+                    columns[f'volatility_{window}'] = std * np.sqrt(TRADING_DAYS) * 100  # เป็น %
+                if 'sharpe_ratio' in metrics:
+                    sharpe = np.sqrt(TRADING_DAYS) * excess / std
+                    columns[f'sharpe_ratio_{window}'] = np.where(np.isfinite(sharpe), sharpe, np.nan)
+                if 'sortino_ratio' in metrics:
+                    sortino = np.sqrt(TRADING_DAYS) * excess / _window_mean_std(downside_prefix, window)[1]
+                    columns[f'sortino_ratio_{window}'] = np.where(np.isfinite(sortino), sortino, np.nan)
+            if 'max_drawdown' in metrics:
+                columns[f'max_drawdown_{window}'] = PerformanceMetrics.rolling_max_drawdown(
+                    values, window, tables).to_numpy()
+            if benchmark_returns is not None:
+                columns[f'beta_{window}'] = PerformanceMetrics.rolling_beta(
+                    returns, benchmark_returns.to_numpy(dtype=float), window).to_numpy()
+        
+        return pd.DataFrame(columns, index=index)
+    
     @staticmethod
     def generate_report(backtest_results, equity_curve):
         """
@@ -259,9 +912,8 @@ class PerformanceMetrics:
         # คำนวณ metrics
         sharpe = PerformanceMetrics.calculate_sharpe_ratio(returns)
         sortino = PerformanceMetrics.calculate_sortino_ratio(returns)
-        max_dd, max_dd_duration = PerformanceMetrics.calculate_max_drawdown(
-            equity_curve['Portfolio Value']
-        )
+        drawdowns = PerformanceMetrics.analyze_drawdowns(equity_curve['Portfolio Value'], top_n=0)
+        max_dd, max_dd_duration = drawdowns['max_drawdown'], drawdowns['max_duration']
         volatility = PerformanceMetrics.calculate_volatility(returns)
         
         # คำนวณ Calmar Ratio
@@ -280,6 +932,7 @@ class PerformanceMetrics:
             'sortino_ratio': sortino,
             'max_drawdown': max_dd,
             'max_drawdown_duration': max_dd_duration,
+            'time_under_water': drawdowns['time_under_water'],
             'volatility': volatility * 100,  # เป็น %
             'calmar_ratio': calmar,
             'expectancy': expectancy,
@@ -0,0 +1,201 @@
+"""
+Multi-Strategy Runner
+เปรียบเทียบหลายกลยุทธ์บนข้อมูลชุดเดียว (โหลดข้อมูลและคำนวณ indicators ครั้งเดียว)
+"""
+
+import logging
+import numpy as np
+import pandas as pd
+
+from .backtester import Backtester, load_historical_data
+from .portfolio import PortfolioBacktester
+from .metrics import PerformanceMetrics
+from src.signals.generator import AISignalGenerator
+from src.utils.trading_calendar import TradingCalendar
+
+logger = logging.getLogger(__name__)
+
+STRATEGY_TYPES = ('technical', 'ai', 'combined')
+
+COMPARISON_COLUMNS = [
+    'strategy', 'min_confidence', 'total_return', 'final_capital', 'total_trades', 'win_rate',
+    'profit_factor', 'max_drawdown', 'sharpe_ratio', 'sortino_ratio', 'volatility',
+]
+
+
+class MultiStrategyRunner:
+    """
+    รันหลายกลยุทธ์พร้อมกันบนข้อมูลราคาและ indicators ชุดเดียวกัน
+    
+    ขั้นตอนที่แพง (ดึงข้อมูล, indicators, สัญญาณ technical, การทำนายของ AI) ทำครั้งเดียว
+    แต่ละกลยุทธ์เหลือเพียงการเลือกสัญญาณและการคำนวณบัญชีแบบ array ใน PortfolioBacktester
+    
+    กลยุทธ์:
+    - technical: สัญญาณจาก SignalGenerator
+    - ai: สัญญาณจาก AISignalGenerator (ต้องฝึก model แล้ว)
+    - combined: ซื้อ/ขายเมื่อ technical และ AI ให้สัญญาณตรงกัน (confidence = ค่าเฉลี่ย)
+    """
+    
+    def __init__(self,
+                 initial_capital=10000,
+                 commission=0.001,  # 0.1%
+                 slippage=0.0005,   # 0.05%
+                 position_size_pct=0.2,  # ใช้ 20% ของเงินสดต่อ trade
+                 max_positions=None,
+                 calendar=None,
+                 execution=None):
+        """
+        Initialize MultiStrategyRunner
+        
+        Args:
+            initial_capital: เงินทุนเริ่มต้น ($)
+            commission: ค่า commission (0.001 = 0.1%)
+            slippage: ค่า slippage (0.0005 = 0.05%)
+            position_size_pct: เปอร์เซ็นต์เงินสดต่อ trade
+            max_positions: จำนวน positions สูงสุดที่ถือพร้อมกัน
+            calendar: TradingCalendar สำหรับกำหนดวันทำการ (default NYSE)
+            execution: IntrabarExecution สำหรับ Stop Loss / Take Profit
+        """
+        self.calendar = calendar or TradingCalendar()
+        self.engine_params = {
+            'initial_capital': initial_capital,
+            'commission': commission,
+            'slippage': slippage,
+            'position_size_pct': position_size_pct,
+            'max_positions': max_positions,
+            'calendar': self.calendar,
+            'execution': execution,
+        }
+        self.results = {}
+    
+    @staticmethod
+    def normalize_strategies(strategies):
+        """
+        แปลงรายการกลยุทธ์ให้อยู่ในรูปแบบมาตรฐาน
+        
+        Args:
+            strategies: list ของ dict {'strategy', 'min_confidence', 'name' (optional)}
+                        หรือ tuple (strategy, min_confidence)
+        
+        Returns:
+            list: dict ที่มี name, strategy, min_confidence
+        """
+        normalized = []
+        for spec in strategies:
+            if not isinstance(spec, dict):
+                strategy, min_confidence = spec
+                spec = {'strategy': strategy, 'min_confidence': min_confidence}
+            
+            strategy = spec.get('strategy', 'technical')
+            if strategy not in STRATEGY_TYPES:
+                raise ValueError(f"Unknown strategy: {strategy}. Use one of {STRATEGY_TYPES}")
+            
+            min_confidence = float(spec.get('min_confidence', 0.6))
+            normalized.append({
+                'name': spec.get('name') or f"{strategy}@{min_confidence:.2f}",
+                'strategy': strategy,
+                'min_confidence': min_confidence,
+            })
+        return normalized
+    
+    def run(self, symbols, start_date, end_date, strategies, historical_data=None,
+            ai_generator=None, min_history=50, cache=None):
+        """
+        รันทุกกลยุทธ์และสร้างตารางเปรียบเทียบ
+        
+        Args:
+            symbols: รายการหุ้น
+            start_date: วันเริ่มต้น (YYYY-MM-DD)
+            end_date: วันสิ้นสุด (YYYY-MM-DD)
+            strategies: รายการกลยุทธ์ (ดู normalize_strategies)
+            historical_data: dict {symbol: DataFrame} ที่โหลดไว้แล้ว (ถ้าไม่ระบุจะดึงใหม่ครั้งเดียว)
+            ai_generator: AISignalGenerator ที่ฝึกแล้ว (จำเป็นสำหรับ 'ai' และ 'combined')
+            min_history: จำนวนแท่งขั้นต่ำก่อนเริ่มใช้สัญญาณ
+            cache: BacktestCache (optional) สำหรับใช้ indicator panels ซ้ำ
+        
+        Returns:
+            pd.DataFrame: ตารางเปรียบเทียบ (index = ชื่อกลยุทธ์)
+        """
+        strategies = self.normalize_strategies(strategies)
+        self.results = {}
+        
+        start_dt = pd.to_datetime(start_date)
+        end_dt = pd.to_datetime(end_date)
+        if historical_data is None:
+            historical_data = load_historical_data(symbols, start_dt, end_dt)
+        historical_data = {symbol: data for symbol, data in historical_data.items()
+                           if symbol in symbols and data is not None and not data.empty}
+        if not historical_data:
+            logger.error("No historical data available")
+            return pd.DataFrame(columns=['name'] + COMPARISON_COLUMNS).set_index('name')
+        
+        # ส่วนที่ใช้ร่วมกันทุกกลยุทธ์ (คำนวณครั้งเดียว)
+        frames = {symbol: panel['frame']
+                  for symbol, panel in Backtester.prepare_signal_panels(historical_data, cache).items()}
+        signals = {'technical': {symbol: frame[['buy', 'sell', 'confidence']]
+                                 for symbol, frame in frames.items()}}
+        
+        if any(spec['strategy'] != 'technical' for spec in strategies):
+            ai_signals = self._predict_ai(frames, ai_generator)
+            if ai_signals is not None:
+                signals['ai'] = ai_signals
+                signals['combined'] = self._combine(signals['technical'], ai_signals)
+        
+        prices = PortfolioBacktester.price_panels(historical_data, self.calendar.sessions(start_dt, end_dt))
+        enough_history = {symbol: pd.Series(np.arange(len(frame)) >= (min_history - 1), index=frame.index)
+                          for symbol, frame in frames.items()}
+        
+        # การคำนวณบัญชีของแต่ละกลยุทธ์
+        rows = []
+        for spec in strategies:
+            if spec['strategy'] not in signals:
+                logger.warning(f"Skipping strategy {spec['name']}: AI model not trained")
+                continue
+            
+            buys, sells, scores = {}, {}, {}
+            for symbol, frame in signals[spec['strategy']].items():
+                confident = (frame['confidence'] >= spec['min_confidence']) & enough_history[symbol]
+                buys[symbol] = (frame['buy'] == 1) & confident
+                sells[symbol] = (frame['sell'] == 1) & confident
+                scores[symbol] = frame['confidence']
+            
+            # engine ใหม่ต่อกลยุทธ์ เพื่อให้ trade log ของแต่ละผลลัพธ์แยกกัน
+            panels = PortfolioBacktester.signal_panels(buys, sells, scores, prices['close'])
+            engine = PortfolioBacktester(**self.engine_params)
+            results = engine.run(prices['close'], panels['buy'], panels['sell'], panels['score'],
+                                 prices['open'], prices['high'], prices['low'])
+            self.results[spec['name']] = results
+            rows.append(self._summary_row(spec, results))
+        
+        return pd.DataFrame(rows, columns=['name'] + COMPARISON_COLUMNS).set_index('name')
+    
+    @staticmethod
+    def _predict_ai(frames, ai_generator):
+        """ทำนายสัญญาณ AI ของทุกแท่งทุกหุ้น (เรียก model ครั้งเดียว)"""
+        if ai_generator is None or not ai_generator.trained:
+            return None
+        return ai_generator.predict_signals_panel(frames)
+    
+    @staticmethod
+    def _combine(technical, ai):
+        """สัญญาณเมื่อ technical และ AI ตรงกัน (confidence = ค่าเฉลี่ยของทั้งสอง)"""
+        return {symbol: AISignalGenerator.combine_signals(tech, ai[symbol]) for symbol, tech in technical.items()}
+    
+    @staticmethod
+    def _summary_row(spec, results):
+        """แถวสรุปผลของหนึ่งกลยุทธ์"""
+        report = PerformanceMetrics.generate_report(results, results['equity_curve'])
+        return {
+            'name': spec['name'],
+            'strategy': spec['strategy'],
+            'min_confidence': spec['min_confidence'],
+            'total_return': results['total_return'],
+            'final_capital': results['final_capital'],
+            'total_trades': results['total_trades'],
+            'win_rate': results['win_rate'],
+            'profit_factor': results['profit_factor'],
+            'max_drawdown': results['max_drawdown'],
+            'sharpe_ratio': report.get('sharpe_ratio', 0),
+            'sortino_ratio': report.get('sortino_ratio', 0),
+            'volatility': report.get('volatility', 0),
+        }
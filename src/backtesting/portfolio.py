@@ -0,0 +1,389 @@
+"""
+Portfolio Backtesting Engine
+ทดสอบกลยุทธ์ระดับ Portfolio ด้วยการคำนวณแบบ Array (วันที่ × หุ้น)
+"""
+
+import logging
+import pandas as pd
+import numpy as np
+
+from src.analysis.technical import TechnicalAnalyzer
+from src.signals.generator import SignalGenerator
+from .backtester import load_historical_data
+from .trade_log import TradeLog
+from .metrics import PerformanceMetrics
+from .execution import IntrabarExecution, EXIT_STOP, EXIT_TARGET, EXIT_REASONS
+from src.utils.trading_calendar import TradingCalendar
+
+logger = logging.getLogger(__name__)
+
+
+class PortfolioBacktester:
+    """
+    ระบบ Backtesting ระดับ Portfolio แบบ Array-based
+    
+    เก็บ cash, holdings และราคาเป็น array ขนาด (วันที่ × หุ้น) และจัดขนาด position
+    ของสัญญาณซื้อทั้งหมดในวันเดียวกันจากเงินสดก้อนเดียวกัน ผลลัพธ์จึงไม่ขึ้นกับลำดับหุ้น
+    
+    Features:
+    - จัดลำดับสัญญาณซื้อตาม score (เช่น confidence)
+    - จำกัดจำนวน positions ที่ถือพร้อมกัน
+    - Stop Loss / Take Profit ตรวจกับ High/Low ของทุกหุ้นพร้อมกัน
+    - รองรับ universe ขนาดหลายร้อยหุ้น
+    """
+    
+    def __init__(self,
+                 initial_capital=10000,
+                 commission=0.001,  # 0.1%
+                 slippage=0.0005,   # 0.05%
+                 position_size_pct=0.2,  # ใช้ 20% ของเงินสดต่อ trade
+                 max_positions=None,  # None = ไม่จำกัด
+                 calendar=None,
+                 execution=None):
+        """
+        Initialize PortfolioBacktester
+        
+        Args:
+            initial_capital: เงินทุนเริ่มต้น ($)
+            commission: ค่า commission (0.001 = 0.1%)
+            slippage: ค่า slippage (0.0005 = 0.05%)
+            position_size_pct: เปอร์เซ็นต์เงินสด (ต้นวัน) ต่อ trade
+            max_positions: จำนวน positions สูงสุดที่ถือพร้อมกัน
+            calendar: TradingCalendar สำหรับกำหนดวันทำการ (default NYSE)
+            execution: IntrabarExecution สำหรับ Stop Loss / Take Profit (default 3% / 5%)
+        """
+        self.initial_capital = initial_capital
+        self.commission = commission
+        self.slippage = slippage
+        self.position_size_pct = position_size_pct
+        self.max_positions = max_positions
+        self.calendar = calendar or TradingCalendar()
+        self.execution = execution or IntrabarExecution()
+        self.trade_log = TradeLog()
+        self.reset()
+    
+    def reset(self):
+        """รีเซ็ตสถานะทั้งหมด"""
+        self.capital = self.initial_capital
+        self.symbols = []
+        self.dates = pd.DatetimeIndex([])
+        self.cash = np.empty(0)
+        self.holdings = np.empty((0, 0))
+        self.equity = np.empty(0)
+        self.trade_log = TradeLog()  # ผลของรอบก่อน (results['trade_log']) ยังอ้างถึง log เดิม
+    
+    @staticmethod
+    def build_panels(historical_data, start_date, end_date, min_confidence=0.6, min_history=50,
+                     calendar=None):
+        """
+        สร้าง panel ราคาและสัญญาณ (วันที่ × หุ้น) จากข้อมูลย้อนหลัง
+        
+        Indicators ถูกคำนวณครั้งเดียวต่อหุ้นบนข้อมูลทั้งหมด แทนการคำนวณใหม่ทุกวัน
+        
+        Args:
+            historical_data: dict {symbol: DataFrame}
+            start_date: วันเริ่มต้น
+            end_date: วันสิ้นสุด
+            min_confidence: ความมั่นใจขั้นต่ำสำหรับสัญญาณ
+            min_history: จำนวนแท่งขั้นต่ำก่อนเริ่มใช้สัญญาณ (เหมือน Backtester)
+            calendar: TradingCalendar (แถวของ panel = วันทำการในช่วงที่ระบุ)
+        
+        Returns:
+            dict: {'close', 'open', 'high', 'low', 'buy', 'sell', 'score'} เป็น DataFrame (วันที่ × หุ้น)
+        """
+        analyzer = TechnicalAnalyzer()
+        signal_gen = SignalGenerator()
+        
+        buys, sells, scores = {}, {}, {}
+        for symbol, data in historical_data.items():
+            if data is None or data.empty:
+                continue
+            
+            indicators = analyzer.get_indicator_history(data)
+            signals = signal_gen.generate_signals_vectorized(indicators)
+            
+            enough_history = np.arange(len(data)) >= (min_history - 1)
+            confident = signals['confidence'].to_numpy() >= min_confidence
+            
+            buys[symbol] = pd.Series((signals['buy'].to_numpy() == 1) & confident & enough_history,
+                                     index=data.index)
+            sells[symbol] = pd.Series((signals['sell'].to_numpy() == 1) & confident & enough_history,
+                                      index=data.index)
+            scores[symbol] = signals['confidence']
+        
+        if not buys:
+            return {}
+        
+        calendar = calendar or TradingCalendar()
+        panels = PortfolioBacktester.price_panels(historical_data, calendar.sessions(start_date, end_date))
+        panels.update(PortfolioBacktester.signal_panels(buys, sells, scores, panels['close']))
+        return panels
+    
+    @staticmethod
+    def price_panels(historical_data, sessions):
+        """
+        สร้าง panel ราคา OHLC (วันทำการ × หุ้น)
+        
+        Args:
+            historical_data: dict {symbol: DataFrame}
+            sessions: DatetimeIndex ของวันทำการ
+        
+        Returns:
+            dict: {'close', 'open', 'high', 'low'} เป็น DataFrame; NaN = ไม่มีการซื้อขาย
+        """
+        frames = {column: {} for column in ('Close', 'Open', 'High', 'Low')}
+        for symbol, data in historical_data.items():
+            if data is None or data.empty:
+                continue
+            for column, series in frames.items():
+                series[symbol] = data[column] if column in data.columns else data['Close']
+        
+        return {column.lower(): pd.DataFrame(series).reindex(sessions).astype(float)
+                for column, series in frames.items()}
+    
+    @staticmethod
+    def signal_panels(buys, sells, scores, close):
+        """
+        จัดสัญญาณรายหุ้นให้อยู่ในรูป panel เดียวกับราคา
+        
+        Args:
+            buys: dict {symbol: Series (bool)} สัญญาณซื้อ
+            sells: dict {symbol: Series (bool)} สัญญาณขาย
+            scores: dict {symbol: Series} score สำหรับจัดลำดับ
+            close: DataFrame ราคาปิดจาก price_panels()
+        
+        Returns:
+            dict: {'buy', 'sell', 'score'} เป็น DataFrame (วันที่ × หุ้น)
+        """
+        def _align(frames, fill):
+            return pd.DataFrame(frames).reindex(index=close.index, columns=close.columns).fillna(fill)
+        
+        return {
+            'buy': _align(buys, False).astype(bool),
+            'sell': _align(sells, False).astype(bool),
+            'score': _align(scores, 0.0).astype(float),
+        }
+    
+    def run(self, close, buy, sell, score=None, open_=None, high=None, low=None):
+        """
+        จำลองการเทรดจาก panel ราคาและสัญญาณ
+        
+        ในแต่ละวัน: ออกจาก positions ที่แตะ Stop Loss / Take Profit ระหว่างวันก่อน
+        แล้วขายตามสัญญาณ จากนั้นจึงซื้อสัญญาณที่ score สูงสุดก่อน
+        โดยทุกสัญญาณใช้ขนาด position จากเงินสดหลังขายของวันนั้น
+        สัญญาณที่เงินสดเหลือไม่พอจะถูกข้าม แล้วลองสัญญาณลำดับถัดไป (จนเต็ม max_positions)
+        
+        Args:
+            close: DataFrame ราคาปิด (วันที่ × หุ้น), NaN = ไม่มีการซื้อขาย
+            buy: DataFrame/array (bool) สัญญาณซื้อ
+            sell: DataFrame/array (bool) สัญญาณขาย
+            score: DataFrame/array สำหรับจัดลำดับสัญญาณซื้อ (default เท่ากันหมด)
+            open_: DataFrame/array ราคาเปิด (default = ราคาปิด)
+            high: DataFrame/array ราคาสูงสุด (default = ราคาปิด)
+            low: DataFrame/array ราคาต่ำสุด (default = ราคาปิด)
+        
+        Returns:
+            dict: ผลลัพธ์การทดสอบ
+        """
+        self.reset()
+        
+        self.dates = pd.DatetimeIndex(close.index)
+        self.symbols = list(close.columns)
+        prices = close.to_numpy(dtype=float)
+        valuation = close.ffill().to_numpy(dtype=float)
+        buy = np.asarray(buy, dtype=bool)
+        sell = np.asarray(sell, dtype=bool)
+        score = np.ones(prices.shape) if score is None else np.asarray(score, dtype=float)
+        opens = prices if open_ is None else np.asarray(open_, dtype=float)
+        highs = prices if high is None else np.asarray(high, dtype=float)
+        lows = prices if low is None else np.asarray(low, dtype=float)
+        
+        n_dates, n_symbols = prices.shape
+        symbol_codes = self.trade_log.symbol_codes(self.symbols)
+        max_positions = n_symbols if self.max_positions is None else self.max_positions
+        
+        self.cash = np.empty(n_dates)
+        self.holdings = np.zeros((n_dates, n_symbols))
+        self.equity = np.empty(n_dates)
+        
+        quantity = np.zeros(n_symbols)
+        entry_price = np.zeros(n_symbols)
+        stop_loss = np.full(n_symbols, np.nan)
+        take_profit = np.full(n_symbols, np.nan)
+        cash = float(self.initial_capital)
+        
+        for t in range(n_dates):
+            current = prices[t]
+            tradable = ~np.isnan(current)
+            
+            # Stop Loss / Take Profit ระหว่างวัน (ระดับกำหนดตอนเข้าซื้อ)
+            held = np.flatnonzero(quantity > 0)
+            if held.size:
+                hit, fill = self.execution.check_bars(opens[t, held], highs[t, held], lows[t, held],
+                                                      stop_loss[held], take_profit[held])
+                for code in (EXIT_STOP, EXIT_TARGET):
+                    exits = held[hit == code]
+                    if exits.size:
+                        cash += self._close_positions(exits, fill[hit == code], t, quantity, entry_price,
+                                                      symbol_codes, EXIT_REASONS[code])
+            
+            # ขายตามสัญญาณ
+            exits = np.flatnonzero((quantity > 0) & sell[t] & tradable)
+            if exits.size:
+                cash += self._close_positions(exits, current[exits], t, quantity, entry_price,
+                                              symbol_codes, "Sell signal")
+            
+            # ซื้อตามสัญญาณ (เรียงตาม score และจำกัดจำนวน positions)
+            open_slots = max_positions - int(np.count_nonzero(quantity))
+            candidates = np.flatnonzero((quantity == 0) & buy[t] & tradable)
+            if candidates.size and open_slots > 0:
+                order = np.argsort(-score[t, candidates], kind='stable')
+                candidates = candidates[order]
+                
+                execution_price = current[candidates] * (1 + self.slippage)
+                budget = cash * self.position_size_pct
+                shares = np.maximum(1, np.floor(budget / execution_price))
+                total_cost = execution_price * shares * (1 + self.commission)
+                
+                # ซื้อตามลำดับ score ข้ามเฉพาะสัญญาณที่เงินสดเหลือไม่พอ (สัญญาณที่ถูกกว่ายังซื้อได้)
+                filled = np.zeros(candidates.size, dtype=bool)
+                remaining = cash
+                for i in range(candidates.size):
+                    if total_cost[i] <= remaining:
+                        filled[i] = True
+                        remaining -= total_cost[i]
+                        open_slots -= 1
+                        if open_slots == 0:
+                            break
+                if filled.any():
+                    candidates = candidates[filled]
+                    quantity[candidates] = shares[filled]
+                    entry_price[candidates] = execution_price[filled]
+                    stop_loss[candidates], take_profit[candidates] = self.execution.levels(
+                        current[candidates])
+                    cash -= total_cost[filled].sum()
+                    self.trade_log.extend(self.dates[t], symbol_codes[candidates], 'BUY',
+                                          execution_price[filled], shares[filled], reason="Buy signal")
+            
+            self.cash[t] = cash
+            self.holdings[t] = quantity
+            held = quantity > 0
+            self.equity[t] = cash + np.dot(quantity[held], valuation[t, held])
+        
+        # ปิด positions ที่เหลือ (ณ วันสุดท้าย)
+        remaining = np.flatnonzero(quantity > 0)
+        if remaining.size:
+            cash += self._close_positions(remaining, valuation[-1, remaining], n_dates - 1,
+                                          quantity, entry_price, symbol_codes, "End of backtest")
+        
+        self.capital = cash
+        
+        logger.info(f"Portfolio backtest completed. Final capital: ${self.capital:,.2f}")
+        return self.get_results()
+    
+    def run_backtest(self, symbols, start_date, end_date, min_confidence=0.6, historical_data=None):
+        """
+        รัน Portfolio Backtest ด้วยข้อมูลย้อนหลังจริง
+        
+        Args:
+            symbols: รายการหุ้นที่จะทดสอบ
+            start_date: วันเริ่มต้น (YYYY-MM-DD)
+            end_date: วันสิ้นสุด (YYYY-MM-DD)
+            min_confidence: ความมั่นใจขั้นต่ำสำหรับสัญญาณ
+            historical_data: dict {symbol: DataFrame} ที่โหลดไว้แล้ว (ถ้าไม่ระบุจะดึงใหม่)
+        
+        Returns:
+            dict: ผลลัพธ์การทดสอบ
+        """
+        logger.info(f"Starting portfolio backtest from {start_date} to {end_date}")
+        start_dt = pd.to_datetime(start_date)
+        end_dt = pd.to_datetime(end_date)
+        
+        if historical_data is None:
+            historical_data = load_historical_data(symbols, start_dt, end_dt)
+        
+        panels = self.build_panels(historical_data, start_dt, end_dt, min_confidence,
+                                   calendar=self.calendar)
+        if not panels or panels['close'].empty:
+            logger.error("No historical data available")
+            self.reset()
+            return {}
+        
+        return self.run(panels['close'], panels['buy'], panels['sell'], panels['score'],
+                        panels['open'], panels['high'], panels['low'])
+    
+    def _close_positions(self, columns, price, t, quantity, entry_price, symbol_codes, reason):
+        """ปิด positions หลายตัวพร้อมกันและคืนเงินสดที่ได้รับ"""
+        execution_price = price * (1 - self.slippage)
+        shares = quantity[columns]
+        revenue = execution_price * shares
+        profit_loss = (execution_price - entry_price[columns]) * shares
+        profit_loss_pct = (execution_price - entry_price[columns]) / entry_price[columns] * 100
+        
+        self.trade_log.extend(self.dates[t], symbol_codes[columns], 'SELL', execution_price,
+                              shares, profit_loss, profit_loss_pct, reason)
+        quantity[columns] = 0
+        entry_price[columns] = 0
+        return float((revenue * (1 - self.commission)).sum())
+    
+    def get_results(self):
+        """
+        สรุปผลลัพธ์การทดสอบ (key เดียวกับ Backtester.get_results)
+        
+        Returns:
+            dict: ผลลัพธ์ทั้งหมด
+        """
+        if self.equity.size == 0:
+            return {}
+        
+        equity_curve = pd.DataFrame({'Portfolio Value': self.equity}, index=self.dates)
+        equity_curve.index.name = 'Date'
+        
+        final_value = self.capital
+        total_return = ((final_value - self.initial_capital) / self.initial_capital) * 100
+        
+        actions = self.trade_log.column('action')
+        total_trades = int(np.count_nonzero(actions > 0))
+        closed_pl = self.trade_log.column('profit_loss')[actions < 0]
+        
+        wins = closed_pl[closed_pl > 0]
+        losses = closed_pl[closed_pl < 0]
+        win_rate = (wins.size / total_trades * 100) if total_trades > 0 else 0
+        avg_win = wins.mean() if wins.size else 0
+        avg_loss = losses.mean() if losses.size else 0
+        
+        # Max Drawdown (peak เริ่มจากเงินทุนเริ่มต้น)
+        drawdowns = PerformanceMetrics.analyze_drawdowns(equity_curve['Portfolio Value'],
+                                                         initial_value=self.initial_capital)
+        
+        return {
+            'initial_capital': self.initial_capital,
+            'final_capital': final_value,
+            'total_return': total_return,
+            'total_return_pct': total_return,
+            'total_trades': total_trades,
+            'winning_trades': int(wins.size),
+            'losing_trades': int(losses.size),
+            'win_rate': win_rate,
+            'avg_win': avg_win,
+            'avg_loss': avg_loss,
+            'profit_factor': abs(avg_win / avg_loss) if avg_loss != 0 else 0,
+            'max_drawdown': drawdowns['max_drawdown'],
+            'max_drawdown_duration': drawdowns['max_duration'],
+            'time_under_water': drawdowns['time_under_water'],
+            'drawdowns': drawdowns['top_drawdowns'],
+            'trades': self.trade_log.to_frame(),
+            'trade_log': self.trade_log,
+            'equity_curve': equity_curve,
+            'cash': pd.Series(self.cash, index=self.dates, name='Cash'),
+            'holdings': pd.DataFrame(self.holdings, index=self.dates, columns=self.symbols),
+        }
+    
+    def get_trade_history(self):
+        """
+        ดึงประวัติการซื้อขายทั้งหมด
+        
+        Returns:
+            pd.DataFrame: ตาราง trade history
+        """
+        return self.trade_log.to_frame()
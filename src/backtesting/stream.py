@@ -0,0 +1,336 @@
+"""
+Streaming Backtest Output
+เขียน equity curve และ trade log ลงไฟล์แบบ columnar ทีละก้อนระหว่างรัน เพื่อให้หน่วยความจำคงที่
+"""
+
+import os
+import json
+import logging
+
+import numpy as np
+import pandas as pd
+
+from .trade_log import TRADE_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# เปลี่ยนเมื่อรูปแบบไฟล์เปลี่ยน
+STREAM_VERSION = 1
+
+EQUITY_COLUMNS = {
+    'date': 'datetime64[ns]',
+    'value': np.float64,
+}
+
+
+class ColumnFile:
+    """
+    ตารางแบบ columnar บนดิสก์ (หนึ่งไฟล์ binary ต่อคอลัมน์ + meta.json)
+    
+    เขียนต่อท้ายทีละก้อน และอ่านกลับแบบ memory-mapped โดยไม่โหลดทั้งไฟล์
+    """
+    
+    def __init__(self, directory, columns):
+        """
+        Initialize ColumnFile
+        
+        Args:
+            directory: โฟลเดอร์ของตาราง
+            columns: dict {ชื่อคอลัมน์: dtype}
+        """
+        self.directory = directory
+        self.columns = {name: np.dtype(dtype) for name, dtype in columns.items()}
+        self.rows = 0
+        self.metadata = {}
+        os.makedirs(directory, exist_ok=True)
+        
+        meta = self._read_meta()
+        if meta is not None and meta.get('version') == STREAM_VERSION:
+            self.rows = meta['rows']
+            self.metadata = meta.get('metadata', {})
+    
+    def __len__(self):
+        return self.rows
+    
+    def _path(self, name):
+        return os.path.join(self.directory, f'{name}.bin')
+    
+    def _meta_path(self):
+        return os.path.join(self.directory, 'meta.json')
+    
+    def _read_meta(self):
+        try:
+            with open(self._meta_path(), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def _write_meta(self):
+        temp_path = f'{self._meta_path()}.{os.getpid()}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': STREAM_VERSION,
+                'rows': self.rows,
+                'columns': {name: dtype.str for name, dtype in self.columns.items()},
+                'metadata': self.metadata,
+            }, f)
+        os.replace(temp_path, self._meta_path())
+    
+    def append(self, arrays, count=None):
+        """
+        เขียนก้อนข้อมูลต่อท้ายไฟล์
+        
+        Args:
+            arrays: dict {ชื่อคอลัมน์: array}
+            count: จำนวนแถวที่เขียน (default = ความยาวของ array)
+        """
+        if count is None:
+            count = len(next(iter(arrays.values())))
+        if count == 0:
+            return
+        
+        for name, dtype in self.columns.items():
+            data = np.ascontiguousarray(arrays[name][:count], dtype=dtype)
+            with open(self._path(name), 'ab') as f:
+                f.write(data.tobytes())
+        self.rows += count
+        self._write_meta()
+    
+    def truncate(self, rows):
+        """ตัดตารางให้เหลือ rows แถวแรก (ใช้ตอนรันต่อจาก checkpoint)"""
+        rows = min(int(rows), self.rows)
+        for name, dtype in self.columns.items():
+            path = self._path(name)
+            if os.path.exists(path):
+                os.truncate(path, rows * dtype.itemsize)
+        self.rows = rows
+        self._write_meta()
+    
+    def clear(self):
+        """ลบข้อมูลทั้งหมด"""
+        for name in self.columns:
+            path = self._path(name)
+            if os.path.exists(path):
+                os.remove(path)
+        self.rows = 0
+        self.metadata = {}
+        self._write_meta()
+    
+    def column(self, name):
+        """
+        อ่านคอลัมน์แบบ memory-mapped (ไม่โหลดเข้าหน่วยความจำทั้งหมด)
+        
+        Args:
+            name: ชื่อคอลัมน์
+        
+        Returns:
+            np.ndarray: memmap แบบอ่านอย่างเดียว (array ว่างถ้ายังไม่มีข้อมูล)
+        """
+        dtype = self.columns[name]
+        if self.rows == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(self._path(name), dtype=dtype, mode='r', shape=(self.rows,))
+    
+    def iter_chunks(self, chunk_size=65536, columns=None):
+        """
+        อ่านข้อมูลทีละก้อน
+        
+        Args:
+            chunk_size: จำนวนแถวต่อก้อน
+            columns: คอลัมน์ที่ต้องการ (default = ทุกคอลัมน์)
+        
+        Yields:
+            dict: {ชื่อคอลัมน์: array ของก้อนนั้น}
+        """
+        mapped = {name: self.column(name) for name in (columns or self.columns)}
+        for start in range(0, self.rows, chunk_size):
+            yield {name: np.asarray(data[start:start + chunk_size]) for name, data in mapped.items()}
+
+
+class BacktestStream:
+    """
+    เขียนผลลัพธ์ของ Backtester ลงดิสก์ระหว่างรัน
+    
+    - equity: จุดมูลค่า portfolio สะสมใน buffer ขนาดคงที่ แล้วเขียนต่อท้ายเมื่อเต็ม
+    - trades: TradeLog ในหน่วยความจำถูกย้ายลงดิสก์ทุก chunk_size trades
+      (รหัสหุ้น/เหตุผลถูกแปลงเป็นตารางรหัสกลางของ stream)
+    
+    ผลลัพธ์อ่านกลับแบบ memory-mapped และสรุปด้วยการ reduce ทีละก้อน
+    """
+    
+    def __init__(self, directory='data/backtest_streams/latest', chunk_size=65536):
+        """
+        Initialize BacktestStream
+        
+        Args:
+            directory: โฟลเดอร์ของการรันนี้
+            chunk_size: จำนวนแถวต่อก้อนที่เขียน/อ่าน
+        """
+        self.directory = directory
+        self.chunk_size = max(1, int(chunk_size))
+        self.equity = ColumnFile(os.path.join(directory, 'equity'), EQUITY_COLUMNS)
+        self.trades = ColumnFile(os.path.join(directory, 'trades'), TRADE_COLUMNS)
+        self._buffer = {name: np.empty(self.chunk_size, dtype=dtype) for name, dtype in EQUITY_COLUMNS.items()}
+        self._buffered = 0
+    
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['_buffer'] = None
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._buffer = {name: np.empty(self.chunk_size, dtype=dtype) for name, dtype in EQUITY_COLUMNS.items()}
+        self._buffered = 0
+    
+    @property
+    def symbols(self):
+        """ตารางรหัสหุ้นของ trades ที่เขียนแล้ว"""
+        return self.trades.metadata.get('symbols', [])
+    
+    @property
+    def reasons(self):
+        """ตารางรหัสเหตุผลของ trades ที่เขียนแล้ว"""
+        return self.trades.metadata.get('reasons', [])
+    
+    def reset(self):
+        """เริ่มการรันใหม่ (ลบข้อมูลเดิมทั้งหมด)"""
+        self._buffered = 0
+        self.equity.clear()
+        self.trades.clear()
+    
+    def append_equity(self, date, value):
+        """
+        เพิ่มจุดมูลค่า portfolio (เขียนลงดิสก์เมื่อ buffer เต็ม)
+        
+        Args:
+            date: วันที่
+            value: มูลค่า portfolio
+        """
+        i = self._buffered
+        self._buffer['date'][i] = np.datetime64(pd.Timestamp(date), 'ns')
+        self._buffer['value'][i] = value
+        self._buffered = i + 1
+        if self._buffered == self.chunk_size:
+            self.flush()
+    
+    def flush(self):
+        """เขียน equity ที่ค้างใน buffer ลงดิสก์"""
+        if self._buffered:
+            self.equity.append(self._buffer, self._buffered)
+            self._buffered = 0
+    
+    def spill_trades(self, trade_log):
+        """
+        ย้าย trades จาก TradeLog ลงดิสก์แล้วล้าง TradeLog
+        
+        Args:
+            trade_log: TradeLog ของ Backtester
+        """
+        if len(trade_log) == 0:
+            return
+        
+        symbols = list(self.symbols)
+        reasons = list(self.reasons)
+        symbol_map = self._code_map(trade_log.symbols, symbols)
+        reason_map = self._code_map(trade_log.reasons, reasons)
+        self.trades.metadata.update({'symbols': symbols, 'reasons': reasons})
+        
+        arrays = {name: trade_log.column(name) for name in TRADE_COLUMNS}
+        arrays['symbol'] = symbol_map[arrays['symbol']]
+        arrays['reason'] = reason_map[arrays['reason']]
+        self.trades.append(arrays)
+        trade_log.clear()
+    
+    @staticmethod
+    def _code_map(local_values, global_values):
+        """แปลงรหัสในตารางของ TradeLog เป็นรหัสในตารางกลาง (เพิ่มค่าใหม่ต่อท้าย)"""
+        positions = {value: code for code, value in enumerate(global_values)}
+        mapping = np.empty(len(local_values), dtype=np.int32)
+        for local_code, value in enumerate(local_values):
+            code = positions.get(value)
+            if code is None:
+                code = len(global_values)
+                positions[value] = code
+                global_values.append(value)
+            mapping[local_code] = code
+        return mapping
+    
+    def checkpoint(self):
+        """
+        เขียนข้อมูลค้างลงดิสก์และคืนจำนวนแถว ณ ปัจจุบัน (สำหรับ Backtester.get_state)
+        
+        Returns:
+            dict: equity_rows, trade_rows
+        """
+        self.flush()
+        return {'equity_rows': len(self.equity), 'trade_rows': len(self.trades)}
+    
+    def restore(self, state):
+        """ตัดไฟล์กลับไปยังจุดของ checkpoint()"""
+        self._buffered = 0
+        self.equity.truncate(state['equity_rows'])
+        self.trades.truncate(state['trade_rows'])
+    
+    def iter_equity(self, chunk_size=None):
+        """อ่านมูลค่า portfolio ทีละก้อน (รวมข้อมูลที่ยังค้างใน buffer)"""
+        self.flush()
+        for chunk in self.equity.iter_chunks(chunk_size or self.chunk_size, ['value']):
+            yield chunk['value']
+    
+    def equity_frame(self):
+        """
+        โหลด equity curve ทั้งหมดเป็น DataFrame (รูปแบบเดียวกับ Backtester.equity_curve)
+        
+        Returns:
+            pd.DataFrame: index = Date, คอลัมน์ 'Portfolio Value'
+        """
+        self.flush()
+        if len(self.equity) == 0:
+            return pd.DataFrame()
+        return pd.DataFrame({'Portfolio Value': np.asarray(self.equity.column('value'))},
+                            index=pd.DatetimeIndex(np.asarray(self.equity.column('date')), name='Date'))
+    
+    def trade_frame(self):
+        """
+        โหลด trades ทั้งหมดเป็น DataFrame (รูปแบบเดียวกับ TradeLog.to_frame)
+        
+        Returns:
+            pd.DataFrame: ตาราง trade history
+        """
+        if len(self.trades) == 0:
+            return pd.DataFrame()
+        
+        column = lambda name: np.asarray(self.trades.column(name))
+        price, quantity, action = column('price'), column('quantity'), column('action')
+        return pd.DataFrame({
+            'Date': column('date'),
+            'Symbol': pd.Categorical.from_codes(column('symbol'), categories=self.symbols),
+            'Action': pd.Categorical.from_codes((action < 0).astype(np.int8), categories=['BUY', 'SELL']),
+            'Price': price,
+            'Quantity': quantity,
+            'Total': price * quantity,
+            'P/L': column('profit_loss'),
+            'P/L %': column('profit_loss_pct'),
+            'Reason': pd.Categorical.from_codes(column('reason'), categories=self.reasons),
+        })
+    
+    def trade_stats(self, chunk_size=None):
+        """
+        สรุปสถิติ trades ด้วยการ reduce ทีละก้อน
+        
+        Returns:
+            dict: total_trades, winning_trades, losing_trades, gross_profit, gross_loss
+        """
+        stats = {'total_trades': 0, 'winning_trades': 0, 'losing_trades': 0,
+                 'gross_profit': 0.0, 'gross_loss': 0.0}
+        for chunk in self.trades.iter_chunks(chunk_size or self.chunk_size, ['action', 'profit_loss']):
+            closed = chunk['profit_loss'][chunk['action'] < 0]
+            wins = closed[closed > 0]
+            losses = closed[closed < 0]
+            stats['total_trades'] += int(np.count_nonzero(chunk['action'] > 0))
+            stats['winning_trades'] += int(wins.size)
+            stats['losing_trades'] += int(losses.size)
+            stats['gross_profit'] += float(wins.sum())
+            stats['gross_loss'] += float(losses.sum())
+        return stats
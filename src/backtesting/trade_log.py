@@ -0,0 +1,253 @@
+"""
+Columnar Trade Log
+เก็บประวัติการซื้อขายแบบ Columnar ใน NumPy buffers ที่ขยายขนาดได้
+"""
+
+import numpy as np
+import pandas as pd
+
+
+ACTION_CODES = {'BUY': 1, 'SELL': -1}
+ACTION_NAMES = {1: 'BUY', -1: 'SELL'}
+
+# ชนิดข้อมูลของแต่ละคอลัมน์ (ประมาณ 49 bytes ต่อ trade)
+TRADE_COLUMNS = {
+    'date': 'datetime64[ns]',
+    'symbol': np.int32,       # index ใน symbol table
+    'action': np.int8,        # 1 = BUY, -1 = SELL
+    'price': np.float64,
+    'quantity': np.float64,
+    'profit_loss': np.float64,
+    'profit_loss_pct': np.float64,
+    'reason': np.int32,       # index ใน reason table
+}
+
+
+class TradeLog:
+    """
+    บันทึก Trade แบบ Columnar
+    
+    แต่ละ field เก็บใน NumPy array ที่จองพื้นที่ล่วงหน้าและขยายแบบเท่าตัว
+    ชื่อหุ้นและเหตุผลถูกเก็บเป็นรหัส (dictionary encoding) แทน string ต่อ trade
+    """
+    
+    __slots__ = ('_columns', '_size', '_symbols', '_symbol_codes', '_reasons', '_reason_codes')
+    
+    def __init__(self, capacity=1024):
+        """
+        Initialize TradeLog
+        
+        Args:
+            capacity: จำนวน trades ที่จองพื้นที่ไว้ตอนเริ่มต้น
+        """
+        capacity = max(1, int(capacity))
+        self._columns = {name: np.empty(capacity, dtype=dtype) for name, dtype in TRADE_COLUMNS.items()}
+        self._size = 0
+        self._symbols = []
+        self._symbol_codes = {}
+        self._reasons = []
+        self._reason_codes = {}
+    
+    def __len__(self):
+        return self._size
+    
+    def __repr__(self):
+        return f"TradeLog({self._size} trades, {self.nbytes:,} bytes)"
+    
+    @property
+    def capacity(self):
+        """จำนวน trades ที่เก็บได้ก่อนต้องขยาย buffer"""
+        return len(self._columns['price'])
+    
+    @property
+    def nbytes(self):
+        """หน่วยความจำที่ใช้ใน buffers (bytes)"""
+        return sum(column.nbytes for column in self._columns.values())
+    
+    @property
+    def symbols(self):
+        """Symbol table (index = รหัสหุ้น)"""
+        return list(self._symbols)
+    
+    @property
+    def reasons(self):
+        """Reason table (index = รหัสเหตุผล)"""
+        return list(self._reasons)
+    
+    def clear(self):
+        """
+        ล้างข้อมูลทั้งหมด
+        
+        จอง buffer ใหม่ขนาดเท่าเดิม เพราะ DataFrame จาก to_frame() และ arrays จาก column()
+        เป็น view ของ buffer เดิม ถ้าเขียนทับ ผลที่ export ไปก่อนหน้าจะเปลี่ยนตาม
+        """
+        self._columns = {name: np.empty(len(column), dtype=column.dtype)
+                         for name, column in self._columns.items()}
+        self._size = 0
+        self._symbols = []
+        self._symbol_codes = {}
+        self._reasons = []
+        self._reason_codes = {}
+    
+    def symbol_code(self, symbol):
+        """แปลงชื่อหุ้นเป็นรหัส (ลงทะเบียนใหม่ถ้ายังไม่มี)"""
+        code = self._symbol_codes.get(symbol)
+        if code is None:
+            code = len(self._symbols)
+            self._symbol_codes[symbol] = code
+            self._symbols.append(symbol)
+        return code
+    
+    def symbol_codes(self, symbols):
+        """แปลงรายชื่อหุ้นเป็น array ของรหัส"""
+        return np.array([self.symbol_code(symbol) for symbol in symbols], dtype=np.int32)
+    
+    def _reason_code(self, reason):
+        code = self._reason_codes.get(reason)
+        if code is None:
+            code = len(self._reasons)
+            self._reason_codes[reason] = code
+            self._reasons.append(reason)
+        return code
+    
+    def _reserve(self, extra):
+        """ขยาย buffers แบบเท่าตัวเมื่อพื้นที่ไม่พอ"""
+        required = self._size + extra
+        capacity = self.capacity
+        if required <= capacity:
+            return
+        
+        while capacity < required:
+            capacity *= 2
+        for name, column in self._columns.items():
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            self._columns[name] = grown
+    
+    def append(self, date, symbol, action, price, quantity, profit_loss=0.0,
+               profit_loss_pct=0.0, reason=""):
+        """
+        เพิ่ม trade หนึ่งรายการ
+        
+        Args:
+            date: วันที่ทำการซื้อขาย
+            symbol: รหัสหุ้น
+            action: 'BUY' หรือ 'SELL'
+            price: ราคา
+            quantity: จำนวนหุ้น
+            profit_loss: กำไร/ขาดทุน ($)
+            profit_loss_pct: กำไร/ขาดทุน (%)
+            reason: เหตุผลในการซื้อขาย
+        """
+        self._reserve(1)
+        i = self._size
+        columns = self._columns
+        columns['date'][i] = np.datetime64(pd.Timestamp(date), 'ns')
+        columns['symbol'][i] = self.symbol_code(symbol)
+        columns['action'][i] = ACTION_CODES[action]
+        columns['price'][i] = price
+        columns['quantity'][i] = quantity
+        columns['profit_loss'][i] = profit_loss
+        columns['profit_loss_pct'][i] = profit_loss_pct
+        columns['reason'][i] = self._reason_code(reason)
+        self._size += 1
+    
+    def extend(self, dates, symbol_codes, action, price, quantity, profit_loss=0.0,
+               profit_loss_pct=0.0, reason=""):
+        """
+        เพิ่มหลาย trades พร้อมกัน (action และ reason เดียวกัน)
+        
+        Args:
+            dates: วันที่ (scalar หรือ array)
+            symbol_codes: array ของรหัสหุ้นจาก symbol_codes()
+            action: 'BUY' หรือ 'SELL'
+            price: array ของราคา
+            quantity: array ของจำนวนหุ้น
+            profit_loss: array/scalar ของกำไร/ขาดทุน ($)
+            profit_loss_pct: array/scalar ของกำไร/ขาดทุน (%)
+            reason: เหตุผลในการซื้อขาย
+        """
+        count = len(symbol_codes)
+        if count == 0:
+            return
+        
+        self._reserve(count)
+        window = slice(self._size, self._size + count)
+        columns = self._columns
+        columns['date'][window] = np.asarray(dates, dtype='datetime64[ns]')
+        columns['symbol'][window] = symbol_codes
+        columns['action'][window] = ACTION_CODES[action]
+        columns['price'][window] = price
+        columns['quantity'][window] = quantity
+        columns['profit_loss'][window] = profit_loss
+        columns['profit_loss_pct'][window] = profit_loss_pct
+        columns['reason'][window] = self._reason_code(reason)
+        self._size += count
+    
+    def column(self, name):
+        """
+        ดึงคอลัมน์เป็น view (ไม่ copy)
+        
+        Args:
+            name: ชื่อคอลัมน์ใน TRADE_COLUMNS
+        
+        Returns:
+            np.ndarray: view ขนาดเท่าจำนวน trades
+        """
+        return self._columns[name][:self._size]
+    
+    def to_frame(self):
+        """
+        แปลงเป็น DataFrame (รูปแบบเดียวกับ Backtester.get_trade_history)
+        
+        คอลัมน์ตัวเลขอ้างอิง buffers เดิมโดยไม่ copy; Symbol/Action/Reason เป็น Categorical
+        
+        Returns:
+            pd.DataFrame: ตาราง trade history
+        """
+        if self._size == 0:
+            return pd.DataFrame()
+        
+        price = self.column('price')
+        quantity = self.column('quantity')
+        action = self.column('action')
+        
+        return pd.DataFrame({
+            'Date': self.column('date'),
+            'Symbol': pd.Categorical.from_codes(self.column('symbol'), categories=self._symbols),
+            'Action': pd.Categorical.from_codes((action < 0).astype(np.int8), categories=['BUY', 'SELL']),
+            'Price': price,
+            'Quantity': quantity,
+            'Total': price * quantity,
+            'P/L': self.column('profit_loss'),
+            'P/L %': self.column('profit_loss_pct'),
+            'Reason': pd.Categorical.from_codes(self.column('reason'), categories=self._reasons),
+        }, copy=False)
+    
+    def to_arrow(self):
+        """
+        แปลงเป็น pyarrow.Table (ต้องติดตั้ง pyarrow)
+        
+        คอลัมน์ตัวเลขใช้หน่วยความจำร่วมกับ buffers; Symbol/Reason เป็น DictionaryArray
+        
+        Returns:
+            pyarrow.Table: ตาราง trade history
+        """
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ImportError("pyarrow is required for TradeLog.to_arrow(). Install with: pip install pyarrow")
+        
+        def _dictionary(codes, values):
+            return pa.DictionaryArray.from_arrays(pa.array(codes), pa.array(values, type=pa.string()))
+        
+        return pa.table({
+            'Date': pa.array(self.column('date')),
+            'Symbol': _dictionary(self.column('symbol'), self._symbols),
+            'Action': _dictionary((self.column('action') < 0).astype(np.int8), ['BUY', 'SELL']),
+            'Price': pa.array(self.column('price')),
+            'Quantity': pa.array(self.column('quantity')),
+            'P/L': pa.array(self.column('profit_loss')),
+            'P/L %': pa.array(self.column('profit_loss_pct')),
+            'Reason': _dictionary(self.column('reason'), self._reasons),
+        })
@@ -9,7 +9,6 @@ import numpy as np
 from datetime import datetime, timedelta
 import logging
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
@@ -32,7 +31,7 @@ class StockDataFetcher:
             DataFrame: ข้อมูลราคาหุ้น
         """
         try:
-            logger.info(f"Fetching data for {symbol} with period {period}...")
+            logger.debug("Fetching data for %s with period %s...", symbol, period)
             ticker = yf.Ticker(symbol)
             data = ticker.history(period=period, interval=interval)
             
@@ -48,7 +47,7 @@ class StockDataFetcher:
                 return None
             
             self.data_cache[symbol] = data
-            logger.info(f"Successfully fetched {len(data)} records for {symbol}")
+            logger.debug("Successfully fetched %d records for %s", len(data), symbol)
             return data
         
         except Exception as e:
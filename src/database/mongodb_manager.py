@@ -15,7 +15,6 @@ from dotenv import load_dotenv
 # โหลด environment variables
 load_dotenv()
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
@@ -86,6 +85,7 @@ class MongoDBManager:
             
             # Index สำหรับ backtests
             self.backtest_collection.create_index([("created_at", DESCENDING)])
+            self.backtest_collection.create_index([("cache_key", ASCENDING)], sparse=True)
             
             logger.info("✅ Created database indexes")
             
@@ -338,6 +338,29 @@ class MongoDBManager:
             logger.error(f"❌ Error getting backtest results: {str(e)}")
             return []
     
+    def get_backtest_by_cache_key(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """
+        ดึงผลลัพธ์ Backtest ที่แคชไว้ด้วย cache key
+        
+        Args:
+            cache_key: key จาก BacktestCache.make_key()
+            
+        Returns:
+            Backtest document ล่าสุดของ key นี้ หรือ None
+        """
+        try:
+            doc = self.backtest_collection.find_one(
+                {'cache_key': cache_key},
+                sort=[('created_at', DESCENDING)]
+            )
+            if doc:
+                doc['_id'] = str(doc['_id'])
+            return doc
+            
+        except Exception as e:
+            logger.error(f"❌ Error getting cached backtest {cache_key}: {str(e)}")
+            return None
+    
     # ==================== PORTFOLIO ====================
     
     def save_portfolio(self, user_id: str, portfolio_data: Dict[str, Any]):
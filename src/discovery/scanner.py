@@ -8,7 +8,8 @@ import yfinance as yf
 import pandas as pd
 from datetime import datetime, timedelta
 
-logging.basicConfig(level=logging.INFO)
+from src.utils.trading_calendar import TradingCalendar
+
 logger = logging.getLogger(__name__)
 
 
@@ -39,6 +40,13 @@ class StockScanner:
     def __init__(self):
         self.popular_stocks = self.POPULAR_STOCKS
         self.microcap_stocks = self.MICROCAP_STOCKS
+        self.calendar = TradingCalendar()
+    
+    def _sessions_only(self, data):
+        """ตัดแท่งที่ไม่ใช่วันทำการของตลาดออก (เช่น แท่งวันหยุดจากข้อมูลที่ผิดพลาด)"""
+        if data is None or len(data) == 0:
+            return data
+        return data[self.calendar.session_mask(data.index)]
     
     def get_popular_stocks(self):
         """
@@ -82,7 +90,7 @@ class StockScanner:
         
         for symbol in stocks_to_scan:
             try:
-                data = yf.download(symbol, period=period, progress=False)
+                data = self._sessions_only(yf.download(symbol, period=period, progress=False))
                 if data is not None and len(data) > 0:
                     first_price = data['Close'].iloc[0]
                     last_price = data['Close'].iloc[-1]
@@ -138,7 +146,7 @@ class StockScanner:
         
         for symbol in self.microcap_stocks[:15]:
             try:
-                data = yf.download(symbol, period='3mo', progress=False)
+                data = self._sessions_only(yf.download(symbol, period='3mo', progress=False))
                 if data is not None and isinstance(data, pd.DataFrame) and len(data) >= 20:
                     current_price = float(data['Close'].iloc[-1])
                     
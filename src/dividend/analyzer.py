@@ -8,7 +8,6 @@ import yfinance as yf
 import pandas as pd
 from datetime import datetime, timedelta
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
@@ -11,7 +11,6 @@ from email.mime.multipart import MIMEMultipart
 from datetime import datetime
 from abc import ABC, abstractmethod
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
@@ -9,10 +9,31 @@ from datetime import datetime
 import logging
 from sklearn.preprocessing import StandardScaler
 from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import SGDClassifier
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Features ของ AI model ตามลำดับคอลัมน์ และค่า default เมื่อไม่มีข้อมูล
+FEATURE_DEFAULTS = {
+    'sma_20': 0,
+    'sma_50': 0,
+    'sma_200': 0,
+    'rsi': 50,
+    'macd': 0,
+    'macd_signal': 0,
+    'macd_histogram': 0,
+    'atr': 0,
+    'stoch_k': 50,
+    'stoch_d': 50,
+}
+_DEFAULT_VALUES = np.array(list(FEATURE_DEFAULTS.values()), dtype=float)
+
+SIGNAL_NAMES = {0: 'SELL', 1: 'HOLD', 2: 'BUY'}
+SIGNAL_CLASSES = np.array(list(SIGNAL_NAMES))
+
+# จำนวนรอบของข้อมูลฝึกชุดแรกเมื่อ AISignalGenerator(incremental=True)
+INCREMENTAL_EPOCHS = 5
+
 
 class SignalGenerator:
     """สร้างสัญญาณซื้อ/ขายโดยใช้ Rule-based logic"""
@@ -103,6 +124,72 @@ class SignalGenerator:
         
         return signals
     
+    def generate_signals_vectorized(self, indicators):
+        """
+        สร้างสัญญาณจาก Indicators ทุกแถวพร้อมกัน (กฎเดียวกับ generate_signals_from_indicators)
+        
+        Args:
+            indicators: DataFrame จาก TechnicalAnalyzer.get_indicator_history()
+        
+        Returns:
+            DataFrame: buy, sell, hold (int8), confidence, buy_score, sell_score
+        """
+        price = indicators['latest_price'].to_numpy(dtype=float)
+        sma_20 = indicators['sma_20'].to_numpy(dtype=float)
+        sma_50 = indicators['sma_50'].to_numpy(dtype=float)
+        sma_200 = indicators['sma_200'].to_numpy(dtype=float)
+        rsi = indicators['rsi'].to_numpy(dtype=float)
+        macd = indicators['macd'].to_numpy(dtype=float)
+        macd_signal = indicators['macd_signal'].to_numpy(dtype=float)
+        macd_hist = indicators['macd_histogram'].to_numpy(dtype=float)
+        
+        buy_score = np.zeros(len(indicators))
+        sell_score = np.zeros(len(indicators))
+        
+        # NaN เปรียบเทียบได้ False เสมอ เหมือนกับเวอร์ชันทีละแถว
+        with np.errstate(invalid='ignore'):
+            # SMA Cross Over Analysis
+            golden = (sma_20 > sma_50) & (sma_50 > sma_200)
+            death = ~golden & (sma_20 < sma_50) & (sma_50 < sma_200)
+            buy_score += 2 * golden
+            sell_score += 2 * death
+            
+            # RSI Analysis
+            oversold = rsi < 30
+            overbought = ~oversold & (rsi > 70)
+            buy_score += 2 * oversold
+            sell_score += 2 * overbought
+            
+            # MACD Analysis
+            bullish = (macd > macd_signal) & (macd_hist > 0)
+            bearish = ~bullish & (macd < macd_signal) & (macd_hist < 0)
+            buy_score += 1.5 * bullish
+            sell_score += 1.5 * bearish
+            
+            # Price vs SMA
+            above = (price > sma_50) & (price > sma_200)
+            below = ~above & (price < sma_50) & (price < sma_200)
+            buy_score += 1 * above
+            sell_score += 1 * below
+        
+        # Determine signal
+        total_score = buy_score + sell_score
+        confidence = np.divide(
+            np.maximum(buy_score, sell_score), total_score,
+            out=np.zeros(len(indicators)), where=total_score > 0
+        )
+        buy = buy_score > sell_score
+        sell = sell_score > buy_score
+        
+        return pd.DataFrame({
+            'buy': buy.astype(np.int8),
+            'sell': sell.astype(np.int8),
+            'hold': (~buy & ~sell).astype(np.int8),
+            'confidence': confidence,
+            'buy_score': buy_score,
+            'sell_score': sell_score,
+        }, index=indicators.index)
+    
     def generate_entry_exit_points(self, data):
         """
         สร้างจุดเข้า-ออก (Entry/Exit points)
@@ -195,49 +282,115 @@ class SignalGenerator:
 class AISignalGenerator:
     """สร้างสัญญาณโดยใช้ Machine Learning"""
     
-    def __init__(self):
+    def __init__(self, incremental=False):
+        """
+        Initialize AISignalGenerator
+        
+        Args:
+            incremental: ใช้ model ที่ปรับด้วยข้อมูลใหม่ได้ (SGDClassifier, ดู update_model)
+                         แทน Random Forest ที่ต้องฝึกใหม่ทั้งหมด
+        """
+        self.incremental = incremental
         self.model = None
         self.scaler = StandardScaler()
         self.trained = False
+        self.compact = None  # CompactTreeEnsemble (ดู compile_model)
     
     def prepare_features(self, technical_data):
-        """เตรียม Features สำหรับ ML Model"""
+        """เตรียม Features สำหรับ ML Model (NaN/None ใช้ค่า default เหมือน prepare_feature_matrix)"""
         features = np.array([
-            technical_data.get('sma_20', 0),
-            technical_data.get('sma_50', 0),
-            technical_data.get('sma_200', 0),
-            technical_data.get('rsi', 50),
-            technical_data.get('macd', 0),
-            technical_data.get('macd_signal', 0),
-            technical_data.get('macd_histogram', 0),
-            technical_data.get('atr', 0),
-            technical_data.get('stoch_k', 50),
-            technical_data.get('stoch_d', 50),
-        ]).reshape(1, -1)
-        
-        return features
+            technical_data.get(name, default) for name, default in FEATURE_DEFAULTS.items()
+        ], dtype=float).reshape(1, -1)
+        
+        return np.where(np.isnan(features), _DEFAULT_VALUES, features)
+    
+    @staticmethod
+    def prepare_feature_matrix(indicators):
+        """
+        เตรียม Features ของทุกแถวพร้อมกัน (คอลัมน์เดียวกับ prepare_features)
+        
+        Args:
+            indicators: DataFrame จาก TechnicalAnalyzer.get_indicator_history()
+        
+        Returns:
+            np.ndarray: (จำนวนแถว × 10); ค่าที่ยังคำนวณไม่ได้ (NaN) ใช้ค่า default
+        """
+        columns = [indicators[name].to_numpy(dtype=float) if name in indicators.columns
+                   else np.full(len(indicators), float(default))
+                   for name, default in FEATURE_DEFAULTS.items()]
+        features = np.column_stack(columns) if columns else np.empty((len(indicators), 0))
+        return np.where(np.isnan(features), _DEFAULT_VALUES, features)
     
     def train_model(self, X_train, y_train):
         """
-        ฝึก Random Forest Model
+        ฝึก Random Forest Model (หรือ SGDClassifier เมื่อ incremental=True)
         
         Args:
             X_train: Feature array
             y_train: Label array (0: sell, 1: hold, 2: buy)
         """
         try:
-            self.model = RandomForestClassifier(
-                n_estimators=100,
-                random_state=42,
-                n_jobs=-1
-            )
-            X_scaled = self.scaler.fit_transform(X_train)
-            self.model.fit(X_scaled, y_train)
+            if self.incremental:
+                self.model = SGDClassifier(loss='log_loss', alpha=1e-4, random_state=42)
+                self.scaler = StandardScaler()
+                # partial_fit ทุกขั้น ให้ scaler สะสม n_samples_seen_ และ model รู้จักครบทั้ง 3 classes
+                X_scaled = self.scaler.partial_fit(X_train).transform(X_train)
+                for _ in range(INCREMENTAL_EPOCHS):
+                    self.model.partial_fit(X_scaled, y_train, classes=SIGNAL_CLASSES)
+            else:
+                self.model = RandomForestClassifier(
+                    n_estimators=100,
+                    random_state=42,
+                    n_jobs=-1
+                )
+                X_scaled = self.scaler.fit_transform(X_train)
+                self.model.fit(X_scaled, y_train)
             self.trained = True
+            self.compact = None
             logger.info("AI Model trained successfully")
         except Exception as e:
             logger.error(f"Error training model: {str(e)}")
     
+    def update_model(self, X_new, y_new):
+        """
+        ปรับ model ด้วยแถวใหม่ที่มี label แล้ว โดยไม่ฝึกใหม่ทั้งหมด
+        
+        scaler ปรับ mean/variance สะสม (StandardScaler.partial_fit) แล้ว model ทำ partial_fit
+        ใช้ได้กับ model ที่ฝึกด้วย incremental=True เท่านั้น
+        model/scaler ที่โหลดจาก ModelRegistry (LazyArtifact) ถูกโหลดเข้าหน่วยความจำแบบแก้ไขได้ก่อน
+        
+        Args:
+            X_new: Feature array ของแถวใหม่
+            y_new: Label array ของแถวใหม่
+        
+        Returns:
+            bool: สำเร็จหรือไม่
+        """
+        if not self.trained:
+            self.incremental = True
+            self.train_model(X_new, y_new)
+            return self.trained
+        
+        from src.ai.registry import LazyArtifact
+        # arrays ของ artifact ที่เปิดแบบ mmap อ่านได้อย่างเดียว แต่ partial_fit แก้ arrays โดยตรง
+        if isinstance(self.model, LazyArtifact):
+            self.model = self.model.materialize()
+        if isinstance(self.scaler, LazyArtifact):
+            self.scaler = self.scaler.materialize()
+        if not hasattr(self.model, 'partial_fit'):
+            logger.error("AI model does not support incremental updates (train with incremental=True)")
+            return False
+        
+        try:
+            X_scaled = self.scaler.partial_fit(X_new).transform(X_new)
+            self.model.partial_fit(X_scaled, y_new, classes=SIGNAL_CLASSES)
+            self.compact = None
+            logger.info(f"AI Model updated with {len(y_new)} rows")
+            return True
+        except Exception as e:
+            logger.error(f"Error updating model: {str(e)}")
+            return False
+    
     def predict_signal(self, technical_data):
         """
         ทำนาย Signal จาก Technical Data
@@ -252,23 +405,146 @@ class AISignalGenerator:
             return {'error': 'Model not trained yet'}
         
         try:
-            features = self.prepare_features(technical_data)
-            X_scaled = self.scaler.transform(features)
-            
-            prediction = self.model.predict(X_scaled)[0]
-            probability = self.model.predict_proba(X_scaled)[0]
-            
-            signal_map = {0: 'SELL', 1: 'HOLD', 2: 'BUY'}
-            
-            return {
-                'signal': signal_map[prediction],
-                'confidence': float(probability[prediction]),
+            return self.predict_signals_batch({None: technical_data})[None]
+        except Exception as e:
+            logger.error(f"Error predicting signal: {str(e)}")
+            return {'error': str(e)}
+    
+    def predict_signals_batch(self, technical_data):
+        """
+        ทำนาย Signal ของหลายชุดข้อมูลด้วยการเรียก model ครั้งเดียว
+        
+        Args:
+            technical_data: dict {key: dict ของ indicators} (เช่น key = symbol หรือวันที่)
+        
+        Returns:
+            dict: {key: prediction result แบบเดียวกับ predict_signal}
+        """
+        if not self.trained:
+            return {key: {'error': 'Model not trained yet'} for key in technical_data}
+        if not technical_data:
+            return {}
+        
+        keys = list(technical_data)
+        features = np.vstack([self.prepare_features(technical_data[key]) for key in keys])
+        probability = self._predict_proba(features)
+        signal = probability.argmax(axis=1)
+        
+        return {
+            key: {
+                'signal': SIGNAL_NAMES[signal[row]],
+                'confidence': float(probability[row, signal[row]]),
                 'probabilities': {
-                    'sell': float(probability[0]),
-                    'hold': float(probability[1]),
-                    'buy': float(probability[2])
+                    'sell': float(probability[row, 0]),
+                    'hold': float(probability[row, 1]),
+                    'buy': float(probability[row, 2])
                 }
             }
+            for row, key in enumerate(keys)
+        }
+    
+    def compile_model(self):
+        """
+        แปลง model + scaler เป็น CompactTreeEnsemble (ตัด overhead ของ sklearn เมื่อทำนายทีละแถว)
+        
+        ผลการทำนายเท่ากับ model เดิม ใช้แทน sklearn จนกว่าจะฝึกใหม่
+        
+        Returns:
+            bool: สำเร็จหรือไม่
+        """
+        if not self.trained:
+            return False
+        try:
+            from src.ai.compact import CompactTreeEnsemble
+            self.compact = CompactTreeEnsemble.from_sklearn(self.model, self.scaler)
+            return True
         except Exception as e:
-            logger.error(f"Error predicting signal: {str(e)}")
-            return {'error': str(e)}
+            logger.error(f"Error compiling model: {str(e)}")
+            self.compact = None
+            return False
+    
+    def _predict_proba(self, features):
+        """ความน่าจะเป็นของ sell/hold/buy (n × 3) จาก feature matrix (transform/predict_proba ครั้งเดียว)"""
+        features = np.atleast_2d(features)
+        probability = np.zeros((len(features), 3))
+        if len(features):
+            if self.compact is not None:
+                probability[:, self.compact.classes_.astype(int)] = self.compact.predict_proba(features)
+            else:
+                probability[:, self.model.classes_.astype(int)] = self.model.predict_proba(
+                    self.scaler.transform(features))
+        return probability
+    
+    @staticmethod
+    def _signal_frame(probability, index):
+        """DataFrame ของสัญญาณจากความน่าจะเป็น"""
+        signal = probability.argmax(axis=1)
+        return pd.DataFrame({
+            'signal': signal.astype(np.int8),
+            'buy': (signal == 2).astype(np.int8),
+            'sell': (signal == 0).astype(np.int8),
+            'confidence': probability.max(axis=1),
+            'prob_sell': probability[:, 0],
+            'prob_hold': probability[:, 1],
+            'prob_buy': probability[:, 2],
+        }, index=index)
+    
+    def predict_signals_vectorized(self, indicators):
+        """
+        ทำนาย Signal ของทุกแถวด้วยการเรียก model ครั้งเดียว
+        
+        Args:
+            indicators: DataFrame จาก TechnicalAnalyzer.get_indicator_history()
+        
+        Returns:
+            DataFrame: signal (0 sell / 1 hold / 2 buy), buy, sell (int8), confidence,
+                       prob_sell, prob_hold, prob_buy หรือ None ถ้า model ยังไม่ได้ฝึก
+        """
+        if not self.trained:
+            logger.warning("AI model not trained yet")
+            return None
+        
+        return self._signal_frame(self._predict_proba(self.prepare_feature_matrix(indicators)), indicators.index)
+    
+    def predict_signals_panel(self, frames):
+        """
+        ทำนาย Signal ของทุกแถวของหลายหุ้นด้วยการเรียก model ครั้งเดียว
+        
+        Args:
+            frames: dict {symbol: DataFrame จาก TechnicalAnalyzer.get_indicator_history()}
+        
+        Returns:
+            dict: {symbol: DataFrame แบบเดียวกับ predict_signals_vectorized} หรือ None ถ้า model ยังไม่ได้ฝึก
+        """
+        if not self.trained:
+            logger.warning("AI model not trained yet")
+            return None
+        if not frames:
+            return {}
+        
+        symbols = list(frames)
+        features = np.vstack([self.prepare_feature_matrix(frames[symbol]) for symbol in symbols])
+        probability = self._predict_proba(features)
+        
+        # แบ่งผลลัพธ์กลับเป็นรายหุ้น
+        bounds = np.cumsum([0] + [len(frames[symbol]) for symbol in symbols])
+        return {symbol: self._signal_frame(probability[bounds[k]:bounds[k + 1]], frames[symbol].index)
+                for k, symbol in enumerate(symbols)}
+    
+    @staticmethod
+    def combine_signals(technical, ai):
+        """
+        สัญญาณเมื่อ technical และ AI ตรงกัน
+        
+        Args:
+            technical: DataFrame (buy, sell, confidence) จาก SignalGenerator
+            ai: DataFrame จาก predict_signals_vectorized / predict_signals_panel
+        
+        Returns:
+            DataFrame: buy, sell (int8), confidence = ค่าเฉลี่ยของทั้งสอง
+        """
+        return pd.DataFrame({
+            'buy': ((technical['buy'] == 1) & (ai['buy'] == 1)).astype(np.int8),
+            'sell': ((technical['sell'] == 1) & (ai['sell'] == 1)).astype(np.int8),
+            'confidence': (technical['confidence'] + ai['confidence']) / 2,
+        }, index=technical.index)
@@ -1,5 +1,6 @@
 """Utils Module"""
 
 from .exchange_rate import ExchangeRateFetcher
+from .trading_calendar import TradingCalendar
 
-__all__ = ['ExchangeRateFetcher']
+__all__ = ['ExchangeRateFetcher', 'TradingCalendar']
@@ -0,0 +1,235 @@
+"""
+Trading Calendar
+ปฏิทินวันทำการของตลาดหุ้น NYSE/NASDAQ (คำนวณวันหยุดในเครื่อง ไม่ต้องใช้ API)
+"""
+
+import logging
+from datetime import date, timedelta
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+# วันที่ตลาดปิดเป็นกรณีพิเศษ (เหตุการณ์ / วันไว้อาลัยอดีตประธานาธิบดี)
+SPECIAL_CLOSURES = [
+    date(1994, 4, 27),   # Richard Nixon
+    date(2001, 9, 11), date(2001, 9, 12), date(2001, 9, 13), date(2001, 9, 14),  # 9/11
+    date(2004, 6, 11),   # Ronald Reagan
+    date(2007, 1, 2),    # Gerald Ford
+    date(2012, 10, 29), date(2012, 10, 30),  # Hurricane Sandy
+    date(2018, 12, 5),   # George H.W. Bush
+    date(2025, 1, 9),    # Jimmy Carter
+]
+
+
+def _easter(year):
+    """วันอีสเตอร์ (Anonymous Gregorian algorithm)"""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _nth_weekday(year, month, weekday, n):
+    """วันที่ของ weekday ครั้งที่ n ในเดือน (n = -1 คือครั้งสุดท้าย)"""
+    if n > 0:
+        first = date(year, month, 1)
+        offset = (weekday - first.weekday()) % 7
+        return first + timedelta(days=offset + 7 * (n - 1))
+    
+    next_month = date(year + month // 12, month % 12 + 1, 1)
+    last = next_month - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _observed(holiday):
+    """วันหยุดชดเชย: เสาร์ → ศุกร์ก่อนหน้า, อาทิตย์ → จันทร์ถัดไป"""
+    if holiday.weekday() == 5:
+        return holiday - timedelta(days=1)
+    if holiday.weekday() == 6:
+        return holiday + timedelta(days=1)
+    return holiday
+
+
+class TradingCalendar:
+    """
+    ปฏิทินวันทำการของตลาดหุ้นสหรัฐ (NYSE และ NASDAQ ใช้วันหยุดเดียวกัน)
+    
+    Features:
+    - คำนวณวันหยุดตามกฎของตลาด (รวม Good Friday และวันหยุดชดเชย)
+    - รายการวันทำการ (sessions) ในช่วงที่ต้องการ
+    - แปลงวันที่เป็นตำแหน่ง session (integer index)
+    """
+    
+    EXCHANGES = ('NYSE', 'NASDAQ')
+    
+    def __init__(self, exchange='NYSE'):
+        """
+        Initialize TradingCalendar
+        
+        Args:
+            exchange: ชื่อตลาด ('NYSE' หรือ 'NASDAQ')
+        """
+        exchange = exchange.upper()
+        if exchange not in self.EXCHANGES:
+            raise ValueError(f"Unsupported exchange: {exchange}. Use one of {self.EXCHANGES}")
+        self.exchange = exchange
+    
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def holidays_for_year(year):
+        """
+        วันหยุดตลาดของปีที่ระบุ
+        
+        Args:
+            year: ปี ค.ศ.
+        
+        Returns:
+            tuple: วันหยุด (datetime.date) เรียงตามวันที่
+        """
+        holidays = []
+        
+        # New Year's Day (ถ้าตรงกับวันเสาร์ ไม่มีวันหยุดชดเชยในปีก่อน)
+        new_year = date(year, 1, 1)
+        if new_year.weekday() == 6:
+            holidays.append(new_year + timedelta(days=1))
+        elif new_year.weekday() < 5:
+            holidays.append(new_year)
+        
+        if year >= 1998:
+            holidays.append(_nth_weekday(year, 1, 0, 3))      # Martin Luther King Jr. Day
+        holidays.append(_nth_weekday(year, 2, 0, 3))          # Washington's Birthday
+        holidays.append(_easter(year) - timedelta(days=2))    # Good Friday
+        holidays.append(_nth_weekday(year, 5, 0, -1))         # Memorial Day
+        if year >= 2022:
+            holidays.append(_observed(date(year, 6, 19)))     # Juneteenth
+        holidays.append(_observed(date(year, 7, 4)))          # Independence Day
+        holidays.append(_nth_weekday(year, 9, 0, 1))          # Labor Day
+        holidays.append(_nth_weekday(year, 11, 3, 4))         # Thanksgiving
+        holidays.append(_observed(date(year, 12, 25)))        # Christmas
+        
+        holidays.extend(closure for closure in SPECIAL_CLOSURES if closure.year == year)
+        return tuple(sorted(set(holidays)))
+    
+    def holidays(self, start, end):
+        """
+        วันหยุดตลาด (ที่ตรงกับวันจันทร์-ศุกร์) ในช่วงที่ระบุ
+        
+        Args:
+            start: วันเริ่มต้น
+            end: วันสิ้นสุด
+        
+        Returns:
+            pd.DatetimeIndex: วันหยุด
+        """
+        start = pd.Timestamp(start).normalize()
+        end = pd.Timestamp(end).normalize()
+        days = [holiday for year in range(start.year, end.year + 1)
+                for holiday in self.holidays_for_year(year)]
+        index = pd.DatetimeIndex(days, dtype='datetime64[ns]')
+        return index[(index >= start) & (index <= end)]
+    
+    def sessions(self, start, end):
+        """
+        วันทำการของตลาดในช่วงที่ระบุ (รวมวันเริ่มต้นและวันสิ้นสุด)
+        
+        Args:
+            start: วันเริ่มต้น
+            end: วันสิ้นสุด
+        
+        Returns:
+            pd.DatetimeIndex: วันทำการเรียงตามวันที่
+        """
+        return self._sessions(pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize())
+    
+    @lru_cache(maxsize=64)
+    def _sessions(self, start, end):
+        weekdays = pd.bdate_range(start=start, end=end).as_unit('ns')
+        return weekdays.difference(self.holidays(start, end))
+    
+    def is_session(self, day):
+        """
+        ตรวจสอบว่าเป็นวันทำการหรือไม่
+        
+        Args:
+            day: วันที่
+        
+        Returns:
+            bool: True ถ้าตลาดเปิด
+        """
+        day = pd.Timestamp(day)
+        if day.weekday() >= 5:
+            return False
+        return day.date() not in self.holidays_for_year(day.year)
+    
+    def session_mask(self, dates):
+        """
+        ตรวจสอบวันทำการของหลายวันพร้อมกัน
+        
+        Args:
+            dates: DatetimeIndex หรือ list ของวันที่
+        
+        Returns:
+            np.ndarray: bool array (True = วันทำการ)
+        """
+        dates = pd.DatetimeIndex(dates)
+        if dates.empty:
+            return np.zeros(0, dtype=bool)
+        sessions = self.sessions(dates.min(), dates.max())
+        return dates.normalize().isin(sessions)
+    
+    def session_positions(self, sessions, index):
+        """
+        ตำแหน่งแท่งล่าสุดใน index ที่ไม่เกินแต่ละ session
+        
+        Args:
+            sessions: DatetimeIndex ของวันทำการ
+            index: DatetimeIndex ของข้อมูลราคา (เรียงตามวันที่)
+        
+        Returns:
+            np.ndarray: ตำแหน่ง (int) ของแท่ง, -1 ถ้ายังไม่มีข้อมูล
+        """
+        sessions = pd.DatetimeIndex(sessions).to_numpy(dtype='datetime64[ns]')
+        index = pd.DatetimeIndex(index).to_numpy(dtype='datetime64[ns]')
+        return index.searchsorted(sessions, side='right') - 1
+    
+    def previous_session(self, day):
+        """วันทำการล่าสุดก่อนหน้า (ไม่รวมวันที่ระบุ)"""
+        day = pd.Timestamp(day).normalize()
+        return self.sessions(day - pd.Timedelta(days=14), day - pd.Timedelta(days=1))[-1]
+    
+    def next_session(self, day):
+        """วันทำการถัดไป (ไม่รวมวันที่ระบุ)"""
+        day = pd.Timestamp(day).normalize()
+        return self.sessions(day + pd.Timedelta(days=1), day + pd.Timedelta(days=14))[0]
+    
+    def session_offset(self, day, count):
+        """
+        เลื่อนวันทำการไปข้างหน้า/ย้อนหลังตามจำนวน sessions
+        
+        Args:
+            day: วันที่อ้างอิง
+            count: จำนวน sessions (ค่าลบ = ย้อนหลัง)
+        
+        Returns:
+            pd.Timestamp: วันทำการที่ได้
+        """
+        day = pd.Timestamp(day).normalize()
+        span = pd.Timedelta(days=abs(count) * 7 // 5 + 14)
+        if count >= 0:
+            sessions = self.sessions(day, day + span)
+            position = sessions.searchsorted(day, side='left')
+        else:
+            sessions = self.sessions(day - span, day)
+            position = sessions.searchsorted(day, side='right') - 1
+        return sessions[position + count]
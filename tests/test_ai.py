@@ -0,0 +1,636 @@
+"""
+Unit tests for AI module
+ทดสอบการสร้างชุดข้อมูลและ models ของ AI
+"""
+
+import pickle
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from src.ai.dataset import DatasetBuilder, FeatureDataset, FEATURE_NAMES, forward_returns, make_labels
+from src.ai.registry import ModelRegistry, LazyArtifact, fingerprint_training_data
+from src.ai.models import SignalClassifier, PricePredictor, StreamingAnomalyDetector
+from src.ai.online import daily_update
+from src.ai.feature_store import FeatureStore
+from src.ai.correlation import CorrelationIndex
+from src.ai.validation import PurgedWalkForwardSplit, cross_validate, date_ranks
+from src.ai.compact import CompactTreeEnsemble
+from src.analysis.technical import TechnicalAnalyzer
+from src.signals.generator import AISignalGenerator
+from src.data.synthetic import generate_ohlcv
+
+
+class TestDatasetBuilder(unittest.TestCase):
+    """ทดสอบ DatasetBuilder และ FeatureDataset"""
+    
+    def setUp(self):
+        self.history = generate_ohlcv(n_symbols=3, periods=400, seed=7)
+        self.builder = DatasetBuilder(horizon=5, buy_threshold=0.02, sell_threshold=-0.02)
+    
+    def test_forward_returns_do_not_cross_symbols(self):
+        """ทดสอบว่าผลตอบแทนล่วงหน้าไม่ข้ามไปยังหุ้นถัดไป"""
+        close = np.array([1.0, 2.0, 4.0, 10.0, 20.0])
+        codes = np.array([0, 0, 0, 1, 1])
+        returns = forward_returns(close, codes, horizon=1)
+        np.testing.assert_allclose(returns, [1.0, 1.0, np.nan, 1.0, np.nan])
+    
+    def test_make_labels(self):
+        """ทดสอบการแปลงผลตอบแทนเป็น label"""
+        labels = make_labels(np.array([-0.05, -0.02, 0.0, 0.02, 0.05]))
+        np.testing.assert_array_equal(labels, [0, 0, 1, 2, 2])
+    
+    def test_matches_per_symbol_features(self):
+        """ทดสอบว่า features และ labels ตรงกับการคำนวณทีละหุ้น"""
+        dataset = self.builder.build(self.history)
+        self.assertEqual(dataset.X.dtype, np.float32)
+        self.assertEqual(dataset.X.shape[1], len(FEATURE_NAMES))
+        self.assertEqual(dataset.symbols, list(self.history))
+        
+        for code, (symbol, data) in enumerate(self.history.items()):
+            indicators = TechnicalAnalyzer.get_indicator_history(data)
+            close = data['Close']
+            expected_returns = (close.shift(-5) / close - 1).to_numpy()
+            keep = ~np.isnan(expected_returns) & indicators[FEATURE_NAMES].notna().all(axis=1).to_numpy()
+            expected_X = AISignalGenerator.prepare_feature_matrix(indicators)[keep]
+            
+            rows = dataset.codes == code
+            np.testing.assert_allclose(dataset.X[rows], expected_X.astype(np.float32), rtol=1e-6)
+            np.testing.assert_allclose(dataset.forward_return[rows], expected_returns[keep], rtol=1e-5)
+            np.testing.assert_array_equal(dataset.dates[rows], data.index[keep].to_numpy(dtype='datetime64[ns]'))
+            np.testing.assert_array_equal(dataset.y[rows], make_labels(expected_returns[keep]))
+    
+    def test_save_and_load(self):
+        """ทดสอบการบันทึกและโหลดแบบ memory-mapped"""
+        dataset = self.builder.build(self.history)
+        with tempfile.TemporaryDirectory() as directory:
+            dataset.save(directory)
+            loaded = FeatureDataset.load(directory)
+            self.assertIsInstance(loaded.X, np.memmap)
+            np.testing.assert_array_equal(loaded.X, dataset.X)
+            np.testing.assert_array_equal(loaded.y, dataset.y)
+            self.assertEqual(loaded.symbols, dataset.symbols)
+            self.assertEqual(loaded.params['horizon'], 5)
+    
+    def test_split_by_date(self):
+        """ทดสอบการแบ่ง train/test ตามวันที่"""
+        dataset = self.builder.build(self.history)
+        cutoff = pd.Timestamp(dataset.dates[len(dataset) // 2])
+        train, test = dataset.split(cutoff)
+        self.assertEqual(len(train) + len(test), len(dataset))
+        self.assertTrue((train.dates < np.datetime64(cutoff)).all())
+        self.assertTrue((test.dates >= np.datetime64(cutoff)).all())
+    
+    def test_trains_ai_signal_generator(self):
+        """ทดสอบว่า dataset ใช้ฝึก AISignalGenerator ได้โดยตรง"""
+        dataset = self.builder.build(self.history)
+        generator = AISignalGenerator()
+        generator.train_model(dataset.X, dataset.y)
+        self.assertTrue(generator.trained)
+
+
+class TestAIBatchInference(unittest.TestCase):
+    """ทดสอบการทำนายแบบ batch ของ AISignalGenerator"""
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.history = generate_ohlcv(n_symbols=3, periods=400, seed=11)
+        cls.frames = {symbol: TechnicalAnalyzer.get_indicator_history(data) for symbol, data in cls.history.items()}
+        dataset = DatasetBuilder().build_from_indicators(cls.frames)
+        cls.generator = AISignalGenerator()
+        cls.generator.train_model(dataset.X, dataset.y)
+    
+    def test_batch_matches_single_predictions(self):
+        """ทดสอบว่า predict_signals_batch ได้ผลเท่ากับ predict_signal ทีละตัว"""
+        summaries = {symbol: frame.iloc[-1].to_dict() for symbol, frame in self.frames.items()}
+        batch = self.generator.predict_signals_batch(summaries)
+        
+        self.assertEqual(list(batch), list(summaries))
+        for symbol, technical_data in summaries.items():
+            single = self.generator.predict_signal(technical_data)
+            self.assertEqual(batch[symbol]['signal'], single['signal'])
+            self.assertAlmostEqual(batch[symbol]['confidence'], single['confidence'])
+    
+    def test_single_row_features_fill_missing_values(self):
+        """ทดสอบว่า prepare_features เติมค่า NaN/None ด้วยค่า default เหมือน prepare_feature_matrix"""
+        frame = next(iter(self.frames.values())).iloc[:60]
+        technical_data = frame.iloc[-1].to_dict()
+        self.assertTrue(np.isnan(technical_data['sma_200']))
+        
+        np.testing.assert_array_equal(self.generator.prepare_features(technical_data),
+                                      AISignalGenerator.prepare_feature_matrix(frame)[-1:])
+        self.assertEqual(self.generator.prepare_features({'rsi': None})[0, 3], 50)
+    
+    def test_panel_matches_per_symbol_predictions(self):
+        """ทดสอบว่า predict_signals_panel เท่ากับ predict_signals_vectorized ของแต่ละหุ้น"""
+        panel = self.generator.predict_signals_panel(self.frames)
+        for symbol, frame in self.frames.items():
+            pd.testing.assert_frame_equal(panel[symbol], self.generator.predict_signals_vectorized(frame))
+    
+    def test_untrained_model(self):
+        """ทดสอบว่า model ที่ยังไม่ได้ฝึกคืน error แทนการทำนาย"""
+        generator = AISignalGenerator()
+        self.assertIn('error', generator.predict_signals_batch({'AAA': {}})['AAA'])
+        self.assertIsNone(generator.predict_signals_panel(self.frames))
+
+
+class TestModelRegistry(unittest.TestCase):
+    """ทดสอบ ModelRegistry"""
+    
+    @classmethod
+    def setUpClass(cls):
+        history = generate_ohlcv(n_symbols=2, periods=400, seed=5)
+        cls.dataset = DatasetBuilder().build(history)
+        cls.generator = AISignalGenerator()
+        cls.generator.train_model(cls.dataset.X, cls.dataset.y)
+    
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.registry = ModelRegistry(self.temp_dir.name)
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def test_save_and_lazy_load(self):
+        """ทดสอบว่า model ที่โหลดกลับทำนายได้เหมือนเดิม และโหลดไฟล์เมื่อใช้ครั้งแรก"""
+        fingerprint = fingerprint_training_data(self.dataset.X, self.dataset.y)
+        self.assertEqual(self.registry.save('signals', self.generator, fingerprint), 'v1')
+        self.assertEqual(self.registry.save('signals', self.generator, fingerprint), 'v2')
+        self.assertEqual(self.registry.versions('signals'), ['v1', 'v2'])
+        
+        loaded = AISignalGenerator()
+        meta = self.registry.load('signals', loaded)
+        self.assertEqual(meta['version'], 'v2')
+        self.assertEqual(meta['training_fingerprint'], fingerprint)
+        self.assertTrue(loaded.trained)
+        self.assertFalse(loaded.model.loaded)
+        
+        X = self.dataset.X[:50]
+        np.testing.assert_allclose(loaded._predict_proba(X), self.generator._predict_proba(X))
+        self.assertEqual(len(loaded.model.classes_), len(self.generator.model.classes_))
+        self.assertTrue(loaded.model.loaded)
+    
+    def test_tree_model_served_from_mmapped_compact(self):
+        """ทดสอบว่า tree model ทำนายจาก CompactTreeEnsemble ที่ mmap โดยไม่ unpickle ต้นไม้ของ sklearn"""
+        self.registry.save('signals', self.generator)
+        loaded = AISignalGenerator()
+        meta = self.registry.load('signals', loaded)
+        
+        self.assertTrue(meta['compact'])
+        self.assertIsInstance(loaded.compact.values, np.memmap)
+        X = self.dataset.X[:50]
+        np.testing.assert_allclose(loaded._predict_proba(X), self.generator._predict_proba(X), atol=1e-12)
+        self.assertFalse(loaded.model.loaded)
+        
+        in_memory = AISignalGenerator()
+        self.registry.load('signals', in_memory, mmap=False)
+        self.assertNotIsInstance(in_memory.compact.values, np.memmap)
+    
+    def test_pickle_sends_path_only(self):
+        """ทดสอบว่า LazyArtifact ที่ถูก pickle (ส่งให้ process อื่น) ไม่รวมตัว model"""
+        self.registry.save('signals', self.generator)
+        loaded = AISignalGenerator()
+        self.registry.load('signals', loaded)
+        loaded.model.load()
+        
+        copy = pickle.loads(pickle.dumps(loaded))
+        self.assertIsInstance(copy.model, LazyArtifact)
+        self.assertFalse(copy.model.loaded)
+        self.assertIsInstance(copy.compact.values, np.memmap)
+        self.assertEqual(len(copy.model.classes_), len(self.generator.model.classes_))
+    
+    def test_feature_schema_mismatch(self):
+        """ทดสอบว่า features ที่ไม่ตรงกับตอนฝึกทำให้เกิด ValueError"""
+        self.registry.save('signals', self.generator)
+        with self.assertRaises(ValueError):
+            self.registry.load('signals', AISignalGenerator(), feature_names=['rsi', 'macd'])
+        self.assertIsNone(self.registry.load('missing', AISignalGenerator()))
+    
+    def test_signal_classifier(self):
+        """ทดสอบการบันทึก/โหลด SignalClassifier จาก src/ai/models.py"""
+        classifier = SignalClassifier()
+        classifier.train(self.dataset.X[:500], self.dataset.y[:500])
+        self.registry.save('classifier', classifier)
+        
+        loaded = SignalClassifier()
+        self.registry.load('classifier', loaded)
+        np.testing.assert_array_equal(loaded.predict(self.dataset.X[:20])['prediction'],
+                                      classifier.predict(self.dataset.X[:20])['prediction'])
+
+
+class TestFeatureStore(unittest.TestCase):
+    """ทดสอบ FeatureStore"""
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.history = generate_ohlcv(n_symbols=2, periods=400, seed=19)
+    
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store = FeatureStore(self.temp_dir.name)
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def test_incremental_append_matches_full_build(self):
+        """ทดสอบว่าการต่อท้ายทีละช่วงได้ features เท่ากับการคำนวณจากประวัติทั้งหมด"""
+        for end in (250, 320, 400):
+            self.store.update_many({symbol: data.iloc[:end] for symbol, data in self.history.items()})
+        self.assertEqual(self.store.update_many(self.history), {symbol: 0 for symbol in self.history})
+        
+        for symbol, data in self.history.items():
+            self.assertEqual(self.store.rows(symbol), len(data))
+            expected = AISignalGenerator.prepare_feature_matrix(TechnicalAnalyzer.get_indicator_history(data))
+            np.testing.assert_allclose(self.store.read(symbol)['features'], expected.astype(np.float32), rtol=1e-6)
+    
+    def test_read_date_range_is_memory_mapped(self):
+        """ทดสอบการอ่านช่วงวันที่แบบ memory-mapped"""
+        symbol, data = next(iter(self.history.items()))
+        self.store.update(symbol, data)
+        start, end = data.index[100], data.index[199]
+        part = self.store.read(symbol, start, end)
+        self.assertIsInstance(part['features'], np.memmap)
+        self.assertEqual(len(part['features']), 100)
+        self.assertEqual(pd.Timestamp(part['dates'][0]), start)
+        self.assertEqual(pd.Timestamp(part['dates'][-1]), end)
+        self.assertEqual(list(self.store.read_frame(symbol, start, end).columns), FEATURE_NAMES)
+        self.assertIsNone(self.store.read('MISSING'))
+    
+    def test_tz_aware_history_stores_session_dates(self):
+        """ทดสอบว่าราคาที่ index มี timezone (เช่นจาก yfinance) อ่านด้วยวันที่ธรรมดาได้ครบทุกวัน"""
+        symbol, data = next(iter(self.history.items()))
+        self.store.update(symbol, data.tz_localize('America/New_York'))
+        last = data.index[-1].strftime('%Y-%m-%d')
+        
+        part = self.store.read(symbol, last, last)
+        self.assertEqual(len(part['dates']), 1)
+        self.assertEqual(pd.Timestamp(part['dates'][0]), data.index[-1])
+        self.assertEqual(len(self.store.read(symbol, data.index[100], data.index[199])['dates']), 100)
+        self.assertEqual(self.store.update(symbol, data.tz_localize('America/New_York')), 0)
+    
+    def test_dataset_matches_builder(self):
+        """ทดสอบว่า dataset จาก store เท่ากับ DatasetBuilder.build"""
+        self.store.update_many(self.history)
+        expected = DatasetBuilder().build(self.history)
+        dataset = self.store.dataset(list(self.history))
+        np.testing.assert_allclose(dataset.X, expected.X, rtol=1e-6)
+        np.testing.assert_array_equal(dataset.y, expected.y)
+        np.testing.assert_array_equal(dataset.dates, expected.dates)
+        np.testing.assert_array_equal(dataset.codes, expected.codes)
+    
+    def test_changed_history_rebuilds_partition(self):
+        """ทดสอบว่าราคาย้อนหลังที่เปลี่ยนทำให้เขียน partition ใหม่"""
+        symbol, data = next(iter(self.history.items()))
+        self.store.update(symbol, data.iloc[:300])
+        adjusted = data.copy()
+        adjusted[['Open', 'High', 'Low', 'Close']] *= 0.5
+        self.assertEqual(self.store.update(symbol, adjusted), len(adjusted))
+        self.assertEqual(self.store.rows(symbol), len(adjusted))
+    
+    def test_definition_version_separates_stores(self):
+        """ทดสอบว่านิยาม features ต่างเวอร์ชันเก็บแยกกัน"""
+        symbol, data = next(iter(self.history.items()))
+        self.store.update(symbol, data)
+        other = FeatureStore(self.temp_dir.name, version='old-definition')
+        self.assertEqual(other.rows(symbol), 0)
+        symbols, dates, X = self.store.latest()
+        self.assertEqual(symbols, [symbol])
+        self.assertEqual(X.shape, (1, len(FEATURE_NAMES)))
+
+
+class TestIncrementalUpdates(unittest.TestCase):
+    """ทดสอบการปรับ model แบบ incremental และ lineage ใน ModelRegistry"""
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.history = generate_ohlcv(n_symbols=2, periods=400, seed=17)
+    
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.registry = ModelRegistry(self.temp_dir.name)
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def test_update_model(self):
+        """ทดสอบว่า update_model ปรับ scaler สะสมและทำนายได้ครบ 3 classes"""
+        dataset = DatasetBuilder().build(self.history)
+        half = len(dataset) // 2
+        generator = AISignalGenerator(incremental=True)
+        generator.train_model(dataset.X[:half], dataset.y[:half])
+        self.assertTrue(generator.update_model(dataset.X[half:], dataset.y[half:]))
+        
+        self.assertEqual(generator.scaler.n_samples_seen_, len(dataset))
+        np.testing.assert_allclose(generator.scaler.mean_, dataset.X.astype(np.float64).mean(axis=0),
+                                   rtol=1e-4, atol=1e-6)
+        self.assertEqual(generator._predict_proba(dataset.X[:10]).shape, (10, 3))
+    
+    def test_update_registry_loaded_model(self):
+        """ทดสอบว่า update_model ใช้ได้กับ model ที่โหลดจาก registry แบบ memory-mapped"""
+        dataset = DatasetBuilder().build(self.history)
+        half = len(dataset) // 2
+        generator = AISignalGenerator(incremental=True)
+        generator.train_model(dataset.X[:half], dataset.y[:half])
+        self.registry.save('signals', generator)
+        
+        loaded = AISignalGenerator()
+        self.registry.load('signals', loaded, mmap=True)
+        self.assertTrue(loaded.update_model(dataset.X[half:], dataset.y[half:]))
+        self.assertNotIsInstance(loaded.model, LazyArtifact)
+        self.assertEqual(loaded.scaler.n_samples_seen_, len(dataset))
+    
+    def test_random_forest_cannot_update(self):
+        """ทดสอบว่า Random Forest ไม่รองรับ update_model"""
+        dataset = DatasetBuilder().build(self.history)
+        generator = AISignalGenerator()
+        generator.train_model(dataset.X, dataset.y)
+        self.assertFalse(generator.update_model(dataset.X[:10], dataset.y[:10]))
+    
+    def test_daily_update_lineage(self):
+        """ทดสอบว่างานประจำวันใช้เฉพาะ bars ใหม่และบันทึก lineage"""
+        early = {symbol: data.iloc[:300] for symbol, data in self.history.items()}
+        self.assertEqual(daily_update(early, self.registry), 'v1')
+        self.assertIsNone(daily_update(early, self.registry))
+        self.assertEqual(daily_update(self.history, self.registry), 'v2')
+        
+        lineage = self.registry.lineage('ai_signal_generator')
+        self.assertEqual([meta['version'] for meta in lineage], ['v2', 'v1'])
+        self.assertEqual(lineage[0]['parent_version'], 'v1')
+        self.assertIsNone(lineage[1]['parent_version'])
+        self.assertGreater(lineage[0]['metadata']['first_label_date'], lineage[1]['metadata']['last_label_date'])
+        self.assertEqual(lineage[0]['model_class'], 'SGDClassifier')
+
+
+class TestSignalClassifierBackends(unittest.TestCase):
+    """ทดสอบ backends ของ SignalClassifier"""
+    
+    @classmethod
+    def setUpClass(cls):
+        history = generate_ohlcv(n_symbols=2, periods=400, seed=13)
+        cls.dataset = DatasetBuilder().build(history)
+    
+    def test_hist_gradient_boosting(self):
+        """ทดสอบ backend hist_gradient_boosting พร้อม early stopping"""
+        classifier = SignalClassifier(backend='hist_gradient_boosting')
+        classifier.train(self.dataset.X, self.dataset.y, dates=self.dataset.dates)
+        self.assertEqual(type(classifier.model).__name__, 'HistGradientBoostingClassifier')
+        self.assertLessEqual(classifier.model.n_iter_, 500)
+        self.assertFalse(classifier.model.early_stopping)
+        
+        result = classifier.predict(self.dataset.X[:50])
+        self.assertEqual(result['probabilities'].shape, (50, len(np.unique(self.dataset.y))))
+        self.assertFalse(classifier.compile_model())
+        self.assertIsNone(classifier.compact)
+    
+    def test_early_stopping_uses_tail_holdout(self):
+        """ทดสอบว่าจำนวน iterations เลือกจาก hold-out ช่วงท้ายตามวันที่ แล้วฝึกใหม่ด้วยทุกแถว"""
+        classifier = SignalClassifier(backend='hist_gradient_boosting')
+        scaled = classifier.scaler.fit_transform(self.dataset.X)
+        best = classifier._best_iteration(scaled, self.dataset.y, self.dataset.dates)
+        self.assertEqual(best % SignalClassifier.HOLDOUT_PATIENCE, 0)
+        
+        classifier.train(self.dataset.X, self.dataset.y, dates=self.dataset.dates)
+        self.assertEqual(classifier.model.n_iter_, best)
+        
+        # ข้อมูลน้อยเกินกว่าจะแบ่ง hold-out ได้: ฝึกเต็มจำนวน iterations
+        short = SignalClassifier(backend='hist_gradient_boosting', purge=10**6)
+        self.assertEqual(short._best_iteration(scaled, self.dataset.y, self.dataset.dates),
+                         SignalClassifier.MAX_ITER)
+    
+    def test_unknown_backend(self):
+        """ทดสอบว่า backend ที่ไม่รู้จักทำให้เกิด ValueError"""
+        with self.assertRaises(ValueError):
+            SignalClassifier(backend='xgboost')
+
+
+class TestCompactTreeEnsemble(unittest.TestCase):
+    """ทดสอบ CompactTreeEnsemble เทียบกับ predict_proba ของ sklearn"""
+    
+    @classmethod
+    def setUpClass(cls):
+        history = generate_ohlcv(n_symbols=2, periods=400, seed=3)
+        cls.dataset = DatasetBuilder().build(history)
+        cls.X = cls.dataset.X[:300]
+        cls.y = cls.dataset.y[:300]
+    
+    def test_random_forest_with_scaler(self):
+        """ทดสอบว่า AISignalGenerator.compile_model ให้ความน่าจะเป็นเท่าเดิม"""
+        generator = AISignalGenerator()
+        generator.train_model(self.dataset.X, self.dataset.y)
+        expected = generator._predict_proba(self.dataset.X)
+        np.testing.assert_allclose(generator._predict_proba(self.dataset.X[5]), expected[5:6])
+        
+        self.assertTrue(generator.compile_model())
+        self.assertIsNotNone(generator.compact)
+        np.testing.assert_allclose(generator._predict_proba(self.dataset.X), expected, atol=1e-12)
+        np.testing.assert_allclose(generator._predict_proba(self.dataset.X[5]), expected[5:6], atol=1e-12)
+    
+    def test_gradient_boosting_multiclass(self):
+        """ทดสอบ GradientBoosting หลาย class ผ่าน SignalClassifier"""
+        classifier = SignalClassifier()
+        classifier.train(self.X, self.y)
+        expected = classifier.predict(self.dataset.X)
+        
+        self.assertTrue(classifier.compile_model())
+        result = classifier.predict(self.dataset.X)
+        np.testing.assert_allclose(result['probabilities'], expected['probabilities'], atol=1e-9)
+        np.testing.assert_array_equal(result['prediction'], expected['prediction'])
+    
+    def test_gradient_boosting_binary(self):
+        """ทดสอบ GradientBoosting สอง class (sigmoid)"""
+        from sklearn.ensemble import GradientBoostingClassifier
+        y = (self.y == 2).astype(int)
+        model = GradientBoostingClassifier(n_estimators=30, max_depth=3, random_state=0).fit(self.X, y)
+        compact = CompactTreeEnsemble.from_sklearn(model)
+        np.testing.assert_allclose(compact.predict_proba(self.dataset.X), model.predict_proba(self.dataset.X),
+                                   atol=1e-9)
+    
+    def test_single_row_matches_batch_apply(self):
+        """ทดสอบว่าเส้นทาง scalar ของแถวเดียวให้ใบเดียวกับการเดินแบบ batch (รวมค่า NaN)"""
+        from sklearn.tree import DecisionTreeClassifier
+        X = self.X.astype(np.float32)
+        X[::7, 0] = np.nan
+        model = DecisionTreeClassifier(random_state=0).fit(X, self.y)
+        compact = CompactTreeEnsemble.from_sklearn(model)
+        batch = compact.apply(X[:40])
+        for i in range(40):
+            np.testing.assert_array_equal(compact.apply(X[i:i + 1])[0], batch[i])
+        np.testing.assert_allclose(compact.predict_proba(X[7:8]), model.predict_proba(X[7:8]), atol=1e-9)
+    
+    def test_save_and_load(self):
+        """ทดสอบการบันทึก/โหลดไฟล์ .npz"""
+        generator = AISignalGenerator()
+        generator.train_model(self.X, self.y)
+        generator.compile_model()
+        with tempfile.TemporaryDirectory() as directory:
+            path = f'{directory}/compact.npz'
+            generator.compact.save(path)
+            loaded = CompactTreeEnsemble.load(path)
+        np.testing.assert_array_equal(loaded.predict_proba(self.dataset.X),
+                                      generator.compact.predict_proba(self.dataset.X))
+    
+    def test_unsupported_model(self):
+        """ทดสอบว่า model ที่ไม่ใช่ tree ensemble ทำให้เกิด ValueError"""
+        from sklearn.linear_model import LogisticRegression
+        with self.assertRaises(ValueError):
+            CompactTreeEnsemble.from_sklearn(LogisticRegression().fit(self.X, self.y))
+
+
+class TestPurgedCrossValidation(unittest.TestCase):
+    """ทดสอบ PurgedWalkForwardSplit และ cross_validate"""
+    
+    @classmethod
+    def setUpClass(cls):
+        history = generate_ohlcv(n_symbols=2, periods=500, seed=9)
+        cls.dataset = DatasetBuilder(horizon=5).build(history)
+    
+    def test_walk_forward_purges_before_test(self):
+        """ทดสอบว่าแถวฝึกอยู่ก่อนช่วงทดสอบอย่างน้อย purge วันเสมอ"""
+        ranks, _ = date_ranks(self.dataset.dates)
+        splitter = PurgedWalkForwardSplit(n_splits=4, purge=5)
+        folds = list(splitter.split(self.dataset.dates))
+        self.assertEqual(len(folds), 4)
+        for train, test in folds:
+            self.assertGreaterEqual(ranks[test].min() - ranks[train].max(), 6)
+            self.assertEqual(len(np.intersect1d(train, test)), 0)
+    
+    def test_embargo_after_test(self):
+        """ทดสอบว่า walk_forward=False ตัดแถวหลังช่วงทดสอบตาม embargo"""
+        splitter = PurgedWalkForwardSplit(n_splits=3, purge=5, embargo=10, walk_forward=False)
+        for fold in splitter.folds(300):
+            test_start, test_end = fold['test']
+            for start, end in fold['train']:
+                self.assertTrue(end <= test_start - 5 or start >= test_end + 10)
+        with self.assertRaises(ValueError):
+            PurgedWalkForwardSplit(n_splits=5, purge=5).folds(8)
+    
+    def test_parallel_matches_sequential(self):
+        """ทดสอบว่าการฝึกคู่ขนานผ่าน shared memory ได้ผลเท่ากับการฝึกใน process เดียว"""
+        splitter = PurgedWalkForwardSplit(n_splits=3, purge=5)
+        X, y = self.dataset.X, self.dataset.y
+        sequential = cross_validate(SignalClassifier, X, y, self.dataset.dates, splitter, n_jobs=1)
+        parallel = cross_validate(SignalClassifier, X, y, self.dataset.dates, splitter, n_jobs=2)
+        
+        self.assertEqual(sequential['task'], 'classification')
+        self.assertEqual(parallel['n_jobs'], 2)
+        self.assertEqual(len(parallel['folds']), 3)
+        for column in ('accuracy', 'f1_macro', 'train_rows', 'test_rows'):
+            np.testing.assert_allclose(parallel['folds'][column], sequential['folds'][column])
+        self.assertIn('train_seconds', parallel['mean'])
+    
+    def test_regression(self):
+        """ทดสอบ PricePredictor กับผลตอบแทนล่วงหน้า"""
+        result = cross_validate(PricePredictor, self.dataset.X, self.dataset.forward_return,
+                                self.dataset.dates, PurgedWalkForwardSplit(n_splits=2), n_jobs=1)
+        self.assertEqual(result['task'], 'regression')
+        self.assertIn('rmse', result['mean'])
+
+
+class TestStreamingAnomalyDetector(unittest.TestCase):
+    """ทดสอบ StreamingAnomalyDetector"""
+    
+    def setUp(self):
+        self.history = generate_ohlcv(n_symbols=3, periods=120, seed=23)
+        self.symbols = list(self.history)
+    
+    def test_state_matches_pandas_ewm(self):
+        """ทดสอบว่า EW mean ของทุกหุ้นเท่ากับ pandas ewm(adjust=False)"""
+        detector = StreamingAnomalyDetector(span=20)
+        detector.warm_up(self.history)
+        for symbol, data in self.history.items():
+            row = detector.index[symbol]
+            expected = data['Close'].ewm(span=20, adjust=False).mean().iloc[-1]
+            self.assertAlmostEqual(detector.mean[row, 0], expected)
+            self.assertEqual(detector.count[row, 0], len(data))
+    
+    def test_emits_only_new_anomalies(self):
+        """ทดสอบว่าแจ้งเฉพาะหุ้นที่เพิ่งผิดปกติ และไม่แจ้งซ้ำในแท่งถัดไป"""
+        detector = StreamingAnomalyDetector(span=20, threshold=3.0)
+        detector.warm_up(self.history)
+        close = np.array([self.history[symbol]['Close'].iloc[-1] for symbol in self.symbols])
+        volume = np.array([self.history[symbol]['Volume'].iloc[-1] for symbol in self.symbols])
+        
+        spiked = close.copy()
+        spiked[1] *= 1.5
+        alerts = detector.update(spiked, volume)
+        self.assertEqual([(alert['symbol'], alert['field']) for alert in alerts], [(self.symbols[1], 'price')])
+        self.assertGreater(alerts[0]['z_score'], 3.0)
+        
+        again = close.copy()
+        again[1] = spiked[1] * 1.01
+        self.assertEqual(detector.update(again, volume), [])
+    
+    def test_missing_values_keep_state(self):
+        """ทดสอบว่าหุ้นที่ไม่มีข้อมูลใน bar ไม่ถูกอัปเดต"""
+        detector = StreamingAnomalyDetector(span=10)
+        detector.warm_up(self.history)
+        before = detector.mean.copy()
+        detector.update_bar({self.symbols[0]: {'Close': 100.0, 'Volume': 1e6}})
+        np.testing.assert_array_equal(detector.mean[1:], before[1:])
+        self.assertNotEqual(detector.mean[0, 0], before[0, 0])
+    
+    def test_save_and_load(self):
+        """ทดสอบการบันทึก/โหลด state"""
+        detector = StreamingAnomalyDetector(span=15, threshold=2.5)
+        detector.warm_up(self.history)
+        with tempfile.TemporaryDirectory() as directory:
+            path = f'{directory}/anomaly.npz'
+            detector.save(path)
+            loaded = StreamingAnomalyDetector.load(path)
+        self.assertEqual(loaded.symbols, detector.symbols)
+        np.testing.assert_array_equal(loaded.var, detector.var)
+        self.assertEqual(loaded.threshold, 2.5)
+
+
+class TestCorrelationIndex(unittest.TestCase):
+    """ทดสอบ CorrelationIndex เทียบกับ DataFrame.corr()"""
+    
+    def setUp(self):
+        history = generate_ohlcv(n_symbols=12, periods=200, seed=29)
+        self.close = pd.DataFrame({symbol: data['Close'] for symbol, data in history.items()})
+    
+    def test_matches_pandas_correlation(self):
+        """ทดสอบว่า top-k และ correlation ตรงกับ pandas"""
+        index = CorrelationIndex(k=3, window=500, block_size=5).fit(self.close.pct_change().iloc[1:])
+        expected = self.close.pct_change().corr()
+        
+        for symbol in self.close.columns:
+            top = expected[symbol].drop(symbol).sort_values(ascending=False).iloc[:3]
+            result = index.most_correlated(symbol)
+            self.assertEqual(list(result.index), list(top.index))
+            np.testing.assert_allclose(result.to_numpy(), top.to_numpy(), atol=1e-5)
+        np.testing.assert_allclose(index.correlation_matrix().to_numpy(), expected.to_numpy(), atol=1e-5)
+    
+    def test_incremental_update_matches_refit(self):
+        """ทดสอบว่าการเพิ่มราคาทีละแท่งได้ผลเท่ากับการสร้างใหม่จาก window ล่าสุด"""
+        window = 100
+        index = CorrelationIndex.from_prices(self.close.iloc[:150], k=4, window=window, refresh_every=7)
+        for _, prices in self.close.iloc[150:].iterrows():
+            index.update_prices(prices)
+        index.build()
+        
+        fresh = CorrelationIndex.from_prices(self.close.iloc[-window - 1:], k=4, window=window)
+        np.testing.assert_array_equal(index.neighbors, fresh.neighbors)
+        np.testing.assert_allclose(index.scores, fresh.scores, atol=1e-5)
+    
+    def test_refreshed_scores_are_exact(self):
+        """ทดสอบว่า correlation ของ neighbors เดิมถูกคำนวณใหม่ทุก update"""
+        index = CorrelationIndex.from_prices(self.close.iloc[:150], k=4, window=100, refresh_every=0)
+        for _, prices in self.close.iloc[150:170].iterrows():
+            index.update_prices(prices)
+        symbol = self.close.columns[0]
+        expected = index.correlations(symbol)
+        result = index.most_correlated(symbol)
+        np.testing.assert_allclose(result.to_numpy(), expected[result.index].to_numpy(), atol=1e-5)
+        self.assertTrue((np.diff(result.to_numpy()) <= 0).all())
+    
+    def test_unknown_symbol(self):
+        """ทดสอบหุ้นที่ไม่มีใน index"""
+        index = CorrelationIndex.from_prices(self.close, k=3)
+        self.assertTrue(index.most_correlated('MISSING').empty)
+        self.assertIsNone(index.correlations('MISSING'))
+
+
+if __name__ == '__main__':
+    # รัน tests
+    unittest.main(verbosity=2)
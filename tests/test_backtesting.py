@@ -3,11 +3,620 @@ Unit tests for backtesting module
 ทดสอบระบบ Backtesting
 """
 
+import os
+import tempfile
 import unittest
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 from src.backtesting.backtester import Backtester, Trade, Position
 from src.backtesting.metrics import PerformanceMetrics
+from src.backtesting.portfolio import PortfolioBacktester
+from src.backtesting.multi_strategy import MultiStrategyRunner
+from src.backtesting.trade_log import TradeLog
+from src.backtesting.cache import BacktestCache, fingerprint_price_data
+from src.backtesting.execution import IntrabarExecution, EXIT_NONE, EXIT_STOP, EXIT_TARGET
+from src.backtesting.events import EventRecorder
+from src.backtesting.checkpoint import BacktestCheckpoint
+from src.backtesting.benchmark_store import BenchmarkStore
+from src.backtesting.stream import BacktestStream, ColumnFile
+from src.backtesting.jobs import JobQueue, BacktestWorker, WorkerPool
+from src.utils.trading_calendar import TradingCalendar
+from src.data.synthetic import generate_ohlcv
+
+
+def make_price_history(symbols, start='2023-01-02', periods=300, seed=0):
+    """สร้างข้อมูลราคาจำลองแบบ random walk สำหรับทดสอบ"""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(start, periods=periods)
+    history = {}
+    for symbol in symbols:
+        close = 100 * np.exp(np.cumsum(rng.normal(0.0005, 0.02, periods)))
+        history[symbol] = pd.DataFrame({
+            'Open': close,
+            'High': close * 1.01,
+            'Low': close * 0.99,
+            'Close': close,
+            'Volume': 1e6,
+        }, index=dates)
+    return history
+
+
+def load_test_history(symbols, start_dt, end_dt):
+    """data_loader ของ worker ที่ใช้ข้อมูลจำลองแทนการดึงจากอินเทอร์เน็ต"""
+    return make_price_history(symbols)
+
+
+class TestBacktestCache(unittest.TestCase):
+    """ทดสอบ BacktestCache class"""
+    
+    def setUp(self):
+        """เตรียมโฟลเดอร์แคชชั่วคราวและข้อมูลราคาจำลอง"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache = BacktestCache(cache_dir=self.temp_dir.name)
+        self.history = make_price_history(['AAA', 'BBB'])
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def test_key_normalization(self):
+        """ทดสอบว่า key ไม่ขึ้นกับตัวพิมพ์ของหุ้นและรูปแบบวันที่ แต่ขึ้นกับลำดับหุ้น"""
+        fingerprint = fingerprint_price_data(self.history)
+        key1 = BacktestCache.make_key({'symbols': ['AAA', 'BBB'], 'start_date': '2023-06-01'}, fingerprint)
+        key2 = BacktestCache.make_key({'symbols': ['aaa', 'BBB'], 'start_date': datetime(2023, 6, 1)}, fingerprint)
+        key3 = BacktestCache.make_key({'symbols': ['AAA', 'BBB'], 'start_date': '2023-06-02'}, fingerprint)
+        key4 = BacktestCache.make_key({'symbols': ['BBB', 'AAA'], 'start_date': '2023-06-01'}, fingerprint)
+        
+        self.assertEqual(key1, key2)
+        self.assertNotEqual(key1, key3)
+        self.assertNotEqual(key1, key4)
+    
+    def test_data_change_changes_fingerprint(self):
+        """ทดสอบว่าข้อมูลราคาที่เปลี่ยนทำให้ fingerprint เปลี่ยน"""
+        fingerprint = fingerprint_price_data(self.history)
+        self.history['AAA'].iloc[-1, 3] += 0.01
+        self.assertNotEqual(fingerprint, fingerprint_price_data(self.history))
+    
+    def test_cached_backtest_restores_state(self):
+        """ทดสอบว่าการรันซ้ำได้ผลลัพธ์จากแคชและคืนสถานะ Backtester"""
+        first = Backtester(initial_capital=10000)
+        results = first.run_backtest(None, ['AAA', 'BBB'], '2023-06-01', '2024-02-01',
+                                     historical_data=self.history, cache=self.cache)
+        self.assertEqual(len(os.listdir(self.cache.results_dir)), 1)
+        
+        second = Backtester(initial_capital=10000)
+        cached = second.run_backtest(None, ['AAA', 'BBB'], '2023-06-01', '2024-02-01',
+                                     historical_data=self.history, cache=self.cache)
+        
+        self.assertAlmostEqual(cached['final_capital'], results['final_capital'])
+        self.assertEqual(len(second.get_trade_history()), len(first.get_trade_history()))
+        self.assertEqual(len(second.portfolio_values), len(first.portfolio_values))
+    
+    def test_trade_objects_not_served_from_lean_run(self):
+        """ทดสอบว่าผลที่แคชจากการรันแบบ keep_trade_objects=False ไม่ถูกใช้กับการรันที่ต้องการ trades"""
+        lean = Backtester(initial_capital=10000, keep_trade_objects=False)
+        lean.run_backtest(None, ['AAA', 'BBB'], '2023-06-01', '2024-02-01',
+                          historical_data=self.history, cache=self.cache)
+        
+        full = Backtester(initial_capital=10000)
+        results = full.run_backtest(None, ['AAA', 'BBB'], '2023-06-01', '2024-02-01',
+                                    historical_data=self.history, cache=self.cache)
+        
+        expected = Backtester(initial_capital=10000)
+        expected.run_backtest(None, ['AAA', 'BBB'], '2023-06-01', '2024-02-01', historical_data=self.history)
+        
+        self.assertEqual(len(os.listdir(self.cache.results_dir)), 2)
+        self.assertGreater(len(results['trades']), 0)
+        self.assertEqual(len(results['trades']), len(expected.trades))
+        self.assertEqual(len(full.closed_positions), len(expected.closed_positions))
+    
+    def test_mongodb_payload_requires_valid_signature(self):
+        """ทดสอบว่าผลลัพธ์จาก MongoDB ถูกโหลดเฉพาะเมื่อลายมือชื่อถูกต้อง"""
+        class FakeMongo:
+            def __init__(self):
+                self.documents = {}
+            
+            def save_backtest_result(self, document):
+                self.documents[document['cache_key']] = document
+            
+            def get_backtest_by_cache_key(self, key):
+                return self.documents.get(key)
+        
+        mongo = FakeMongo()
+        writer = BacktestCache(os.path.join(self.temp_dir.name, 'writer'), mongo, secret='shared')
+        writer.put('k1', {'final_capital': 123.0})
+        
+        reader = BacktestCache(os.path.join(self.temp_dir.name, 'reader'), mongo, secret='shared')
+        self.assertEqual(reader.get('k1'), {'final_capital': 123.0})
+        
+        mongo.documents['k2'] = {**mongo.documents['k1'], 'cache_key': 'k2'}
+        self.assertIsNone(reader.get('k2'))
+        other = BacktestCache(os.path.join(self.temp_dir.name, 'other'), mongo, secret='different')
+        self.assertIsNone(other.get('k1'))
+        
+        unsigned = BacktestCache(os.path.join(self.temp_dir.name, 'unsigned'), mongo, secret='')
+        unsigned.put('k3', {'final_capital': 1.0})
+        self.assertNotIn('payload', mongo.documents['k3'])
+    
+    def test_indicator_panels_reused(self):
+        """ทดสอบการใช้ indicator panels ซ้ำเมื่อพารามิเตอร์อื่นเปลี่ยน"""
+        Backtester().run_backtest(None, ['AAA', 'BBB'], '2023-06-01', '2024-02-01',
+                                  historical_data=self.history, cache=self.cache)
+        self.assertEqual(len(os.listdir(self.cache.indicators_dir)), 2)
+        
+        self.assertIsNotNone(self.cache.get_indicators(self.history['AAA']))
+        Backtester().run_backtest(None, ['AAA', 'BBB'], '2023-06-01', '2024-02-01',
+                                  min_confidence=0.8, historical_data=self.history, cache=self.cache)
+        self.assertEqual(len(os.listdir(self.cache.indicators_dir)), 2)
+        self.assertEqual(len(os.listdir(self.cache.results_dir)), 2)
+
+
+class TestTradingCalendar(unittest.TestCase):
+    """ทดสอบ TradingCalendar class"""
+    
+    def setUp(self):
+        self.calendar = TradingCalendar()
+    
+    def test_holidays_2024(self):
+        """ทดสอบวันหยุดตลาดปี 2024"""
+        holidays = [day.strftime('%Y-%m-%d') for day in self.calendar.holidays('2024-01-01', '2024-12-31')]
+        self.assertEqual(holidays, [
+            '2024-01-01', '2024-01-15', '2024-02-19', '2024-03-29', '2024-05-27',
+            '2024-06-19', '2024-07-04', '2024-09-02', '2024-11-28', '2024-12-25',
+        ])
+    
+    def test_session_counts(self):
+        """ทดสอบจำนวนวันทำการต่อปี"""
+        self.assertEqual(len(self.calendar.sessions('2022-01-01', '2022-12-31')), 251)
+        self.assertEqual(len(self.calendar.sessions('2024-01-01', '2024-12-31')), 252)
+        self.assertEqual(len(self.calendar.sessions('2025-01-01', '2025-12-31')), 250)
+    
+    def test_session_navigation(self):
+        """ทดสอบการเลื่อนวันทำการข้ามวันหยุด"""
+        self.assertFalse(self.calendar.is_session('2024-07-04'))
+        self.assertTrue(self.calendar.is_session('2024-07-05'))
+        self.assertEqual(self.calendar.next_session('2024-07-03'), pd.Timestamp('2024-07-05'))
+        self.assertEqual(self.calendar.previous_session('2024-01-02'), pd.Timestamp('2023-12-29'))
+        self.assertEqual(self.calendar.session_offset('2024-03-27', 2), pd.Timestamp('2024-04-01'))
+        self.assertEqual(self.calendar.session_offset('2024-04-01', -2), pd.Timestamp('2024-03-27'))
+    
+    def test_session_positions(self):
+        """ทดสอบการแปลงวันทำการเป็นตำแหน่งแท่งข้อมูล"""
+        sessions = self.calendar.sessions('2024-01-02', '2024-01-08')
+        index = pd.DatetimeIndex(['2024-01-03', '2024-01-04', '2024-01-08'])
+        np.testing.assert_array_equal(self.calendar.session_positions(sessions, index), [-1, 0, 1, 1, 2])
+    
+    def test_backtest_skips_holidays(self):
+        """ทดสอบว่า Backtester ไม่สร้าง equity points ในวันหยุด"""
+        history = make_price_history(['AAA'])
+        backtester = Backtester(initial_capital=10000)
+        backtester.run_backtest(None, ['AAA'], '2023-06-01', '2024-02-01', historical_data=history)
+        
+        dates = pd.DatetimeIndex([date for date, _ in backtester.portfolio_values])
+        self.assertEqual(len(dates), len(self.calendar.sessions('2023-06-01', '2024-02-01')))
+        self.assertNotIn(pd.Timestamp('2023-07-04'), dates)
+        self.assertNotIn(pd.Timestamp('2023-12-25'), dates)
+
+
+class TestSyntheticData(unittest.TestCase):
+    """ทดสอบตัวสร้างข้อมูล OHLCV จำลอง"""
+    
+    def test_reproducible_and_consistent(self):
+        """ทดสอบว่า seed เดียวกันได้ข้อมูลเดิม และ High/Low ครอบ Open/Close"""
+        first = generate_ohlcv(n_symbols=3, periods=300, seed=7)
+        second = generate_ohlcv(n_symbols=3, periods=300, seed=7)
+        
+        self.assertEqual(len(first), 3)
+        for symbol, data in first.items():
+            pd.testing.assert_frame_equal(data, second[symbol])
+            self.assertEqual(len(data), 300)
+            self.assertTrue((data['High'] >= data[['Open', 'Close']].max(axis=1)).all())
+            self.assertTrue((data['Low'] <= data[['Open', 'Close']].min(axis=1)).all())
+            self.assertTrue((data['Volume'] > 0).all())
+        
+        self.assertTrue(TradingCalendar().session_mask(first['SYN0000'].index).all())
+    
+    def test_backtest_on_synthetic_data(self):
+        """ทดสอบว่า Backtester รันกับข้อมูลจำลองได้แบบ offline"""
+        history = generate_ohlcv(n_symbols=2, periods=300, seed=1)
+        dates = history['SYN0000'].index
+        results = Backtester().run_backtest(None, list(history), dates[100], dates[-1],
+                                            historical_data=history)
+        self.assertEqual(len(results['equity_curve']), len(dates) - 100)
+
+
+class TestEventRecorder(unittest.TestCase):
+    """ทดสอบ EventRecorder (โหมด quiet สำหรับ Backtest จำนวนมาก)"""
+    
+    def test_quiet_mode_counts_without_logging(self):
+        """ทดสอบว่าโหมด quiet นับเหตุการณ์โดยไม่ log และเก็บตัวอย่างใน ring buffer"""
+        events = EventRecorder(quiet=True, sample_every=10, buffer_size=5)
+        with self.assertNoLogs('src.backtesting.events', level='INFO'):
+            for i in range(100):
+                events.record('buy', "BUY %s @ $%.2f", 'AAPL', 100.0 + i)
+        
+        summary = events.summary()
+        self.assertEqual(summary['counts'], {'buy': 100})
+        self.assertEqual(len(summary['samples']), 5)
+        self.assertEqual(summary['samples'][-1], 'buy: BUY AAPL @ $199.00')
+    
+    def test_normal_mode_logs(self):
+        """ทดสอบว่าโหมดปกติส่งข้อความไปยัง logger"""
+        events = EventRecorder()
+        with self.assertLogs('src.backtesting.events', level='INFO') as captured:
+            events.record('sell', "SELL %s", 'AAPL')
+        self.assertIn('SELL AAPL', captured.output[0])
+        self.assertEqual(events.counts, {'sell': 1})
+    
+    def test_quiet_backtest_matches_default(self):
+        """ทดสอบว่า Backtest โหมด quiet ได้ผลลัพธ์เดียวกันและนับ trades ครบ"""
+        history = make_price_history(['AAA', 'BBB'])
+        default = Backtester().run_backtest(None, ['AAA', 'BBB'], '2023-06-01', '2024-02-01',
+                                            historical_data=history)
+        
+        quiet = Backtester(events=EventRecorder(quiet=True))
+        results = quiet.run_backtest(None, ['AAA', 'BBB'], '2023-06-01', '2024-02-01',
+                                     historical_data=history)
+        
+        self.assertAlmostEqual(results['final_capital'], default['final_capital'])
+        self.assertEqual(quiet.events.counts.get('buy', 0), results['total_trades'])
+
+
+class TestBacktestCheckpoint(unittest.TestCase):
+    """ทดสอบการบันทึก checkpoint และรัน Backtest ต่อ"""
+    
+    class CrashingBacktester(Backtester):
+        """Backtester ที่หยุดทำงานหลังจำลองครบจำนวนวันที่กำหนด"""
+        
+        def __init__(self, crash_after=None, **kwargs):
+            super().__init__(**kwargs)
+            self.crash_after = crash_after
+            self.simulated_days = 0
+        
+        def update_portfolio_value(self, date, current_prices):
+            super().update_portfolio_value(date, current_prices)
+            self.simulated_days += 1
+            if self.crash_after is not None and self.simulated_days >= self.crash_after:
+                raise RuntimeError("simulated crash")
+    
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.checkpoint = BacktestCheckpoint(self.temp_dir.name, every=20)
+        self.history = make_price_history(['AAA', 'BBB'])
+        self.args = (None, ['AAA', 'BBB'], '2023-06-01', '2024-02-01')
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def test_resume_matches_uninterrupted_run(self):
+        """ทดสอบว่าการรันต่อจาก checkpoint ได้ผลเหมือนรันรวดเดียว และไม่จำลองวันเดิมซ้ำ"""
+        expected = Backtester().run_backtest(*self.args, historical_data=self.history)
+        
+        crashed = self.CrashingBacktester(crash_after=75)
+        with self.assertRaises(RuntimeError):
+            crashed.run_backtest(*self.args, historical_data=self.history, checkpoint=self.checkpoint)
+        self.assertEqual(len(os.listdir(self.temp_dir.name)), 1)
+        
+        resumed = self.CrashingBacktester()
+        results = resumed.run_backtest(*self.args, historical_data=self.history, checkpoint=self.checkpoint)
+        
+        total_days = len(expected['equity_curve'])
+        self.assertEqual(resumed.simulated_days, total_days - 60)
+        self.assertAlmostEqual(results['final_capital'], expected['final_capital'])
+        self.assertEqual(results['total_trades'], expected['total_trades'])
+        pd.testing.assert_frame_equal(results['equity_curve'], expected['equity_curve'])
+        self.assertEqual(os.listdir(self.temp_dir.name), [])
+    
+    def test_checkpoint_ignored_for_different_params(self):
+        """ทดสอบว่า checkpoint ไม่ถูกใช้กับ backtest ที่ตั้งค่าต่างกัน"""
+        crashed = self.CrashingBacktester(crash_after=30)
+        with self.assertRaises(RuntimeError):
+            crashed.run_backtest(*self.args, historical_data=self.history, checkpoint=self.checkpoint)
+        
+        other = self.CrashingBacktester(commission=0.002)
+        other.run_backtest(*self.args, historical_data=self.history, checkpoint=self.checkpoint)
+        self.assertEqual(other.simulated_days, len(other.equity_curve))
+
+
+class TestBacktestStream(unittest.TestCase):
+    """ทดสอบการเขียน equity/trades ลงดิสก์ระหว่างรันและ metrics แบบ out-of-core"""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.history = make_price_history(['AAA', 'BBB', 'CCC'], periods=400, seed=7)
+        self.args = (None, ['AAA', 'BBB', 'CCC'], '2023-04-03', '2024-07-01')
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def test_column_file_append_truncate_and_chunks(self):
+        """ทดสอบการเขียนต่อท้าย, ตัดไฟล์ และอ่านทีละก้อน"""
+        table = ColumnFile(os.path.join(self.temp_dir.name, 't'), {'x': np.float64, 'n': np.int32})
+        table.append({'x': np.arange(5.0), 'n': np.arange(5)})
+        table.append({'x': np.arange(5.0, 8.0), 'n': np.arange(5, 8)})
+        table.truncate(7)
+        
+        reopened = ColumnFile(os.path.join(self.temp_dir.name, 't'), {'x': np.float64, 'n': np.int32})
+        chunks = [chunk['x'] for chunk in reopened.iter_chunks(3)]
+        
+        self.assertEqual(len(reopened), 7)
+        self.assertEqual([len(chunk) for chunk in chunks], [3, 3, 1])
+        np.testing.assert_array_equal(np.concatenate(chunks), np.arange(7.0))
+        np.testing.assert_array_equal(reopened.column('n'), np.arange(7))
+    
+    def test_stream_results_match_in_memory_run(self):
+        """ทดสอบว่าผลลัพธ์จาก stream ตรงกับการรันแบบเก็บในหน่วยความจำ"""
+        expected_bt = Backtester(keep_trade_objects=False)
+        expected = expected_bt.run_backtest(*self.args, historical_data=self.history)
+        report = PerformanceMetrics.generate_report(expected, expected['equity_curve'])
+        
+        stream = BacktestStream(self.temp_dir.name, chunk_size=8)
+        backtester = Backtester(keep_trade_objects=False, stream=stream)
+        results = backtester.run_backtest(*self.args, historical_data=self.history)
+        
+        self.assertTrue(results['equity_curve'].empty)
+        self.assertEqual(len(backtester.portfolio_values), 0)
+        self.assertLess(len(backtester.trade_log), stream.chunk_size)
+        for key in ('final_capital', 'total_trades', 'winning_trades', 'losing_trades',
+                    'avg_win', 'avg_loss', 'max_drawdown', 'max_drawdown_duration', 'time_under_water'):
+            self.assertAlmostEqual(results[key], expected[key], msg=key)
+        for key in ('sharpe_ratio', 'sortino_ratio', 'volatility'):
+            self.assertAlmostEqual(results[key], report[key], msg=key)
+        
+        pd.testing.assert_frame_equal(stream.equity_frame(), expected['equity_curve'])
+        pd.testing.assert_frame_equal(backtester.get_trade_history(), expected_bt.get_trade_history())
+    
+    def test_stream_resumes_from_checkpoint(self):
+        """ทดสอบว่าไฟล์ stream ถูกตัดกลับไปที่ checkpoint เมื่อรันต่อ"""
+        checkpoint = BacktestCheckpoint(os.path.join(self.temp_dir.name, 'ckpt'), every=20)
+        stream_dir = os.path.join(self.temp_dir.name, 'stream')
+        expected = Backtester().run_backtest(*self.args, historical_data=self.history)
+        
+        crashed = TestBacktestCheckpoint.CrashingBacktester(crash_after=75,
+                                                            stream=BacktestStream(stream_dir, chunk_size=8))
+        with self.assertRaises(RuntimeError):
+            crashed.run_backtest(*self.args, historical_data=self.history, checkpoint=checkpoint)
+        
+        stream = BacktestStream(stream_dir, chunk_size=8)
+        results = Backtester(stream=stream).run_backtest(*self.args, historical_data=self.history,
+                                                         checkpoint=checkpoint)
+        
+        self.assertAlmostEqual(results['final_capital'], expected['final_capital'])
+        pd.testing.assert_frame_equal(stream.equity_frame(), expected['equity_curve'])
+        self.assertEqual(len(stream.trade_frame()), len(expected['trade_log']))
+
+
+class TestJobQueue(unittest.TestCase):
+    """ทดสอบคิวงาน Backtest และ workers"""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, 'jobs.db')
+        self.cache_dir = os.path.join(self.temp_dir.name, 'cache')
+        self.queue = JobQueue(self.db_path)
+        self.cache = BacktestCache(self.cache_dir)
+        self.spec = {'symbols': ['bbb', 'AAA'], 'start_date': '2023-06-01', 'end_date': '2024-02-01'}
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def make_worker(self, **kwargs):
+        return BacktestWorker(self.queue, cache=self.cache, data_loader=load_test_history,
+                              worker_id='test', **kwargs)
+    
+    def test_submit_normalizes_spec(self):
+        """ทดสอบว่า spec ถูกเติมค่าเริ่มต้นและตรวจสอบพารามิเตอร์"""
+        job = self.queue.get(self.queue.submit(self.spec))
+        self.assertEqual(job['status'], 'queued')
+        self.assertEqual(job['spec']['symbols'], ['AAA', 'BBB'])
+        self.assertEqual(job['spec']['strategy'], 'technical')
+        
+        with self.assertRaises(ValueError):
+            self.queue.submit({**self.spec, 'leverage': 2})
+        with self.assertRaises(ValueError):
+            self.queue.submit({**self.spec, 'end_date': '2023-01-01'})
+    
+    def test_worker_runs_job_and_stores_result(self):
+        """ทดสอบว่า worker รายงานความคืบหน้าและได้ผลลัพธ์เหมือนรันตรง"""
+        job_id = self.queue.submit(self.spec)
+        reports = []
+        worker = self.make_worker(progress_interval=0)
+        report_progress = self.queue.report_progress
+        self.queue.report_progress = lambda *args: reports.append(args[1:3]) or report_progress(*args)
+        
+        self.assertTrue(worker.run_once())
+        self.assertFalse(worker.run_once())
+        
+        job = self.queue.get(job_id)
+        self.assertEqual(job['status'], 'done')
+        self.assertEqual(job['progress'], 1.0)
+        self.assertEqual(reports[-1][0], reports[-1][1])
+        self.assertEqual([processed for processed, _ in reports], list(range(1, reports[-1][1] + 1)))
+        
+        expected = Backtester().run_backtest(None, ['AAA', 'BBB'], '2023-06-01', '2024-02-01',
+                                             historical_data=make_price_history(['AAA', 'BBB']))
+        results = self.queue.result(job_id, self.cache)
+        self.assertAlmostEqual(results['final_capital'], expected['final_capital'])
+        self.assertEqual(results['total_trades'], expected['total_trades'])
+    
+    def test_ai_job_result_keyed_by_model(self):
+        """ทดสอบว่างาน AI เก็บผลลัพธ์ได้ และ key ของผลลัพธ์เปลี่ยนตาม model"""
+        from src.analysis.technical import TechnicalAnalyzer
+        from src.signals.generator import AISignalGenerator
+        data = make_price_history(['AAA'])['AAA']
+        features = AISignalGenerator.prepare_feature_matrix(TechnicalAnalyzer.get_indicator_history(data))
+        labels = np.arange(len(features)) % 3
+        generators = []
+        for y in (labels, labels[::-1].copy()):
+            generator = AISignalGenerator()
+            generator.train_model(features, y)
+            generators.append(generator)
+        
+        job_id = self.queue.submit({**self.spec, 'strategy': 'ai', 'min_confidence': 0.4})
+        self.make_worker(ai_generator=generators[0]).run_once()
+        self.assertEqual(self.queue.get(job_id)['status'], 'done')
+        self.assertIsNotNone(self.queue.result(job_id, self.cache))
+        
+        history = make_price_history(['AAA', 'BBB'])
+        keys = {Backtester().run_key(['AAA', 'BBB'], '2023-06-01', '2024-02-01', 'ai', 0.4, history,
+                                     Backtester.model_fingerprint(generator))
+                for generator in generators}
+        self.assertEqual(len(keys), 2)
+    
+    def test_cancel_running_job(self):
+        """ทดสอบว่างานที่ถูกยกเลิกหยุดเมื่อรายงานความคืบหน้าครั้งถัดไป"""
+        job_id = self.queue.submit(self.spec)
+        job = self.queue.claim('test')
+        self.assertTrue(self.queue.cancel(job_id))
+        
+        self.assertEqual(self.make_worker(progress_interval=0).run_job(job), 'cancelled')
+        self.assertEqual(self.queue.get(job_id)['status'], 'cancelled')
+        self.assertFalse(self.queue.cancel(job_id))
+    
+    def test_failed_job_records_error(self):
+        """ทดสอบว่างานที่ไม่มีข้อมูลถูกบันทึกเป็น failed พร้อมข้อผิดพลาด"""
+        job_id = self.queue.submit(self.spec)
+        worker = BacktestWorker(self.queue, cache=self.cache, data_loader=lambda *args: {})
+        worker.run_once()
+        
+        job = self.queue.get(job_id)
+        self.assertEqual(job['status'], 'failed')
+        self.assertIn('No historical data available', job['error'])
+    
+    def test_requeue_stale(self):
+        """ทดสอบว่างานที่ไม่มีความคืบหน้าเกิน timeout ถูกส่งกลับเข้าคิว"""
+        job_id = self.queue.submit(self.spec)
+        self.queue.claim('lost-worker')
+        self.assertEqual(self.queue.requeue_stale(timeout=60), 0)
+        self.assertEqual(self.queue.requeue_stale(timeout=-1), 1)
+        self.assertEqual(self.queue.get(job_id)['status'], 'queued')
+    
+    def test_requeue_uses_worker_heartbeat(self):
+        """ทดสอบว่างานที่ worker ยังส่ง heartbeat อยู่ไม่ถูกส่งกลับเข้าคิวแม้ไม่มีความคืบหน้า"""
+        job_id = self.queue.submit(self.spec)
+        self.queue.claim('loading-worker')
+        self.queue.heartbeat('loading-worker', job_id)
+        with self.queue._connect() as conn:
+            conn.execute('UPDATE jobs SET updated_at = 0 WHERE id = ?', (job_id,))
+        self.assertEqual(self.queue.requeue_stale(timeout=60), 0)
+        
+        with self.queue._connect() as conn:
+            conn.execute('UPDATE workers SET heartbeat = 0')
+        self.assertEqual(self.queue.requeue_stale(timeout=60), 1)
+    
+    def test_updates_fenced_by_worker(self):
+        """ทดสอบว่า worker เดิมของงานที่ถูกส่งต่อแล้วบันทึกความคืบหน้าหรือผลลัพธ์ไม่ได้"""
+        job_id = self.queue.submit(self.spec)
+        self.queue.claim('old-worker')
+        self.queue.requeue_stale(timeout=-1)
+        self.queue.claim('new-worker')
+        
+        self.assertFalse(self.queue.report_progress(job_id, 1, 10, worker_id='old-worker'))
+        self.assertFalse(self.queue.complete(job_id, 'old-key', 'old-worker'))
+        self.assertFalse(self.queue.fail(job_id, 'error', 'old-worker'))
+        self.assertTrue(self.queue.report_progress(job_id, 1, 10, worker_id='new-worker'))
+        self.assertTrue(self.queue.complete(job_id, 'new-key', 'new-worker'))
+        
+        job = self.queue.get(job_id)
+        self.assertEqual((job['status'], job['worker'], job['result_key']), ('done', 'new-worker', 'new-key'))
+    
+    def test_worker_pool_processes(self):
+        """ทดสอบว่า worker processes หลายตัวรันงานทั้งหมดในคิวจนเสร็จ"""
+        job_ids = [self.queue.submit({**self.spec, 'min_confidence': confidence})
+                   for confidence in (0.5, 0.6, 0.7)]
+        
+        pool = WorkerPool(n_workers=2, db_path=self.db_path, cache_dir=self.cache_dir,
+                          checkpoint_dir=None, data_loader=load_test_history, poll_interval=0.1)
+        pool.start(stop_when_idle=True)
+        pool.join(timeout=120)
+        
+        for job_id in job_ids:
+            self.assertEqual(self.queue.get(job_id)['status'], 'done')
+            self.assertIsNotNone(self.queue.result(job_id, self.cache))
+
+
+class TestBenchmarkStore(unittest.TestCase):
+    """ทดสอบ BenchmarkStore (ข้อมูล benchmark ในเครื่อง + alpha/beta แบบ vectorized)"""
+    
+    class FakeFetcher:
+        """fetcher จำลองที่นับจำนวนครั้งที่ถูกเรียก"""
+        
+        def __init__(self, history):
+            self.history = history
+            self.calls = 0
+        
+        def fetch_historical_data(self, symbol, period='1y'):
+            self.calls += 1
+            return self.history.get(symbol)
+    
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.history = make_price_history(['SPY', 'QQQ', 'AAA', 'BBB'], periods=260, seed=5)
+        self.fetcher = self.FakeFetcher({'SPY': self.history['SPY'], 'QQQ': self.history['QQQ']})
+        self.store = BenchmarkStore(self.temp_dir.name, fetcher=self.fetcher)
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def test_prices_are_fetched_once_and_persisted(self):
+        """ทดสอบว่าดึงข้อมูลครั้งเดียวแล้วอ่านจากไฟล์ใน store"""
+        prices = self.store.get_prices('SPY')
+        self.store.get_prices('spy')
+        
+        reopened = BenchmarkStore(self.temp_dir.name, fetcher=self.fetcher)
+        stored = reopened.get_prices('SPY', start=prices.index[10], end=prices.index[20])
+        
+        self.assertEqual(self.fetcher.calls, 1)
+        self.assertEqual(len(stored), 11)
+        pd.testing.assert_series_equal(stored, prices.iloc[10:21])
+    
+    def test_stale_data_used_when_fetch_fails(self):
+        """ทดสอบการใช้ข้อมูลเดิมเมื่อข้อมูลเก่าและดึงใหม่ไม่ได้"""
+        self.store.get_prices('SPY')
+        offline = BenchmarkStore(self.temp_dir.name, fetcher=self.FakeFetcher({}), max_age_hours=0)
+        
+        prices = offline.get_prices('SPY')
+        
+        self.assertIsNotNone(prices)
+        self.assertEqual(len(prices), 260)
+        self.assertIsNone(offline.get_prices('DIA'))
+    
+    def test_relative_metrics_match_scalar_functions(self):
+        """ทดสอบ alpha/beta/information ratio แบบ vectorized เทียบกับฟังก์ชันเดิม"""
+        curves = {symbol: self.history[symbol] for symbol in ('AAA', 'BBB')}
+        
+        report = self.store.relative_metrics(curves)
+        
+        self.assertEqual(list(report.index), [('SPY', 'AAA'), ('SPY', 'BBB'), ('QQQ', 'AAA'), ('QQQ', 'BBB')])
+        for (benchmark, symbol), row in report.iterrows():
+            returns = self.history[symbol]['Close'].pct_change().dropna()
+            benchmark_returns = self.history[benchmark]['Close'].pct_change().dropna()
+            alpha, beta = PerformanceMetrics.calculate_alpha_beta(returns, benchmark_returns)
+            self.assertAlmostEqual(row['alpha'], alpha)
+            self.assertAlmostEqual(row['beta'], beta)
+            self.assertAlmostEqual(row['information_ratio'],
+                                   PerformanceMetrics.calculate_information_ratio(returns, benchmark_returns))
+    
+    def test_relative_metrics_tz_aware_frame(self):
+        """ทดสอบว่า DataFrame ราคาที่มี timezone ได้ผลเท่ากับ dict ของราคาเดียวกัน"""
+        frame = pd.DataFrame({symbol: self.history[symbol]['Close'] for symbol in ('AAA', 'BBB')})
+        expected = self.store.relative_metrics({symbol: self.history[symbol] for symbol in ('AAA', 'BBB')})
+        
+        report = self.store.relative_metrics(frame.tz_localize('America/New_York'))
+        
+        self.assertFalse(report.isna().all().any())
+        pd.testing.assert_frame_equal(report, expected)
+    
+    def test_relative_metrics_for_backtest_results(self):
+        """ทดสอบการใช้ผลลัพธ์ของ Backtester (equity curve) โดยตรง"""
+        backtester = Backtester(initial_capital=10000)
+        results = backtester.run_backtest(None, ['AAA', 'BBB'], self.history['AAA'].index[60],
+                                          self.history['AAA'].index[-1], historical_data=self.history)
+        
+        report = self.store.relative_metrics({'run': results}, benchmarks=['SPY'])
+        
+        self.assertEqual(len(report), 1)
+        self.assertEqual(report.iloc[0]['observations'], len(results['equity_curve']) - 1)
 
 
 class TestBacktester(unittest.TestCase):
@@ -189,6 +798,137 @@ class TestPerformanceMetrics(unittest.TestCase):
         self.assertIsInstance(drawdown_duration, int)
         self.assertGreaterEqual(drawdown_duration, 0)
     
+    def test_analyze_drawdowns_periods(self):
+        """ทดสอบการแยกช่วง drawdown (start / trough / recovery)"""
+        dates = pd.bdate_range('2024-01-01', periods=10)
+        equity = pd.Series([10000, 11000, 10500, 9500, 9000, 9500, 10000, 11000, 10800, 11500], index=dates)
+        
+        analysis = PerformanceMetrics.analyze_drawdowns(equity, top_n=1)
+        periods = analysis['periods']
+        
+        self.assertEqual(len(periods), 2)
+        self.assertAlmostEqual(analysis['max_drawdown'], 2000 / 11000 * 100)
+        self.assertEqual(analysis['max_duration'], 5)
+        self.assertEqual(analysis['underwater_bars'], 6)
+        self.assertAlmostEqual(analysis['time_under_water'], 60.0)
+        
+        deepest = analysis['top_drawdowns'].iloc[0]
+        self.assertEqual(deepest['start'], dates[1])
+        self.assertEqual(deepest['trough'], dates[4])
+        self.assertEqual(deepest['recovery'], dates[7])
+        self.assertEqual(deepest['recovery_bars'], 3)
+        self.assertTrue(deepest['recovered'])
+    
+    def test_analyze_drawdowns_unrecovered_and_initial_value(self):
+        """ทดสอบช่วงที่ยังไม่ฟื้นตัว และ peak เริ่มต้นจากเงินทุน"""
+        equity = pd.Series([9500.0, 9800.0, 9700.0])
+        
+        analysis = PerformanceMetrics.analyze_drawdowns(equity, initial_value=10000)
+        period = analysis['periods'].iloc[0]
+        
+        self.assertAlmostEqual(analysis['max_drawdown'], 5.0)
+        self.assertEqual(analysis['max_duration'], 3)
+        self.assertFalse(period['recovered'])
+        self.assertTrue(pd.isna(period['recovery']))
+        self.assertEqual(period['recovery_bars'], -1)
+    
+    def test_analyze_drawdowns_matches_loop(self):
+        """ทดสอบว่าผลตรงกับการคำนวณแบบ loop บน equity curve ยาว"""
+        rng = np.random.default_rng(0)
+        equity = 10000 * np.exp(np.cumsum(rng.normal(0, 0.01, 100_000)))
+        
+        peak, expected = equity[0], 0.0
+        for value in equity:
+            peak = max(peak, value)
+            expected = max(expected, (peak - value) / peak * 100)
+        
+        analysis = PerformanceMetrics.analyze_drawdowns(pd.Series(equity))
+        self.assertAlmostEqual(analysis['max_drawdown'], expected, places=8)
+        self.assertEqual(analysis['periods']['duration'].sum(), analysis['underwater_bars'])
+    
+    def test_batch_report_matches_single_metrics(self):
+        """ทดสอบว่า metrics แบบ batch ตรงกับการคำนวณทีละ equity curve (ความยาวไม่เท่ากัน)"""
+        rng = np.random.default_rng(1)
+        curves = {
+            f'run{i}': pd.Series(10000 * np.exp(np.cumsum(rng.normal(0.0004, 0.01, 120 + 40 * i))),
+                                 index=pd.bdate_range('2022-01-03', periods=120 + 40 * i))
+            for i in range(4)
+        }
+        
+        report = PerformanceMetrics.generate_batch_report(curves)
+        
+        self.assertEqual(list(report.index), list(curves))
+        for name, equity in curves.items():
+            returns = equity.pct_change().dropna()
+            max_dd, duration = PerformanceMetrics.calculate_max_drawdown(equity)
+            row = report.loc[name]
+            self.assertEqual(row['observations'], len(equity))
+            self.assertAlmostEqual(row['sharpe_ratio'], PerformanceMetrics.calculate_sharpe_ratio(returns))
+            self.assertAlmostEqual(row['sortino_ratio'], PerformanceMetrics.calculate_sortino_ratio(returns))
+            self.assertAlmostEqual(row['volatility'], PerformanceMetrics.calculate_volatility(returns) * 100)
+            self.assertAlmostEqual(row['max_drawdown'], max_dd)
+            self.assertEqual(row['max_drawdown_duration'], duration)
+    
+    def test_batch_metrics_with_nan_mask(self):
+        """ทดสอบ array 2 มิติที่มี NaN (run ที่สั้นกว่า) และ run ที่ไม่มีข้อมูลพอ"""
+        equity = np.array([
+            [100.0, 100.0, np.nan],
+            [110.0, 90.0, np.nan],
+            [99.0, 95.0, np.nan],
+            [np.nan, 99.0, 100.0],
+        ])
+        
+        report = PerformanceMetrics.generate_batch_report(equity)
+        
+        self.assertEqual(list(report['observations']), [3, 4, 1])
+        self.assertAlmostEqual(report.loc[0, 'total_return'], -1.0)
+        self.assertAlmostEqual(report.loc[0, 'max_drawdown'], 10.0)
+        self.assertAlmostEqual(report.loc[1, 'max_drawdown'], 10.0)
+        self.assertEqual(report.loc[1, 'max_drawdown_duration'], 3)
+        self.assertEqual(report.loc[2, 'sharpe_ratio'], 0)
+        self.assertEqual(report.loc[2, 'max_drawdown'], 0)
+    
+    def test_rolling_metrics_match_scalar_functions(self):
+        """ทดสอบว่า rolling metrics ณ จุดสุดท้ายตรงกับ metrics ของหน้าต่างเดียวกัน"""
+        rng = np.random.default_rng(2)
+        dates = pd.bdate_range('2020-01-01', periods=400)
+        benchmark = pd.Series(100 * np.exp(np.cumsum(rng.normal(0.0003, 0.01, 400))), index=dates)
+        noise = rng.normal(0, 0.005, 400)
+        equity = pd.Series(10000 * np.exp(np.cumsum(0.8 * benchmark.pct_change().fillna(0) + noise)), index=dates)
+        window = 63
+        
+        rolling = PerformanceMetrics.rolling_metrics(equity, windows=(21, window), benchmark=benchmark)
+        
+        tail_equity = equity.iloc[-window - 1:]
+        tail_returns = tail_equity.pct_change().dropna()
+        tail_benchmark = benchmark.iloc[-window - 1:].pct_change().dropna()
+        last = rolling.iloc[-1]
+        self.assertAlmostEqual(last[f'sharpe_ratio_{window}'], PerformanceMetrics.calculate_sharpe_ratio(tail_returns))
+        self.assertAlmostEqual(last[f'sortino_ratio_{window}'], PerformanceMetrics.calculate_sortino_ratio(tail_returns))
+        self.assertAlmostEqual(last[f'volatility_{window}'], PerformanceMetrics.calculate_volatility(tail_returns) * 100)
+        self.assertAlmostEqual(last[f'beta_{window}'], np.polyfit(tail_benchmark, tail_returns, 1)[0])
+        self.assertTrue(rolling[f'sharpe_ratio_{window}'].iloc[:window].isna().all())
+        self.assertIn('max_drawdown_21', rolling.columns)
+        pd.testing.assert_series_equal(PerformanceMetrics.rolling_volatility(equity.pct_change(), window),
+                                       rolling[f'volatility_{window}'])
+    
+    def test_rolling_max_drawdown_matches_windows(self):
+        """ทดสอบ rolling max drawdown กับการคำนวณทีละหน้าต่าง (window ไม่ใช่ 2^k)"""
+        rng = np.random.default_rng(3)
+        equity = pd.Series(10000 * np.exp(np.cumsum(rng.normal(0, 0.02, 200))))
+        
+        for window in (1, 7, 50):
+            rolling = PerformanceMetrics.rolling_max_drawdown(equity, window)
+            expected = [PerformanceMetrics.calculate_max_drawdown(equity.iloc[t - window + 1:t + 1])[0]
+                        for t in range(window - 1, len(equity))]
+            np.testing.assert_allclose(rolling.iloc[window - 1:].to_numpy(), expected, atol=1e-9)
+            self.assertTrue(rolling.iloc[:window - 1].isna().all())
+    
+    def test_rolling_metrics_rejects_unknown_metric(self):
+        """ทดสอบ metric ที่ไม่รองรับ"""
+        with self.assertRaises(ValueError):
+            PerformanceMetrics.rolling_metrics(self.equity_series, windows=(3,), metrics=('omega',))
+    
     def test_calmar_ratio_calculation(self):
         """ทดสอบการคำนวณ Calmar ratio"""
         total_return = 0.08  # 8%
@@ -318,6 +1058,312 @@ class TestPosition(unittest.TestCase):
         self.assertEqual(position.holding_days, 9)
 
 
+class TestIntrabarExecution(unittest.TestCase):
+    """ทดสอบ IntrabarExecution (Stop Loss / Take Profit จาก High/Low)"""
+    
+    def setUp(self):
+        self.execution = IntrabarExecution(stop_loss_pct=0.03, take_profit_pct=0.05)
+        self.stop, self.target = self.execution.levels(100.0)
+    
+    def test_first_touch(self):
+        """ทดสอบการหาแท่งแรกที่แตะระดับราคา"""
+        open_ = np.array([100.0, 101.0, 102.0, 104.0])
+        high = np.array([101.0, 102.0, 103.0, 106.0])
+        low = np.array([99.0, 98.0, 100.0, 103.0])
+        
+        bar, price, code = self.execution.find_exit(open_, high, low, self.stop, self.target)
+        self.assertEqual((bar, code), (3, EXIT_TARGET))
+        self.assertAlmostEqual(price, 105.0)
+        
+        bar, price, code = self.execution.find_exit(open_[:3], high[:3], low[:3], self.stop, self.target)
+        self.assertEqual((bar, code), (-1, EXIT_NONE))
+    
+    def test_gap_fills_at_open(self):
+        """ทดสอบว่าราคาเปิด gap ข้ามระดับจะออกที่ราคาเปิด"""
+        code, price = self.execution.check_bars([95.0, 108.0], [96.0, 110.0], [94.0, 107.0],
+                                                self.stop, self.target)
+        np.testing.assert_array_equal(code, [EXIT_STOP, EXIT_TARGET])
+        np.testing.assert_allclose(price, [95.0, 108.0])
+    
+    def test_both_touched_rules(self):
+        """ทดสอบกฎเมื่อแท่งเดียวแตะทั้ง Stop Loss และ Take Profit"""
+        bar = ([104.0], [106.0], [96.0])
+        expected = {'stop_first': (EXIT_STOP, 97.0), 'target_first': (EXIT_TARGET, 105.0),
+                    'open_proximity': (EXIT_TARGET, 105.0)}
+        for rule, (expected_code, expected_price) in expected.items():
+            execution = IntrabarExecution(both_touched=rule)
+            code, price = execution.check_bars(*bar, self.stop, self.target)
+            self.assertEqual(code[0], expected_code, rule)
+            self.assertAlmostEqual(price[0], expected_price)
+        
+        with self.assertRaises(ValueError):
+            IntrabarExecution(both_touched='random')
+    
+    def test_backtester_uses_entry_levels(self):
+        """ทดสอบว่า Backtester ออกที่ระดับ Stop Loss ที่กำหนดตอนเข้าซื้อ"""
+        backtester = Backtester(initial_capital=10000, commission=0, slippage=0)
+        backtester.execute_trade('AAPL', 'BUY', 100, datetime(2024, 1, 1), "Test buy",
+                                 stop_loss=97, take_profit=105)
+        
+        self.assertFalse(backtester.check_stop_loss_take_profit('AAPL', 99, datetime(2024, 1, 2),
+                                                                high=101, low=98, open_price=99))
+        self.assertTrue(backtester.check_stop_loss_take_profit('AAPL', 99, datetime(2024, 1, 3),
+                                                               high=100, low=96, open_price=99))
+        self.assertAlmostEqual(backtester.trades[-1].price, 97)
+        self.assertEqual(backtester.trades[-1].reason, "Stop Loss")
+    
+    def test_backtest_exits_on_stops(self):
+        """ทดสอบว่า Backtest มีการออกด้วย Stop Loss / Take Profit และออกที่ระดับพอดี"""
+        history = make_price_history(['AAA', 'BBB'])
+        backtester = Backtester(initial_capital=10000, slippage=0)
+        backtester.run_backtest(None, ['AAA', 'BBB'], '2023-06-01', '2024-02-01', historical_data=history)
+        
+        positions = {}
+        exits = 0
+        for trade in backtester.trades:
+            if trade.action == 'BUY':
+                positions[trade.symbol] = trade.price
+            elif trade.reason in ("Stop Loss", "Take Profit"):
+                exits += 1
+                entry = positions[trade.symbol]
+                self.assertTrue(trade.price <= entry * 0.97 + 1e-9 or trade.price >= entry * 1.05 - 1e-9)
+        self.assertGreater(exits, 0)
+
+
+class TestPortfolioBacktester(unittest.TestCase):
+    """ทดสอบ PortfolioBacktester class"""
+    
+    def setUp(self):
+        """เตรียม panel ราคาและสัญญาณทดสอบ"""
+        dates = pd.bdate_range('2024-01-01', periods=6)
+        self.close = pd.DataFrame({
+            'AAA': [100, 101, 102, 103, 104, 105],
+            'BBB': [50, 51, 52, 53, 54, 55],
+            'CCC': [20, 20, 21, 21, 22, 22],
+        }, index=dates, dtype=float)
+        
+        self.buy = pd.DataFrame(False, index=dates, columns=self.close.columns)
+        self.buy.iloc[0] = True
+        self.sell = pd.DataFrame(False, index=dates, columns=self.close.columns)
+        self.sell.iloc[3, 0] = True
+        self.score = pd.DataFrame(0.7, index=dates, columns=self.close.columns)
+        self.score.iloc[0] = [0.6, 0.9, 0.8]
+    
+    def test_order_independent_sizing(self):
+        """ทดสอบว่าผลลัพธ์ไม่ขึ้นกับลำดับหุ้น"""
+        results = PortfolioBacktester(initial_capital=10000).run(
+            self.close, self.buy, self.sell, self.score)
+        
+        reversed_cols = list(reversed(self.close.columns))
+        reversed_results = PortfolioBacktester(initial_capital=10000).run(
+            self.close[reversed_cols], self.buy[reversed_cols],
+            self.sell[reversed_cols], self.score[reversed_cols])
+        
+        self.assertAlmostEqual(results['final_capital'], reversed_results['final_capital'], places=6)
+        
+        # ทุกสัญญาณในวันแรกใช้เงินสดก้อนเดียวกัน (20% ของ 10000)
+        holdings = results['holdings'].iloc[0]
+        self.assertEqual(holdings['AAA'], 19)
+        self.assertEqual(holdings['BBB'], 39)
+        self.assertEqual(holdings['CCC'], 99)
+    
+    def test_max_positions_ranked_by_score(self):
+        """ทดสอบการจำกัดจำนวน positions ตาม score"""
+        backtester = PortfolioBacktester(initial_capital=10000, max_positions=2)
+        results = backtester.run(self.close, self.buy, self.sell, self.score)
+        
+        first_day = results['holdings'].iloc[0]
+        self.assertEqual((first_day > 0).sum(), 2)
+        self.assertEqual(first_day['AAA'], 0)  # score ต่ำสุดถูกตัดออก
+    
+    def test_unaffordable_signal_skipped(self):
+        """ทดสอบว่าสัญญาณที่เงินสดไม่พอถูกข้าม แต่สัญญาณลำดับถัดไปที่ถูกกว่ายังซื้อได้"""
+        close = self.close.copy()
+        close['AAA'] = 5000.0  # 1 หุ้นแพงกว่าเงินสดที่เหลือหลังซื้อ BBB
+        score = self.score.copy()
+        score.iloc[0] = [0.8, 0.9, 0.6]
+        backtester = PortfolioBacktester(initial_capital=6000, commission=0, slippage=0)
+        results = backtester.run(close, self.buy, self.sell, score)
+        
+        first_day = results['holdings'].iloc[0]
+        self.assertEqual(first_day['AAA'], 0)
+        self.assertGreater(first_day['BBB'], 0)
+        self.assertGreater(first_day['CCC'], 0)
+    
+    def test_cash_accounting(self):
+        """ทดสอบการคำนวณเงินสดและการปิด position"""
+        no_stops = IntrabarExecution(stop_loss_pct=None, take_profit_pct=None)
+        backtester = PortfolioBacktester(initial_capital=10000, commission=0, slippage=0,
+                                         execution=no_stops)
+        results = backtester.run(self.close, self.buy, self.sell, self.score)
+        
+        # ขาย AAA ในวันที่ 4 และปิดที่เหลือวันสุดท้าย
+        trades = backtester.get_trade_history()
+        self.assertEqual((trades['Action'] == 'BUY').sum(), 3)
+        self.assertEqual((trades['Action'] == 'SELL').sum(), 3)
+        self.assertEqual(results['holdings'].iloc[3]['AAA'], 0)
+        
+        expected = 10000 + 20 * (103 - 100) + 40 * (55 - 50) + 100 * (22 - 20)
+        self.assertAlmostEqual(results['final_capital'], expected, places=6)
+        self.assertAlmostEqual(results['equity_curve']['Portfolio Value'].iloc[-1], expected, places=6)
+
+
+class TestMultiStrategyRunner(unittest.TestCase):
+    """ทดสอบ MultiStrategyRunner"""
+    
+    def setUp(self):
+        self.history = generate_ohlcv(n_symbols=4, periods=400, seed=3)
+        self.symbols = list(self.history)
+        self.dates = self.history['SYN0000'].index
+    
+    def train_ai(self):
+        """ฝึก AISignalGenerator ด้วยผลตอบแทนล่วงหน้า 5 วัน"""
+        from src.analysis.technical import TechnicalAnalyzer
+        from src.signals.generator import AISignalGenerator
+        data = self.history['SYN0000']
+        features = AISignalGenerator.prepare_feature_matrix(TechnicalAnalyzer.get_indicator_history(data))
+        forward = data['Close'].pct_change(5).shift(-5).fillna(0).to_numpy()
+        labels = np.where(forward > 0.02, 2, np.where(forward < -0.02, 0, 1))
+        
+        generator = AISignalGenerator()
+        generator.train_model(features, labels)
+        return generator
+    
+    def test_technical_variants_match_single_runs(self):
+        """ทดสอบว่าผลแต่ละกลยุทธ์เท่ากับการรัน PortfolioBacktester ทีละครั้ง"""
+        runner = MultiStrategyRunner()
+        table = runner.run(self.symbols, self.dates[100], self.dates[-1],
+                           [('technical', 0.5), ('technical', 0.7)], historical_data=self.history)
+        
+        self.assertEqual(list(table.index), ['technical@0.50', 'technical@0.70'])
+        for name, min_confidence in (('technical@0.50', 0.5), ('technical@0.70', 0.7)):
+            single = PortfolioBacktester().run_backtest(self.symbols, self.dates[100], self.dates[-1],
+                                                        min_confidence, historical_data=self.history)
+            self.assertAlmostEqual(table.loc[name, 'final_capital'], single['final_capital'])
+            self.assertEqual(table.loc[name, 'total_trades'], single['total_trades'])
+    
+    def test_ai_strategies(self):
+        """ทดสอบกลยุทธ์ ai/combined และการข้ามเมื่อ model ยังไม่ได้ฝึก"""
+        strategies = [{'strategy': 'ai', 'min_confidence': 0.5, 'name': 'AI'}, ('combined', 0.5)]
+        runner = MultiStrategyRunner()
+        
+        skipped = runner.run(self.symbols, self.dates[100], self.dates[-1], strategies,
+                             historical_data=self.history)
+        self.assertTrue(skipped.empty)
+        
+        table = runner.run(self.symbols, self.dates[100], self.dates[-1], strategies,
+                           historical_data=self.history, ai_generator=self.train_ai())
+        self.assertEqual(list(table.index), ['AI', 'combined@0.50'])
+        self.assertEqual(len(runner.results['AI']['trade_log']), len(runner.results['AI']['trades']))
+    
+    def test_unknown_strategy(self):
+        """ทดสอบว่ากลยุทธ์ที่ไม่รู้จักทำให้เกิด ValueError"""
+        with self.assertRaises(ValueError):
+            MultiStrategyRunner.normalize_strategies([('momentum', 0.5)])
+    
+    def test_backtester_ai_strategy(self):
+        """ทดสอบว่า Backtester ใช้สัญญาณ AI ของ analyzer_app เมื่อ strategy='ai'"""
+        app = type('App', (), {'ai_signal_generator': self.train_ai()})()
+        backtester = Backtester()
+        results = backtester.run_backtest(app, self.symbols, self.dates[100], self.dates[-1], strategy='ai',
+                                          min_confidence=0.5, historical_data=self.history)
+        
+        self.assertGreater(results['total_trades'], 0)
+        history = backtester.get_trade_history()
+        buy_reasons = history.loc[history['Action'] == 'BUY', 'Reason'].astype(str)
+        self.assertTrue(buy_reasons.str.startswith('AI signal').all())
+        
+        panels = Backtester.prepare_signal_panels(self.history)
+        Backtester.apply_ai_signals(panels, app.ai_signal_generator)
+        expected = app.ai_signal_generator.predict_signals_vectorized(panels[self.symbols[0]]['frame'])
+        np.testing.assert_array_equal(panels[self.symbols[0]]['buy'], expected['buy'].to_numpy() == 1)
+    
+    def test_backtester_ai_strategy_requires_trained_model(self):
+        """ทดสอบว่า strategy='ai' โดยไม่มี model ที่ฝึกแล้วทำให้เกิด ValueError"""
+        with self.assertRaises(ValueError):
+            Backtester().run_backtest(None, self.symbols, self.dates[100], self.dates[-1], strategy='ai',
+                                      historical_data=self.history)
+
+
+class TestTradeLog(unittest.TestCase):
+    """ทดสอบ TradeLog class"""
+    
+    def test_append_grows_buffers(self):
+        """ทดสอบการขยาย buffer เมื่อเพิ่ม trades เกินความจุ"""
+        log = TradeLog(capacity=2)
+        for i in range(5):
+            log.append(datetime(2024, 1, 1 + i), 'AAPL', 'BUY', 100.0 + i, 10)
+        
+        self.assertEqual(len(log), 5)
+        self.assertGreaterEqual(log.capacity, 5)
+        self.assertEqual(list(log.column('price')), [100.0, 101.0, 102.0, 103.0, 104.0])
+    
+    def test_to_frame_matches_trade_history_format(self):
+        """ทดสอบว่า DataFrame มีรูปแบบเดียวกับ get_trade_history"""
+        backtester = Backtester(initial_capital=10000)
+        backtester.execute_trade('AAPL', 'BUY', 100, datetime(2024, 1, 1), 'Test buy')
+        backtester.execute_trade('AAPL', 'SELL', 110, datetime(2024, 1, 5), 'Test sell')
+        
+        history = backtester.get_trade_history()
+        self.assertEqual(list(history.columns),
+                         ['Date', 'Symbol', 'Action', 'Price', 'Quantity', 'Total', 'P/L', 'P/L %', 'Reason'])
+        self.assertEqual(list(history['Action']), ['BUY', 'SELL'])
+        self.assertEqual(history['Reason'].iloc[1], 'Test sell')
+        self.assertAlmostEqual(history['P/L'].iloc[1], backtester.trades[-1].profit_loss)
+    
+    def test_memory_per_trade(self):
+        """ทดสอบว่าหน่วยความจำต่อ trade น้อยกว่า 64 bytes"""
+        log = TradeLog(capacity=10000)
+        codes = log.symbol_codes(['AAPL', 'MSFT'])
+        log.extend(pd.Timestamp('2024-01-01'), np.resize(codes, 10000), 'BUY',
+                   np.full(10000, 100.0), np.full(10000, 5.0))
+        
+        self.assertEqual(len(log), 10000)
+        self.assertLess(log.nbytes / len(log), 64)
+    
+    def test_without_trade_objects(self):
+        """ทดสอบโหมดที่ไม่เก็บ Trade objects"""
+        backtester = Backtester(initial_capital=10000, keep_trade_objects=False)
+        backtester.execute_trade('AAPL', 'BUY', 100, datetime(2024, 1, 1))
+        backtester.execute_trade('AAPL', 'SELL', 110, datetime(2024, 1, 5))
+        backtester.update_portfolio_value(datetime(2024, 1, 5), {})
+        
+        results = backtester.get_results()
+        self.assertEqual(len(backtester.trades), 0)
+        self.assertEqual(results['total_trades'], 1)
+        self.assertEqual(results['winning_trades'], 1)
+    
+    def test_clear_keeps_exported_frame(self):
+        """ทดสอบว่า DataFrame ที่ export ก่อน clear() ไม่ถูกเขียนทับ"""
+        log = TradeLog(capacity=4)
+        log.append(datetime(2024, 1, 1), 'AAPL', 'BUY', 100.0, 10)
+        frame = log.to_frame()
+        
+        log.clear()
+        log.append(datetime(2024, 2, 1), 'MSFT', 'SELL', 200.0, 5)
+        
+        self.assertEqual(list(frame['Symbol']), ['AAPL'])
+        self.assertEqual(list(frame['Price']), [100.0])
+        self.assertEqual(log.capacity, 4)
+    
+    def test_rerun_keeps_previous_results(self):
+        """ทดสอบว่าการรัน Backtester ตัวเดิมซ้ำไม่เปลี่ยนผลของรอบก่อน"""
+        backtester = Backtester(initial_capital=10000)
+        first = backtester.run_backtest(None, ['AAA'], '2023-06-01', '2024-02-01',
+                                        historical_data=make_price_history(['AAA'], seed=1))
+        first_history = backtester.get_trade_history()
+        expected = first_history.copy()
+        first_log = first['trade_log'].to_frame().copy()
+        self.assertGreater(len(expected), 0)
+        
+        backtester.run_backtest(None, ['BBB'], '2023-06-01', '2024-02-01',
+                                historical_data=make_price_history(['BBB'], seed=2))
+        
+        pd.testing.assert_frame_equal(first_history, expected)
+        pd.testing.assert_frame_equal(first['trade_log'].to_frame(), first_log)
+        self.assertEqual(set(first_log['Symbol']), {'AAA'})
+
+
 if __name__ == '__main__':
     # รัน tests
     unittest.main(verbosity=2)